@@ -0,0 +1,68 @@
+"""
+Benchmark the round completion planner on synthetic walks over the 282
+Munros: greedy weighted set cover, the local search on its plan, and the
+exact branch and bound seeded with the result.
+
+Run from the root of the project:
+
+    uv run python -m benchmarks.bench_completion
+"""
+
+import time
+
+import numpy as np
+
+from src.users.completion import CompletionPlanner
+from src.users.hill_bitsets import WalkHillBitsets
+
+HILLS = 282
+WALK_COUNTS = (400, 2_500)
+REGION_HILLS = 12
+
+
+def make_instance(walks: int, seed: int = 0):
+    """
+    Walks of one to five hills from the same area, as hills on a walk are
+    close together, with total times of four to fourteen hours. The hills
+    fall into areas of REGION_HILLS, like the Munro regions.
+    """
+    rng = np.random.default_rng(seed)
+    pairs = []
+    for walk in range(walks):
+        region = rng.integers(0, HILLS // REGION_HILLS + 1) * REGION_HILLS
+        hills = region + rng.integers(0, REGION_HILLS, rng.integers(1, 6))
+        pairs.extend((walk, int(hill)) for hill in set(hills) if hill < HILLS)
+    bitsets = WalkHillBitsets.from_pairs(pairs)
+    bits = bitsets.walk_bits(np.arange(walks))
+    costs = rng.uniform(4, 14, walks) * 3600
+    return bits, costs, np.bitwise_or.reduce(bits, axis=0)
+
+
+def main() -> None:
+    for walks in WALK_COUNTS:
+        bits, costs, target = make_instance(walks)
+        print(f"{walks:,} walks over {HILLS} hills")
+
+        start = time.perf_counter()
+        chosen = CompletionPlanner.greedy(bits, costs, target)
+        print(
+            f"  greedy        {(time.perf_counter() - start) * 1000:8.1f} ms  "
+            f"{len(chosen):>3} walks  {costs[chosen].sum() / 3600:7.1f} h"
+        )
+        start = time.perf_counter()
+        chosen = CompletionPlanner.improve(bits, costs, chosen, target)
+        print(
+            f"  local search  {(time.perf_counter() - start) * 1000:8.1f} ms  "
+            f"{len(chosen):>3} walks  {costs[chosen].sum() / 3600:7.1f} h"
+        )
+        start = time.perf_counter()
+        chosen, proved = CompletionPlanner.branch_and_bound(bits, costs, target, chosen)
+        print(
+            f"  exact         {(time.perf_counter() - start) * 1000:8.1f} ms  "
+            f"{len(chosen):>3} walks  {costs[chosen].sum() / 3600:7.1f} h  "
+            f"{'optimal' if proved else 'node limit reached'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
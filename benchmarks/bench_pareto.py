@@ -0,0 +1,71 @@
+"""
+Benchmark the Pareto front of user walks: comparing every pair of walks
+against RankingEngine.pareto_indices, which sorts once and sweeps.
+
+Run from the root of the project:
+
+    uv run python -m benchmarks.bench_pareto
+"""
+
+import time
+from collections.abc import Callable
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.users.ranking import RankingEngine
+
+SIZES = (2_000, 10_000, 100_000)
+# Pairwise comparison is quadratic and takes seconds beyond this.
+PAIRWISE_MAX_ROWS = 10_000
+
+
+def make_keys(count: int, objectives: int, seed: int = 0) -> NDArray[np.float64]:
+    """
+    Synthetic keys shaped like travel time, walk time and hills bagged
+    (negated), plus grade when four objectives are asked for.
+    """
+    rng = np.random.default_rng(seed)
+    columns = [
+        rng.uniform(600, 5 * 3600, count),
+        rng.uniform(2 * 3600, 12 * 3600, count),
+        -rng.integers(0, 6, count).astype(np.float64),
+        rng.integers(1, 6, count).astype(np.float64),
+    ]
+    return np.column_stack(columns[:objectives])
+
+
+def pareto_pairwise(keys: NDArray[np.float64]) -> NDArray[np.intp]:
+    """Every walk compared with every other walk, one row at a time."""
+    keep = []
+    for index, row in enumerate(keys):
+        dominated = np.any(np.all(keys <= row, axis=1) & np.any(keys < row, axis=1))
+        if not dominated:
+            keep.append(index)
+    return np.array(keep, dtype=np.intp)
+
+
+def measure(
+    name: str, front: Callable[[NDArray[np.float64]], NDArray[np.intp]], keys
+) -> set[int]:
+    """Print the time to find one front and return its rows."""
+    start = time.perf_counter()
+    result = front(keys)
+    elapsed = time.perf_counter() - start
+    print(f"  {name:<10} {elapsed * 1000:9.1f} ms  {result.size:,} walks on the front")
+    return set(result.tolist())
+
+
+def main() -> None:
+    for objectives in (3, 4):
+        for size in SIZES:
+            keys = make_keys(size, objectives)
+            print(f"{size:,} walks, {objectives} objectives")
+            engine = measure("sweep", RankingEngine.pareto_indices, keys)
+            if size <= PAIRWISE_MAX_ROWS:
+                pairwise = measure("pairwise", pareto_pairwise, keys)
+                assert engine == pairwise, "Fronts differ"
+
+
+if __name__ == "__main__":
+    main()
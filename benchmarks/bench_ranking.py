@@ -0,0 +1,92 @@
+"""
+Benchmark ranking a user's walks by total time: building a record per walk
+and sorting them all, against the columnar RankingEngine that scores every
+walk at once and only sorts the top walks.
+
+Run from the root of the project:
+
+    uv run python -m benchmarks.bench_ranking
+"""
+
+import gc
+import time
+from collections.abc import Callable
+
+from src.users.data import UserData
+from src.users.ranking import RankingEngine, WalkColumns
+
+ROWS = 100_000
+TOP = 10
+REPEATS = 5
+
+
+def make_detail_rows(count: int) -> list[tuple]:
+    """Build synthetic rows shaped like the user walk travel query results."""
+    return [
+        (
+            walk_id,
+            f"Walk {walk_id}",
+            "https://www.google.com/maps/search/56.90890,-4.23660/",
+            800 + walk_id % 500,
+            12.5,
+            6.25,
+            f"https://www.walkhighlands.co.uk/walk-{walk_id}",
+            150_000 + walk_id,
+            7_200 + (walk_id * 7_919) % 36_000,
+            '["Hill One","Hill Two"]',
+        )
+        for walk_id in range(count)
+    ]
+
+
+def make_column_rows(detail_rows: list[tuple]) -> list[tuple]:
+    """The same walks as rows of the ranking columns query."""
+    return [
+        (row[0], int(row[5] * 3600), row[4], row[3], 2, row[7], row[8], 3, 2, 4.0)
+        for row in detail_rows
+    ]
+
+
+def rank_records(rows: tuple[list[tuple], list[tuple]]) -> list[int]:
+    """Build every record, total it and sort the whole list."""
+    detail_rows, _ = rows
+    records = [UserData._row_to_record(1, row) for row in detail_rows]
+    for record in records:
+        record.total_time_seconds = (
+            record.walk_duration_seconds + 2 * record.travel_duration_seconds
+        )
+    records.sort(key=lambda record: record.total_time_seconds)
+    return [record.walk_id for record in records[:TOP]]
+
+
+def rank_columns(rows: tuple[list[tuple], list[tuple]]) -> list[int]:
+    """Load the columns, score them at once and partition out the top walks."""
+    _, column_rows = rows
+    columns = WalkColumns.from_rows(column_rows)
+    top, _ = RankingEngine.rank(columns, TOP)
+    return columns.walk_ids[top].tolist()
+
+
+def measure(name: str, rank: Callable[[tuple], list[int]], rows: tuple) -> list[int]:
+    """Print the best time of a few runs of one ranking."""
+    timings = []
+    for _ in range(REPEATS):
+        gc.collect()
+        start = time.perf_counter()
+        result = rank(rows)
+        timings.append(time.perf_counter() - start)
+    print(f"{name:<10} {min(timings) * 1000:8.1f} ms for top {TOP} of {ROWS:,}")
+    return result
+
+
+def main() -> None:
+    detail_rows = make_detail_rows(ROWS)
+    rows = (detail_rows, make_column_rows(detail_rows))
+    print(f"Ranking {ROWS:,} user walks")
+    expected = measure("records", rank_records, rows)
+    actual = measure("columns", rank_columns, rows)
+    assert actual == expected, "Rankings differ"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark building walk travel rows as nested pydantic models against the
+slotted UserWalkTravelRecord used on the internal read paths.
+
+Run from the root of the project:
+
+    uv run python -m benchmarks.bench_read_records
+"""
+
+import gc
+import json
+import time
+import tracemalloc
+from collections.abc import Callable
+
+from src.users.data import UserData
+from src.users.dtos import TravelInfo, UserWalkTravelInfo, WalkInfo
+from src.utils.distance import kilometers_to_meters
+from src.utils.time import hours_to_seconds
+
+ROWS = 100_000
+
+
+def make_rows(count: int) -> list[tuple]:
+    """Build synthetic rows shaped like the user walk travel query results."""
+    return [
+        (
+            walk_id,
+            f"Walk {walk_id}",
+            "https://www.google.com/maps/search/56.90890,-4.23660/",
+            800 + walk_id % 500,
+            12.5,
+            6.25,
+            f"https://www.walkhighlands.co.uk/walk-{walk_id}",
+            150_000 + walk_id,
+            7_200 + walk_id % 3_600,
+            '["Hill One","Hill Two"]',
+        )
+        for walk_id in range(count)
+    ]
+
+
+def build_pydantic(rows: list[tuple]) -> list[UserWalkTravelInfo]:
+    """Build the nested, validated models the read path used before."""
+    result = []
+    for row in rows:
+        hills = json.loads(row[9]) if row[9] else []
+        result.append(
+            UserWalkTravelInfo(
+                user_id=1,
+                walk_info=WalkInfo(
+                    walk_id=row[0],
+                    walk_name=row[1],
+                    walk_start_location=row[2],
+                    walk_ascent_meters=row[3],
+                    walk_distance_meters=kilometers_to_meters(row[4]),
+                    walk_duration_seconds=hours_to_seconds(float(row[5])),
+                    walk_url=row[6],
+                    number_of_hills=len(hills),
+                    hills=hills,
+                ),
+                travel_info=TravelInfo(distance_meters=row[7], duration_seconds=row[8]),
+            )
+        )
+    return result
+
+
+def build_records(rows: list[tuple]) -> list:
+    """Build the slotted records the read path uses now."""
+    return [UserData._row_to_record(1, row) for row in rows]
+
+
+def measure(name: str, build: Callable[[list[tuple]], list], rows: list) -> None:
+    """Print the time, allocated blocks and peak memory for one build."""
+    gc.collect()
+    start = time.perf_counter()
+    build(rows)
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = build(rows)
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    del result
+
+    per_100k = elapsed * 100_000 / len(rows)
+    print(
+        f"{name:<10} {per_100k:8.3f} s/100k rows  "
+        f"{blocks:>10,} blocks retained  {peak / 1024 / 1024:8.1f} MiB peak"
+    )
+
+
+def main() -> None:
+    rows = make_rows(ROWS)
+    print(f"Building {ROWS:,} user walk travel rows")
+    measure("pydantic", build_pydantic, rows)
+    measure("records", build_records, rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark the season scheduler on synthetic walks over the 282 Munros:
+daylight for every walk start on every weekend day of a year, then the
+lazy greedy schedule with its augmenting path matching.
+
+Run from the root of the project:
+
+    uv run python -m benchmarks.bench_season
+"""
+
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from src.users.hill_bitsets import WalkHillBitsets
+from src.users.season import UNSCHEDULED, SeasonScheduler
+from src.utils.daylight import day_of_year, daylight_seconds
+
+HILLS = 282
+WALK_COUNTS = (400, 2_500)
+REGION_HILLS = 12
+FIRST_DAY = date(2026, 1, 3)
+
+
+def make_instance(walks: int, seed: int = 0):
+    """
+    Walks of one to five hills from the same area, starting between 56 and
+    58.5 degrees north, with total times of four to sixteen hours.
+    """
+    rng = np.random.default_rng(seed)
+    pairs = []
+    for walk in range(walks):
+        region = rng.integers(0, HILLS // REGION_HILLS + 1) * REGION_HILLS
+        hills = region + rng.integers(0, REGION_HILLS, rng.integers(1, 6))
+        pairs.extend((walk, int(hill)) for hill in set(hills) if hill < HILLS)
+    bitsets = WalkHillBitsets.from_pairs(pairs)
+    bits = bitsets.walk_bits(np.arange(walks))
+    latitude = rng.uniform(56.0, 58.5, walks)
+    costs = rng.uniform(4, 16, walks) * 3600
+    return bits, costs, latitude
+
+
+def main() -> None:
+    weekends = [
+        FIRST_DAY + timedelta(weeks=week, days=offset)
+        for week in range(52)
+        for offset in (0, 1)
+    ]
+    days = day_of_year(weekends)
+    for walks in WALK_COUNTS:
+        bits, costs, latitude = make_instance(walks)
+        print(f"{walks:,} walks over {HILLS} hills, {len(weekends)} weekend days")
+
+        start = time.perf_counter()
+        daylight = daylight_seconds(latitude[:, None], days[None, :])
+        print(f"  daylight      {(time.perf_counter() - start) * 1000:8.1f} ms")
+        start = time.perf_counter()
+        schedule = SeasonScheduler.schedule(bits, costs, daylight)
+        scheduled = schedule[schedule != UNSCHEDULED]
+        hills = WalkHillBitsets.popcount(np.bitwise_or.reduce(bits[scheduled], axis=0))
+        print(
+            f"  schedule      {(time.perf_counter() - start) * 1000:8.1f} ms  "
+            f"{scheduled.size:>3} walks  {hills:>3} hills"
+        )
+
+
+if __name__ == "__main__":
+    main()
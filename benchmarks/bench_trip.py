@@ -0,0 +1,81 @@
+"""
+Benchmark the multi-day trip planner on synthetic walks scattered around a
+base: greedy insertion alone, then the full plan with 2-opt, Or-opt and
+swap local search.
+
+Run from the root of the project:
+
+    uv run python -m benchmarks.bench_trip
+"""
+
+import time
+
+import numpy as np
+
+from src.maps.estimator import TravelTimeEstimator
+from src.users.hill_bitsets import WalkHillBitsets
+from src.users.trip import TripPlanner
+
+HILLS = 282
+WALK_COUNTS = (300, 1_500)
+REGION_HILLS = 12
+DAYS = 7
+DAILY_BUDGET_SECONDS = 10 * 3600
+BASE = (57.0, -5.0)
+
+
+def make_instance(walks: int, seed: int = 0):
+    """
+    Walks of one to five hills from the same area starting within about
+    100 km of the base, each taking three to nine hours.
+    """
+    rng = np.random.default_rng(seed)
+    pairs = []
+    for walk in range(walks):
+        region = rng.integers(0, HILLS // REGION_HILLS + 1) * REGION_HILLS
+        hills = region + rng.integers(0, REGION_HILLS, rng.integers(1, 6))
+        pairs.extend((walk, int(hill)) for hill in set(hills) if hill < HILLS)
+    bitsets = WalkHillBitsets.from_pairs(pairs)
+    bits = bitsets.walk_bits(np.arange(walks))
+    lat = np.concatenate([[BASE[0]], BASE[0] + rng.uniform(-0.9, 0.9, walks)])
+    lon = np.concatenate([[BASE[1]], BASE[1] + rng.uniform(-1.5, 1.5, walks)])
+    travel = TravelTimeEstimator().estimate_matrix_seconds(lat, lon)
+    walk_seconds = rng.uniform(3, 9, walks) * 3600
+    return travel, walk_seconds, bits
+
+
+def describe(routes, travel, walk_seconds, bits) -> str:
+    covered = np.bitwise_or.reduce(
+        bits[[walk for route in routes for walk in route]], axis=0
+    )
+    hours = sum(TripPlanner.day_seconds(r, travel, walk_seconds) for r in routes)
+    return (
+        f"{sum(map(len, routes)):>3} walks  "
+        f"{int(WalkHillBitsets.popcount(covered)):>3} hills  {hours / 3600:6.1f} h"
+    )
+
+
+def main() -> None:
+    for walks in WALK_COUNTS:
+        travel, walk_seconds, bits = make_instance(walks)
+        print(f"{walks:,} walks, {DAYS} days of {DAILY_BUDGET_SECONDS // 3600} h")
+
+        start = time.perf_counter()
+        routes = [[] for _ in range(DAYS)]
+        TripPlanner.insert(routes, travel, walk_seconds, bits, DAILY_BUDGET_SECONDS)
+        print(
+            f"  greedy insertion  {(time.perf_counter() - start) * 1000:8.1f} ms  "
+            f"{describe(routes, travel, walk_seconds, bits)}"
+        )
+        start = time.perf_counter()
+        routes = TripPlanner.solve(
+            travel, walk_seconds, bits, DAYS, DAILY_BUDGET_SECONDS
+        )
+        print(
+            f"  with local search {(time.perf_counter() - start) * 1000:8.1f} ms  "
+            f"{describe(routes, travel, walk_seconds, bits)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,24 @@
 from src.walkhighlands.api import WalkhighlandsAPI
-from src.users.service import UsersService
+from src.maps.api import MapsApi
+from src.users.service import (
+    DEFAULT_GROUP_MAX_WEIGHT,
+    GROUP_AGGREGATES,
+    UsersService,
+)
 from src.exporter.csv_exporter import CsvExporter
 from src.users.data import UserData
 from src.users.api import UsersAPI
+from src.users.dtos import WalkFilters
+from src.users.ranking import DEFAULT_PARETO_OBJECTIVES, PARETO_OBJECTIVES
+from src.users.scoring import (
+    SCORE_FUNCTIONS,
+    SCORE_VARIABLES,
+    ScoreExpressionError,
+    compile_score,
+)
 import argparse
 import sys
+from datetime import date
 from src.utils.logging_config import init_logging
 import logging
 from dotenv import load_dotenv
@@ -19,6 +33,7 @@ def initialize(args):
     logger.info("Initializing with arguments", extra={"cli_args": vars(args)})
     WalkhighlandsAPI.initialize_app()
     UsersAPI.initialize_users()
+    MapsApi.initialize_maps()
     logger.info("Initialization complete.")
 
 
@@ -54,21 +69,112 @@ def add_user(args):
     UsersAPI.add_user(args.name, args.postcode)
 
 
+def import_users(args):
+    logger.info("Importing users", extra={"cli_args": vars(args)})
+    results = UsersAPI.import_users(args.file)
+    UsersService.display_user_import_report(results)
+
+
+def bag_hills(args):
+    logger.info("Bagging hills", extra={"cli_args": vars(args)})
+    UsersAPI.bag_hills(args.user, args.hills)
+
+
+def unbag_hills(args):
+    logger.info("Unbagging hills", extra={"cli_args": vars(args)})
+    UsersAPI.unbag_hills(args.user, args.hills)
+
+
+def import_postcodes(args):
+    logger.info("Importing postcodes", extra={"cli_args": vars(args)})
+    UsersAPI.import_postcodes(args.file)
+
+
+def build_travel_matrix(args):
+    logger.info("Building travel matrix", extra={"cli_args": vars(args)})
+    UsersAPI.refresh_travel_matrix(rebuild=args.rebuild)
+
+
 def get_walk_directions_for_user(args):
     logger.info("Getting walk directions for user", extra={"cli_args": vars(args)})
-    UsersAPI.get_walk_directions_for_user(args.user)
+    if args.dry_run:
+        plan = UsersAPI.plan_walk_directions_for_user(
+            args.user, top_n=args.top, retry_failed=args.retry_failed
+        )
+        UsersService.display_walk_directions_plan(plan)
+        return
+    UsersAPI.get_walk_directions_for_user(
+        args.user, top_n=args.top, retry_failed=args.retry_failed
+    )
 
 
 def directions(args):
-    from src.maps.api import MapsApi
-
     dirs = MapsApi.get_driving_distance_and_time(args.start, args.end)
     logger.info("Directions fetched", extra={"directions": dirs.model_dump()})
 
 
 def get_optimal_user_routes(args):
     logger.info("Getting optimal routes for user", extra={"cli_args": vars(args)})
-    UsersAPI.get_optimal_user_routes(args.users, args.number_of_routes, args.ascending)
+    score = compile_score(args.score) if args.score else None
+    filters = WalkFilters(
+        min_hills=args.min_hills,
+        max_grade=args.max_grade,
+        max_bog_factor=args.max_bog_factor,
+        min_rating=args.min_rating,
+        max_distance_km=args.max_distance,
+        max_ascent_meters=args.max_ascent,
+        min_new_hills=args.min_new_hills,
+    )
+    if len(args.users) > 1:
+        if args.fetch_missing:
+            # A member's own top routes say little about the group's, so
+            # every missing walk is fetched.
+            for user in args.users:
+                UsersAPI.get_walk_directions_for_user(user, filters=filters)
+        UsersAPI.get_optimal_group_routes(
+            args.users,
+            args.number_of_routes,
+            args.ascending,
+            filters,
+            args.aggregate,
+            args.max_weight,
+        )
+        return
+    (user,) = args.users
+    pareto = args.pareto is not None
+    if args.fetch_missing:
+        # Only the ascending total time ranking can be pruned by a lower bound.
+        prunable = args.ascending and score is None and not pareto
+        UsersAPI.get_walk_directions_for_user(
+            user,
+            top_n=args.number_of_routes if prunable else None,
+            filters=filters,
+        )
+    if pareto:
+        UsersAPI.get_pareto_user_routes(
+            user, args.pareto or DEFAULT_PARETO_OBJECTIVES, filters
+        )
+        return
+    UsersAPI.get_optimal_user_routes(
+        user, args.number_of_routes, args.ascending, filters, score
+    )
+
+
+def plan_completion(args):
+    logger.info("Planning round completion", extra={"cli_args": vars(args)})
+    UsersAPI.plan_completion(args.user, planning_filters(args), exact=args.exact)
+
+
+def plan_season(args):
+    logger.info("Planning season", extra={"cli_args": vars(args)})
+    UsersAPI.plan_season(args.user, args.dates, planning_filters(args))
+
+
+def plan_trip(args):
+    logger.info("Planning trip", extra={"cli_args": vars(args)})
+    UsersAPI.plan_trip(
+        args.user, args.days, args.daily_hours, args.base, planning_filters(args)
+    )
 
 
 def export_user_routes_to_csv(args):
@@ -77,10 +183,55 @@ def export_user_routes_to_csv(args):
     if not user_id:
         logger.error("User not found", extra={"user": args.user})
         return
-    walk_travel_infos = UsersService.calculate_user_total_times(user_id)
+    walk_travel_infos = UsersService.iter_ranked_user_walks(user_id, args.top)
     CsvExporter.export_user_walk_travel_info(args.user, walk_travel_infos, args.output)
 
 
+def planning_filters(args) -> WalkFilters:
+    """Walk filters from the flags added by add_planning_filter_arguments."""
+    return WalkFilters(
+        max_grade=args.max_grade,
+        max_bog_factor=args.max_bog_factor,
+        max_distance_km=args.max_distance,
+        max_ascent_meters=args.max_ascent,
+    )
+
+
+def add_planning_filter_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the walk filter flags shared by the planning commands."""
+    parser.add_argument(
+        "--max_grade", type=int, default=None, help="Maximum walk grade"
+    )
+    parser.add_argument(
+        "--max_bog_factor", type=int, default=None, help="Maximum walk bog factor"
+    )
+    parser.add_argument(
+        "--max_distance",
+        type=float,
+        default=None,
+        help="Maximum walk distance in kilometers",
+    )
+    parser.add_argument(
+        "--max_ascent",
+        type=int,
+        default=None,
+        help="Maximum walk ascent in meters",
+    )
+
+
+def score_expression(expression: str) -> str:
+    """
+    Check a --score expression compiles, reporting invalid ones as usage
+    errors. The text is kept, so the arguments can still be logged, and
+    compiled again where it is used.
+    """
+    try:
+        compile_score(expression)
+    except ScoreExpressionError as e:
+        raise argparse.ArgumentTypeError(str(e)) from e
+    return expression
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Walkhighlands CLI Tool",
@@ -93,9 +244,17 @@ def main():
         fetch-walks: Fetch walks for a specific hill.
         reset-db: Reset the database.
         add-user: Add a new user.
+        import-users: Add users from a CSV or JSONL of names and postcodes.
+        import-postcodes: Import a postcode directory CSV for offline lookups.
+        bag: Record hills a user has climbed.
+        unbag: Remove hills from a user's bagged hills.
         directions: test to get driving directions
         walk-directions: Get walking directions for a user to a walk.
+        build-travel-matrix: Build or update the users x walks travel matrix.
         optimal-routes: Get optimal routes for user walk.
+        plan-completion: Plan the quickest set of walks to bag every remaining hill.
+        plan-trip: Plan a multi-day trip from a base to bag the most hills.
+        plan-season: Schedule walks on available dates within daylight.
         export-csv: Export user walk data to a CSV file.
     """,
     )
@@ -117,6 +276,44 @@ def main():
     user_parser.add_argument(
         "--postcode", type=str, required=True, help="Postcode of the user"
     )
+    import_users_parser = subparsers.add_parser(
+        "import-users", help="Add users from a CSV or JSONL file"
+    )
+    import_users_parser.add_argument(
+        "--file",
+        type=str,
+        required=True,
+        help="CSV with name and postcode columns, or JSONL with name and postcode",
+    )
+    bag_parser = subparsers.add_parser("bag", help="Record hills a user has climbed")
+    bag_parser.add_argument("--user", type=str, required=True, help="User's name")
+    bag_parser.add_argument(
+        "--hills",
+        type=str,
+        nargs="+",
+        required=True,
+        help="Hill names, e.g. 'Ben Nevis', or hill ids",
+    )
+    unbag_parser = subparsers.add_parser(
+        "unbag", help="Remove hills from a user's bagged hills"
+    )
+    unbag_parser.add_argument("--user", type=str, required=True, help="User's name")
+    unbag_parser.add_argument(
+        "--hills",
+        type=str,
+        nargs="+",
+        required=True,
+        help="Hill names or hill ids",
+    )
+    import_postcodes_parser = subparsers.add_parser(
+        "import-postcodes", help="Import a postcode directory CSV"
+    )
+    import_postcodes_parser.add_argument(
+        "--file",
+        type=str,
+        required=True,
+        help="CSV with postcode and latitude/longitude columns, e.g. the ONSPD",
+    )
     directions_parser = subparsers.add_parser(
         "directions", help="Get driving directions"
     )
@@ -138,11 +335,43 @@ def main():
     walk_directions_for_user_parser.add_argument(
         "--user", type=str, required=True, help="User's name"
     )
+    walk_directions_for_user_parser.add_argument(
+        "--top",
+        type=int,
+        default=None,
+        help=(
+            "Only fetch directions for walks that could be among the N "
+            "shortest total times, using offline travel estimates"
+        ),
+    )
+    walk_directions_for_user_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Report how many uncached route lookups the run would make and stop",
+    )
+    walk_directions_for_user_parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="Only fetch directions for walks that failed on an earlier run",
+    )
+    build_travel_matrix_parser = subparsers.add_parser(
+        "build-travel-matrix",
+        help="Build or update the memory-mapped users x walks travel matrix",
+    )
+    build_travel_matrix_parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Rebuild the matrix from scratch instead of adding new directions",
+    )
     optimal_routes_parser = subparsers.add_parser(
         "optimal-routes", help="Get optimal routes for user walks"
     )
     optimal_routes_parser.add_argument(
-        "--users", type=str, required=True, help="User's name"
+        "--users",
+        type=str,
+        nargs="+",
+        required=True,
+        help="User's name, or several names to plan for a group",
     )
     optimal_routes_parser.add_argument(
         "--number_of_routes",
@@ -155,6 +384,128 @@ def main():
         action="store_true",
         help="Sort routes in ascending total duration order",
     )
+    optimal_routes_parser.add_argument(
+        "--min_hills",
+        type=int,
+        default=1,
+        help="Minimum number of hills a walk must include",
+    )
+    optimal_routes_parser.add_argument(
+        "--min_new_hills",
+        type=int,
+        default=0,
+        help="Minimum number of hills the user has not bagged a walk must include",
+    )
+    optimal_routes_parser.add_argument(
+        "--max_grade", type=int, default=None, help="Maximum walk grade"
+    )
+    optimal_routes_parser.add_argument(
+        "--max_bog_factor", type=int, default=None, help="Maximum walk bog factor"
+    )
+    optimal_routes_parser.add_argument(
+        "--min_rating", type=float, default=None, help="Minimum walk user rating"
+    )
+    optimal_routes_parser.add_argument(
+        "--max_distance",
+        type=float,
+        default=None,
+        help="Maximum walk distance in kilometers",
+    )
+    optimal_routes_parser.add_argument(
+        "--max_ascent",
+        type=int,
+        default=None,
+        help="Maximum walk ascent in meters",
+    )
+    optimal_routes_parser.add_argument(
+        "--fetch_missing",
+        action="store_true",
+        help="Fetch directions for walks that could make the top routes first",
+    )
+    optimal_routes_parser.add_argument(
+        "--aggregate",
+        choices=GROUP_AGGREGATES,
+        default="max",
+        help=(
+            "How a group's total times are combined: the slowest member, "
+            "the sum, or a weighted mix of the slowest and the mean"
+        ),
+    )
+    optimal_routes_parser.add_argument(
+        "--max_weight",
+        type=float,
+        default=DEFAULT_GROUP_MAX_WEIGHT,
+        help="Weight of the slowest member in the weighted group aggregate",
+    )
+    optimal_routes_parser.add_argument(
+        "--score",
+        type=score_expression,
+        default=None,
+        help=(
+            "Rank by an expression instead of total time, e.g. "
+            "'hills / total_hours'. Variables: "
+            f"{', '.join(SCORE_VARIABLES)}. Functions: {', '.join(SCORE_FUNCTIONS)}"
+        ),
+    )
+    optimal_routes_parser.add_argument(
+        "--pareto",
+        nargs="*",
+        choices=PARETO_OBJECTIVES,
+        default=None,
+        metavar="OBJECTIVE",
+        help=(
+            "Show every walk no other walk beats on all of the objectives "
+            f"instead of a top N. Objectives: {', '.join(PARETO_OBJECTIVES)}; "
+            f"default: {' '.join(DEFAULT_PARETO_OBJECTIVES)}"
+        ),
+    )
+    plan_completion_parser = subparsers.add_parser(
+        "plan-completion",
+        help="Plan the quickest set of walks to bag every remaining hill",
+    )
+    plan_completion_parser.add_argument(
+        "--user", type=str, required=True, help="User's name"
+    )
+    plan_completion_parser.add_argument(
+        "--exact",
+        action="store_true",
+        help="Search for a provably optimal plan; practical for few remaining hills",
+    )
+    add_planning_filter_arguments(plan_completion_parser)
+    plan_season_parser = subparsers.add_parser(
+        "plan-season", help="Schedule walks on available dates within daylight"
+    )
+    plan_season_parser.add_argument(
+        "--user", type=str, required=True, help="User's name"
+    )
+    plan_season_parser.add_argument(
+        "--dates",
+        type=date.fromisoformat,
+        nargs="+",
+        required=True,
+        help="Available dates as YYYY-MM-DD",
+    )
+    add_planning_filter_arguments(plan_season_parser)
+    plan_trip_parser = subparsers.add_parser(
+        "plan-trip", help="Plan a multi-day trip from a base to bag the most hills"
+    )
+    plan_trip_parser.add_argument("--user", type=str, required=True, help="User's name")
+    plan_trip_parser.add_argument(
+        "--days", type=int, required=True, help="Number of days of walking"
+    )
+    plan_trip_parser.add_argument(
+        "--daily_hours",
+        type=float,
+        required=True,
+        help="Hours of driving and walking available each day",
+    )
+    plan_trip_parser.add_argument(
+        "--base",
+        type=str,
+        default=None,
+        help='Postcode or "lat,lon" of the trip base, the user\'s home by default',
+    )
+    add_planning_filter_arguments(plan_trip_parser)
     export_csv_parser = subparsers.add_parser(
         "export-csv", help="Export user walk data to a CSV file"
     )
@@ -168,8 +519,21 @@ def main():
         default=None,
         help="Output file path for the CSV.",
     )
+    export_csv_parser.add_argument(
+        "--top",
+        type=int,
+        default=None,
+        help="Only export the N walks with the shortest total time",
+    )
 
     args = parser.parse_args()
+    if args.command == "optimal-routes":
+        if args.score and args.pareto is not None:
+            parser.error("--score and --pareto cannot be used together")
+        if len(args.users) > 1 and (args.score or args.pareto is not None):
+            parser.error("--score and --pareto rank a single user's walks")
+    if args.command == "plan-trip" and (args.days < 1 or args.daily_hours <= 0):
+        parser.error("--days and --daily_hours must be positive")
 
     match args.command:
         case "init":
@@ -184,10 +548,26 @@ def main():
             add_user(args)
         case "directions":
             directions(args)
+        case "import-users":
+            import_users(args)
+        case "import-postcodes":
+            import_postcodes(args)
+        case "bag":
+            bag_hills(args)
+        case "unbag":
+            unbag_hills(args)
         case "walk-directions":
             get_walk_directions_for_user(args)
+        case "build-travel-matrix":
+            build_travel_matrix(args)
         case "optimal-routes":
             get_optimal_user_routes(args)
+        case "plan-completion":
+            plan_completion(args)
+        case "plan-season":
+            plan_season(args)
+        case "plan-trip":
+            plan_trip(args)
         case "export-csv":
             export_user_routes_to_csv(args)
         case _:
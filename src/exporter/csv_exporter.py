@@ -0,0 +1,78 @@
+import csv
+import logging
+from collections.abc import Iterable
+
+from src.users.dtos import UserWalkTravelRecord
+from src.utils import distance, time
+
+logger = logging.getLogger(__name__)
+
+CSV_HEADERS = [
+    "walk_id",
+    "walk_name",
+    "walk_url",
+    "walk_start_location",
+    "walk_distance_km",
+    "walk_ascent_meters",
+    "walk_duration_hours",
+    "number_of_hills",
+    "hills",
+    "travel_distance_km",
+    "travel_duration_hours",
+    "total_time_hours",
+]
+
+
+class CsvExporter:
+    @staticmethod
+    def export_user_walk_travel_info(
+        user_name: str,
+        walk_travel_infos: Iterable[UserWalkTravelRecord],
+        output_path: str | None = None,
+    ) -> str:
+        """
+        Write the user's walk and travel information to a CSV file one row at
+        a time, so an iterator of walks is never collected into memory.
+        Returns the path the file was written to.
+        """
+        if output_path is None:
+            output_path = f"{user_name}_walks.csv"
+        rows_written = 0
+        with open(output_path, "w", newline="", encoding="utf-8") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(CSV_HEADERS)
+            for walk in walk_travel_infos:
+                writer.writerow(CsvExporter._to_row(walk))
+                rows_written += 1
+        logger.info(
+            "Exported user walks to CSV",
+            extra={
+                "user": user_name,
+                "output_path": output_path,
+                "rows": rows_written,
+            },
+        )
+        return output_path
+
+    @staticmethod
+    def _to_row(walk: UserWalkTravelRecord) -> list:
+        """Flatten a walk and its travel information into CSV column values."""
+        total_time_hours = (
+            round(time.seconds_to_hours(walk.total_time_seconds), 2)
+            if walk.total_time_seconds is not None
+            else ""
+        )
+        return [
+            walk.walk_id,
+            walk.walk_name,
+            walk.walk_url,
+            walk.walk_start_location,
+            distance.meters_to_kilometers(walk.walk_distance_meters),
+            walk.walk_ascent_meters,
+            round(time.seconds_to_hours(walk.walk_duration_seconds), 2),
+            walk.number_of_hills,
+            "; ".join(walk.hills),
+            distance.meters_to_kilometers(walk.travel_distance_meters),
+            round(time.seconds_to_hours(walk.travel_duration_seconds), 2),
+            total_time_hours,
+        ]
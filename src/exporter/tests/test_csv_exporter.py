@@ -0,0 +1,47 @@
+import csv
+
+from src.exporter.csv_exporter import CSV_HEADERS, CsvExporter
+from src.users.tests.factories import create_user_walk_travel_record
+
+
+def test_export_user_walk_travel_info(tmp_path):
+    output_path = tmp_path / "walks.csv"
+    walks = (
+        create_user_walk_travel_record(walk_id=walk_id, hills=["Hill A", "Hill B"])
+        for walk_id in (1, 2)
+    )
+
+    result = CsvExporter.export_user_walk_travel_info(
+        "test_user", walks, str(output_path)
+    )
+
+    assert result == str(output_path)
+    with open(output_path, newline="", encoding="utf-8") as csv_file:
+        rows = list(csv.reader(csv_file))
+    assert rows[0] == CSV_HEADERS
+    assert len(rows) == 3
+    assert rows[1] == [
+        "1",
+        "Test Walk",
+        "http://test.com",
+        "55.9533,-3.1883",
+        "10.0",
+        "500",
+        "5.0",
+        "2",
+        "Hill A; Hill B",
+        "20.0",
+        "1.0",
+        "6.0",
+    ]
+    assert rows[2][0] == "2"
+
+
+def test_export_user_walk_travel_info_default_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    result = CsvExporter.export_user_walk_travel_info("test_user", [])
+
+    assert result == "test_user_walks.csv"
+    with open(tmp_path / result, newline="", encoding="utf-8") as csv_file:
+        assert list(csv.reader(csv_file)) == [CSV_HEADERS]
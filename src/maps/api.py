@@ -1,17 +1,55 @@
 import logging
+import math
+import os
+import threading
+from collections.abc import Hashable, Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from src.maps.dtos import MapsResponseDTO
+from src.maps.data import MapsData
+from src.maps.dtos import MapsLookupPlanDTO, MapsResponseDTO
+from src.maps.maps_service_interface import MapsServiceInterface
+from src.maps.osm_service import OsmRoutingService
+from src.maps.quota import MapsQuota
+from src.maps.route_cache import RouteCache
 from src.maps.service import MapsService
+from src.utils.rate_limit import RateLimiter
 
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_MAPS_BACKEND = "google"
+DEFAULT_MAPS_MAX_WORKERS = 4
+DEFAULT_MAPS_QPS = 10.0
+
 
 class MapsApi:
+    _service: MapsServiceInterface | None = None
+    _rate_limiter: RateLimiter | None = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def initialize_maps() -> None:
+        """Create the tables used by the maps module."""
+        MapsData.create_route_cache_table()
+        MapsData.create_maps_api_usage_table()
+
     @staticmethod
     def get_driving_distance_and_time(origin: str, destination: str) -> MapsResponseDTO:
-        """Get driving distance and time between two locations."""
-        maps_service = MapsService()
+        """
+        Get driving distance and time between two locations, using the shared
+        route cache before calling the maps provider.
+        """
+        backend = MapsApi._backend()
+        cached = RouteCache.get_many(origin, {destination: destination}, backend)
+        if destination in cached:
+            logger.debug(
+                "Route cache hit",
+                extra={"origin": origin, "destination": destination},
+            )
+            return cached[destination]
+        maps_service = MapsApi._get_service()
+        if maps_service.rate_limited:
+            MapsApi._reserve_request(1)
         result = maps_service.get_directions(
             origin=origin, destination=destination, mode="driving"
         )
@@ -29,4 +67,283 @@ class MapsApi:
                 extra={"origin": origin, "destination": destination},
             )
             raise ValueError("Could not retrieve driving directions.")
+        RouteCache.put_many([result], backend)
         return result
+
+    @staticmethod
+    def get_driving_matrix(
+        origins: Mapping[Hashable, str],
+        destinations: Mapping[Hashable, str],
+        max_workers: int | None = None,
+    ) -> dict[tuple[Hashable, Hashable], MapsResponseDTO]:
+        """
+        Get driving distance and time for every origin and destination pair,
+        keyed by (origin key, destination key). See iter_driving_matrix.
+        """
+        results: dict[tuple[Hashable, Hashable], MapsResponseDTO] = {}
+        for batch in MapsApi.iter_driving_matrix(origins, destinations, max_workers):
+            results.update(batch)
+        return results
+
+    @staticmethod
+    def iter_driving_matrix(
+        origins: Mapping[Hashable, str],
+        destinations: Mapping[Hashable, str],
+        max_workers: int | None = None,
+    ) -> Iterator[dict[tuple[Hashable, Hashable], MapsResponseDTO]]:
+        """
+        Yield driving distance and time for every origin and destination pair
+        in batches keyed by (origin key, destination key), where the keys are
+        the caller's ids, e.g. walk ids. Pairs in the shared route cache are
+        yielded first. The rest are split into chunks within the backend's
+        request limits and requested on a pool of max_workers threads (MAPS_MAX_WORKERS
+        by default) sharing the MAPS_QPS rate limit; each chunk is yielded as
+        soon as it completes. Pairs without a route, or in a chunk that
+        failed, are left out. On paid backends each request, and each retry
+        of one, is counted against MAPS_DAILY_BUDGET first and waits for the
+        rate limit; MapsBudgetExceededError is raised
+        once it is reached, after the chunks already sent have been cached.
+        MapsUnavailableError is raised the same way if the provider's
+        circuit breaker opens.
+        """
+        # Origins missing the same destinations can share rectangular chunks.
+        backend = MapsApi._backend()
+        origins_by_missing: dict[tuple[Hashable, ...], list[Hashable]] = {}
+        for origin_key, origin in origins.items():
+            cached = RouteCache.get_many(origin, destinations, backend)
+            if cached:
+                yield {
+                    (origin_key, destination_key): result
+                    for destination_key, result in cached.items()
+                }
+            missing = tuple(key for key in destinations if key not in cached)
+            if missing:
+                origins_by_missing.setdefault(missing, []).append(origin_key)
+        if not origins_by_missing:
+            return
+        maps_service = MapsApi._get_service()
+        chunks = [
+            chunk
+            for missing, origin_keys in origins_by_missing.items()
+            for chunk in MapsApi._chunk_matrix(origin_keys, list(missing), maps_service)
+        ]
+
+        def request_chunk(
+            chunk: tuple[list[Hashable], list[Hashable]],
+        ) -> dict[tuple[Hashable, Hashable], MapsResponseDTO]:
+            origin_keys, destination_keys = chunk
+            if maps_service.rate_limited:
+                MapsApi._reserve_request(len(origin_keys) * len(destination_keys))
+            chunk_destinations = [destinations[key] for key in destination_keys]
+            if len(origin_keys) == 1:
+                # One origin is a single-source search on backends that
+                # support it, rather than a search per destination.
+                row = maps_service.get_distances_from(
+                    origins[origin_keys[0]], chunk_destinations, mode="driving"
+                )
+                rows = [row] if row is not None else None
+            else:
+                rows = maps_service.get_distance_matrix(
+                    origins=[origins[key] for key in origin_keys],
+                    destinations=chunk_destinations,
+                    mode="driving",
+                )
+            if rows is None:
+                logger.error(
+                    "Failed to get distance matrix chunk",
+                    extra={
+                        "origins": len(origin_keys),
+                        "destinations": len(destination_keys),
+                    },
+                )
+                return {}
+            fetched = {
+                (origin_key, destination_key): element
+                for origin_key, row in zip(origin_keys, rows)
+                for destination_key, element in zip(destination_keys, row)
+                if element is not None
+            }
+            RouteCache.put_many(fetched.values(), backend)
+            return fetched
+
+        fetched_count = 0
+        with ThreadPoolExecutor(
+            max_workers=max_workers or MapsApi._max_workers()
+        ) as executor:
+            futures = [executor.submit(request_chunk, chunk) for chunk in chunks]
+            try:
+                for future in as_completed(futures):
+                    batch = future.result()
+                    fetched_count += len(batch)
+                    yield batch
+            finally:
+                # Chunks not yet started are dropped if a request raised or
+                # the caller stopped iterating.
+                for future in futures:
+                    future.cancel()
+        logger.debug(
+            "Retrieved driving matrix",
+            extra={
+                "origins": len(origins),
+                "destinations": len(destinations),
+                "requests": len(chunks),
+                "fetched": fetched_count,
+            },
+        )
+
+    @staticmethod
+    def get_driving_distances_from(
+        origin: str, destinations: Mapping[Hashable, str]
+    ) -> dict[Hashable, MapsResponseDTO]:
+        """
+        Get driving distance and time from one origin to many destinations,
+        keyed by the destination keys.
+        """
+        results: dict[Hashable, MapsResponseDTO] = {}
+        for batch in MapsApi.iter_driving_distances_from(origin, destinations):
+            results.update(batch)
+        return results
+
+    @staticmethod
+    def iter_driving_distances_from(
+        origin: str, destinations: Mapping[Hashable, str]
+    ) -> Iterator[dict[Hashable, MapsResponseDTO]]:
+        """
+        Yield driving distance and time from one origin to many destinations
+        in batches keyed by the destination keys, as they complete.
+        """
+        for batch in MapsApi.iter_driving_matrix({origin: origin}, destinations):
+            yield {
+                destination_key: result
+                for (_, destination_key), result in batch.items()
+            }
+
+    @staticmethod
+    def plan_driving_distances_from(
+        origin: str, destinations: Mapping[Hashable, str]
+    ) -> MapsLookupPlanDTO:
+        """
+        Work out how many lookups from one origin to the destinations are
+        already cached and how many requests the rest would take, without
+        sending anything.
+        """
+        backend = MapsApi._backend()
+        cached = RouteCache.count_cached(origin, destinations, backend)
+        uncached = len(destinations) - cached
+        service_class = MapsApi._service_class()
+        per_request = (
+            min(
+                service_class.max_matrix_destinations or uncached,
+                service_class.max_matrix_elements or uncached,
+            )
+            if uncached
+            else 1
+        )
+        return MapsLookupPlanDTO(
+            backend=backend,
+            lookups=len(destinations),
+            cached=cached,
+            uncached=uncached,
+            requests=math.ceil(uncached / per_request),
+            estimated_cost=(
+                MapsQuota.estimate_cost(uncached) if service_class.rate_limited else 0.0
+            ),
+        )
+
+    @staticmethod
+    def get_usage_stats() -> dict[str, int | float | str]:
+        """Get this run's and today's maps requests and estimated cost."""
+        return MapsQuota.stats(MapsApi._backend())
+
+    @staticmethod
+    def _get_service() -> MapsServiceInterface:
+        """Get the maps service shared by every call in this process."""
+        with MapsApi._lock:
+            if MapsApi._service is None:
+                MapsApi._service = MapsApi._create_service()
+            return MapsApi._service
+
+    @staticmethod
+    def _create_service() -> MapsServiceInterface:
+        """
+        Build the routing backend selected by MAPS_BACKEND: 'google' for the
+        Google Maps API or 'osm' for offline routing on OSM_EXTRACT_PATH.
+        """
+        service_class = MapsApi._service_class()
+        if service_class is MapsService:
+            return MapsService(before_retry=MapsApi._reserve_request)
+        return service_class()
+
+    @staticmethod
+    def _reserve_request(elements: int) -> None:
+        """
+        Count a request, or a retry of one, of the given number of elements
+        against MAPS_DAILY_BUDGET and wait for the shared rate limit.
+        """
+        MapsQuota.reserve(MapsApi._backend(), elements)
+        MapsApi._get_rate_limiter().acquire()
+
+    @staticmethod
+    def _service_class() -> type[MapsServiceInterface]:
+        """The maps service class for the MAPS_BACKEND setting."""
+        backend = MapsApi._backend()
+        match backend:
+            case "google":
+                return MapsService
+            case "osm":
+                return OsmRoutingService
+            case _:
+                raise ValueError(f"Unsupported MAPS_BACKEND: {backend}")
+
+    @staticmethod
+    def _backend() -> str:
+        """Name of the configured routing backend."""
+        return os.getenv("MAPS_BACKEND", DEFAULT_MAPS_BACKEND).lower()
+
+    @staticmethod
+    def _get_rate_limiter() -> RateLimiter:
+        """Get the rate limiter shared by every maps request in this process."""
+        with MapsApi._lock:
+            if MapsApi._rate_limiter is None:
+                MapsApi._rate_limiter = RateLimiter(
+                    float(os.getenv("MAPS_QPS", str(DEFAULT_MAPS_QPS)))
+                )
+            return MapsApi._rate_limiter
+
+    @staticmethod
+    def _max_workers() -> int:
+        """Number of concurrent maps requests."""
+        return int(os.getenv("MAPS_MAX_WORKERS", str(DEFAULT_MAPS_MAX_WORKERS)))
+
+    @staticmethod
+    def _chunk_matrix(
+        origin_keys: list[Hashable],
+        destination_keys: list[Hashable],
+        maps_service: MapsServiceInterface,
+    ) -> Iterator[tuple[list[Hashable], list[Hashable]]]:
+        """
+        Split the origins and destinations into blocks that each fit in a
+        single request to the maps service. Backends without limits get one
+        block per origin, each answered by a single-source search.
+        """
+        if not origin_keys or not destination_keys:
+            return
+        max_origins = maps_service.max_matrix_origins or 1
+        origins_per_request = min(len(origin_keys), max_origins)
+        max_destinations = maps_service.max_matrix_destinations or len(destination_keys)
+        if maps_service.max_matrix_elements:
+            max_destinations = min(
+                max_destinations,
+                maps_service.max_matrix_elements // origins_per_request,
+            )
+        for origin_start in range(0, len(origin_keys), origins_per_request):
+            origin_chunk = origin_keys[
+                origin_start : origin_start + origins_per_request
+            ]
+            for destination_start in range(0, len(destination_keys), max_destinations):
+                yield (
+                    origin_chunk,
+                    destination_keys[
+                        destination_start : destination_start + max_destinations
+                    ],
+                )
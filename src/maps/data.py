@@ -0,0 +1,281 @@
+import logging
+import sqlite3
+
+from src.database.api import DatabaseAPI
+
+logger = logging.getLogger(__name__)
+
+
+class MapsData:
+    @staticmethod
+    def create_route_cache_table() -> None:
+        """
+        Create the route_cache table in the database if it doesn't exist.
+        Tables from before the backend had its own column, when it was folded
+        into the mode as 'mode:backend' for backends other than Google, are
+        rebuilt with the backend split out.
+        """
+        logger.info("Creating route_cache table in the database if it doesn't exist.")
+        db_api = DatabaseAPI()
+        with db_api.db_connection() as conn:
+            cursor = conn.cursor()
+            columns = {
+                row[1] for row in cursor.execute("PRAGMA table_info(route_cache)")
+            }
+            if columns and "backend" not in columns:
+                logger.info("Adding the backend column to the route_cache table.")
+                cursor.execute("ALTER TABLE route_cache RENAME TO route_cache_old")
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS route_cache (
+                    origin_key TEXT NOT NULL,
+                    destination_key TEXT NOT NULL,
+                    mode TEXT NOT NULL,
+                    backend TEXT NOT NULL,
+                    distance INTEGER NOT NULL,
+                    duration INTEGER NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (origin_key, destination_key, mode, backend)
+                )
+                """
+            )
+            if columns and "backend" not in columns:
+                cursor.execute(
+                    """
+                    INSERT INTO route_cache
+                        (origin_key, destination_key, mode, backend,
+                         distance, duration, hits, created_at)
+                    SELECT
+                        origin_key,
+                        destination_key,
+                        CASE WHEN instr(mode, ':') > 0
+                            THEN substr(mode, 1, instr(mode, ':') - 1)
+                            ELSE mode END,
+                        CASE WHEN instr(mode, ':') > 0
+                            THEN substr(mode, instr(mode, ':') + 1)
+                            ELSE 'google' END,
+                        distance,
+                        duration,
+                        hits,
+                        created_at
+                    FROM route_cache_old
+                    """
+                )
+                cursor.execute("DROP TABLE route_cache_old")
+            conn.commit()
+
+    @staticmethod
+    def get_cached_routes(
+        origin_key: str,
+        destination_keys: list[str],
+        mode: str,
+        backend: str,
+        ttl_days: int,
+        count_hits: bool = True,
+    ) -> dict[str, tuple[int, int]]:
+        """
+        Get the cached (distance, duration) for the backend's routes from one
+        snapped origin to each snapped destination, ignoring entries older
+        than the TTL.
+        Unless count_hits is off, the hit count of every returned entry is
+        incremented.
+        """
+        if not destination_keys:
+            return {}
+        db_api = DatabaseAPI()
+        max_age = f"-{ttl_days} days"
+        cached: dict[str, tuple[int, int]] = {}
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                # Stay well below SQLite's bound parameter limit.
+                for start in range(0, len(destination_keys), 500):
+                    chunk = destination_keys[start : start + 500]
+                    placeholders = ",".join("?" for _ in chunk)
+                    cursor.execute(
+                        f"""
+                        SELECT destination_key, distance, duration
+                        FROM route_cache
+                        WHERE origin_key = ?
+                        AND mode = ?
+                        AND backend = ?
+                        AND created_at >= datetime('now', ?)
+                        AND destination_key IN ({placeholders})
+                        """,
+                        (origin_key, mode, backend, max_age, *chunk),
+                    )
+                    for destination_key, distance, duration in cursor.fetchall():
+                        cached[destination_key] = (distance, duration)
+                if not count_hits:
+                    return cached
+                cursor.executemany(
+                    """
+                    UPDATE route_cache SET hits = hits + 1
+                    WHERE origin_key = ? AND destination_key = ?
+                    AND mode = ? AND backend = ?
+                    """,
+                    [(origin_key, key, mode, backend) for key in cached],
+                )
+                conn.commit()
+        except sqlite3.Error:
+            logger.exception(
+                "An error occurred while reading the route cache",
+                extra={"origin_key": origin_key},
+            )
+            return {}
+        return cached
+
+    @staticmethod
+    def save_cached_routes(routes: list[tuple[str, str, str, str, int, int]]) -> None:
+        """
+        Save routes as (origin_key, destination_key, mode, backend, distance,
+        duration), replacing any existing entry for the same key and resetting its age.
+        """
+        if not routes:
+            return
+        db_api = DatabaseAPI()
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    """
+                    INSERT OR REPLACE INTO route_cache
+                        (origin_key, destination_key, mode, backend,
+                         distance, duration)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    routes,
+                )
+                conn.commit()
+        except sqlite3.Error:
+            logger.exception(
+                "An error occurred while saving to the route cache",
+                extra={"routes": len(routes)},
+            )
+
+    @staticmethod
+    def create_maps_api_usage_table() -> None:
+        """Create the maps_api_usage table in the database if it doesn't exist."""
+        logger.info(
+            "Creating maps_api_usage table in the database if it doesn't exist."
+        )
+        db_api = DatabaseAPI()
+        with db_api.db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS maps_api_usage (
+                    day TEXT NOT NULL,
+                    backend TEXT NOT NULL,
+                    requests INTEGER NOT NULL DEFAULT 0,
+                    elements INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, backend)
+                )
+                """
+            )
+            conn.commit()
+
+    @staticmethod
+    def record_maps_api_usage(
+        day: str, backend: str, requests: int, elements: int
+    ) -> None:
+        """Add requests and billed elements to a day's usage for a backend."""
+        db_api = DatabaseAPI()
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    INSERT INTO maps_api_usage (day, backend, requests, elements)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (day, backend) DO UPDATE SET
+                        requests = requests + excluded.requests,
+                        elements = elements + excluded.elements
+                    """,
+                    (day, backend, requests, elements),
+                )
+                conn.commit()
+        except sqlite3.Error:
+            logger.exception(
+                "An error occurred while recording maps API usage",
+                extra={"day": day, "backend": backend},
+            )
+
+    @staticmethod
+    def reserve_maps_api_usage(
+        day: str,
+        backend: str,
+        requests: int,
+        elements: int,
+        cost_per_element: float,
+        budget: float,
+    ) -> bool:
+        """
+        Add requests and billed elements to a day's usage for a backend only
+        if the day's estimated cost stays within the budget. The check and
+        the update are one statement, so concurrent callers can't both pass
+        the check. Returns whether the usage was added; a database error
+        adds nothing and returns False, so the budget can't be overspent
+        untracked.
+        """
+        db_api = DatabaseAPI()
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    INSERT INTO maps_api_usage (day, backend, requests, elements)
+                    SELECT :day, :backend, :requests, :elements
+                    WHERE ROUND(
+                        (:elements + COALESCE(
+                            (SELECT elements FROM maps_api_usage
+                             WHERE day = :day AND backend = :backend),
+                            0
+                        )) * :cost_per_element,
+                        4
+                    ) <= :budget
+                    ON CONFLICT (day, backend) DO UPDATE SET
+                        requests = requests + excluded.requests,
+                        elements = elements + excluded.elements
+                    """,
+                    {
+                        "day": day,
+                        "backend": backend,
+                        "requests": requests,
+                        "elements": elements,
+                        "cost_per_element": cost_per_element,
+                        "budget": budget,
+                    },
+                )
+                conn.commit()
+                return cursor.rowcount > 0
+        except sqlite3.Error:
+            logger.exception(
+                "An error occurred while reserving maps API usage",
+                extra={"day": day, "backend": backend},
+            )
+            return False
+
+    @staticmethod
+    def get_maps_api_usage(day: str, backend: str) -> tuple[int, int]:
+        """Get the (requests, elements) used on a day for a backend."""
+        db_api = DatabaseAPI()
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    SELECT requests, elements FROM maps_api_usage
+                    WHERE day = ? AND backend = ?
+                    """,
+                    (day, backend),
+                )
+                result = cursor.fetchone()
+                return (result[0], result[1]) if result else (0, 0)
+        except sqlite3.Error:
+            logger.exception(
+                "An error occurred while reading maps API usage",
+                extra={"day": day, "backend": backend},
+            )
+            return (0, 0)
@@ -6,3 +6,12 @@ class MapsResponseDTO(BaseModel):
     destination: str
     distance_meters: int
     duration_seconds: int
+
+
+class MapsLookupPlanDTO(BaseModel):
+    backend: str
+    lookups: int
+    cached: int
+    uncached: int
+    requests: int
+    estimated_cost: float
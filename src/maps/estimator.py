@@ -0,0 +1,178 @@
+import logging
+from dataclasses import dataclass
+
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+
+from src.utils.distance import great_circle_meters
+
+logger = logging.getLogger(__name__)
+
+# Routes shorter than this in a straight line are dominated by getting out of
+# town and onto the main road, so they skew the fitted factors.
+MIN_SAMPLE_DISTANCE_METERS = 5_000.0
+MIN_REGION_SAMPLES = 20
+# No route can average more than this along its road distance, which is never
+# shorter than the great-circle distance: well above the UK's 70 mph limit,
+# and independent of the fitted routes so the lower bound always holds.
+MAX_ROAD_SPEED_METERS_PER_SECOND = 130 / 3.6
+
+
+@dataclass(frozen=True, slots=True)
+class TravelCalibration:
+    """Road detour factor over the great-circle distance and average road speed."""
+
+    detour_factor: float
+    speed_meters_per_second: float
+    samples: int = 0
+
+
+# Used until there are stored routes to fit from: a 35% detour at 60 km/h.
+DEFAULT_CALIBRATION = TravelCalibration(
+    detour_factor=1.35,
+    speed_meters_per_second=60 / 3.6,
+)
+
+
+class TravelTimeEstimator:
+    """
+    Offline driving time estimates from great-circle distance, calibrated per
+    region from routes already fetched from the maps provider.
+    """
+
+    def __init__(
+        self,
+        default: TravelCalibration = DEFAULT_CALIBRATION,
+        regions: dict[str, TravelCalibration] | None = None,
+    ) -> None:
+        self.default = default
+        self.regions = regions or {}
+
+    @classmethod
+    def fit(
+        cls,
+        origin_lat: ArrayLike,
+        origin_lon: ArrayLike,
+        destination_lat: ArrayLike,
+        destination_lon: ArrayLike,
+        road_distance_meters: ArrayLike,
+        duration_seconds: ArrayLike,
+        regions: ArrayLike | None = None,
+    ) -> "TravelTimeEstimator":
+        """
+        Fit an estimator from known routes. Each region with enough samples
+        gets its own calibration; other regions use the calibration fitted
+        over every sample, or the defaults when there are too few samples.
+        """
+        straight = great_circle_meters(
+            origin_lat, origin_lon, destination_lat, destination_lon
+        )
+        road = np.asarray(road_distance_meters, dtype=np.float64)
+        duration = np.asarray(duration_seconds, dtype=np.float64)
+        usable = (straight >= MIN_SAMPLE_DISTANCE_METERS) & (duration > 0)
+        region_names = (
+            np.asarray(regions, dtype=object)
+            if regions is not None
+            else np.full(straight.shape, None, dtype=object)
+        )
+
+        default = cls._calibrate(straight[usable], road[usable], duration[usable])
+        fitted: dict[str, TravelCalibration] = {}
+        for region in {name for name in region_names[usable] if name is not None}:
+            in_region = usable & (region_names == region)
+            if np.count_nonzero(in_region) < MIN_REGION_SAMPLES:
+                continue
+            calibration = cls._calibrate(
+                straight[in_region], road[in_region], duration[in_region]
+            )
+            if calibration is not None:
+                fitted[region] = calibration
+        logger.debug(
+            "Fitted travel time estimator",
+            extra={
+                "samples": int(np.count_nonzero(usable)),
+                "regions": sorted(fitted),
+            },
+        )
+        return cls(default or DEFAULT_CALIBRATION, fitted)
+
+    def estimate_seconds(
+        self,
+        origin_lat: float,
+        origin_lon: float,
+        destination_lat: ArrayLike,
+        destination_lon: ArrayLike,
+        regions: ArrayLike | None = None,
+    ) -> NDArray[np.float64]:
+        """Estimated driving time in seconds from the origin to each destination."""
+        straight = great_circle_meters(
+            origin_lat, origin_lon, destination_lat, destination_lon
+        )
+        detour, speed = self._calibration_arrays(straight.shape, regions)
+        return straight * detour / speed
+
+    def estimate_matrix_seconds(
+        self,
+        lat: ArrayLike,
+        lon: ArrayLike,
+        regions: ArrayLike | None = None,
+    ) -> NDArray[np.float64]:
+        """
+        Estimated driving time in seconds between every pair of points, with
+        row i the time from point i to each point. The calibration is that of
+        the destination's region, as for estimate_seconds.
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        straight = great_circle_meters(
+            lat[:, None], lon[:, None], lat[None, :], lon[None, :]
+        )
+        detour, speed = self._calibration_arrays(lat.shape, regions)
+        return straight * (detour / speed)[None, :]
+
+    @staticmethod
+    def lower_bound_seconds(
+        origin_lat: float,
+        origin_lon: float,
+        destination_lat: ArrayLike,
+        destination_lon: ArrayLike,
+    ) -> NDArray[np.float64]:
+        """
+        Driving time in seconds the real route to each destination cannot
+        beat: the great-circle distance at MAX_ROAD_SPEED_METERS_PER_SECOND.
+        It does not depend on the fit, so pruning by it is exact.
+        """
+        straight = great_circle_meters(
+            origin_lat, origin_lon, destination_lat, destination_lon
+        )
+        return straight / MAX_ROAD_SPEED_METERS_PER_SECOND
+
+    def _calibration_arrays(
+        self, shape: tuple[int, ...], regions: ArrayLike | None
+    ) -> tuple[NDArray[np.float64], NDArray[np.float64]]:
+        """Per-destination detour factor and speed arrays."""
+        detour = np.full(shape, self.default.detour_factor)
+        speed = np.full(shape, self.default.speed_meters_per_second)
+        if regions is None or not self.regions:
+            return detour, speed
+        region_names = np.asarray(regions, dtype=object)
+        for region, calibration in self.regions.items():
+            in_region = region_names == region
+            detour[in_region] = calibration.detour_factor
+            speed[in_region] = calibration.speed_meters_per_second
+        return detour, speed
+
+    @staticmethod
+    def _calibrate(
+        straight: NDArray[np.float64],
+        road: NDArray[np.float64],
+        duration: NDArray[np.float64],
+    ) -> TravelCalibration | None:
+        """Fit one calibration from usable samples, or None without samples."""
+        if straight.size == 0:
+            return None
+        return TravelCalibration(
+            detour_factor=float(np.median(road / straight)),
+            speed_meters_per_second=float(road.sum() / duration.sum()),
+            samples=int(straight.size),
+        )
@@ -0,0 +1,39 @@
+from src.maps.dtos import MapsResponseDTO
+
+
+class MapsServiceInterface:
+    # Whether requests go to a paid online provider and share its rate limit.
+    rate_limited: bool = True
+    # Largest request the backend accepts; None for no limit.
+    max_matrix_origins: int | None = None
+    max_matrix_destinations: int | None = None
+    max_matrix_elements: int | None = None
+
+    def get_directions(
+        self, origin: str, destination: str, mode: str = "driving"
+    ) -> MapsResponseDTO | None:
+        """
+        Distance and duration of the route between two locations, or None
+        when there is no route.
+        """
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def get_distance_matrix(
+        self, origins: list[str], destinations: list[str], mode: str = "driving"
+    ) -> list[list[MapsResponseDTO | None]] | None:
+        """
+        A row per origin holding the route to each destination, or None for
+        pairs without a route. None if the whole request fails.
+        """
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def get_distances_from(
+        self, origin: str, destinations: list[str], mode: str = "driving"
+    ) -> list[MapsResponseDTO | None] | None:
+        """
+        The route from one origin to each destination, or None for
+        destinations without a route. None if the whole request fails.
+        Backends that can answer this with a single search override it.
+        """
+        rows = self.get_distance_matrix([origin], destinations, mode)
+        return rows[0] if rows else None
@@ -0,0 +1,150 @@
+import logging
+import os
+
+from src.maps.dtos import MapsResponseDTO
+from src.maps.maps_service_interface import MapsServiceInterface
+from src.maps.road_graph import RoadGraph
+
+logger = logging.getLogger(__name__)
+
+# Locations further than this from the nearest road node are not routed.
+DEFAULT_OSM_MAX_SNAP_METERS = 2000.0
+
+
+class OsmRoutingService(MapsServiceInterface):
+    rate_limited = False
+
+    def __init__(
+        self, extract_path: str | None = None, graph: RoadGraph | None = None
+    ) -> None:
+        """
+        Initializes the OsmRoutingService.
+        :param extract_path: OSM extract to route on. If not provided, it will be read from the OSM_EXTRACT_PATH environment variable.
+        :param graph: Road graph to use instead of loading the extract, e.g. in tests.
+        """
+        if graph is not None:
+            self.graph = graph
+        else:
+            if extract_path is None:
+                extract_path = os.getenv("OSM_EXTRACT_PATH")
+            if not extract_path or not os.path.exists(extract_path):
+                logger.error(
+                    "OSM extract not found", extra={"extract_path": extract_path}
+                )
+                raise ValueError("An OSM extract is required for offline routing.")
+            self.graph = RoadGraph.load(extract_path)
+        self.max_snap_meters = float(
+            os.getenv("OSM_MAX_SNAP_METERS", str(DEFAULT_OSM_MAX_SNAP_METERS))
+        )
+
+    def get_directions(
+        self, origin: str, destination: str, mode: str = "driving"
+    ) -> MapsResponseDTO | None:
+        """
+        Fastest driving route between two 'lat,lon' locations on the local
+        road graph.
+        :param origin: Starting location as 'lat,lon'. Addresses are not supported offline.
+        :param destination: Ending location as 'lat,lon'.
+        :param mode: Mode of transportation, only 'driving' is supported.
+        :return: MapsResponseDTO with distance and duration, or None if there is no route.
+        """
+        if mode != "driving":
+            logger.error("Unsupported mode for offline routing", extra={"mode": mode})
+            return None
+        source = self._snap(origin)
+        target = self._snap(destination)
+        if source is None or target is None:
+            return None
+        route = self.graph.shortest_path(source, target)
+        if route is None:
+            logger.warning(
+                "No route in road graph",
+                extra={"origin": origin, "destination": destination},
+            )
+            return None
+        distance, duration = route
+        return MapsResponseDTO(
+            distance_meters=round(distance),
+            duration_seconds=round(duration),
+            origin=origin,
+            destination=destination,
+        )
+
+    def get_distance_matrix(
+        self, origins: list[str], destinations: list[str], mode: str = "driving"
+    ) -> list[list[MapsResponseDTO | None]] | None:
+        """
+        Fastest driving route for every origin and destination pair on the
+        local road graph, with one single-source search per origin. There
+        are no request size limits offline.
+        """
+        rows: list[list[MapsResponseDTO | None]] = []
+        for origin in origins:
+            row = self.get_distances_from(origin, destinations, mode)
+            rows.append(row if row is not None else [None] * len(destinations))
+        return rows
+
+    def get_distances_from(
+        self, origin: str, destinations: list[str], mode: str = "driving"
+    ) -> list[MapsResponseDTO | None] | None:
+        """
+        Fastest driving route from one origin to every destination with a
+        single search of the road graph, rather than one search per
+        destination.
+        :return: The route to each destination, or None for destinations without a route.
+        """
+        if mode != "driving":
+            logger.error("Unsupported mode for offline routing", extra={"mode": mode})
+            return None
+        source = self._snap(origin)
+        if source is None:
+            return [None] * len(destinations)
+        destination_nodes = {
+            destination: self._snap(destination) for destination in set(destinations)
+        }
+        routes = self.graph.shortest_paths_from(
+            source, {node for node in destination_nodes.values() if node is not None}
+        )
+        results: list[MapsResponseDTO | None] = []
+        for destination in destinations:
+            route = routes.get(destination_nodes[destination])
+            if route is None:
+                results.append(None)
+                continue
+            distance, duration = route
+            results.append(
+                MapsResponseDTO(
+                    distance_meters=round(distance),
+                    duration_seconds=round(duration),
+                    origin=origin,
+                    destination=destination,
+                )
+            )
+        logger.debug(
+            "Routed from origin on road graph",
+            extra={
+                "origin": origin,
+                "destinations": len(destinations),
+                "routed": len(destinations) - results.count(None),
+            },
+        )
+        return results
+
+    def _snap(self, location: str) -> int | None:
+        """Nearest road node to a 'lat,lon' location, or None if there is none close."""
+        try:
+            lat, lon = (float(part) for part in location.split(","))
+        except ValueError:
+            logger.error(
+                "Offline routing needs 'lat,lon' locations",
+                extra={"location": location},
+            )
+            return None
+        node, snap_distance = self.graph.nearest_node(lat, lon)
+        if snap_distance > self.max_snap_meters:
+            logger.warning(
+                "Location is too far from the road graph",
+                extra={"location": location, "snap_distance": snap_distance},
+            )
+            return None
+        return node
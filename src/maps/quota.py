@@ -0,0 +1,100 @@
+import logging
+import os
+import threading
+from datetime import UTC, datetime
+
+from src.maps.data import MapsData
+
+logger = logging.getLogger(__name__)
+
+# Google bills Directions and Distance Matrix by element (origin and
+# destination pair); a directions request is one element. In USD.
+DEFAULT_MAPS_COST_PER_ELEMENT = 0.005
+
+
+class MapsBudgetExceededError(Exception):
+    """Raised before a maps request that would take the day over budget."""
+
+
+class MapsQuota:
+    """
+    Request and billed element counts for paid maps backends, per process
+    run and per UTC day. The day's totals are kept in maps_api_usage so a
+    MAPS_DAILY_BUDGET cap holds across runs.
+    """
+
+    run_requests = 0
+    run_elements = 0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def reserve(backend: str, elements: int) -> None:
+        """
+        Record one request of the given number of elements before it is
+        sent. Raises MapsBudgetExceededError, without recording anything,
+        if it would take the day's estimated cost over MAPS_DAILY_BUDGET.
+        """
+        day = MapsQuota._today()
+        budget = MapsQuota._daily_budget()
+        if budget is None:
+            MapsData.record_maps_api_usage(day, backend, 1, elements)
+        elif not MapsData.reserve_maps_api_usage(
+            day, backend, 1, elements, MapsQuota._cost_per_element(), budget
+        ):
+            _, used_elements = MapsData.get_maps_api_usage(day, backend)
+            logger.warning(
+                "Maps daily budget reached",
+                extra={
+                    "backend": backend,
+                    "day": day,
+                    "budget": budget,
+                    "used_elements": used_elements,
+                },
+            )
+            raise MapsBudgetExceededError(
+                f"Maps daily budget of {budget:.2f} reached for {day}."
+            )
+        with MapsQuota._lock:
+            MapsQuota.run_requests += 1
+            MapsQuota.run_elements += elements
+
+    @staticmethod
+    def stats(backend: str) -> dict[str, int | float | str]:
+        """Get this run's and today's request counts and estimated cost."""
+        day = MapsQuota._today()
+        day_requests, day_elements = MapsData.get_maps_api_usage(day, backend)
+        with MapsQuota._lock:
+            run_requests = MapsQuota.run_requests
+            run_elements = MapsQuota.run_elements
+        return {
+            "day": day,
+            "run_requests": run_requests,
+            "run_elements": run_elements,
+            "run_cost": MapsQuota.estimate_cost(run_elements),
+            "day_requests": day_requests,
+            "day_elements": day_elements,
+            "day_cost": MapsQuota.estimate_cost(day_elements),
+        }
+
+    @staticmethod
+    def estimate_cost(elements: int) -> float:
+        """Estimated cost of the given number of billed elements."""
+        return round(elements * MapsQuota._cost_per_element(), 4)
+
+    @staticmethod
+    def _cost_per_element() -> float:
+        """Cost of one billed element from MAPS_COST_PER_ELEMENT."""
+        return float(
+            os.getenv("MAPS_COST_PER_ELEMENT", str(DEFAULT_MAPS_COST_PER_ELEMENT))
+        )
+
+    @staticmethod
+    def _daily_budget() -> float | None:
+        """Daily cost cap from MAPS_DAILY_BUDGET, or None for no cap."""
+        budget = os.getenv("MAPS_DAILY_BUDGET")
+        return float(budget) if budget else None
+
+    @staticmethod
+    def _today() -> str:
+        """Current UTC day as an ISO date."""
+        return datetime.now(UTC).date().isoformat()
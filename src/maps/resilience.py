@@ -0,0 +1,203 @@
+import logging
+import os
+import random
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import googlemaps
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAPS_MAX_RETRIES = 3
+DEFAULT_MAPS_BACKOFF_SECONDS = 0.5
+DEFAULT_MAPS_MAX_BACKOFF_SECONDS = 8.0
+DEFAULT_MAPS_CIRCUIT_FAILURES = 5
+DEFAULT_MAPS_CIRCUIT_RESET_SECONDS = 60.0
+
+# API statuses for a request that may succeed if sent again; any other
+# status (REQUEST_DENIED, INVALID_REQUEST, ...) fails the same way every time.
+TRANSIENT_API_STATUSES = frozenset({"OVER_QUERY_LIMIT", "UNKNOWN_ERROR"})
+
+
+class MapsUnavailableError(Exception):
+    """Raised instead of calling the maps provider while its circuit is open."""
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Whether a maps client error is worth retrying."""
+    if isinstance(error, googlemaps.exceptions.HTTPError):
+        return error.status_code == 429 or error.status_code >= 500
+    if isinstance(
+        error, (googlemaps.exceptions.Timeout, googlemaps.exceptions.TransportError)
+    ):
+        return True
+    if isinstance(error, googlemaps.exceptions.ApiError):
+        return error.status in TRANSIENT_API_STATUSES
+    return False
+
+
+@dataclass(frozen=True, slots=True)
+class RetryPolicy:
+    """
+    Bounded retries with exponential backoff and full jitter: the wait
+    before retry n is uniform between zero and
+    min(max_backoff_seconds, backoff_seconds * 2 ** n).
+    """
+
+    max_retries: int = DEFAULT_MAPS_MAX_RETRIES
+    backoff_seconds: float = DEFAULT_MAPS_BACKOFF_SECONDS
+    max_backoff_seconds: float = DEFAULT_MAPS_MAX_BACKOFF_SECONDS
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        """Build the policy from MAPS_MAX_RETRIES and the MAPS_*BACKOFF_SECONDS settings."""
+        return cls(
+            max_retries=int(
+                os.getenv("MAPS_MAX_RETRIES", str(DEFAULT_MAPS_MAX_RETRIES))
+            ),
+            backoff_seconds=float(
+                os.getenv("MAPS_BACKOFF_SECONDS", str(DEFAULT_MAPS_BACKOFF_SECONDS))
+            ),
+            max_backoff_seconds=float(
+                os.getenv(
+                    "MAPS_MAX_BACKOFF_SECONDS", str(DEFAULT_MAPS_MAX_BACKOFF_SECONDS)
+                )
+            ),
+        )
+
+    def delay_seconds(self, retry: int) -> float:
+        """Seconds to wait before the given retry, counting from zero."""
+        cap = min(self.max_backoff_seconds, self.backoff_seconds * 2**retry)
+        return random.uniform(0, cap)
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker for a maps provider. After failure_threshold
+    consecutive transient failures the circuit opens and calls fail fast with
+    MapsUnavailableError. Once reset_seconds have passed a single trial call
+    is let through: success closes the circuit, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_MAPS_CIRCUIT_FAILURES,
+        reset_seconds: float = DEFAULT_MAPS_CIRCUIT_RESET_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1.")
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "CircuitBreaker":
+        """Build a breaker from MAPS_CIRCUIT_FAILURES and MAPS_CIRCUIT_RESET_SECONDS."""
+        return cls(
+            failure_threshold=int(
+                os.getenv("MAPS_CIRCUIT_FAILURES", str(DEFAULT_MAPS_CIRCUIT_FAILURES))
+            ),
+            reset_seconds=float(
+                os.getenv(
+                    "MAPS_CIRCUIT_RESET_SECONDS",
+                    str(DEFAULT_MAPS_CIRCUIT_RESET_SECONDS),
+                )
+            ),
+        )
+
+    @property
+    def state(self) -> str:
+        """'closed', 'open' or 'half_open'."""
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._clock() - self._opened_at < self.reset_seconds:
+                return "open"
+            return "half_open"
+
+    def before_call(self) -> None:
+        """Raise MapsUnavailableError unless a call may be made now."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if (
+                self._clock() - self._opened_at >= self.reset_seconds
+                and not self._trial_in_flight
+            ):
+                self._trial_in_flight = True
+                return
+        raise MapsUnavailableError("Maps provider circuit is open.")
+
+    def record_success(self) -> None:
+        """Close the circuit after a call reached the provider."""
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("Maps provider circuit closed")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """Count a transient failure, opening the circuit at the threshold."""
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(
+                        "Maps provider circuit opened",
+                        extra={
+                            "failures": self._failures,
+                            "reset_seconds": self.reset_seconds,
+                        },
+                    )
+                self._opened_at = self._clock()
+
+
+def call_with_retries[T](
+    func: Callable[[], T],
+    policy: RetryPolicy,
+    breaker: CircuitBreaker,
+    sleep: Callable[[float], None] = time.sleep,
+    before_retry: Callable[[], None] | None = None,
+) -> T:
+    """
+    Call func, retrying transient maps errors under the policy. Every
+    attempt goes through the circuit breaker, so an open circuit stops the
+    retries with MapsUnavailableError. before_retry is called ahead of each
+    retry, e.g. to count it against a quota; anything it raises stops the
+    retries. Errors that are not transient, and the last transient one, are
+    raised to the caller.
+    """
+    retry = 0
+    while True:
+        breaker.before_call()
+        try:
+            result = func()
+        except Exception as error:
+            if not is_transient_error(error):
+                # The provider answered, it just refused this request.
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            if retry >= policy.max_retries:
+                raise
+            delay = policy.delay_seconds(retry)
+            logger.warning(
+                "Transient maps error, retrying",
+                extra={"error": str(error), "retry": retry + 1, "delay": delay},
+            )
+            sleep(delay)
+            if before_retry is not None:
+                before_retry()
+            retry += 1
+        else:
+            breaker.record_success()
+            return result
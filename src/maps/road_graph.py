@@ -0,0 +1,418 @@
+import bz2
+import heapq
+import itertools
+import logging
+import math
+import os
+import xml.etree.ElementTree as ET
+from array import array
+from collections.abc import Iterable
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.utils.distance import EARTH_RADIUS_METERS, great_circle_meters
+
+logger = logging.getLogger(__name__)
+
+# Typical driving speeds in km/h by OSM highway tag, used when a way has no
+# usable maxspeed. Ways with other highway tags (tracks, paths, ...) are not
+# driveable and are left out of the graph.
+DRIVING_SPEEDS_KPH = {
+    "motorway": 105.0,
+    "trunk": 90.0,
+    "primary": 75.0,
+    "secondary": 65.0,
+    "tertiary": 55.0,
+    "unclassified": 45.0,
+    "residential": 30.0,
+    "living_street": 10.0,
+    "service": 15.0,
+    "motorway_link": 60.0,
+    "trunk_link": 55.0,
+    "primary_link": 50.0,
+    "secondary_link": 45.0,
+    "tertiary_link": 40.0,
+}
+# Driving at the posted limit is rare, so maxspeed is scaled down.
+MAXSPEED_FACTOR = 0.9
+MPH_TO_KPH = 1.609344
+GRAPH_CACHE_SUFFIX = ".graph.npz"
+# Size of the grid cells used to find the nearest node to a location.
+SNAP_CELL_DEGREES = 0.02
+
+
+class RoadGraph:
+    """
+    Driving road network held in compressed sparse row arrays: the outgoing
+    edges of node i are targets[indptr[i]:indptr[i + 1]], with their length
+    in meters and travel time in seconds at the same positions.
+    """
+
+    def __init__(
+        self,
+        lat: NDArray[np.float64],
+        lon: NDArray[np.float64],
+        indptr: NDArray[np.int64],
+        targets: NDArray[np.int32],
+        lengths: NDArray[np.float32],
+        times: NDArray[np.float32],
+    ) -> None:
+        self.lat = lat
+        self.lon = lon
+        self.indptr = indptr
+        self.targets = targets
+        self.lengths = lengths
+        self.times = times
+        speeds = lengths / np.maximum(times, 1e-6) if times.size else np.ones(1)
+        self.max_speed_meters_per_second = float(speeds.max())
+        self._adjacency: tuple[list, ...] | None = None
+        self._cells: dict[tuple[int, int], NDArray[np.intp]] | None = None
+
+    @property
+    def number_of_nodes(self) -> int:
+        """Number of road nodes in the graph."""
+        return int(self.lat.size)
+
+    @property
+    def number_of_edges(self) -> int:
+        """Number of directed road edges in the graph."""
+        return int(self.targets.size)
+
+    @classmethod
+    def load(cls, path: str) -> "RoadGraph":
+        """
+        Load a graph from an OSM XML extract (.osm or .osm.bz2) or a graph
+        saved with save. A parsed extract is saved next to the source with
+        GRAPH_CACHE_SUFFIX and reused while it is newer than the extract.
+        """
+        if path.endswith(".npz"):
+            return cls._load_arrays(path)
+        cache_path = path + GRAPH_CACHE_SUFFIX
+        if os.path.exists(cache_path) and os.path.getmtime(
+            cache_path
+        ) >= os.path.getmtime(path):
+            return cls._load_arrays(cache_path)
+        graph = cls.from_osm(path)
+        try:
+            graph.save(cache_path)
+        except OSError:
+            logger.warning(
+                "Could not save parsed road graph", extra={"path": cache_path}
+            )
+        return graph
+
+    @classmethod
+    def from_osm(cls, path: str) -> "RoadGraph":
+        """
+        Build a graph from the driveable ways in an OSM XML extract. The file
+        is streamed, and only nodes on driveable ways are kept.
+        """
+        node_ids = array("q")
+        node_lats = array("d")
+        node_lons = array("d")
+        edge_from = array("q")
+        edge_to = array("q")
+        edge_speed = array("d")
+
+        opener = bz2.open if path.endswith(".bz2") else open
+        with opener(path, "rb") as osm_file:
+            for _, element in ET.iterparse(osm_file, events=("end",)):
+                if element.tag == "node":
+                    node_ids.append(int(element.get("id")))
+                    node_lats.append(float(element.get("lat")))
+                    node_lons.append(float(element.get("lon")))
+                    element.clear()
+                elif element.tag == "way":
+                    cls._add_way(element, edge_from, edge_to, edge_speed)
+                    element.clear()
+
+        osm_ids = np.frombuffer(node_ids, dtype=np.int64)
+        order = np.argsort(osm_ids, kind="stable")
+        sorted_ids = osm_ids[order]
+        sources = np.frombuffer(edge_from, dtype=np.int64)
+        destinations = np.frombuffer(edge_to, dtype=np.int64)
+        speeds = np.frombuffer(edge_speed, dtype=np.float64)
+
+        # Drop edges referring to nodes outside the extract.
+        known = cls._contains(sorted_ids, sources) & cls._contains(
+            sorted_ids, destinations
+        )
+        sources, destinations, speeds = (
+            sources[known],
+            destinations[known],
+            speeds[known],
+        )
+        used_ids, inverse = np.unique(
+            np.concatenate([sources, destinations]), return_inverse=True
+        )
+        positions = order[np.searchsorted(sorted_ids, used_ids)]
+        lat = np.frombuffer(node_lats, dtype=np.float64)[positions].copy()
+        lon = np.frombuffer(node_lons, dtype=np.float64)[positions].copy()
+        source_index = inverse[: sources.size]
+        target_index = inverse[sources.size :]
+
+        lengths = great_circle_meters(
+            lat[source_index], lon[source_index], lat[target_index], lon[target_index]
+        )
+        times = lengths / (speeds / 3.6)
+        edge_order = np.argsort(source_index, kind="stable")
+        indptr = np.zeros(used_ids.size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(source_index, minlength=used_ids.size), out=indptr[1:])
+        graph = cls(
+            lat,
+            lon,
+            indptr,
+            target_index[edge_order].astype(np.int32),
+            lengths[edge_order].astype(np.float32),
+            times[edge_order].astype(np.float32),
+        )
+        logger.info(
+            "Built road graph from OSM extract",
+            extra={
+                "path": path,
+                "nodes": graph.number_of_nodes,
+                "edges": graph.number_of_edges,
+            },
+        )
+        return graph
+
+    def save(self, path: str) -> None:
+        """Save the graph arrays to a .npz file."""
+        with open(path, "wb") as graph_file:
+            np.savez(
+                graph_file,
+                lat=self.lat,
+                lon=self.lon,
+                indptr=self.indptr,
+                targets=self.targets,
+                lengths=self.lengths,
+                times=self.times,
+            )
+
+    def nearest_node(self, lat: float, lon: float) -> tuple[int, float]:
+        """Index of the graph node closest to a point and its distance in meters."""
+        cell_lat, cell_lon = self._cell(lat, lon)
+        cells = self._get_cells()
+        candidates = [
+            cells[(cell_lat + d_lat, cell_lon + d_lon)]
+            for d_lat in (-1, 0, 1)
+            for d_lon in (-1, 0, 1)
+            if (cell_lat + d_lat, cell_lon + d_lon) in cells
+        ]
+        # Every node outside the neighbouring cells is at least this far away.
+        covered_meters = (
+            math.radians(SNAP_CELL_DEGREES)
+            * EARTH_RADIUS_METERS
+            * math.cos(math.radians(min(abs(lat) + SNAP_CELL_DEGREES, 90.0)))
+        )
+        if candidates:
+            nodes = np.concatenate(candidates)
+            distances = great_circle_meters(lat, lon, self.lat[nodes], self.lon[nodes])
+            best = int(np.argmin(distances))
+            if distances[best] <= covered_meters:
+                return int(nodes[best]), float(distances[best])
+        distances = great_circle_meters(lat, lon, self.lat, self.lon)
+        index = int(np.argmin(distances))
+        return index, float(distances[index])
+
+    def shortest_paths_from(
+        self, source: int, targets: Iterable[int]
+    ) -> dict[int, tuple[float, float]]:
+        """
+        Fastest routes from one node to many with a single Dijkstra search,
+        which stops once every target is settled. Returns the route (distance
+        in meters, duration in seconds) keyed by target node; unreachable
+        targets are left out.
+        """
+        remaining = set(targets)
+        indptr, edge_targets, lengths, times, _, _ = self._get_adjacency()
+        best_time = {source: 0.0}
+        best_distance = {source: 0.0}
+        heap = [(0.0, source)]
+        settled: set[int] = set()
+        routes: dict[int, tuple[float, float]] = {}
+        while heap and remaining:
+            time, node = heapq.heappop(heap)
+            if node in settled:
+                continue
+            settled.add(node)
+            distance = best_distance[node]
+            if node in remaining:
+                remaining.discard(node)
+                routes[node] = (distance, time)
+            for edge in range(indptr[node], indptr[node + 1]):
+                neighbour = edge_targets[edge]
+                if neighbour in settled:
+                    continue
+                neighbour_time = time + times[edge]
+                if neighbour_time < best_time.get(neighbour, math.inf):
+                    best_time[neighbour] = neighbour_time
+                    best_distance[neighbour] = distance + lengths[edge]
+                    heapq.heappush(heap, (neighbour_time, neighbour))
+        return routes
+
+    def shortest_path(self, source: int, target: int) -> tuple[float, float] | None:
+        """
+        Fastest route between two nodes with an A* search, using the
+        great-circle distance at the top speed in the graph as the heuristic.
+        Returns the route (distance in meters, duration in seconds), or None
+        when the target cannot be reached.
+        """
+        if source == target:
+            return 0.0, 0.0
+        indptr, targets, lengths, times, lat, lon = self._get_adjacency()
+        target_lat = math.radians(lat[target])
+        target_lon = math.radians(lon[target])
+        cos_target_lat = math.cos(target_lat)
+        seconds_per_radian = EARTH_RADIUS_METERS / self.max_speed_meters_per_second
+
+        def heuristic(node: int) -> float:
+            node_lat = math.radians(lat[node])
+            a = (
+                math.sin((target_lat - node_lat) / 2) ** 2
+                + math.cos(node_lat)
+                * cos_target_lat
+                * math.sin((target_lon - math.radians(lon[node])) / 2) ** 2
+            )
+            return 2 * seconds_per_radian * math.asin(math.sqrt(min(a, 1.0)))
+
+        best_time = {source: 0.0}
+        best_distance = {source: 0.0}
+        heap = [(heuristic(source), 0.0, source)]
+        settled: set[int] = set()
+        while heap:
+            _, time, node = heapq.heappop(heap)
+            if node == target:
+                return best_distance[node], time
+            if node in settled:
+                continue
+            settled.add(node)
+            distance = best_distance[node]
+            for edge in range(indptr[node], indptr[node + 1]):
+                neighbour = targets[edge]
+                if neighbour in settled:
+                    continue
+                neighbour_time = time + times[edge]
+                if neighbour_time < best_time.get(neighbour, math.inf):
+                    best_time[neighbour] = neighbour_time
+                    best_distance[neighbour] = distance + lengths[edge]
+                    heapq.heappush(
+                        heap,
+                        (
+                            neighbour_time + heuristic(neighbour),
+                            neighbour_time,
+                            neighbour,
+                        ),
+                    )
+        return None
+
+    def _get_adjacency(self) -> tuple[list, ...]:
+        """
+        The CSR and coordinate arrays as Python lists, built on first use;
+        indexing lists in the search loop is much faster than indexing numpy
+        arrays one element at a time.
+        """
+        if self._adjacency is None:
+            self._adjacency = (
+                self.indptr.tolist(),
+                self.targets.tolist(),
+                self.lengths.tolist(),
+                self.times.tolist(),
+                self.lat.tolist(),
+                self.lon.tolist(),
+            )
+        return self._adjacency
+
+    def _get_cells(self) -> dict[tuple[int, int], NDArray[np.intp]]:
+        """Node indices bucketed by SNAP_CELL_DEGREES grid cell, built on first use."""
+        if self._cells is None:
+            cell_lat = np.floor(self.lat / SNAP_CELL_DEGREES).astype(np.int64)
+            cell_lon = np.floor(self.lon / SNAP_CELL_DEGREES).astype(np.int64)
+            order = np.lexsort((cell_lon, cell_lat))
+            keys = np.stack([cell_lat[order], cell_lon[order]], axis=1)
+            starts = np.flatnonzero(
+                np.concatenate([[True], np.any(keys[1:] != keys[:-1], axis=1)])
+            )
+            bounds = np.append(starts, order.size)
+            self._cells = {
+                (int(keys[start, 0]), int(keys[start, 1])): order[start:end]
+                for start, end in itertools.pairwise(bounds)
+            }
+        return self._cells
+
+    @staticmethod
+    def _cell(lat: float, lon: float) -> tuple[int, int]:
+        """Grid cell containing a point."""
+        return (
+            math.floor(lat / SNAP_CELL_DEGREES),
+            math.floor(lon / SNAP_CELL_DEGREES),
+        )
+
+    @classmethod
+    def _load_arrays(cls, path: str) -> "RoadGraph":
+        """Load a graph saved with save."""
+        with np.load(path) as arrays:
+            return cls(
+                arrays["lat"],
+                arrays["lon"],
+                arrays["indptr"],
+                arrays["targets"],
+                arrays["lengths"],
+                arrays["times"],
+            )
+
+    @staticmethod
+    def _add_way(
+        way: ET.Element, edge_from: array, edge_to: array, edge_speed: array
+    ) -> None:
+        """Append the directed edges of a driveable way."""
+        tags = {tag.get("k"): tag.get("v") for tag in way.iter("tag")}
+        highway = tags.get("highway")
+        if highway not in DRIVING_SPEEDS_KPH or tags.get("access") in ("no", "private"):
+            return
+        speed = RoadGraph._parse_maxspeed(tags.get("maxspeed"))
+        if speed is None:
+            speed = DRIVING_SPEEDS_KPH[highway]
+        refs = [int(node.get("ref")) for node in way.iter("nd")]
+        oneway = tags.get("oneway")
+        if oneway is None and (
+            highway in ("motorway", "motorway_link")
+            or tags.get("junction") == "roundabout"
+        ):
+            oneway = "yes"
+        if oneway == "-1":
+            refs.reverse()
+        for start, end in itertools.pairwise(refs):
+            edge_from.append(start)
+            edge_to.append(end)
+            edge_speed.append(speed)
+            if oneway not in ("yes", "true", "1", "-1"):
+                edge_from.append(end)
+                edge_to.append(start)
+                edge_speed.append(speed)
+
+    @staticmethod
+    def _parse_maxspeed(maxspeed: str | None) -> float | None:
+        """Parse an OSM maxspeed value, e.g. '40 mph' or '50', into km/h."""
+        if not maxspeed:
+            return None
+        value, _, unit = maxspeed.strip().partition(" ")
+        try:
+            speed = float(value)
+        except ValueError:
+            return None
+        if unit.strip() == "mph":
+            speed *= MPH_TO_KPH
+        return speed * MAXSPEED_FACTOR if speed > 0 else None
+
+    @staticmethod
+    def _contains(
+        sorted_values: NDArray[np.int64], values: NDArray[np.int64]
+    ) -> NDArray[np.bool_]:
+        """Whether each value is in the sorted array."""
+        if sorted_values.size == 0:
+            return np.zeros(values.shape, dtype=bool)
+        positions = np.searchsorted(sorted_values, values)
+        positions[positions == sorted_values.size] = 0
+        return sorted_values[positions] == values
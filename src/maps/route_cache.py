@@ -0,0 +1,152 @@
+import logging
+import os
+import threading
+from collections.abc import Hashable, Iterable, Mapping
+
+from src.maps.data import MapsData
+from src.maps.dtos import MapsResponseDTO
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROUTE_CACHE_PRECISION = 3
+DEFAULT_ROUTE_CACHE_TTL_DAYS = 90
+
+
+class RouteCache:
+    """
+    Route results shared across all users, keyed on the origin and
+    destination snapped to ROUTE_CACHE_PRECISION decimal places (3 is about
+    100 m), the travel mode and the routing backend, so switching backends
+    never mixes their results. Entries older than ROUTE_CACHE_TTL_DAYS are
+    ignored. Hits and misses are counted for the life of the process.
+    """
+
+    hits = 0
+    misses = 0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def snap(location: str) -> str | None:
+        """
+        Snap a 'lat,lon' string to the cache precision. Returns None for
+        locations that are not coordinates, e.g. addresses, which bypass the
+        cache.
+        """
+        try:
+            lat, lon = (float(part) for part in location.split(","))
+        except ValueError:
+            return None
+        precision = RouteCache._precision()
+        return f"{lat:.{precision}f},{lon:.{precision}f}"
+
+    @staticmethod
+    def get_many(
+        origin: str,
+        destinations: Mapping[Hashable, str],
+        backend: str,
+        mode: str = "driving",
+    ) -> dict[Hashable, MapsResponseDTO]:
+        """
+        Get the backend's cached routes from the origin to each destination,
+        keyed by the destination keys. Destinations that are not cached are
+        left out.
+        """
+        origin_key = RouteCache.snap(origin)
+        snapped: dict[str, list[Hashable]] = {}
+        for destination_key, destination in destinations.items():
+            snapped_destination = RouteCache.snap(destination)
+            if snapped_destination is not None:
+                snapped.setdefault(snapped_destination, []).append(destination_key)
+        cached = (
+            MapsData.get_cached_routes(
+                origin_key,
+                list(snapped),
+                mode,
+                backend,
+                RouteCache._ttl_days(),
+            )
+            if origin_key is not None
+            else {}
+        )
+        results = {
+            destination_key: MapsResponseDTO(
+                origin=origin,
+                destination=destinations[destination_key],
+                distance_meters=distance,
+                duration_seconds=duration,
+            )
+            for snapped_destination, (distance, duration) in cached.items()
+            for destination_key in snapped[snapped_destination]
+        }
+        with RouteCache._lock:
+            RouteCache.hits += len(results)
+            RouteCache.misses += len(destinations) - len(results)
+        return results
+
+    @staticmethod
+    def count_cached(
+        origin: str,
+        destinations: Mapping[Hashable, str],
+        backend: str,
+        mode: str = "driving",
+    ) -> int:
+        """
+        Count the destinations with a cached route from the origin, without
+        touching the hit counters, e.g. to plan a run before starting it.
+        """
+        origin_key = RouteCache.snap(origin)
+        if origin_key is None:
+            return 0
+        snapped = [
+            RouteCache.snap(destination) for destination in destinations.values()
+        ]
+        cached = MapsData.get_cached_routes(
+            origin_key,
+            list({key for key in snapped if key is not None}),
+            mode,
+            backend,
+            RouteCache._ttl_days(),
+            count_hits=False,
+        )
+        return sum(1 for key in snapped if key in cached)
+
+    @staticmethod
+    def put_many(
+        results: Iterable[MapsResponseDTO], backend: str, mode: str = "driving"
+    ) -> None:
+        """Store routes fetched from the backend in the cache."""
+        routes = []
+        for result in results:
+            origin_key = RouteCache.snap(result.origin)
+            destination_key = RouteCache.snap(result.destination)
+            if origin_key is None or destination_key is None:
+                continue
+            routes.append(
+                (
+                    origin_key,
+                    destination_key,
+                    mode,
+                    backend,
+                    result.distance_meters,
+                    result.duration_seconds,
+                )
+            )
+        MapsData.save_cached_routes(routes)
+
+    @staticmethod
+    def stats() -> dict[str, int]:
+        """Get the hit and miss counts for this process."""
+        with RouteCache._lock:
+            return {"hits": RouteCache.hits, "misses": RouteCache.misses}
+
+    @staticmethod
+    def _precision() -> int:
+        """Number of decimal places locations are snapped to."""
+        return int(
+            os.getenv("ROUTE_CACHE_PRECISION", str(DEFAULT_ROUTE_CACHE_PRECISION))
+        )
+
+    @staticmethod
+    def _ttl_days() -> int:
+        """Number of days a cached route stays valid."""
+        return int(os.getenv("ROUTE_CACHE_TTL_DAYS", str(DEFAULT_ROUTE_CACHE_TTL_DAYS)))
@@ -1,27 +1,72 @@
 import logging
 import os
+from collections.abc import Callable
 
 import googlemaps
 
 from src.maps.dtos import MapsResponseDTO
+from src.maps.maps_service_interface import MapsServiceInterface
+from src.maps.resilience import CircuitBreaker, RetryPolicy, call_with_retries
 
 logger = logging.getLogger(__name__)
 
+# Google Distance Matrix limits for a single request.
+MAX_MATRIX_ORIGINS = 25
+MAX_MATRIX_DESTINATIONS = 25
+MAX_MATRIX_ELEMENTS = 100
+# Seconds the googlemaps client may spend retrying a request itself.
+CLIENT_RETRY_TIMEOUT_SECONDS = 1
 
-class MapsService:
-    def __init__(self, api_key: str | None = None) -> None:
+# Client errors that fail a request once retries are used up.
+MAPS_CLIENT_ERRORS = (
+    googlemaps.exceptions.ApiError,
+    googlemaps.exceptions.TransportError,
+    googlemaps.exceptions.Timeout,
+)
+
+
+class MapsService(MapsServiceInterface):
+    max_matrix_origins = MAX_MATRIX_ORIGINS
+    max_matrix_destinations = MAX_MATRIX_DESTINATIONS
+    max_matrix_elements = MAX_MATRIX_ELEMENTS
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        client: googlemaps.Client | None = None,
+        retry_policy: RetryPolicy | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+        before_retry: Callable[[int], None] | None = None,
+    ) -> None:
         """
         Initializes the MapsService.
         :param api_key: Google Maps API key. If not provided, it will be read from the MAPS_API_KEY environment variable.
+        :param client: Client to use instead of building a googlemaps.Client, e.g. a local stub.
+        :param retry_policy: Retries for transient errors, read from the environment if not provided.
+        :param circuit_breaker: Breaker shared by every request, built from the environment if not provided.
+        :param before_retry: Called with the number of billed elements before each retry, so retries are counted like first attempts.
         """
-        if api_key is None:
-            api_key = os.getenv("MAPS_API_KEY")
-        if not api_key:
-            logger.error(
-                "Maps API key not found in environment variables or provided directly."
+        if client is None:
+            if api_key is None:
+                api_key = os.getenv("MAPS_API_KEY")
+            if not api_key:
+                logger.error(
+                    "Maps API key not found in environment variables or provided directly."
+                )
+                raise ValueError("Maps API key is required.")
+            # Transient errors are retried here, with jitter and behind the
+            # circuit breaker, rather than inside the client. The client's
+            # own retries of 5xx responses can't be turned off, as a zero
+            # timeout also fails the first attempt, so they are cut short.
+            client = googlemaps.Client(
+                key=api_key,
+                retry_over_query_limit=False,
+                retry_timeout=CLIENT_RETRY_TIMEOUT_SECONDS,
             )
-            raise ValueError("Maps API key is required.")
-        self.client: googlemaps.Client = googlemaps.Client(key=api_key)
+        self.client: googlemaps.Client = client
+        self.retry_policy = retry_policy or RetryPolicy.from_env()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker.from_env()
+        self.before_retry = before_retry
 
     def get_directions(
         self, origin: str, destination: str, mode: str = "driving"
@@ -32,17 +77,23 @@ class MapsService:
         :param destination: Ending location as a string.
         :param mode: Mode of transportation (default is 'driving').
         :return: MapsResponseDTO with distance and duration, or None if an error occurs.
+        :raises MapsUnavailableError: If the circuit breaker is open.
         """
         try:
-            directions_result = self.client.directions(  # type: ignore
-                origin=origin, destination=destination, mode=mode
+            directions_result = call_with_retries(
+                lambda: self.client.directions(  # type: ignore
+                    origin=origin, destination=destination, mode=mode
+                ),
+                self.retry_policy,
+                self.circuit_breaker,
+                before_retry=self._retry_hook(1),
             )
             if not directions_result:
                 logger.error(
                     "No directions found between %s and %s", origin, destination
                 )
                 return None
-        except googlemaps.exceptions.ApiError:
+        except MAPS_CLIENT_ERRORS:
             logger.exception("Google Maps API error occurred.")
             return None
 
@@ -55,3 +106,70 @@ class MapsService:
             origin=origin,
             destination=destination,
         )
+
+    def get_distance_matrix(
+        self, origins: list[str], destinations: list[str], mode: str = "driving"
+    ) -> list[list[MapsResponseDTO | None]] | None:
+        """
+        Requests a Distance Matrix from Google Maps API in a single call.
+        The caller is responsible for keeping the request within the
+        provider limits; see MAX_MATRIX_ORIGINS, MAX_MATRIX_DESTINATIONS
+        and MAX_MATRIX_ELEMENTS.
+        :param origins: Starting locations as strings.
+        :param destinations: Ending locations as strings.
+        :param mode: Mode of transportation (default is 'driving').
+        :return: A row per origin holding a MapsResponseDTO per destination, or None
+            for pairs without a route. None if the whole request fails.
+        :raises MapsUnavailableError: If the circuit breaker is open.
+        """
+        if (
+            len(origins) > MAX_MATRIX_ORIGINS
+            or len(destinations) > MAX_MATRIX_DESTINATIONS
+            or len(origins) * len(destinations) > MAX_MATRIX_ELEMENTS
+        ):
+            raise ValueError("Distance matrix request exceeds provider limits.")
+        try:
+            matrix_result = call_with_retries(
+                lambda: self.client.distance_matrix(  # type: ignore
+                    origins=origins, destinations=destinations, mode=mode
+                ),
+                self.retry_policy,
+                self.circuit_breaker,
+                before_retry=self._retry_hook(len(origins) * len(destinations)),
+            )
+        except MAPS_CLIENT_ERRORS:
+            logger.exception("Google Maps API error occurred.")
+            return None
+
+        rows: list[list[MapsResponseDTO | None]] = []
+        for origin, row in zip(origins, matrix_result.get("rows", [])):
+            elements: list[MapsResponseDTO | None] = []
+            for destination, element in zip(destinations, row["elements"]):
+                if element.get("status") != "OK":
+                    logger.warning(
+                        "No route in distance matrix",
+                        extra={
+                            "origin": origin,
+                            "destination": destination,
+                            "status": element.get("status"),
+                        },
+                    )
+                    elements.append(None)
+                    continue
+                elements.append(
+                    MapsResponseDTO(
+                        distance_meters=int(element["distance"]["value"]),
+                        duration_seconds=int(element["duration"]["value"]),
+                        origin=origin,
+                        destination=destination,
+                    )
+                )
+            rows.append(elements)
+        return rows
+
+    def _retry_hook(self, elements: int) -> Callable[[], None] | None:
+        """before_retry bound to a request of the given number of elements."""
+        if self.before_retry is None:
+            return None
+        before_retry = self.before_retry
+        return lambda: before_retry(elements)
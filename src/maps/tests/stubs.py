@@ -0,0 +1,55 @@
+import threading
+
+
+class StubMapsClient:
+    """
+    Local stand-in for googlemaps.Client. Distances are derived from the
+    position of the destination in the request so results can be checked
+    after they have been chunked and mapped back to caller keys.
+    """
+
+    def __init__(self, unroutable: set[str] | None = None) -> None:
+        self.unroutable = unroutable or set()
+        self.distance_matrix_calls: list[tuple[list[str], list[str]]] = []
+        self.directions_calls: list[tuple[str, str]] = []
+        self._lock = threading.Lock()
+
+    def distance_matrix(
+        self, origins: list[str], destinations: list[str], mode: str = "driving"
+    ) -> dict:
+        with self._lock:
+            self.distance_matrix_calls.append((list(origins), list(destinations)))
+        return {
+            "status": "OK",
+            "rows": [
+                {
+                    "elements": [
+                        (
+                            {"status": "ZERO_RESULTS"}
+                            if destination in self.unroutable
+                            else {
+                                "status": "OK",
+                                "distance": {"value": int(destination) * 1000},
+                                "duration": {"value": int(destination) * 60},
+                            }
+                        )
+                        for destination in destinations
+                    ]
+                }
+                for _ in origins
+            ],
+        }
+
+    def directions(self, origin: str, destination: str, mode: str = "driving") -> list:
+        with self._lock:
+            self.directions_calls.append((origin, destination))
+        return [
+            {
+                "legs": [
+                    {
+                        "distance": {"value": int(destination) * 1000},
+                        "duration": {"value": int(destination) * 60},
+                    }
+                ]
+            }
+        ]
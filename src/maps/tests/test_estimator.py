@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from src.maps.estimator import (
+    DEFAULT_CALIBRATION,
+    MAX_ROAD_SPEED_METERS_PER_SECOND,
+    MIN_REGION_SAMPLES,
+    TravelCalibration,
+    TravelTimeEstimator,
+)
+from src.utils.distance import great_circle_meters
+
+
+def test_default_estimator_uses_default_calibration():
+    estimator = TravelTimeEstimator()
+    straight = great_circle_meters(56.0, -4.0, 57.0, -4.0)
+
+    estimate = estimator.estimate_seconds(56.0, -4.0, [57.0], [-4.0])
+    lower_bound = estimator.lower_bound_seconds(56.0, -4.0, [57.0], [-4.0])
+
+    assert estimate[0] == pytest.approx(
+        straight
+        * DEFAULT_CALIBRATION.detour_factor
+        / DEFAULT_CALIBRATION.speed_meters_per_second
+    )
+    assert lower_bound[0] < estimate[0]
+
+
+def _samples(count: int, detour: float, speed: float, region: str):
+    destination_lat = np.linspace(56.2, 57.5, count)
+    straight = great_circle_meters(56.0, -4.0, destination_lat, -4.0)
+    road = straight * detour
+    return (
+        np.full(count, 56.0),
+        np.full(count, -4.0),
+        destination_lat,
+        np.full(count, -4.0),
+        road,
+        road / speed,
+        [region] * count,
+    )
+
+
+def test_fit_calibrates_regions():
+    highland = _samples(MIN_REGION_SAMPLES, 1.5, 15.0, "Highland")
+    southern = _samples(MIN_REGION_SAMPLES, 1.2, 25.0, "Southern")
+    samples = [np.concatenate([a, b]) for a, b in zip(highland, southern)]
+
+    estimator = TravelTimeEstimator.fit(*samples)
+
+    assert estimator.regions["Highland"].detour_factor == pytest.approx(1.5)
+    assert estimator.regions["Highland"].speed_meters_per_second == pytest.approx(15)
+    assert estimator.regions["Southern"].detour_factor == pytest.approx(1.2)
+    assert estimator.regions["Southern"].speed_meters_per_second == pytest.approx(25)
+    straight = great_circle_meters(56.0, -4.0, 57.0, -4.0)
+    estimates = estimator.estimate_seconds(
+        56.0,
+        -4.0,
+        [57.0, 57.0, 57.0],
+        [-4.0, -4.0, -4.0],
+        ["Highland", "Southern", None],
+    )
+    assert estimates[0] == pytest.approx(straight * 1.5 / 15)
+    assert estimates[1] == pytest.approx(straight * 1.2 / 25)
+    assert estimates[1] < estimates[2] < estimates[0]
+
+
+def test_fit_skips_regions_with_few_samples():
+    samples = _samples(MIN_REGION_SAMPLES - 1, 1.5, 15.0, "Islands")
+
+    estimator = TravelTimeEstimator.fit(*samples)
+
+    assert estimator.regions == {}
+    assert estimator.default.samples == MIN_REGION_SAMPLES - 1
+
+
+def test_lower_bound_is_below_routes_faster_than_any_fitted():
+    samples = _samples(MIN_REGION_SAMPLES, 1.4, 15.0, "Highland")
+    _, _, destination_lat, destination_lon, _, _, _ = samples
+    # Straight motorway at the speed limit, far faster than the fitted routes.
+    fastest = great_circle_meters(56.0, -4.0, destination_lat, destination_lon) / (
+        70 * 1.609344 / 3.6
+    )
+
+    lower_bound = TravelTimeEstimator.lower_bound_seconds(
+        56.0, -4.0, destination_lat, destination_lon
+    )
+
+    assert np.all(lower_bound < fastest)
+    assert lower_bound[0] == pytest.approx(
+        great_circle_meters(56.0, -4.0, destination_lat[0], -4.0)
+        / MAX_ROAD_SPEED_METERS_PER_SECOND
+    )
+
+
+def test_fit_without_usable_samples_uses_defaults():
+    estimator = TravelTimeEstimator.fit([56.0], [-4.0], [56.0], [-4.0], [10], [5])
+
+    assert estimator.default == DEFAULT_CALIBRATION
+
+
+def test_estimate_matrix_seconds_matches_single_origin_estimates():
+    estimator = TravelTimeEstimator(regions={"Highland": TravelCalibration(1.5, 15.0)})
+    lat = [56.0, 56.5, 57.0]
+    lon = [-4.0, -5.0, -4.5]
+    regions = ["Highland", None, "Highland"]
+
+    matrix = estimator.estimate_matrix_seconds(lat, lon, regions)
+
+    assert matrix.shape == (3, 3)
+    assert np.diag(matrix).tolist() == [0, 0, 0]
+    for row in range(3):
+        assert matrix[row] == pytest.approx(
+            estimator.estimate_seconds(lat[row], lon[row], lat, lon, regions)
+        )
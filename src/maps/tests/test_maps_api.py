@@ -1,12 +1,29 @@
+import pytest
 from unittest.mock import patch, MagicMock
 from src.maps.api import MapsApi
 from src.maps.dtos import MapsResponseDTO
+from src.maps.quota import MapsBudgetExceededError
+from src.maps.service import MapsService
+from src.maps.tests.stubs import StubMapsClient
 
 
+@pytest.fixture(autouse=True)
+def reset_shared_maps_clients(monkeypatch):
+    monkeypatch.setenv("MAPS_QPS", "1000")
+    MapsApi._service = None
+    MapsApi._rate_limiter = None
+    with patch("src.maps.api.MapsQuota") as mock_maps_quota:
+        yield mock_maps_quota
+    MapsApi._service = None
+    MapsApi._rate_limiter = None
+
+
+@patch("src.maps.api.RouteCache")
 @patch("src.maps.api.MapsService")
-def test_get_driving_distance_and_time(mock_maps_service):
+def test_get_driving_distance_and_time(mock_maps_service, mock_route_cache):
     mock_service_instance = MagicMock()
     mock_maps_service.return_value = mock_service_instance
+    mock_route_cache.get_many.return_value = {}
 
     expected_response = MapsResponseDTO(
         origin="origin",
@@ -24,3 +41,259 @@ def test_get_driving_distance_and_time(mock_maps_service):
     mock_service_instance.get_directions.assert_called_once_with(
         origin="origin", destination="destination", mode="driving"
     )
+    mock_route_cache.put_many.assert_called_once_with([expected_response], "google")
+
+
+@patch("src.maps.api.RouteCache")
+@patch("src.maps.api.MapsService")
+def test_get_driving_matrix_chunks_and_maps_keys(mock_maps_service, mock_route_cache):
+    mock_route_cache.get_many.return_value = {}
+    stub_client = StubMapsClient(unroutable={"7"})
+    mock_maps_service.return_value = MapsService(client=stub_client)
+    destinations = {walk_id: str(walk_id) for walk_id in range(1, 61)}
+
+    result = MapsApi.get_driving_matrix({"home": "origin"}, destinations)
+
+    assert len(stub_client.distance_matrix_calls) == 3
+    assert all(
+        len(origins) * len(chunk) <= 100 and len(chunk) <= 25
+        for origins, chunk in stub_client.distance_matrix_calls
+    )
+    assert ("home", 7) not in result
+    assert len(result) == 59
+    assert result[("home", 42)].distance_meters == 42000
+    assert result[("home", 42)].duration_seconds == 42 * 60
+
+
+@patch("src.maps.api.RouteCache")
+@patch("src.maps.api.MapsService")
+def test_get_driving_matrix_many_origins_within_element_limit(
+    mock_maps_service, mock_route_cache
+):
+    mock_route_cache.get_many.return_value = {}
+    stub_client = StubMapsClient()
+    mock_maps_service.return_value = MapsService(client=stub_client)
+    origins = {key: str(key) for key in range(30)}
+    destinations = {key: str(key) for key in range(10)}
+
+    result = MapsApi.get_driving_matrix(origins, destinations)
+
+    assert len(result) == 300
+    assert all(
+        len(origin_chunk) <= 25 and len(origin_chunk) * len(chunk) <= 100
+        for origin_chunk, chunk in stub_client.distance_matrix_calls
+    )
+
+
+@patch("src.maps.api.RouteCache")
+@patch("src.maps.api.MapsService")
+def test_get_driving_distances_from(mock_maps_service, mock_route_cache):
+    mock_route_cache.get_many.return_value = {}
+    mock_maps_service.return_value = MapsService(client=StubMapsClient())
+
+    result = MapsApi.get_driving_distances_from("origin", {10: "1", 20: "2"})
+
+    assert set(result) == {10, 20}
+    assert result[20].distance_meters == 2000
+    assert result[20].origin == "origin"
+
+
+@patch("src.maps.api.RouteCache")
+@patch("src.maps.api.MapsService")
+def test_get_driving_distance_and_time_cache_hit(mock_maps_service, mock_route_cache):
+    cached = MapsResponseDTO(
+        origin="origin",
+        destination="destination",
+        distance_meters=1000,
+        duration_seconds=3600,
+    )
+    mock_route_cache.get_many.return_value = {"destination": cached}
+
+    result = MapsApi.get_driving_distance_and_time(
+        origin="origin", destination="destination"
+    )
+
+    assert result == cached
+    mock_maps_service.assert_not_called()
+
+
+@patch("src.maps.api.RouteCache")
+@patch("src.maps.api.MapsService")
+def test_get_driving_matrix_only_requests_uncached(mock_maps_service, mock_route_cache):
+    stub_client = StubMapsClient()
+    mock_maps_service.return_value = MapsService(client=stub_client)
+    cached = MapsResponseDTO(
+        origin="origin", destination="1", distance_meters=5, duration_seconds=5
+    )
+    mock_route_cache.get_many.return_value = {1: cached}
+
+    result = MapsApi.get_driving_matrix({"home": "origin"}, {1: "1", 2: "2"})
+
+    assert stub_client.distance_matrix_calls == [(["origin"], ["2"])]
+    assert result[("home", 1)] == cached
+    assert result[("home", 2)].distance_meters == 2000
+    stored, backend = mock_route_cache.put_many.call_args.args
+    assert [route.destination for route in stored] == ["2"]
+    assert backend == "google"
+
+
+@patch("src.maps.api.RouteCache")
+@patch("src.maps.api.MapsService")
+def test_maps_service_is_shared_between_calls(mock_maps_service, mock_route_cache):
+    mock_route_cache.get_many.return_value = {}
+    mock_maps_service.return_value = MapsService(client=StubMapsClient())
+
+    MapsApi.get_driving_distances_from("origin", {1: "1"})
+    MapsApi.get_driving_distances_from("origin", {2: "2"})
+    MapsApi.get_driving_distance_and_time("origin", "3")
+
+    mock_maps_service.assert_called_once()
+
+
+@patch("src.maps.api.RouteCache")
+@patch("src.maps.api.MapsService")
+def test_iter_driving_distances_from_yields_per_chunk(
+    mock_maps_service, mock_route_cache
+):
+    mock_route_cache.get_many.return_value = {}
+    mock_maps_service.return_value = MapsService(client=StubMapsClient())
+    destinations = {walk_id: str(walk_id) for walk_id in range(1, 51)}
+
+    batches = list(MapsApi.iter_driving_distances_from("origin", destinations))
+
+    assert sorted(len(batch) for batch in batches) == [25, 25]
+    assert set().union(*batches) == set(destinations)
+
+
+@patch("src.maps.api.MapsService")
+def test_google_retries_count_against_quota_and_rate_limit(
+    mock_maps_service, reset_shared_maps_clients, monkeypatch
+):
+    monkeypatch.delenv("MAPS_BACKEND", raising=False)
+    MapsApi._rate_limiter = MagicMock()
+
+    MapsApi._get_service()
+    before_retry = mock_maps_service.call_args.kwargs["before_retry"]
+    before_retry(3)
+
+    reset_shared_maps_clients.reserve.assert_called_once_with("google", 3)
+    MapsApi._rate_limiter.acquire.assert_called_once()
+
+
+def test_get_service_uses_osm_backend(monkeypatch):
+    monkeypatch.setenv("MAPS_BACKEND", "osm")
+    monkeypatch.setenv("OSM_EXTRACT_PATH", "extract.osm")
+
+    with patch("src.maps.api.OsmRoutingService") as mock_osm_service:
+        service = MapsApi._get_service()
+
+    assert service is mock_osm_service.return_value
+
+
+def test_get_service_unsupported_backend(monkeypatch):
+    monkeypatch.setenv("MAPS_BACKEND", "carrier-pigeon")
+
+    with pytest.raises(ValueError, match="Unsupported MAPS_BACKEND"):
+        MapsApi._get_service()
+
+
+@patch("src.maps.api.RouteCache")
+def test_offline_backend_skips_rate_limit(mock_route_cache):
+    mock_route_cache.get_many.return_value = {}
+    offline_service = MagicMock(rate_limited=False)
+    offline_service.get_directions.return_value = MapsResponseDTO(
+        origin="56.0,-4.0",
+        destination="56.0,-3.98",
+        distance_meters=1244,
+        duration_seconds=60,
+    )
+    MapsApi._service = offline_service
+    MapsApi._rate_limiter = MagicMock()
+
+    MapsApi.get_driving_distance_and_time("56.0,-4.0", "56.0,-3.98")
+
+    MapsApi._rate_limiter.acquire.assert_not_called()
+
+
+@patch("src.maps.api.RouteCache")
+def test_iter_driving_distances_from_single_search_without_limits(mock_route_cache):
+    mock_route_cache.get_many.return_value = {}
+    offline_service = MagicMock(
+        rate_limited=False,
+        max_matrix_origins=None,
+        max_matrix_destinations=None,
+        max_matrix_elements=None,
+    )
+
+    def distances_from(origin, destinations, mode):
+        return [
+            MapsResponseDTO(
+                origin=origin,
+                destination=destination,
+                distance_meters=int(destination),
+                duration_seconds=int(destination),
+            )
+            for destination in destinations
+        ]
+
+    offline_service.get_distances_from.side_effect = distances_from
+    MapsApi._service = offline_service
+    destinations = {walk_id: str(walk_id) for walk_id in range(1, 61)}
+
+    result = MapsApi.get_driving_distances_from("origin", destinations)
+
+    offline_service.get_distances_from.assert_called_once_with(
+        "origin", list(destinations.values()), mode="driving"
+    )
+    offline_service.get_distance_matrix.assert_not_called()
+    assert len(result) == 60
+
+
+@patch("src.maps.api.RouteCache")
+@patch("src.maps.api.MapsService")
+def test_paid_requests_are_counted_against_the_quota(
+    mock_maps_service, mock_route_cache, reset_shared_maps_clients
+):
+    mock_route_cache.get_many.return_value = {}
+    mock_maps_service.return_value = MapsService(client=StubMapsClient())
+    destinations = {walk_id: str(walk_id) for walk_id in range(1, 31)}
+
+    MapsApi.get_driving_distances_from("origin", destinations)
+
+    reserved = sorted(
+        call.args for call in reset_shared_maps_clients.reserve.call_args_list
+    )
+    assert reserved == [("google", 5), ("google", 25)]
+
+
+@patch("src.maps.api.RouteCache")
+@patch("src.maps.api.MapsService")
+def test_budget_stops_requests(
+    mock_maps_service, mock_route_cache, reset_shared_maps_clients
+):
+    mock_route_cache.get_many.return_value = {}
+    stub_client = StubMapsClient()
+    mock_maps_service.return_value = MapsService(client=stub_client)
+    reset_shared_maps_clients.reserve.side_effect = MapsBudgetExceededError("budget")
+
+    with pytest.raises(MapsBudgetExceededError):
+        MapsApi.get_driving_distances_from("origin", {1: "1"})
+
+    assert stub_client.distance_matrix_calls == []
+
+
+@patch("src.maps.api.RouteCache")
+def test_plan_driving_distances_from(mock_route_cache, reset_shared_maps_clients):
+    reset_shared_maps_clients.estimate_cost.return_value = 0.5
+    mock_route_cache.count_cached.return_value = 10
+    destinations = {walk_id: str(walk_id) for walk_id in range(60)}
+
+    plan = MapsApi.plan_driving_distances_from("origin", destinations)
+
+    assert plan.backend == "google"
+    assert plan.lookups == 60
+    assert plan.cached == 10
+    assert plan.uncached == 50
+    assert plan.requests == 2
+    assert plan.estimated_cost == 0.5
+    reset_shared_maps_clients.estimate_cost.assert_called_once_with(50)
@@ -2,6 +2,8 @@ import pytest
 from unittest.mock import patch
 from src.maps.service import MapsService
 from src.maps.dtos import MapsResponseDTO
+from src.maps.resilience import CircuitBreaker, MapsUnavailableError, RetryPolicy
+from src.maps.tests.stubs import StubMapsClient
 import googlemaps
 
 
@@ -56,3 +58,99 @@ def test_get_directions_api_error(mock_client):
     result = service.get_directions(origin="origin", destination="destination")
 
     assert result is None
+
+
+def test_get_distance_matrix_with_stub_client():
+    stub_client = StubMapsClient(unroutable={"3"})
+    service = MapsService(client=stub_client)
+
+    result = service.get_distance_matrix(
+        origins=["origin"], destinations=["1", "2", "3"]
+    )
+
+    assert stub_client.distance_matrix_calls == [(["origin"], ["1", "2", "3"])]
+    assert result is not None
+    assert [element.distance_meters if element else None for element in result[0]] == [
+        1000,
+        2000,
+        None,
+    ]
+    assert result[0][1].duration_seconds == 120
+    assert result[0][1].destination == "2"
+
+
+def test_get_distance_matrix_over_limits():
+    service = MapsService(client=StubMapsClient())
+
+    with pytest.raises(ValueError, match="exceeds provider limits"):
+        service.get_distance_matrix(
+            origins=["origin"], destinations=[str(i) for i in range(26)]
+        )
+
+
+def test_get_distance_matrix_api_error():
+    stub_client = StubMapsClient()
+    service = MapsService(client=stub_client)
+
+    with patch.object(
+        stub_client,
+        "distance_matrix",
+        side_effect=googlemaps.exceptions.ApiError("error"),
+    ):
+        result = service.get_distance_matrix(origins=["origin"], destinations=["1"])
+
+    assert result is None
+
+
+def test_get_distance_matrix_retries_over_query_limit():
+    stub_client = StubMapsClient()
+    service = MapsService(
+        client=stub_client, retry_policy=RetryPolicy(backoff_seconds=0)
+    )
+    responses = [googlemaps.exceptions.ApiError("OVER_QUERY_LIMIT")]
+    distance_matrix = stub_client.distance_matrix
+
+    def over_query_limit_once(*args, **kwargs):
+        if responses:
+            raise responses.pop(0)
+        return distance_matrix(*args, **kwargs)
+
+    with patch.object(stub_client, "distance_matrix", over_query_limit_once):
+        result = service.get_distance_matrix(origins=["origin"], destinations=["1"])
+
+    assert result is not None
+    assert result[0][0].distance_meters == 1000
+
+
+def test_get_distance_matrix_counts_retries():
+    stub_client = StubMapsClient()
+    retried_elements = []
+    service = MapsService(
+        client=stub_client,
+        retry_policy=RetryPolicy(backoff_seconds=0),
+        before_retry=retried_elements.append,
+    )
+    responses = [googlemaps.exceptions.ApiError("OVER_QUERY_LIMIT")]
+    distance_matrix = stub_client.distance_matrix
+
+    def over_query_limit_once(*args, **kwargs):
+        if responses:
+            raise responses.pop(0)
+        return distance_matrix(*args, **kwargs)
+
+    with patch.object(stub_client, "distance_matrix", over_query_limit_once):
+        service.get_distance_matrix(origins=["origin"], destinations=["1", "2"])
+
+    assert retried_elements == [2]
+
+
+def test_get_directions_fails_fast_with_open_circuit():
+    stub_client = StubMapsClient()
+    breaker = CircuitBreaker(failure_threshold=1)
+    breaker.record_failure()
+    service = MapsService(client=stub_client, circuit_breaker=breaker)
+
+    with pytest.raises(MapsUnavailableError):
+        service.get_directions(origin="origin", destination="1")
+
+    assert stub_client.directions_calls == []
@@ -0,0 +1,82 @@
+import shutil
+from unittest.mock import patch
+
+import pytest
+
+from src.maps.osm_service import OsmRoutingService
+from src.maps.road_graph import RoadGraph
+from src.maps.tests.test_road_graph import SMALL_EXTRACT
+
+
+@pytest.fixture(scope="module")
+def osm_service():
+    return OsmRoutingService(graph=RoadGraph.from_osm(SMALL_EXTRACT))
+
+
+def test_init_without_extract(monkeypatch):
+    monkeypatch.delenv("OSM_EXTRACT_PATH", raising=False)
+
+    with pytest.raises(ValueError, match="OSM extract is required"):
+        OsmRoutingService()
+
+
+def test_init_loads_extract_from_environment(monkeypatch, tmp_path):
+    extract = tmp_path / "extract.osm"
+    shutil.copyfile(SMALL_EXTRACT, extract)
+    monkeypatch.setenv("OSM_EXTRACT_PATH", str(extract))
+
+    service = OsmRoutingService()
+
+    assert service.graph.number_of_nodes == 7
+
+
+def test_get_directions(osm_service):
+    result = osm_service.get_directions("56.0,-4.0", "56.0001,-3.98")
+
+    assert result is not None
+    assert result.origin == "56.0,-4.0"
+    assert result.destination == "56.0001,-3.98"
+    assert result.distance_meters == pytest.approx(1244, abs=2)
+    assert result.duration_seconds == 60
+
+
+def test_get_directions_without_route(osm_service):
+    assert osm_service.get_directions("56.0,-4.0", "56.1,-4.0") is None
+
+
+def test_get_directions_too_far_from_roads(osm_service):
+    assert osm_service.get_directions("56.0,-4.0", "57.0,-4.0") is None
+
+
+def test_get_directions_rejects_addresses(osm_service):
+    assert osm_service.get_directions("Edinburgh", "56.0,-3.98") is None
+
+
+def test_get_distance_matrix(osm_service):
+    rows = osm_service.get_distance_matrix(
+        ["56.0,-4.0", "56.005,-3.99"], ["56.0,-3.98", "56.1,-4.0"]
+    )
+
+    assert rows is not None
+    assert [[element is not None for element in row] for row in rows] == [
+        [True, False],
+        [True, False],
+    ]
+
+
+def test_get_distances_from_uses_one_search(osm_service):
+    destinations = ["56.0,-3.98", "56.005,-3.99", "56.1,-4.0", "56.0,-3.98"]
+
+    with patch.object(
+        osm_service.graph,
+        "shortest_paths_from",
+        wraps=osm_service.graph.shortest_paths_from,
+    ) as shortest_paths_from:
+        results = osm_service.get_distances_from("56.0,-4.0", destinations)
+
+    shortest_paths_from.assert_called_once()
+    assert results is not None
+    assert results[2] is None
+    for destination, result in zip(destinations, results):
+        if result is not None:
+            assert result == osm_service.get_directions("56.0,-4.0", destination)
@@ -0,0 +1,77 @@
+import sqlite3
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.maps.data import MapsData
+from src.maps.quota import MapsBudgetExceededError, MapsQuota
+
+
+@pytest.fixture
+def mock_db_api():
+    with patch("src.maps.data.DatabaseAPI") as MockDatabaseAPI:
+        mock_instance = MockDatabaseAPI.return_value
+        shared_conn = sqlite3.connect(":memory:")
+        mock_context_manager = MagicMock()
+        mock_context_manager.__enter__.return_value = shared_conn
+        mock_context_manager.__exit__.return_value = None
+        mock_instance.db_connection.return_value = mock_context_manager
+        MapsData.create_maps_api_usage_table()
+        yield mock_instance
+        shared_conn.close()
+
+
+@pytest.fixture(autouse=True)
+def reset_run_counters(monkeypatch):
+    monkeypatch.delenv("MAPS_DAILY_BUDGET", raising=False)
+    monkeypatch.setenv("MAPS_COST_PER_ELEMENT", "0.01")
+    monkeypatch.setattr(MapsQuota, "run_requests", 0)
+    monkeypatch.setattr(MapsQuota, "run_elements", 0)
+
+
+def test_reserve_counts_run_and_day_usage(mock_db_api):
+    MapsQuota.reserve("google", 25)
+    MapsQuota.reserve("google", 5)
+    MapsData.record_maps_api_usage(MapsQuota._today(), "google", 1, 10)
+
+    stats = MapsQuota.stats("google")
+
+    assert stats["run_requests"] == 2
+    assert stats["run_elements"] == 30
+    assert stats["run_cost"] == 0.3
+    assert stats["day_requests"] == 3
+    assert stats["day_elements"] == 40
+    assert stats["day_cost"] == 0.4
+
+
+def test_reserve_stops_at_daily_budget(mock_db_api, monkeypatch):
+    monkeypatch.setenv("MAPS_DAILY_BUDGET", "0.3")
+    MapsData.record_maps_api_usage(MapsQuota._today(), "google", 1, 20)
+
+    MapsQuota.reserve("google", 10)
+    with pytest.raises(MapsBudgetExceededError):
+        MapsQuota.reserve("google", 1)
+
+    assert MapsData.get_maps_api_usage(MapsQuota._today(), "google") == (2, 30)
+    assert MapsQuota.run_requests == 1
+
+
+def test_reserve_stops_when_usage_cannot_be_recorded(mock_db_api, monkeypatch):
+    monkeypatch.setenv("MAPS_DAILY_BUDGET", "10")
+    conn = mock_db_api.db_connection.return_value.__enter__.return_value
+    conn.execute("DROP TABLE maps_api_usage")
+
+    with pytest.raises(MapsBudgetExceededError):
+        MapsQuota.reserve("google", 1)
+
+    assert MapsQuota.run_requests == 0
+
+
+def test_budget_is_per_backend_and_day(mock_db_api, monkeypatch):
+    monkeypatch.setenv("MAPS_DAILY_BUDGET", "0.1")
+    MapsData.record_maps_api_usage(MapsQuota._today(), "other", 1, 100)
+    MapsData.record_maps_api_usage("2000-01-01", "google", 1, 100)
+
+    MapsQuota.reserve("google", 10)
+
+    assert MapsData.get_maps_api_usage(MapsQuota._today(), "google") == (1, 10)
@@ -0,0 +1,152 @@
+import googlemaps
+import pytest
+
+from src.maps.resilience import (
+    CircuitBreaker,
+    MapsUnavailableError,
+    RetryPolicy,
+    call_with_retries,
+    is_transient_error,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.parametrize(
+    "error, transient",
+    [
+        (googlemaps.exceptions.Timeout(), True),
+        (googlemaps.exceptions.TransportError(ConnectionError()), True),
+        (googlemaps.exceptions.HTTPError(503), True),
+        (googlemaps.exceptions.HTTPError(429), True),
+        (googlemaps.exceptions.HTTPError(404), False),
+        (googlemaps.exceptions.ApiError("OVER_QUERY_LIMIT"), True),
+        (googlemaps.exceptions.ApiError("UNKNOWN_ERROR"), True),
+        (googlemaps.exceptions.ApiError("REQUEST_DENIED"), False),
+        (ValueError("bad"), False),
+    ],
+)
+def test_is_transient_error(error, transient):
+    assert is_transient_error(error) is transient
+
+
+def test_retry_policy_delay_is_capped():
+    policy = RetryPolicy(max_retries=5, backoff_seconds=1.0, max_backoff_seconds=4.0)
+
+    delays = [policy.delay_seconds(retry) for retry in range(6) for _ in range(50)]
+
+    assert all(0 <= delay <= 4.0 for delay in delays)
+    assert all(0 <= policy.delay_seconds(0) <= 1.0 for _ in range(50))
+
+
+def test_call_with_retries_recovers_from_transient_errors():
+    responses = [googlemaps.exceptions.Timeout(), googlemaps.exceptions.HTTPError(500)]
+    sleeps = []
+
+    def flaky():
+        if responses:
+            raise responses.pop(0)
+        return "ok"
+
+    result = call_with_retries(
+        flaky, RetryPolicy(max_retries=3), CircuitBreaker(), sleep=sleeps.append
+    )
+
+    assert result == "ok"
+    assert len(sleeps) == 2
+
+
+def test_call_with_retries_calls_before_retry_for_each_retry():
+    responses = [googlemaps.exceptions.Timeout(), googlemaps.exceptions.Timeout()]
+    retries = []
+
+    def flaky():
+        if responses:
+            raise responses.pop(0)
+        return "ok"
+
+    call_with_retries(
+        flaky,
+        RetryPolicy(max_retries=3),
+        CircuitBreaker(),
+        sleep=lambda _: None,
+        before_retry=lambda: retries.append(1),
+    )
+
+    assert len(retries) == 2
+
+
+def test_call_with_retries_does_not_retry_permanent_errors():
+    calls = []
+
+    def denied():
+        calls.append(1)
+        raise googlemaps.exceptions.ApiError("REQUEST_DENIED")
+
+    with pytest.raises(googlemaps.exceptions.ApiError):
+        call_with_retries(denied, RetryPolicy(), CircuitBreaker(), sleep=lambda _: None)
+
+    assert len(calls) == 1
+
+
+def test_call_with_retries_gives_up_after_max_retries():
+    calls = []
+
+    def down():
+        calls.append(1)
+        raise googlemaps.exceptions.Timeout()
+
+    with pytest.raises(googlemaps.exceptions.Timeout):
+        call_with_retries(
+            down,
+            RetryPolicy(max_retries=2),
+            CircuitBreaker(failure_threshold=10),
+            sleep=lambda _: None,
+        )
+
+    assert len(calls) == 3
+
+
+def test_open_circuit_stops_retries():
+    calls = []
+    breaker = CircuitBreaker(failure_threshold=2)
+
+    def down():
+        calls.append(1)
+        raise googlemaps.exceptions.Timeout()
+
+    with pytest.raises(MapsUnavailableError):
+        call_with_retries(
+            down, RetryPolicy(max_retries=5), breaker, sleep=lambda _: None
+        )
+    with pytest.raises(MapsUnavailableError):
+        call_with_retries(lambda: "ok", RetryPolicy(), breaker)
+
+    assert len(calls) == 2
+    assert breaker.state == "open"
+
+
+def test_circuit_half_opens_after_reset():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30, clock=clock)
+    breaker.record_failure()
+
+    clock.now = 31
+    assert breaker.state == "half_open"
+    breaker.before_call()
+    with pytest.raises(MapsUnavailableError):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now = 62
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
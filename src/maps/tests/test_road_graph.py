@@ -0,0 +1,113 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from src.maps.road_graph import GRAPH_CACHE_SUFFIX, RoadGraph
+from src.utils.distance import great_circle_meters
+
+SMALL_EXTRACT = os.path.join(
+    os.path.dirname(__file__), "test_data", "small_extract.osm"
+)
+
+
+@pytest.fixture(scope="module")
+def graph():
+    return RoadGraph.from_osm(SMALL_EXTRACT)
+
+
+def node_at(graph: RoadGraph, lat: float, lon: float) -> int:
+    node, snap_distance = graph.nearest_node(lat, lon)
+    assert snap_distance < 1
+    return node
+
+
+def test_from_osm_keeps_only_driveable_ways(graph):
+    # The track to node 6 and the way to the missing node 99 are dropped.
+    assert graph.number_of_nodes == 7
+    assert graph.number_of_edges == 13
+    assert graph.indptr[-1] == graph.number_of_edges
+
+
+def test_shortest_path_prefers_faster_road(graph):
+    route = graph.shortest_path(node_at(graph, 56.0, -4.0), node_at(graph, 56.0, -3.98))
+
+    assert route is not None
+    distance, duration = route
+    assert distance == pytest.approx(1244, abs=2)
+    assert duration == pytest.approx(1244 / (75 / 3.6), abs=1)
+
+
+def test_shortest_path_respects_oneway(graph):
+    north_west = node_at(graph, 56.005, -3.99)
+    north_east = node_at(graph, 56.005, -3.98)
+
+    with_oneway = graph.shortest_path(north_west, north_east)
+    against_oneway = graph.shortest_path(north_east, north_west)
+
+    assert with_oneway is not None and against_oneway is not None
+    assert with_oneway[0] == pytest.approx(622, abs=2)
+    assert against_oneway[0] > 2 * with_oneway[0]
+
+
+def test_shortest_path_unreachable(graph):
+    assert (
+        graph.shortest_path(node_at(graph, 56.0, -4.0), node_at(graph, 56.1, -4.0))
+        is None
+    )
+
+
+def test_shortest_path_same_node(graph):
+    node = node_at(graph, 56.0, -4.0)
+
+    assert graph.shortest_path(node, node) == (0.0, 0.0)
+
+
+def test_maxspeed_in_mph(graph):
+    route = graph.shortest_path(node_at(graph, 56.1, -4.0), node_at(graph, 56.1, -3.99))
+
+    assert route is not None
+    distance, duration = route
+    assert distance / duration == pytest.approx(20 * 1.609344 * 0.9 / 3.6, rel=1e-3)
+
+
+def test_load_saves_and_reuses_parsed_graph(tmp_path, graph):
+    extract = tmp_path / "extract.osm"
+    shutil.copy(SMALL_EXTRACT, extract)
+
+    loaded = RoadGraph.load(str(extract))
+    cached = tmp_path / ("extract.osm" + GRAPH_CACHE_SUFFIX)
+
+    assert cached.exists()
+    reloaded = RoadGraph.load(str(extract))
+    assert reloaded.number_of_edges == loaded.number_of_edges == graph.number_of_edges
+    assert (reloaded.times == graph.times).all()
+
+
+def test_shortest_paths_from_matches_point_to_point(graph):
+    source = node_at(graph, 56.0, -4.0)
+    targets = range(graph.number_of_nodes)
+
+    routes = graph.shortest_paths_from(source, targets)
+
+    for target in targets:
+        expected = graph.shortest_path(source, target)
+        if expected is None:
+            assert target not in routes
+        else:
+            assert routes[target] == pytest.approx(expected)
+    assert len(routes) == 5
+
+
+def test_nearest_node_matches_full_scan(graph):
+    rng = np.random.default_rng(7)
+    points = np.column_stack(
+        [rng.uniform(55.95, 56.15, 50), rng.uniform(-4.05, -3.95, 50)]
+    )
+
+    for lat, lon in points:
+        distances = great_circle_meters(lat, lon, graph.lat, graph.lon)
+        node, snap_distance = graph.nearest_node(lat, lon)
+        assert snap_distance == pytest.approx(distances.min())
+        assert distances[node] == pytest.approx(distances.min())
@@ -0,0 +1,146 @@
+import sqlite3
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.maps.data import MapsData
+from src.maps.dtos import MapsResponseDTO
+from src.maps.route_cache import RouteCache
+
+
+@pytest.fixture
+def mock_db_api():
+    with patch("src.maps.data.DatabaseAPI") as MockDatabaseAPI:
+        mock_instance = MockDatabaseAPI.return_value
+        shared_conn = sqlite3.connect(":memory:")
+        mock_context_manager = MagicMock()
+        mock_context_manager.__enter__.return_value = shared_conn
+        mock_context_manager.__exit__.return_value = None
+        mock_instance.db_connection.return_value = mock_context_manager
+        MapsData.create_route_cache_table()
+        yield mock_instance
+        shared_conn.close()
+
+
+def _route(origin: str, destination: str, distance: int) -> MapsResponseDTO:
+    return MapsResponseDTO(
+        origin=origin,
+        destination=destination,
+        distance_meters=distance,
+        duration_seconds=distance // 10,
+    )
+
+
+def test_snap():
+    assert RouteCache.snap("56.908904,-4.236601") == "56.909,-4.237"
+    assert RouteCache.snap("Fort William") is None
+
+
+def test_snap_uses_configured_precision(monkeypatch):
+    monkeypatch.setenv("ROUTE_CACHE_PRECISION", "1")
+
+    assert RouteCache.snap("56.908904,-4.236601") == "56.9,-4.2"
+
+
+def test_put_and_get_many_shares_nearby_locations(mock_db_api):
+    RouteCache.put_many(
+        [_route("55.84901,-3.14373", "56.90890,-4.23660", 1000)], "google"
+    )
+    hits_before = RouteCache.stats()["hits"]
+
+    result = RouteCache.get_many(
+        "55.84912,-3.14368",
+        {1: "56.90893,-4.23655", 2: "57.00000,-5.00000"},
+        "google",
+    )
+
+    assert set(result) == {1}
+    assert result[1].distance_meters == 1000
+    assert result[1].origin == "55.84912,-3.14368"
+    assert result[1].destination == "56.90893,-4.23655"
+    assert RouteCache.stats()["hits"] == hits_before + 1
+    conn = mock_db_api.db_connection.return_value.__enter__.return_value
+    assert conn.execute("SELECT hits FROM route_cache").fetchone() == (1,)
+
+
+def test_get_many_ignores_expired_entries(mock_db_api, monkeypatch):
+    RouteCache.put_many(
+        [_route("55.84901,-3.14373", "56.90890,-4.23660", 1000)], "google"
+    )
+    conn = mock_db_api.db_connection.return_value.__enter__.return_value
+    conn.execute("UPDATE route_cache SET created_at = datetime('now', '-10 days')")
+    monkeypatch.setenv("ROUTE_CACHE_TTL_DAYS", "7")
+
+    result = RouteCache.get_many(
+        "55.84901,-3.14373", {1: "56.90890,-4.23660"}, "google"
+    )
+
+    assert result == {}
+
+
+def test_routes_are_kept_apart_per_backend(mock_db_api):
+    RouteCache.put_many(
+        [_route("55.84901,-3.14373", "56.90890,-4.23660", 1000)], "google"
+    )
+
+    assert (
+        RouteCache.get_many("55.84901,-3.14373", {1: "56.90890,-4.23660"}, "osm") == {}
+    )
+
+    RouteCache.put_many([_route("55.84901,-3.14373", "56.90890,-4.23660", 1100)], "osm")
+    google = RouteCache.get_many(
+        "55.84901,-3.14373", {1: "56.90890,-4.23660"}, "google"
+    )
+    osm = RouteCache.get_many("55.84901,-3.14373", {1: "56.90890,-4.23660"}, "osm")
+
+    assert google[1].distance_meters == 1000
+    assert osm[1].distance_meters == 1100
+
+
+def test_create_table_splits_backend_out_of_legacy_mode(mock_db_api):
+    conn = mock_db_api.db_connection.return_value.__enter__.return_value
+    conn.execute("DROP TABLE route_cache")
+    conn.execute(
+        """
+        CREATE TABLE route_cache (
+            origin_key TEXT NOT NULL,
+            destination_key TEXT NOT NULL,
+            mode TEXT NOT NULL,
+            distance INTEGER NOT NULL,
+            duration INTEGER NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (origin_key, destination_key, mode)
+        )
+        """
+    )
+    conn.executemany(
+        "INSERT INTO route_cache (origin_key, destination_key, mode, distance, duration)"
+        " VALUES ('55.849,-3.144', '56.909,-4.237', ?, ?, 100)",
+        [("driving", 1000), ("driving:osm", 1100)],
+    )
+
+    MapsData.create_route_cache_table()
+
+    rows = conn.execute(
+        "SELECT mode, backend, distance FROM route_cache ORDER BY distance"
+    ).fetchall()
+    assert rows == [("driving", "google", 1000), ("driving", "osm", 1100)]
+
+
+def test_count_cached_does_not_count_hits(mock_db_api):
+    RouteCache.put_many(
+        [_route("55.84901,-3.14373", "56.90890,-4.23660", 1000)], "google"
+    )
+    stats_before = RouteCache.stats()
+
+    count = RouteCache.count_cached(
+        "55.84901,-3.14373",
+        {1: "56.90890,-4.23660", 2: "57.0,-5.0", 3: "Fort William"},
+        "google",
+    )
+
+    assert count == 1
+    assert RouteCache.stats() == stats_before
+    conn = mock_db_api.db_connection.return_value.__enter__.return_value
+    assert conn.execute("SELECT hits FROM route_cache").fetchone() == (0,)
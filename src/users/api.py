@@ -1,14 +1,51 @@
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+
+import numpy as np
+from numpy.typing import NDArray
 
 from src.walkhighlands.api import WalkhighlandsAPI
 from src.users.data import UserData
-from src.users.service import UsersService
-from src.users.location_service import get_lat_lon_from_postcode
-from src.users.dtos import LatLon
+from src.users.service import DEFAULT_GROUP_MAX_WEIGHT, UsersService
+from src.users.ranking import ScoreFunction
+from src.users.travel_matrix import TravelMatrix
+from src.users.location_data import LocationData
+from src.users.location_service import (
+    get_lat_lon_from_postcode,
+    normalise_postcode,
+    read_postcode_directory,
+)
+from src.users.completion import CompletionPlanner
+from src.users.season import SeasonScheduler
+from src.users.trip import TripPlanner
+from src.utils.time import hours_to_seconds
+from src.users.dtos import (
+    CompletionPlan,
+    LatLon,
+    SeasonPlan,
+    TripPlan,
+    UserImportResult,
+    WalkCandidateRecord,
+    WalkDirectionsPlan,
+    WalkFilters,
+)
 from src.maps.api import MapsApi
+from src.maps.quota import MapsBudgetExceededError
+from src.maps.resilience import MapsUnavailableError
+from src.maps.service import MAPS_CLIENT_ERRORS
+from src.maps.dtos import MapsResponseDTO
+from src.maps.route_cache import RouteCache
 
 logger = logging.getLogger(__name__)
 
+DIRECTIONS_WRITE_BATCH_SIZE = 200
+# Walks requested per round when prefiltering by estimated travel time,
+# one full Distance Matrix request.
+DIRECTIONS_PREFILTER_BATCH_SIZE = 25
+DEFAULT_USER_IMPORT_MAX_WORKERS = 4
+
 
 class UsersAPI:
     @staticmethod
@@ -16,8 +53,89 @@ class UsersAPI:
         logger.info("Initializing users...")
         UserData.create_user_table()
         UserData.create_user_walk_directions_table()
+        UserData.create_user_walk_direction_failures_table()
+        UserData.create_user_hills_bagged_table()
+        LocationData.create_postcodes_table()
+        LocationData.create_geocode_cache_table()
         logger.info("Initialization complete.")
 
+    @staticmethod
+    def bag_hills(user: str, hills: list[str]) -> int:
+        """
+        Record hills, by name or id, as bagged by the user so rankings can
+        count only the hills a walk would add. Returns the number newly
+        bagged.
+        """
+        user_id = UsersAPI._get_user_id(user)
+        hill_ids = UsersAPI._resolve_hill_ids(hills)
+        UserData.create_user_hills_bagged_table()
+        bagged = UserData.bag_hills(user_id, hill_ids)
+        logger.info(
+            "Bagged hills",
+            extra={"user": user, "hills": len(hill_ids), "newly_bagged": bagged},
+        )
+        return bagged
+
+    @staticmethod
+    def unbag_hills(user: str, hills: list[str]) -> int:
+        """
+        Forget that the user bagged hills, given by name or id. Returns the
+        number removed.
+        """
+        user_id = UsersAPI._get_user_id(user)
+        hill_ids = UsersAPI._resolve_hill_ids(hills)
+        UserData.create_user_hills_bagged_table()
+        removed = UserData.unbag_hills(user_id, hill_ids)
+        logger.info(
+            "Unbagged hills",
+            extra={"user": user, "hills": len(hill_ids), "removed": removed},
+        )
+        return removed
+
+    @staticmethod
+    def _get_user_id(user: str) -> int:
+        """The user's id, raising ValueError for an unknown user."""
+        user_id = UserData.get_user_id_for_name(user)
+        if user_id is None:
+            logger.error("User not found", extra={"user": user})
+            raise ValueError("User not found")
+        return user_id
+
+    @staticmethod
+    def _resolve_hill_ids(hills: list[str]) -> set[int]:
+        """
+        Turn hill names, matched ignoring case, or numeric ids into hill
+        ids. Raises ValueError for names that match no hill or several.
+        """
+        hill_ids = {int(hill) for hill in hills if hill.strip().isdigit()}
+        names = [hill for hill in hills if not hill.strip().isdigit()]
+        found = UserData.get_hill_ids_by_name(names)
+        unknown = [name for name in names if name.strip().lower() not in found]
+        if unknown:
+            logger.error("Hills not found", extra={"hills": unknown})
+            raise ValueError(f"Hills not found: {', '.join(unknown)}")
+        for name in names:
+            matches = found[name.strip().lower()]
+            if len(matches) > 1:
+                raise ValueError(
+                    f"Several hills are called {name}, give one of the ids: "
+                    f"{', '.join(map(str, matches))}"
+                )
+            hill_ids.update(matches)
+        return hill_ids
+
+    @staticmethod
+    def import_postcodes(path: str) -> int:
+        """
+        Import a postcode directory CSV into the local postcode lookup used
+        by add_user before the online geocoder. Returns the number of
+        postcodes imported.
+        """
+        LocationData.create_postcodes_table()
+        imported = LocationData.save_postcodes(read_postcode_directory(path))
+        logger.info("Imported postcodes", extra={"path": path, "imported": imported})
+        return imported
+
     @staticmethod
     def add_user(name: str, postcode: str) -> None:
         try:
@@ -37,6 +155,87 @@ class UsersAPI:
 
         UserData.save_user_data(name, location)
 
+    @staticmethod
+    def import_users(
+        path: str, max_workers: int | None = None
+    ) -> list[UserImportResult]:
+        """
+        Add every user in a CSV or JSONL file of names and postcodes. Each
+        distinct postcode is geocoded once, on a pool of max_workers threads
+        (USER_IMPORT_MAX_WORKERS by default); lookups go through the local
+        postcode table and geocode cache, and the online geocoder keeps its
+        own rate limit. Users with a valid location are inserted in a single
+        transaction. Returns the result of every row.
+        """
+        results = UsersService.read_user_import(path)
+        existing_names = UserData.get_user_names()
+        seen_names: set[str] = set()
+        to_geocode: list[UserImportResult] = []
+        for result in results:
+            if result.status != "pending":
+                continue
+            if result.name in existing_names:
+                result.status = "exists"
+            elif result.name in seen_names:
+                result.status = "invalid"
+                result.message = "Duplicate name in file."
+            else:
+                to_geocode.append(result)
+            seen_names.add(result.name)
+
+        postcodes: dict[str, str] = {}
+        for result in to_geocode:
+            postcodes.setdefault(normalise_postcode(result.postcode), result.postcode)
+        locations: dict[str, LatLon] = {}
+        errors: dict[str, str] = {}
+        workers = max_workers or int(
+            os.getenv("USER_IMPORT_MAX_WORKERS", str(DEFAULT_USER_IMPORT_MAX_WORKERS))
+        )
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(get_lat_lon_from_postcode, postcode): key
+                for key, postcode in postcodes.items()
+            }
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    locations[key] = future.result()
+                except (ValueError, ConnectionError) as e:
+                    errors[key] = str(e)
+
+        to_insert: list[UserImportResult] = []
+        for result in to_geocode:
+            key = normalise_postcode(result.postcode)
+            location = locations.get(key)
+            if location is None:
+                result.status = "failed"
+                result.message = errors.get(key, "Postcode could not be geocoded.")
+            elif not UsersService.check_location(location):
+                result.status = "invalid"
+                result.message = f"Invalid location {location.lat},{location.lon}."
+            else:
+                result.location = location
+                to_insert.append(result)
+        inserted = UserData.save_users_batch(
+            [(result.name, result.location) for result in to_insert]
+        )
+        for result in to_insert:
+            if result.name in inserted:
+                result.status = "added"
+            else:
+                result.status = "failed"
+                result.message = "User could not be saved."
+        logger.info(
+            "Imported users",
+            extra={
+                "path": path,
+                "rows": len(results),
+                "postcodes": len(postcodes),
+                "added": len(inserted),
+            },
+        )
+        return results
+
     @staticmethod
     def get_user_location(name: str) -> LatLon:
         _, location = UserData.fetch_user_location(name) or (None, None)
@@ -46,69 +245,481 @@ class UsersAPI:
         return location
 
     @staticmethod
-    def get_walk_directions_for_user(user: str) -> None:
+    def get_walk_directions_for_user(
+        user: str,
+        top_n: int | None = None,
+        filters: WalkFilters | None = None,
+        retry_failed: bool = False,
+    ) -> None:
         """
         For the user get and store the time and distance between the users
         location and each of the walk starting points.
+
+        When top_n is given only the walks that could be among the user's
+        top_n shortest total times are fetched, see _fetch_top_walk_directions.
+        With retry_failed only the walks whose directions failed on an
+        earlier run are fetched. A built travel matrix is refreshed with the
+        new directions afterwards.
         """
         user_id, user_location = UserData.fetch_user_location(user) or (None, None)
         if user_location is None or user_id is None:
             logger.error("User location not found", extra={"user": user})
             raise ValueError("User not found")
-        user_location_string = UsersAPI._parse_lat_lon_to_string(user_location)
+        try:
+            if retry_failed:
+                UsersAPI._fetch_and_save_directions(
+                    user,
+                    user_id,
+                    user_location,
+                    UsersAPI._get_missing_walk_destinations(
+                        user, user_id, only_failed=True
+                    ),
+                )
+                return
+            if top_n is not None:
+                UsersAPI._fetch_top_walk_directions(
+                    user, user_id, user_location, top_n, filters
+                )
+                return
+            UsersAPI._fetch_and_save_directions(
+                user,
+                user_id,
+                user_location,
+                UsersAPI._get_missing_walk_destinations(user, user_id),
+            )
+        except MapsBudgetExceededError as e:
+            logger.warning(
+                "Walk directions paused at the maps budget, run again to resume",
+                extra={
+                    "user": user,
+                    "error": str(e),
+                    "maps_usage": MapsApi.get_usage_stats(),
+                },
+            )
+        except MapsUnavailableError as e:
+            logger.warning(
+                "Walk directions paused while the maps provider is unavailable, "
+                "run again to resume",
+                extra={"user": user, "error": str(e)},
+            )
+        finally:
+            if TravelMatrix.exists():
+                TravelMatrix.refresh()
+
+    @staticmethod
+    def refresh_travel_matrix(rebuild: bool = False) -> TravelMatrix:
+        """
+        Build or incrementally update the users x walks travel matrix. Once
+        built it is kept up to date whenever walk directions are fetched.
+        """
+        return TravelMatrix.refresh(rebuild=rebuild)
+
+    @staticmethod
+    def plan_walk_directions_for_user(
+        user: str,
+        top_n: int | None = None,
+        filters: WalkFilters | None = None,
+        retry_failed: bool = False,
+    ) -> WalkDirectionsPlan:
+        """
+        Report how many walks are missing directions for the user, or only
+        failed on an earlier run with retry_failed, and how many uncached
+        route lookups and maps requests fetching them would take, without
+        fetching anything.
+
+        When top_n is given the plan applies the same prefilter as
+        get_walk_directions_for_user, with estimated totals standing in for
+        the directions it has not fetched yet, see _plan_top_walk_destinations.
+        """
+        user_id, user_location = UserData.fetch_user_location(user) or (None, None)
+        if user_location is None or user_id is None:
+            logger.error("User location not found", extra={"user": user})
+            raise ValueError("User not found")
+        if top_n is not None and not retry_failed:
+            destinations = UsersAPI._plan_top_walk_destinations(
+                user_id, user_location, top_n, filters
+            )
+        else:
+            destinations = UsersAPI._get_missing_walk_destinations(
+                user, user_id, only_failed=retry_failed
+            )
+        route_destinations, _ = UsersAPI._group_by_trailhead(destinations)
+        return WalkDirectionsPlan(
+            user=user,
+            missing_walks=len(destinations),
+            lookup_plan=MapsApi.plan_driving_distances_from(
+                UsersAPI._parse_lat_lon_to_string(user_location), route_destinations
+            ),
+        )
+
+    @staticmethod
+    def _plan_top_walk_destinations(
+        user_id: int,
+        user_location: LatLon,
+        top_n: int,
+        filters: WalkFilters | None = None,
+    ) -> dict[int, str]:
+        """
+        Start locations, keyed by walk id, of the walks without directions
+        that _fetch_top_walk_directions would likely fetch. The estimated
+        totals of the candidates join the totals already known, so the top_n
+        threshold is the one the fetch would reach if the estimates held.
+        """
+        candidates, estimated, lower_bound = UsersAPI._estimate_missing_walks(
+            user_id, user_location, filters
+        )
+        known_totals = [
+            walk.total_time_seconds
+            for walk in UsersService.get_optimal_user_walks(
+                user_id, top_n, True, filters
+            )
+        ]
+        selected = UsersService.select_walks_to_fetch(
+            estimated,
+            lower_bound,
+            [*known_totals, *estimated],
+            top_n,
+            len(candidates),
+        )
+        return {
+            candidates[index].walk_id: WalkhighlandsAPI.parse_start_location(
+                candidates[index].walk_start_location
+            )
+            for index in selected
+        }
+
+    @staticmethod
+    def _estimate_missing_walks(
+        user_id: int, user_location: LatLon, filters: WalkFilters | None = None
+    ) -> tuple[list[WalkCandidateRecord], NDArray[np.float64], NDArray[np.float64]]:
+        """
+        The walks passing the filters that the user has no directions for,
+        with their estimated and lower bound total times, see
+        UsersService.estimate_walk_total_times.
+        """
+        missing_walk_ids = UserData.get_walk_ids_missing_directions(user_id)
+        candidates = [
+            walk
+            for walk in UserData.get_walk_candidates(filters)
+            if walk.walk_id in missing_walk_ids
+        ]
+        estimator = UsersService.fit_travel_estimator()
+        estimated, lower_bound = UsersService.estimate_walk_total_times(
+            estimator, user_location, candidates
+        )
+        return candidates, estimated, lower_bound
+
+    @staticmethod
+    def _get_missing_walk_destinations(
+        user: str, user_id: int, only_failed: bool = False
+    ) -> dict[int, str]:
+        """
+        Start locations, keyed by walk id, of walks the user has no
+        directions for, or only those that failed on an earlier run.
+        """
         walk_starting_locations = WalkhighlandsAPI.get_walk_start_locations()
+        missing_walk_ids = (
+            UserData.get_failed_walk_ids(user_id)
+            if only_failed
+            else UserData.get_walk_ids_missing_directions(user_id)
+        )
+        walks_to_fetch = [
+            walk for walk in walk_starting_locations if walk.walk_id in missing_walk_ids
+        ]
         logger.debug(
             "Fetched walk starting locations",
             extra={
                 "starting_locations_count": len(walk_starting_locations),
+                "missing_directions_count": len(walks_to_fetch),
                 "user": user,
             },
         )
-        for walk in walk_starting_locations:
-            if UsersAPI._directions_already_saved(user_id, walk.walk_id):
-                logger.debug(
-                    "Directions already saved for user and walk",
-                    extra={"user": user, "walk_id": walk.walk_id},
-                )
-                continue
-            try:
-                map_response = MapsApi.get_driving_distance_and_time(
-                    origin=user_location_string, destination=walk.walk_start_location
-                )
-                UsersService.save_walk_directions_for_user(
-                    user_id, walk.walk_id, map_response
+        return {walk.walk_id: walk.walk_start_location for walk in walks_to_fetch}
+
+    @staticmethod
+    def _fetch_top_walk_directions(
+        user: str,
+        user_id: int,
+        user_location: LatLon,
+        top_n: int,
+        filters: WalkFilters | None = None,
+    ) -> None:
+        """
+        Fetch directions only for walks that could make the user's top_n by
+        total time. Totals for walks without directions are estimated offline
+        from the great-circle distance, calibrated on the routes already
+        stored. Real directions are requested for the best estimates a batch
+        at a time until no remaining walk's lower bound could beat the top_n
+        totals already known.
+        """
+        candidates, estimated, lower_bound = UsersAPI._estimate_missing_walks(
+            user_id, user_location, filters
+        )
+        batch_size = max(top_n, DIRECTIONS_PREFILTER_BATCH_SIZE)
+        remaining = np.ones(len(candidates), dtype=bool)
+        requested = 0
+        while remaining.any():
+            known_totals = [
+                walk.total_time_seconds
+                for walk in UsersService.get_optimal_user_walks(
+                    user_id, top_n, True, filters
                 )
-            except Exception as e:
-                logger.error(
-                    "Error fetching and saving directions for user",
-                    extra={"user": user, "walk_id": walk.walk_id, "error": str(e)},
+            ]
+            remaining_indices = np.flatnonzero(remaining)
+            selected = remaining_indices[
+                UsersService.select_walks_to_fetch(
+                    estimated[remaining_indices],
+                    lower_bound[remaining_indices],
+                    known_totals,
+                    top_n,
+                    batch_size,
                 )
+            ]
+            if selected.size == 0:
+                break
+            remaining[selected] = False
+            requested += selected.size
+            UsersAPI._fetch_and_save_directions(
+                user,
+                user_id,
+                user_location,
+                {
+                    candidates[index].walk_id: WalkhighlandsAPI.parse_start_location(
+                        candidates[index].walk_start_location
+                    )
+                    for index in selected
+                },
+            )
+        logger.info(
+            "Prefiltered walk directions by estimated travel time",
+            extra={
+                "user": user,
+                "top_n": top_n,
+                "candidates": len(candidates),
+                "requested": requested,
+                "skipped": len(candidates) - requested,
+            },
+        )
 
     @staticmethod
-    def _parse_lat_lon_to_string(location: LatLon) -> str:
-        return f"{location.lat},{location.lon}"
+    def _fetch_and_save_directions(
+        user: str,
+        user_id: int,
+        user_location: LatLon,
+        destinations: dict[int, str],
+    ) -> set[int]:
+        """
+        Fetch directions from the user's location to each destination, keyed
+        by walk id, saving them in batches as they arrive. Walks sharing a
+        trailhead share one route lookup to the trailhead, which is then
+        saved for each of the walks. Walks left without directions are
+        recorded as failures to retry later, unless the run was stopped by
+        the maps budget or an unavailable provider. Returns the ids of the
+        walks that were saved.
+        """
+        saved_walk_ids: set[int] = set()
+        if not destinations:
+            return saved_walk_ids
+        user_location_string = UsersAPI._parse_lat_lon_to_string(user_location)
+        route_destinations, walks_by_route = UsersAPI._group_by_trailhead(destinations)
+        pending: dict[int, MapsResponseDTO] = {}
+        try:
+            for batch in MapsApi.iter_driving_distances_from(
+                origin=user_location_string, destinations=route_destinations
+            ):
+                for route_key, map_response in batch.items():
+                    for walk_id in walks_by_route[route_key]:
+                        pending[walk_id] = map_response
+                if len(pending) >= DIRECTIONS_WRITE_BATCH_SIZE:
+                    UsersService.save_walk_directions_batch_for_user(user_id, pending)
+                    saved_walk_ids.update(pending)
+                    pending = {}
+        except MAPS_CLIENT_ERRORS as e:
+            logger.error(
+                "Error fetching directions for user",
+                extra={"user": user, "error": str(e)},
+            )
+        finally:
+            if pending:
+                UsersService.save_walk_directions_batch_for_user(user_id, pending)
+                saved_walk_ids.update(pending)
+        logger.info(
+            "Saved walk directions for user",
+            extra={
+                "user": user,
+                "saved": len(saved_walk_ids),
+                "route_lookups": len(route_destinations),
+                "dedup_ratio": round(len(destinations) / len(route_destinations), 2),
+                "route_cache": RouteCache.stats(),
+                "maps_usage": MapsApi.get_usage_stats(),
+            },
+        )
+        UserData.clear_walk_direction_failures(user_id, saved_walk_ids)
+        failed_walk_ids = set(destinations) - saved_walk_ids
+        if failed_walk_ids:
+            logger.warning(
+                "Directions could not be fetched for some walks",
+                extra={"user": user, "walk_ids": sorted(failed_walk_ids)},
+            )
+            UserData.record_walk_direction_failures(user_id, failed_walk_ids)
+        return saved_walk_ids
+
+    @staticmethod
+    def _group_by_trailhead(
+        destinations: dict[int, str],
+    ) -> tuple[dict[tuple[str, int], str], dict[tuple[str, int], list[int]]]:
+        """
+        Group walk destinations, keyed by walk id, into route lookups: one
+        per shared trailhead, and one per walk without a trailhead. Returns
+        the lookup destinations and the walk ids each lookup covers.
+        """
+        trailheads = WalkhighlandsAPI.get_walk_trailheads()
+        route_destinations: dict[tuple[str, int], str] = {}
+        walks_by_route: dict[tuple[str, int], list[int]] = {}
+        for walk_id, walk_start_location in destinations.items():
+            trailhead = trailheads.get(walk_id)
+            if trailhead is not None:
+                route_key = ("trailhead", trailhead.trailhead_id)
+                route_destinations[route_key] = trailhead.trailhead_location
+            else:
+                route_key = ("walk", walk_id)
+                route_destinations[route_key] = walk_start_location
+            walks_by_route.setdefault(route_key, []).append(walk_id)
+        return route_destinations, walks_by_route
 
     @staticmethod
-    def _directions_already_saved(user_id: int, walk_id: int) -> bool:
-        return UserData.check_walk_directions_exist(user_id, walk_id)
+    def _parse_lat_lon_to_string(location: LatLon) -> str:
+        return f"{location.lat},{location.lon}"
 
     @staticmethod
     def get_optimal_user_routes(
-        user: str, number_of_routes: int, ascending: bool = True
+        user: str,
+        number_of_routes: int,
+        ascending: bool = True,
+        filters: WalkFilters | None = None,
+        score: ScoreFunction | None = None,
     ) -> None:
         """
         Get the total time for each walk and travel.
-        Order the walks by total time.
+        Order the walks by total time, or by the score function when given,
+        and display the best that pass the filters.
         """
         user_id = UserData.get_user_id_for_name(user)
         if user_id is None:
             logger.error("User not found", extra={"user": user})
             raise ValueError("User not found")
-        walk_travel_infos = UsersService.calculate_user_total_times(user_id)
-        walk_travel_infos = [
-            walk for walk in walk_travel_infos if walk.walk_info.number_of_hills >= 1
-        ]
-        walk_travel_infos.sort(
-            key=lambda x: x.total_time_seconds or float("inf"), reverse=not ascending
+        walk_travel_infos = UsersService.get_optimal_user_walks(
+            user_id, number_of_routes, ascending, filters, score
+        )
+        UsersService.display_user_walk_travel_info(walk_travel_infos)
+
+    @staticmethod
+    def get_pareto_user_routes(
+        user: str,
+        objectives: list[str],
+        filters: WalkFilters | None = None,
+    ) -> None:
+        """
+        Display the user's walks that pass the filters and are not beaten
+        on every objective by another walk, the trade-offs a single sort
+        would hide.
+        """
+        user_id = UserData.get_user_id_for_name(user)
+        if user_id is None:
+            logger.error("User not found", extra={"user": user})
+            raise ValueError("User not found")
+        walk_travel_infos = UsersService.get_pareto_user_walks(
+            user_id, objectives, filters
+        )
+        UsersService.display_user_walk_travel_info(walk_travel_infos)
+
+    @staticmethod
+    def plan_completion(
+        user: str, filters: WalkFilters | None = None, exact: bool = False
+    ) -> CompletionPlan:
+        """
+        Plan and display the walks that bag every hill the user has not
+        bagged in the least summed total time, from the walks they have
+        directions for.
+        """
+        user_id = UsersAPI._get_user_id(user)
+        plan = CompletionPlanner.plan_for_user(user_id, filters, exact)
+        UsersService.display_completion_plan(plan)
+        return plan
+
+    @staticmethod
+    def plan_season(
+        user: str, dates: list[date], filters: WalkFilters | None = None
+    ) -> SeasonPlan:
+        """
+        Schedule and display a walk for each available date that bags the
+        most of the user's unbagged hills, each fitting the daylight on its
+        date, from the walks they have directions for.
+        """
+        user_id = UsersAPI._get_user_id(user)
+        plan = SeasonScheduler.plan_for_user(user_id, dates, filters)
+        UsersService.display_season_plan(plan)
+        return plan
+
+    @staticmethod
+    def plan_trip(
+        user: str,
+        days: int,
+        daily_hours: float,
+        base: str | None = None,
+        filters: WalkFilters | None = None,
+    ) -> TripPlan:
+        """
+        Plan and display a trip of several days from a base, given as a
+        postcode or "lat,lon", or the user's home when not given, bagging
+        as many of the user's unbagged hills as the daily time allows.
+        """
+        user_id = UsersAPI._get_user_id(user)
+        location = (
+            UsersAPI._parse_base(base)
+            if base is not None
+            else UsersAPI.get_user_location(user)
+        )
+        if not UsersService.check_location(location):
+            logger.error("Invalid trip base", extra={"base": base})
+            raise ValueError("Invalid trip base")
+        plan = TripPlanner.plan_for_user(
+            user_id, location, days, hours_to_seconds(daily_hours), filters
+        )
+        UsersService.display_trip_plan(plan)
+        return plan
+
+    @staticmethod
+    def _parse_base(base: str) -> LatLon:
+        """A trip base given as "lat,lon", or otherwise as a postcode."""
+        try:
+            lat, lon = map(float, base.split(","))
+        except ValueError:
+            return get_lat_lon_from_postcode(base)
+        return LatLon(lat=lat, lon=lon)
+
+    @staticmethod
+    def get_optimal_group_routes(
+        users: list[str],
+        number_of_routes: int,
+        ascending: bool = True,
+        filters: WalkFilters | None = None,
+        aggregate: str = "max",
+        max_weight: float = DEFAULT_GROUP_MAX_WEIGHT,
+    ) -> None:
+        """
+        Rank the walks for a group of users by an aggregate of each member's
+        round-trip travel plus walk time and display the best that pass the
+        filters. Only walks every member has directions for are ranked.
+        """
+        members: dict[str, int] = {}
+        for user in users:
+            user_id = UserData.get_user_id_for_name(user)
+            if user_id is None:
+                logger.error("User not found", extra={"user": user})
+                raise ValueError("User not found")
+            members[user] = user_id
+        group_walks = UsersService.get_optimal_group_walks(
+            members, number_of_routes, ascending, filters, aggregate, max_weight
         )
-        UsersService.display_user_walk_travel_info(walk_travel_infos[:number_of_routes])
+        UsersService.display_group_walks(group_walks)
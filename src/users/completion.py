@@ -0,0 +1,377 @@
+import logging
+import time
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.users.data import UserData
+from src.users.dtos import CompletionPlan, WalkFilters
+from src.users.hill_bitsets import WalkHillBitsets
+from src.users.ranking import RankingEngine
+
+logger = logging.getLogger(__name__)
+
+# Search nodes the exact solver may visit before it settles for the best
+# plan found so far.
+EXACT_NODE_LIMIT = 200_000
+# Savings smaller than this are rounding, not an improvement.
+COST_TOLERANCE = 1e-6
+
+
+class CompletionPlanner:
+    """
+    Chooses walks covering every hill a user has not bagged with the least
+    summed total time, a weighted set cover over the walk hill bitsets.
+    Walks are indexed by row of bits and costs; target is the bitset of the
+    hills to cover.
+    """
+
+    @staticmethod
+    def plan_for_user(
+        user_id: int, filters: WalkFilters | None = None, exact: bool = False
+    ) -> CompletionPlan:
+        """
+        Plan the walks, among those the user has directions for and that
+        pass the filters, that bag every remaining hill in the least total
+        time. Hills no such walk reaches are reported as uncovered. With
+        exact set, the heuristic plan is then improved by branch and bound
+        until proved optimal or EXACT_NODE_LIMIT is reached.
+        """
+        started = time.perf_counter()
+        filters = (filters or WalkFilters()).model_copy(update={"min_new_hills": 0})
+        columns = RankingEngine.load_columns(user_id, filters)
+        bitsets = WalkHillBitsets.load()
+        hill_names = UserData.get_hill_names()
+        bagged = UserData.get_bagged_hill_ids(user_id)
+        remaining = sorted(set(hill_names) - bagged)
+
+        bits = bitsets.walk_bits(columns.walk_ids) & bitsets.hill_mask(remaining)
+        target = np.bitwise_or.reduce(bits, axis=0)
+        coverable = set(
+            bitsets.hill_ids[CompletionPlanner._bit_positions(target)].tolist()
+        )
+        costs = columns.total_seconds
+
+        chosen = CompletionPlanner.greedy(bits, costs, target)
+        chosen = CompletionPlanner.improve(bits, costs, chosen, target)
+        proved_optimal = False
+        if exact:
+            chosen, proved_optimal = CompletionPlanner.branch_and_bound(
+                bits, costs, target, chosen
+            )
+
+        chosen = sorted(chosen, key=lambda row: costs[row])
+        walk_ids = [int(columns.walk_ids[row]) for row in chosen]
+        records = UserData.get_user_walks_travel_info_for_walks(user_id, walk_ids)
+        walks = []
+        for row, walk_id in zip(chosen, walk_ids):
+            record = records[walk_id]
+            record.total_time_seconds = int(costs[row])
+            walks.append(record)
+        plan = CompletionPlan(
+            walks=walks,
+            total_seconds=int(costs[chosen].sum()) if chosen else 0,
+            remaining_hills=len(remaining),
+            uncovered_hills=[
+                hill_names[hill_id] for hill_id in remaining if hill_id not in coverable
+            ],
+            proved_optimal=proved_optimal,
+        )
+        logger.info(
+            "Planned round completion",
+            extra={
+                "user_id": user_id,
+                "candidate_walks": len(columns),
+                "remaining_hills": plan.remaining_hills,
+                "uncovered_hills": len(plan.uncovered_hills),
+                "walks": len(plan.walks),
+                "total_seconds": plan.total_seconds,
+                "proved_optimal": proved_optimal,
+                "elapsed_seconds": round(time.perf_counter() - started, 3),
+            },
+        )
+        return plan
+
+    @staticmethod
+    def greedy(
+        bits: NDArray[np.uint64], costs: NDArray[np.float64], target: NDArray[np.uint64]
+    ) -> list[int]:
+        """
+        Greedy weighted set cover: keep taking the walk with the lowest cost
+        per hill still uncovered until every target hill is covered or no
+        walk adds one.
+        """
+        uncovered = target.copy()
+        chosen: list[int] = []
+        while uncovered.any():
+            gains = WalkHillBitsets.popcount(bits & uncovered)
+            with np.errstate(divide="ignore"):
+                ratios = np.where(gains > 0, costs / gains, np.inf)
+            best = int(np.argmin(ratios))
+            if not np.isfinite(ratios[best]):
+                break
+            chosen.append(best)
+            uncovered &= ~bits[best]
+        return chosen
+
+    @staticmethod
+    def improve(
+        bits: NDArray[np.uint64],
+        costs: NDArray[np.float64],
+        chosen: list[int],
+        target: NDArray[np.uint64],
+    ) -> list[int]:
+        """
+        Local search on a cover: drop walks the others already cover, then
+        replace one walk, or two, with a single cheaper walk covering the
+        hills only they cover, taking the biggest saving each round until
+        none is left.
+        """
+        chosen = CompletionPlanner.remove_redundant(bits, costs, chosen, target)
+        while True:
+            move = CompletionPlanner._best_replacement(bits, costs, chosen, target)
+            if move is None:
+                return chosen
+            removed, added = move
+            logger.debug(
+                "Improved completion plan",
+                extra={"removed": removed, "added": added},
+            )
+            chosen = [row for row in chosen if row not in removed] + [added]
+            chosen = CompletionPlanner.remove_redundant(bits, costs, chosen, target)
+
+    @staticmethod
+    def remove_redundant(
+        bits: NDArray[np.uint64],
+        costs: NDArray[np.float64],
+        chosen: list[int],
+        target: NDArray[np.uint64],
+    ) -> list[int]:
+        """Drop walks, dearest first, whose target hills the rest all cover."""
+        kept = sorted(chosen, key=lambda row: -costs[row])
+        for row in list(kept):
+            others = [other for other in kept if other != row]
+            covered = (
+                np.bitwise_or.reduce(bits[others], axis=0)
+                if others
+                else np.zeros_like(target)
+            )
+            if not (bits[row] & target & ~covered).any():
+                kept = others
+        return kept
+
+    @staticmethod
+    def branch_and_bound(
+        bits: NDArray[np.uint64],
+        costs: NDArray[np.float64],
+        target: NDArray[np.uint64],
+        incumbent: list[int],
+        node_limit: int = EXACT_NODE_LIMIT,
+    ) -> tuple[list[int], bool]:
+        """
+        Exact weighted set cover by depth-first branch and bound, starting
+        from the incumbent cover. Hills no walk links are independent, so
+        each group of hills linked through shared walks is searched on its
+        own, sharing the node limit. Returns the best cover and whether
+        every search finished, proving it optimal.
+        """
+        masks = [CompletionPlanner._to_int(row & target) for row in bits]
+        best: list[int] = []
+        proved = True
+        nodes_left = node_limit
+        for component in CompletionPlanner._components(masks):
+            rows = [row for row, mask in enumerate(masks) if mask & component]
+            component_best, finished, nodes = CompletionPlanner._search(
+                masks,
+                costs,
+                component,
+                rows,
+                [row for row in incumbent if row in rows],
+                nodes_left,
+            )
+            best.extend(component_best)
+            proved = proved and finished
+            nodes_left = max(nodes_left - nodes, 0)
+        if not proved:
+            logger.info(
+                "Exact completion search stopped at its node limit",
+                extra={"node_limit": node_limit},
+            )
+        return best, proved
+
+    @staticmethod
+    def _components(masks: list[int]) -> list[int]:
+        """Groups of hills linked through walks covering more than one."""
+        components: list[int] = []
+        for mask in masks:
+            if not mask:
+                continue
+            merged = mask
+            for component in [c for c in components if c & mask]:
+                components.remove(component)
+                merged |= component
+            components.append(merged)
+        return components
+
+    @staticmethod
+    def _search(
+        masks: list[int],
+        costs: NDArray[np.float64],
+        target: int,
+        rows: list[int],
+        incumbent: list[int],
+        node_limit: int,
+    ) -> tuple[list[int], bool, int]:
+        """
+        Depth-first branch and bound over the walks in rows covering the
+        target hills. Each node branches on the uncovered hill with the
+        fewest walks covering it, cheapest walk first, and is pruned when
+        its cost plus the dearest cheapest walk of any uncovered hill cannot
+        beat the best cover so far. Returns the best cover, whether the
+        search finished and the nodes visited.
+        """
+        walks_covering: dict[int, list[int]] = {}
+        for position in CompletionPlanner._int_positions(target):
+            covering = [row for row in rows if masks[row] >> position & 1]
+            walks_covering[position] = sorted(covering, key=lambda row: costs[row])
+        cheapest = {
+            position: float(costs[covering[0]])
+            for position, covering in walks_covering.items()
+        }
+
+        best = list(incumbent)
+        best_cost = float(costs[best].sum()) if best else np.inf
+        nodes = 0
+        stack: list[tuple[int, float, list[int]]] = [(target, 0.0, [])]
+        while stack:
+            if nodes >= node_limit:
+                return best, False, nodes
+            uncovered, cost, path = stack.pop()
+            nodes += 1
+            if uncovered == 0:
+                if cost < best_cost - COST_TOLERANCE:
+                    best, best_cost = path, cost
+                continue
+            positions = CompletionPlanner._int_positions(uncovered)
+            bound = max(cheapest[position] for position in positions)
+            if cost + bound >= best_cost - COST_TOLERANCE:
+                continue
+            branch = min(positions, key=lambda position: len(walks_covering[position]))
+            # Pushed dearest first so the cheapest walk is explored first.
+            for row in reversed(walks_covering[branch]):
+                stack.append((uncovered & ~masks[row], cost + costs[row], path + [row]))
+        return best, True, nodes
+
+    @staticmethod
+    def _best_replacement(
+        bits: NDArray[np.uint64],
+        costs: NDArray[np.float64],
+        chosen: list[int],
+        target: NDArray[np.uint64],
+    ) -> tuple[list[int], int] | None:
+        """
+        The move saving the most time: one or two chosen walks and the
+        cheaper unchosen walk covering every hill only they cover.
+        """
+        if not chosen:
+            return None
+        chosen_costs = costs[chosen]
+        covered_by = np.unpackbits(
+            (bits[chosen] & target).view(np.uint8), axis=1, bitorder="little"
+        ).astype(bool)
+        counts = covered_by.sum(axis=0)
+        unchosen = np.ones(len(costs), dtype=bool)
+        unchosen[chosen] = False
+        # Hills only chosen walk i covers, and for every walk whether it
+        # covers them: a pair's hills are both walks' own hills, plus any
+        # covered by just the two of them, which are checked separately.
+        unique = CompletionPlanner._pack(covered_by & (counts == 1))
+        covers_unique = (
+            np.all((bits[:, np.newaxis, :] & unique) == unique, axis=2)
+            & unchosen[:, np.newaxis]
+        )
+        candidate_costs = np.where(covers_unique, costs[:, np.newaxis], np.inf)
+
+        best_move: tuple[list[int], int] | None = None
+        best_saving = COST_TOLERANCE
+        singles = candidate_costs.argmin(axis=0)
+        savings = chosen_costs - candidate_costs[singles, np.arange(len(chosen))]
+        if savings.max() > best_saving:
+            i = int(savings.argmax())
+            best_saving = float(savings[i])
+            best_move = ([chosen[i]], int(singles[i]))
+
+        shared_pairs: set[tuple[int, int]] = set()
+        for position in np.flatnonzero(counts == 2):
+            i, j = np.flatnonzero(covered_by[:, position])
+            shared_pairs.add((int(i), int(j)))
+        for i in range(len(chosen) - 1):
+            pair_costs = np.where(
+                covers_unique[:, [i]] & covers_unique[:, i + 1 :],
+                costs[:, np.newaxis],
+                np.inf,
+            )
+            rows = pair_costs.argmin(axis=0)
+            savings = (
+                chosen_costs[i]
+                + chosen_costs[i + 1 :]
+                - pair_costs[rows, np.arange(rows.size)]
+            )
+            for offset in np.flatnonzero(savings > best_saving):
+                j = i + 1 + int(offset)
+                row = int(rows[offset])
+                if (i, j) in shared_pairs:
+                    row = CompletionPlanner._cheapest_cover(
+                        bits,
+                        costs,
+                        unchosen,
+                        CompletionPlanner._pack(
+                            (covered_by[i] | covered_by[j])
+                            & (counts == covered_by[i].astype(int) + covered_by[j])
+                        ),
+                    )
+                    if row < 0:
+                        continue
+                saving = float(chosen_costs[i] + chosen_costs[j] - costs[row])
+                if saving > best_saving:
+                    best_saving = saving
+                    best_move = ([chosen[i], chosen[j]], row)
+        return best_move
+
+    @staticmethod
+    def _cheapest_cover(
+        bits: NDArray[np.uint64],
+        costs: NDArray[np.float64],
+        allowed: NDArray[np.bool_],
+        needed: NDArray[np.uint64],
+    ) -> int:
+        """Row of the cheapest allowed walk covering needed, or -1 if none."""
+        covers = np.all((bits & needed) == needed, axis=1) & allowed
+        if not covers.any():
+            return -1
+        return int(np.where(covers, costs, np.inf).argmin())
+
+    @staticmethod
+    def _pack(hills: NDArray[np.bool_]) -> NDArray[np.uint64]:
+        """Boolean hill positions, in the last axis, packed back into bitsets."""
+        return np.packbits(hills, axis=-1, bitorder="little").view(np.uint64)
+
+    @staticmethod
+    def _bit_positions(bitset: NDArray[np.uint64]) -> NDArray[np.intp]:
+        """Positions of the set bits of one bitset."""
+        return np.flatnonzero(np.unpackbits(bitset.view(np.uint8), bitorder="little"))
+
+    @staticmethod
+    def _to_int(bitset: NDArray[np.uint64]) -> int:
+        """One bitset as a Python int, bit k of the int being hill position k."""
+        return int.from_bytes(bitset.astype("<u8").tobytes(), "little")
+
+    @staticmethod
+    def _int_positions(bitset: int) -> list[int]:
+        """Positions of the set bits of a Python int bitset."""
+        positions = []
+        while bitset:
+            low = bitset & -bitset
+            positions.append(low.bit_length() - 1)
+            bitset ^= low
+        return positions
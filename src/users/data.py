@@ -1,13 +1,34 @@
+import json
+from collections.abc import Iterator, Mapping
 from src.database.api import DatabaseAPI
 import sqlite3
 import logging
 from src.maps.dtos import MapsResponseDTO
-from src.users.dtos import LatLon, TravelInfo, UserWalkTravelInfo, WalkInfo
+from src.users.dtos import (
+    LatLon,
+    TravelSampleRecord,
+    TripWalkRecord,
+    UserWalkTravelRecord,
+    WalkCandidateRecord,
+    WalkFilters,
+)
 from src.utils.distance import kilometers_to_meters
 from src.utils.time import hours_to_seconds
 
 logger = logging.getLogger(__name__)
 
+FETCH_CHUNK_SIZE = 500
+
+# Region of a walk taken from its hills, for walks aliased as w.
+WALK_REGION_SQL = """
+    (
+        SELECT MIN(h.region)
+        FROM walk_hill_decomposition whd
+        JOIN hills h ON h.id = whd.hill_id
+        WHERE whd.walk_id = w.id
+    )
+"""
+
 
 class UserData:
     @staticmethod
@@ -51,6 +72,54 @@ class UserData:
             )
             conn.commit()
 
+    @staticmethod
+    def create_user_walk_direction_failures_table() -> None:
+        """
+        Create the user_walk_direction_failures table in the database if it
+        doesn't exist. It holds the walks whose directions could not be
+        fetched for a user, so they can be retried on their own.
+        """
+        db_api = DatabaseAPI()
+        with db_api.db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS user_walk_direction_failures (
+                    user_id INTEGER NOT NULL,
+                    walk_id INTEGER NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 1,
+                    last_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (user_id, walk_id),
+                    FOREIGN KEY (user_id) REFERENCES users(id),
+                    FOREIGN KEY (walk_id) REFERENCES walks(id)
+                )
+                """
+            )
+            conn.commit()
+
+    @staticmethod
+    def create_user_hills_bagged_table() -> None:
+        """
+        Create the user_hills_bagged table in the database if it doesn't
+        exist. It holds the hills each user has already climbed.
+        """
+        db_api = DatabaseAPI()
+        with db_api.db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS user_hills_bagged (
+                    user_id INTEGER NOT NULL,
+                    hill_id INTEGER NOT NULL,
+                    bagged_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (user_id, hill_id),
+                    FOREIGN KEY (user_id) REFERENCES users(id),
+                    FOREIGN KEY (hill_id) REFERENCES hills(id)
+                ) WITHOUT ROWID
+                """
+            )
+            conn.commit()
+
     @staticmethod
     def save_user_data(name: str, location: LatLon) -> None:
         """Save user data to the database."""
@@ -70,6 +139,52 @@ class UserData:
         except sqlite3.DatabaseError:
             logger.exception(f"An error occurred while saving user data for {name}")
 
+    @staticmethod
+    def save_users_batch(users: list[tuple[str, LatLon]]) -> set[str]:
+        """
+        Save many users in one transaction, skipping names that already
+        exist. Returns the names that were inserted; none if the
+        transaction fails.
+        """
+        if not users:
+            return set()
+        db_api = DatabaseAPI()
+        inserted: set[str] = set()
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                for name, location in users:
+                    cursor.execute(
+                        """
+                        INSERT OR IGNORE INTO users (name, location)
+                        VALUES (?, ?)
+                        """,
+                        (name, UserData._get_lat_lon_string(location)),
+                    )
+                    if cursor.rowcount:
+                        inserted.add(name)
+                conn.commit()
+        except sqlite3.DatabaseError:
+            logger.exception(
+                "An error occurred while saving users batch",
+                extra={"count": len(users)},
+            )
+            return set()
+        return inserted
+
+    @staticmethod
+    def get_user_names() -> set[str]:
+        """Get the names of every saved user."""
+        db_api = DatabaseAPI()
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT name FROM users")
+                return {row[0] for row in cursor.fetchall()}
+        except sqlite3.Error:
+            logger.exception("An error occurred while fetching user names")
+            return set()
+
     @staticmethod
     def fetch_user_location(name: str) -> tuple[int, LatLon] | None:
         """Fetch the location of a user from the database."""
@@ -144,27 +259,441 @@ class UserData:
             )
 
     @staticmethod
-    def check_walk_directions_exist(user_id: int, walk_id: int) -> bool:
-        """Check if walk directions already exist for a user and walk."""
+    def save_walk_directions_batch(
+        user_id: int, map_responses: Mapping[int, MapsResponseDTO]
+    ) -> None:
+        """
+        Save walking directions for a user to many walks in one transaction,
+        keyed by walk id. Walks that already have directions are skipped.
+        """
+        if not map_responses:
+            return
+        db_api = DatabaseAPI()
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    """
+                    INSERT OR IGNORE INTO user_walk_directions
+                        (user_id, walk_id, distance, duration)
+                    VALUES (?, ?, ?, ?)
+                    """,
+                    [
+                        (
+                            user_id,
+                            walk_id,
+                            map_response.distance_meters,
+                            map_response.duration_seconds,
+                        )
+                        for walk_id, map_response in map_responses.items()
+                    ],
+                )
+                conn.commit()
+                logger.debug(
+                    "Walk directions batch saved",
+                    extra={"user_id": user_id, "count": len(map_responses)},
+                )
+        except sqlite3.DatabaseError:
+            logger.exception(
+                "An error occurred while saving walk directions batch",
+                extra={"user_id": user_id, "count": len(map_responses)},
+            )
+
+    @staticmethod
+    def get_walk_ids_missing_directions(user_id: int) -> set[int]:
+        """
+        Get the ids of walks with a start location that have no saved
+        directions for the user, using a single anti-join query.
+        """
         db_api = DatabaseAPI()
         try:
             with db_api.db_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
                     """
-                    SELECT 1 FROM user_walk_directions
+                    SELECT w.id FROM walks w
+                    WHERE w.start_location IS NOT NULL
+                    AND NOT EXISTS (
+                        SELECT 1 FROM user_walk_directions uwd
+                        WHERE uwd.user_id = ? AND uwd.walk_id = w.id
+                    )
+                    """,
+                    (user_id,),
+                )
+                return {row[0] for row in cursor.fetchall()}
+        except sqlite3.Error:
+            logger.exception(
+                "An error occurred while fetching walks missing directions",
+                extra={"user_id": user_id},
+            )
+            return set()
+
+    @staticmethod
+    def record_walk_direction_failures(user_id: int, walk_ids: set[int]) -> None:
+        """
+        Record that directions could not be fetched for the walks, counting
+        the attempt for walks that had already failed.
+        """
+        if not walk_ids:
+            return
+        db_api = DatabaseAPI()
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    """
+                    INSERT INTO user_walk_direction_failures (user_id, walk_id)
+                    VALUES (?, ?)
+                    ON CONFLICT (user_id, walk_id) DO UPDATE SET
+                        attempts = attempts + 1,
+                        last_attempt_at = CURRENT_TIMESTAMP
+                    """,
+                    [(user_id, walk_id) for walk_id in sorted(walk_ids)],
+                )
+                conn.commit()
+        except sqlite3.Error:
+            logger.exception(
+                "An error occurred while recording walk direction failures",
+                extra={"user_id": user_id, "count": len(walk_ids)},
+            )
+
+    @staticmethod
+    def clear_walk_direction_failures(user_id: int, walk_ids: set[int]) -> None:
+        """Forget earlier failures for walks whose directions are now saved."""
+        if not walk_ids:
+            return
+        db_api = DatabaseAPI()
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    """
+                    DELETE FROM user_walk_direction_failures
                     WHERE user_id = ? AND walk_id = ?
                     """,
-                    (user_id, walk_id),
+                    [(user_id, walk_id) for walk_id in walk_ids],
                 )
-                result = cursor.fetchone()
-                return result is not None
+                conn.commit()
         except sqlite3.Error:
             logger.exception(
-                "An error occurred while checking walk directions",
-                extra={"user_id": user_id, "walk_id": walk_id},
+                "An error occurred while clearing walk direction failures",
+                extra={"user_id": user_id, "count": len(walk_ids)},
+            )
+
+    @staticmethod
+    def get_failed_walk_ids(user_id: int) -> set[int]:
+        """
+        Get the ids of walks whose directions failed for the user and are
+        still missing.
+        """
+        db_api = DatabaseAPI()
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    SELECT f.walk_id FROM user_walk_direction_failures f
+                    WHERE f.user_id = ?
+                    AND NOT EXISTS (
+                        SELECT 1 FROM user_walk_directions uwd
+                        WHERE uwd.user_id = f.user_id AND uwd.walk_id = f.walk_id
+                    )
+                    """,
+                    (user_id,),
+                )
+                return {row[0] for row in cursor.fetchall()}
+        except sqlite3.Error:
+            logger.exception(
+                "An error occurred while fetching failed walk directions",
+                extra={"user_id": user_id},
+            )
+            return set()
+
+    @staticmethod
+    def bag_hills(user_id: int, hill_ids: set[int]) -> int:
+        """
+        Record the hills as bagged by the user. Returns the number newly
+        bagged; hills already bagged keep their original date.
+        """
+        if not hill_ids:
+            return 0
+        db_api = DatabaseAPI()
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                bagged = 0
+                for hill_id in sorted(hill_ids):
+                    cursor.execute(
+                        """
+                        INSERT OR IGNORE INTO user_hills_bagged (user_id, hill_id)
+                        VALUES (?, ?)
+                        """,
+                        (user_id, hill_id),
+                    )
+                    bagged += cursor.rowcount
+                conn.commit()
+                return bagged
+        except sqlite3.Error:
+            logger.exception(
+                "An error occurred while bagging hills",
+                extra={"user_id": user_id, "count": len(hill_ids)},
+            )
+            return 0
+
+    @staticmethod
+    def unbag_hills(user_id: int, hill_ids: set[int]) -> int:
+        """Forget that the user bagged the hills. Returns the number removed."""
+        if not hill_ids:
+            return 0
+        db_api = DatabaseAPI()
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    """
+                    DELETE FROM user_hills_bagged WHERE user_id = ? AND hill_id = ?
+                    """,
+                    [(user_id, hill_id) for hill_id in sorted(hill_ids)],
+                )
+                conn.commit()
+                return cursor.rowcount
+        except sqlite3.Error:
+            logger.exception(
+                "An error occurred while unbagging hills",
+                extra={"user_id": user_id, "count": len(hill_ids)},
+            )
+            return 0
+
+    @staticmethod
+    def get_bagged_hill_ids(user_id: int) -> set[int]:
+        """Get the ids of the hills the user has bagged."""
+        db_api = DatabaseAPI()
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT hill_id FROM user_hills_bagged WHERE user_id = ?",
+                    (user_id,),
+                )
+                return {row[0] for row in cursor.fetchall()}
+        except sqlite3.Error:
+            logger.exception(
+                "An error occurred while fetching bagged hills",
+                extra={"user_id": user_id},
             )
-            return False
+            return set()
+
+    @staticmethod
+    def get_hill_ids_by_name(names: list[str]) -> dict[str, list[int]]:
+        """
+        Look hills up by name, ignoring case. Returns the ids of the hills
+        with each name, keyed by the lower-cased name; names that match no
+        hill are left out.
+        """
+        if not names:
+            return {}
+        lowered = sorted({name.strip().lower() for name in names})
+        placeholders = ", ".join("?" for _ in lowered)
+        db_api = DatabaseAPI()
+        hill_ids: dict[str, list[int]] = {}
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"""
+                    SELECT id, lower(name) FROM hills
+                    WHERE lower(name) IN ({placeholders})
+                    ORDER BY id
+                    """,
+                    lowered,
+                )
+                for hill_id, name in cursor.fetchall():
+                    hill_ids.setdefault(name, []).append(hill_id)
+        except sqlite3.Error:
+            logger.exception(
+                "An error occurred while looking up hills by name",
+                extra={"names": lowered},
+            )
+        return hill_ids
+
+    @staticmethod
+    def get_hill_names() -> dict[int, str]:
+        """Get the name of every hill, keyed by hill id."""
+        db_api = DatabaseAPI()
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT id, name FROM hills")
+                return dict(cursor.fetchall())
+        except sqlite3.Error:
+            logger.exception("An error occurred while fetching hill names")
+            return {}
+
+    @staticmethod
+    def get_walk_hill_ids() -> list[tuple[int, int]]:
+        """Get every (walk_id, hill_id) pair from the walk hill decomposition."""
+        db_api = DatabaseAPI()
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT walk_id, hill_id FROM walk_hill_decomposition")
+                return cursor.fetchall()
+        except sqlite3.Error:
+            logger.exception("An error occurred while fetching walk hills")
+            return []
+
+    @staticmethod
+    def get_walk_candidates(
+        filters: WalkFilters | None = None,
+    ) -> list[WalkCandidateRecord]:
+        """
+        Get every walk with a start location that passes the filters, with
+        the region of its hills and its duration.
+        """
+        filters = filters or WalkFilters()
+        filter_clause, filter_params = UserData._build_walk_filter_clause(filters)
+        db_api = DatabaseAPI()
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"""
+                    SELECT
+                        w.id,
+                        w.start_location,
+                        {WALK_REGION_SQL} as region,
+                        w.time
+                    FROM
+                        walks w
+                    LEFT JOIN
+                        walk_hill_summary s ON w.id = s.walk_id
+                    WHERE
+                        w.start_location IS NOT NULL
+                        {filter_clause}
+                    """,
+                    filter_params,
+                )
+                return [
+                    WalkCandidateRecord(
+                        walk_id,
+                        start_location,
+                        region,
+                        hours_to_seconds(float(walk_duration_hours)),
+                    )
+                    for walk_id, start_location, region, walk_duration_hours in (
+                        cursor.fetchall()
+                    )
+                ]
+        except sqlite3.Error:
+            logger.exception("An error occurred while fetching walk candidates")
+            return []
+
+    @staticmethod
+    def get_travel_samples() -> list[TravelSampleRecord]:
+        """
+        Get every stored route between a user and a walk start, across all
+        users, for calibrating travel time estimates.
+        """
+        db_api = DatabaseAPI()
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"""
+                    SELECT
+                        u.location,
+                        w.start_location,
+                        {WALK_REGION_SQL} as region,
+                        uwd.distance,
+                        uwd.duration
+                    FROM
+                        user_walk_directions uwd
+                    JOIN
+                        users u ON uwd.user_id = u.id
+                    JOIN
+                        walks w ON uwd.walk_id = w.id
+                    WHERE
+                        w.start_location IS NOT NULL
+                        AND uwd.distance IS NOT NULL
+                        AND uwd.duration IS NOT NULL
+                    """
+                )
+                return [TravelSampleRecord(*row) for row in cursor.fetchall()]
+        except sqlite3.Error:
+            logger.exception("An error occurred while fetching travel samples")
+            return []
+
+    @staticmethod
+    def get_user_ids() -> list[int]:
+        """Get the ids of every saved user in id order."""
+        db_api = DatabaseAPI()
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT id FROM users ORDER BY id")
+                return [row[0] for row in cursor.fetchall()]
+        except sqlite3.Error:
+            logger.exception("An error occurred while fetching user ids")
+            return []
+
+    @staticmethod
+    def iter_walk_directions_since(
+        last_id: int, chunk_size: int = FETCH_CHUNK_SIZE
+    ) -> Iterator[list[tuple[int, int, int, int, int]]]:
+        """
+        Stream the directions saved after the row with id last_id, in id
+        order, as chunks of (id, user_id, walk_id, distance, duration) rows.
+        """
+        db_api = DatabaseAPI()
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    SELECT id, user_id, walk_id, distance, duration
+                    FROM user_walk_directions
+                    WHERE id > ?
+                    AND distance IS NOT NULL
+                    AND duration IS NOT NULL
+                    ORDER BY id
+                    """,
+                    (last_id,),
+                )
+                while rows := cursor.fetchmany(chunk_size):
+                    yield rows
+        except sqlite3.Error:
+            logger.exception(
+                "An error occurred while fetching new walk directions",
+                extra={"last_id": last_id},
+            )
+
+    @staticmethod
+    def count_walk_directions(up_to_id: int) -> int:
+        """
+        Count the saved directions rows with a distance and duration whose
+        id is at most up_to_id. Errors are raised rather than counted as
+        zero, so callers never mistake a failed read for deleted rows.
+        """
+        db_api = DatabaseAPI()
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    SELECT COUNT(*) FROM user_walk_directions
+                    WHERE id <= ?
+                    AND distance IS NOT NULL
+                    AND duration IS NOT NULL
+                    """,
+                    (up_to_id,),
+                )
+                return cursor.fetchone()[0]
+        except sqlite3.Error:
+            logger.exception(
+                "An error occurred while counting walk directions",
+                extra={"up_to_id": up_to_id},
+            )
+            raise
 
     @staticmethod
     def get_user_id_for_name(user_name: str) -> int | None:
@@ -189,90 +718,261 @@ class UserData:
             return None
 
     @staticmethod
-    def get_user_walks_travel_info(user_id: int) -> list[UserWalkTravelInfo]:
+    def get_user_walk_columns(
+        user_id: int, filters: WalkFilters | None = None
+    ) -> list[tuple[int, int, float, int, int, int, int, int, int, float]]:
         """
-        Get the information for all user walks including walk details and travel info.
+        Get the numeric columns used to rank a user's walks that pass the
+        filters, one row per walk with directions in walk id order:
+        (walk_id, walk_duration_seconds, walk_distance_km, walk_ascent_meters,
+        number_of_hills, travel_distance_meters, travel_duration_seconds,
+        grade, bog_factor, user_rating).
         """
+        filters = filters or WalkFilters()
+        filter_clause, filter_params = UserData._build_walk_filter_clause(filters)
         db_api = DatabaseAPI()
         try:
             with db_api.db_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
-                    """
+                    f"""
                     SELECT
-                        w.id as walk_id,
-                        w.title as walk_title,
-                        w.start_location as walk_start_location,
-                        w.ascent as walk_ascent_meters,
-                        w.distance as walk_distance_km,
-                        w.time as walk_duration_hours,
-                        w.url as walk_url,
-                        uwd.distance as travel_distance_meters,
-                        uwd.duration as travel_duration_seconds,
-                        GROUP_CONCAT(h.name) as hill_names
+                        w.id,
+                        CAST(w.time * 3600 AS INTEGER),
+                        w.distance,
+                        w.ascent,
+                        COALESCE(s.number_of_hills, 0),
+                        uwd.distance,
+                        uwd.duration,
+                        w.grade,
+                        w.bog_factor,
+                        w.user_rating
                     FROM
                         user_walk_directions uwd
                     JOIN
                         walks w ON uwd.walk_id = w.id
                     LEFT JOIN
-                        walk_hill_decomposition whd ON w.id = whd.walk_id
-                    LEFT JOIN
-                        hills h ON whd.hill_id = h.id
+                        walk_hill_summary s ON w.id = s.walk_id
                     WHERE
                         uwd.user_id = ?
-                    GROUP BY
+                        AND uwd.duration IS NOT NULL
+                        {filter_clause}
+                    ORDER BY
                         w.id
+                    """,
+                    (user_id, *filter_params),
+                )
+                return cursor.fetchall()
+        except sqlite3.Error:
+            logger.exception(
+                "An error occurred while fetching user walk columns",
+                extra={"user_id": user_id},
+            )
+            return []
+
+    @staticmethod
+    def get_walk_columns(
+        filters: WalkFilters | None = None,
+    ) -> list[tuple[int, int, float, int, int, None, None, int, int, float]]:
+        """
+        Get the numeric columns used to rank every walk that passes the
+        filters, in walk id order, laid out as get_user_walk_columns rows
+        with the user's travel distance and duration left as None, for
+        callers that read travel from the travel matrix.
+        """
+        filters = filters or WalkFilters()
+        filter_clause, filter_params = UserData._build_walk_filter_clause(filters)
+        db_api = DatabaseAPI()
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"""
+                    SELECT
+                        w.id,
+                        CAST(w.time * 3600 AS INTEGER),
+                        w.distance,
+                        w.ascent,
+                        COALESCE(s.number_of_hills, 0),
+                        NULL,
+                        NULL,
+                        w.grade,
+                        w.bog_factor,
+                        w.user_rating
+                    FROM
+                        walks w
+                    LEFT JOIN
+                        walk_hill_summary s ON w.id = s.walk_id
+                    WHERE
+                        1 = 1
+                        {filter_clause}
                     ORDER BY
                         w.id
                     """,
-                    (user_id,),
+                    filter_params,
                 )
-                results = cursor.fetchall()
+                return cursor.fetchall()
+        except sqlite3.Error:
+            logger.exception("An error occurred while fetching walk columns")
+            return []
 
-                user_walks_info = []
-                for row in results:
-                    (
-                        walk_id,
-                        walk_title,
-                        walk_start_location,
-                        walk_ascent_meters,
-                        walk_distance_km,
-                        walk_duration_hours,
-                        walk_url,
-                        travel_distance_meters,
-                        travel_duration_seconds,
-                        hill_names,
-                    ) = row
-                    hills = hill_names.split(",") if hill_names else []
-                    walk_info = WalkInfo(
-                        walk_id=walk_id,
-                        walk_name=walk_title,
-                        walk_start_location=walk_start_location,
-                        walk_ascent_meters=walk_ascent_meters,
-                        walk_distance_meters=kilometers_to_meters(walk_distance_km),
-                        walk_duration_seconds=hours_to_seconds(
-                            float(walk_duration_hours)
-                        ),
-                        walk_url=walk_url,
-                        number_of_hills=len(hills),
-                        hills=hills,
+    @staticmethod
+    def get_user_walks_travel_info_for_walks(
+        user_id: int, walk_ids: list[int]
+    ) -> dict[int, UserWalkTravelRecord]:
+        """
+        Get the walk details and travel info for a user for only the given
+        walks, keyed by walk id.
+        """
+        if not walk_ids:
+            return {}
+        db_api = DatabaseAPI()
+        records: dict[int, UserWalkTravelRecord] = {}
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                # Stay well below SQLite's bound parameter limit.
+                for start in range(0, len(walk_ids), FETCH_CHUNK_SIZE):
+                    chunk = walk_ids[start : start + FETCH_CHUNK_SIZE]
+                    placeholders = ",".join("?" for _ in chunk)
+                    cursor.execute(
+                        f"""
+                        SELECT
+                            w.id as walk_id,
+                            w.title as walk_title,
+                            w.start_location as walk_start_location,
+                            w.ascent as walk_ascent_meters,
+                            w.distance as walk_distance_km,
+                            w.time as walk_duration_hours,
+                            w.url as walk_url,
+                            uwd.distance as travel_distance_meters,
+                            uwd.duration as travel_duration_seconds,
+                            s.hill_names as hill_names
+                        FROM
+                            user_walk_directions uwd
+                        JOIN
+                            walks w ON uwd.walk_id = w.id
+                        LEFT JOIN
+                            walk_hill_summary s ON w.id = s.walk_id
+                        WHERE
+                            uwd.user_id = ?
+                            AND w.id IN ({placeholders})
+                        """,
+                        (user_id, *chunk),
                     )
-                    travel_info = TravelInfo(
-                        distance_meters=travel_distance_meters,
-                        duration_seconds=travel_duration_seconds,
+                    for row in cursor.fetchall():
+                        record = UserData._row_to_record(user_id, row)
+                        records[record.walk_id] = record
+        except sqlite3.Error:
+            logger.exception(
+                "An error occurred while fetching user walks by id",
+                extra={"user_id": user_id, "walks": len(walk_ids)},
+            )
+            return {}
+        return records
+
+    @staticmethod
+    def get_trip_walks(walk_ids: list[int]) -> dict[int, TripWalkRecord]:
+        """Get the details of the given walks for a trip plan, keyed by walk id."""
+        if not walk_ids:
+            return {}
+        db_api = DatabaseAPI()
+        records: dict[int, TripWalkRecord] = {}
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                for start in range(0, len(walk_ids), FETCH_CHUNK_SIZE):
+                    chunk = walk_ids[start : start + FETCH_CHUNK_SIZE]
+                    placeholders = ",".join("?" for _ in chunk)
+                    cursor.execute(
+                        f"""
+                        SELECT
+                            w.id,
+                            w.title,
+                            w.url,
+                            w.time,
+                            s.hill_names
+                        FROM
+                            walks w
+                        LEFT JOIN
+                            walk_hill_summary s ON w.id = s.walk_id
+                        WHERE
+                            w.id IN ({placeholders})
+                        """,
+                        chunk,
                     )
-                    user_walks_info.append(
-                        UserWalkTravelInfo(
-                            user_id=user_id,
-                            walk_info=walk_info,
-                            travel_info=travel_info,
+                    for walk_id, title, url, hours, hill_names in cursor.fetchall():
+                        records[walk_id] = TripWalkRecord(
+                            walk_id,
+                            title,
+                            url,
+                            hours_to_seconds(float(hours)),
+                            json.loads(hill_names) if hill_names else [],
                         )
-                    )
-                return user_walks_info
-
         except sqlite3.Error:
             logger.exception(
-                "An error occurred while fetching user walks travel info",
-                extra={"user_id": user_id},
+                "An error occurred while fetching trip walks",
+                extra={"walks": len(walk_ids)},
             )
-            return []
+            return {}
+        return records
+
+    @staticmethod
+    def _build_walk_filter_clause(filters: WalkFilters) -> tuple[str, list]:
+        """
+        Build the SQL conditions and parameters for the walk filters. Each
+        condition is prefixed with AND so it can be appended to an existing
+        WHERE clause on walks aliased as w joined to walk_hill_summary as s.
+        """
+        conditions: list[str] = []
+        params: list = []
+        if filters.min_hills > 0:
+            conditions.append("COALESCE(s.number_of_hills, 0) >= ?")
+            params.append(filters.min_hills)
+        if filters.max_grade is not None:
+            conditions.append("w.grade <= ?")
+            params.append(filters.max_grade)
+        if filters.max_bog_factor is not None:
+            conditions.append("w.bog_factor <= ?")
+            params.append(filters.max_bog_factor)
+        if filters.min_rating is not None:
+            conditions.append("w.user_rating >= ?")
+            params.append(filters.min_rating)
+        if filters.max_distance_km is not None:
+            conditions.append("w.distance <= ?")
+            params.append(filters.max_distance_km)
+        if filters.max_ascent_meters is not None:
+            conditions.append("w.ascent <= ?")
+            params.append(filters.max_ascent_meters)
+        clause = "".join(f" AND {condition}" for condition in conditions)
+        return clause, params
+
+    @staticmethod
+    def _row_to_record(user_id: int, row: tuple) -> UserWalkTravelRecord:
+        """Convert a walk travel row into a UserWalkTravelRecord."""
+        (
+            walk_id,
+            walk_title,
+            walk_start_location,
+            walk_ascent_meters,
+            walk_distance_km,
+            walk_duration_hours,
+            walk_url,
+            travel_distance_meters,
+            travel_duration_seconds,
+            hill_names,
+        ) = row
+        walk_duration_seconds = hours_to_seconds(float(walk_duration_hours))
+        return UserWalkTravelRecord(
+            user_id,
+            walk_id,
+            walk_title,
+            walk_start_location,
+            walk_ascent_meters,
+            kilometers_to_meters(walk_distance_km),
+            walk_duration_seconds,
+            walk_url,
+            json.loads(hill_names) if hill_names else [],
+            travel_distance_meters,
+            travel_duration_seconds,
+        )
@@ -1,5 +1,10 @@
+from dataclasses import dataclass
+from datetime import date
+
 from pydantic import BaseModel
 
+from src.maps.dtos import MapsLookupPlanDTO
+
 
 class LatLon(BaseModel):
     lat: float
@@ -28,3 +33,206 @@ class UserWalkTravelInfo(BaseModel):
     walk_info: WalkInfo
     travel_info: TravelInfo
     total_time_seconds: int | None = None
+
+
+class WalkFilters(BaseModel):
+    min_hills: int = 1
+    max_grade: int | None = None
+    max_bog_factor: int | None = None
+    min_rating: float | None = None
+    max_distance_km: float | None = None
+    max_ascent_meters: int | None = None
+    # Applied when ranking, from the hills the user has bagged.
+    min_new_hills: int = 0
+
+
+class WalkDirectionsPlan(BaseModel):
+    user: str
+    missing_walks: int
+    lookup_plan: MapsLookupPlanDTO
+
+
+@dataclass(slots=True)
+class UserWalkTravelRecord:
+    """
+    Flat, unvalidated walk and travel row used on internal read paths.
+    Building one of these is far cheaper than the nested pydantic models;
+    use to_dto at API boundaries that need a UserWalkTravelInfo.
+    """
+
+    user_id: int
+    walk_id: int
+    walk_name: str
+    walk_start_location: str
+    walk_ascent_meters: int
+    walk_distance_meters: int
+    walk_duration_seconds: int
+    walk_url: str
+    hills: list[str]
+    travel_distance_meters: int
+    travel_duration_seconds: int
+    total_time_seconds: int | None = None
+    # Set when ranked by a custom score expression rather than total time.
+    score: float | None = None
+
+    @property
+    def number_of_hills(self) -> int:
+        """Number of hills included in the walk."""
+        return len(self.hills)
+
+    def to_dto(self) -> UserWalkTravelInfo:
+        """Convert the record into the validated UserWalkTravelInfo model."""
+        return UserWalkTravelInfo(
+            user_id=self.user_id,
+            walk_info=WalkInfo(
+                walk_id=self.walk_id,
+                walk_name=self.walk_name,
+                walk_start_location=self.walk_start_location,
+                walk_ascent_meters=self.walk_ascent_meters,
+                walk_distance_meters=self.walk_distance_meters,
+                walk_duration_seconds=self.walk_duration_seconds,
+                walk_url=self.walk_url,
+                number_of_hills=self.number_of_hills,
+                hills=self.hills,
+            ),
+            travel_info=TravelInfo(
+                distance_meters=self.travel_distance_meters,
+                duration_seconds=self.travel_duration_seconds,
+            ),
+            total_time_seconds=self.total_time_seconds,
+        )
+
+
+@dataclass(slots=True)
+class WalkCandidateRecord:
+    """
+    A walk that could be ranked for a user, with the raw start location and
+    the region of its hills, used to estimate travel before fetching routes.
+    """
+
+    walk_id: int
+    walk_start_location: str
+    region: str | None
+    walk_duration_seconds: int
+
+
+@dataclass(slots=True)
+class TravelSampleRecord:
+    """A stored route between a user's location and a walk start location."""
+
+    user_location: str
+    walk_start_location: str
+    region: str | None
+    distance_meters: int
+    duration_seconds: int
+
+
+@dataclass(slots=True)
+class UserImportResult:
+    """
+    One row of a bulk user import and what happened to it: 'pending' until
+    it is processed, then 'added', 'exists', 'invalid' or 'failed'.
+    """
+
+    line: int
+    name: str
+    postcode: str
+    status: str = "pending"
+    message: str = ""
+    location: LatLon | None = None
+
+
+@dataclass(slots=True)
+class GroupWalkRecord:
+    """
+    A walk ranked for a group: the walk and travel details of the first
+    member, the group score and each member's total time in seconds.
+    """
+
+    walk: UserWalkTravelRecord
+    score_seconds: float
+    member_total_seconds: dict[str, int]
+
+
+@dataclass(slots=True)
+class CompletionPlan:
+    """
+    Walks that together bag a user's remaining hills, cheapest first, with
+    their summed total time in seconds. uncovered_hills names the remaining
+    hills no walk with directions reaches.
+    """
+
+    walks: list[UserWalkTravelRecord]
+    total_seconds: int
+    remaining_hills: int
+    uncovered_hills: list[str]
+    proved_optimal: bool = False
+
+
+@dataclass(slots=True)
+class TripWalkRecord:
+    """
+    A walk on a trip day: its details, the estimated drive in seconds to its
+    start from the previous stop, and how many hills it bags for the first
+    time on the trip.
+    """
+
+    walk_id: int
+    walk_name: str
+    walk_url: str
+    walk_duration_seconds: int
+    hills: list[str]
+    drive_seconds: int = 0
+    new_hills: int = 0
+
+
+@dataclass(slots=True)
+class TripDay:
+    """
+    The walks of one trip day in order, with the day's estimated driving in
+    seconds, including the drive back to base, and its total time.
+    """
+
+    walks: list[TripWalkRecord]
+    drive_seconds: int
+    total_seconds: int
+
+
+@dataclass(slots=True)
+class TripPlan:
+    """
+    A multi-day trip from a base: the days with walks, the hills the trip
+    bags that the user has not, and the summed time of every day.
+    """
+
+    base: LatLon
+    days: list[TripDay]
+    new_hills: int
+    total_seconds: int
+
+
+@dataclass(slots=True)
+class SeasonDay:
+    """
+    An available date and the walk scheduled on it, if any, with the
+    daylight in seconds at the walk's start and the hills it bags for the
+    first time in the season.
+    """
+
+    day: date
+    walk: UserWalkTravelRecord | None = None
+    daylight_seconds: int | None = None
+    new_hills: int = 0
+
+
+@dataclass(slots=True)
+class SeasonPlan:
+    """
+    Every available date in order with its scheduled walk, the hills the
+    season bags that the user has not, and the summed total time of the
+    scheduled walks in seconds.
+    """
+
+    days: list[SeasonDay]
+    new_hills: int
+    total_seconds: int
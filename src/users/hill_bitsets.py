@@ -0,0 +1,93 @@
+import logging
+from collections.abc import Iterable
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.users.data import UserData
+
+logger = logging.getLogger(__name__)
+
+WORD_BITS = 64
+
+
+class WalkHillBitsets:
+    """
+    The hills of every walk as bitsets over the hill ids: hill_ids[k] is bit
+    k % 64 of word k // 64, and row i of bits is the hills of walk_ids[i].
+    A user's bagged hills use the same layout, so the hills a walk would add
+    are one AND NOT and a popcount per word, for every walk at once.
+    """
+
+    def __init__(
+        self,
+        walk_ids: NDArray[np.int64],
+        hill_ids: NDArray[np.int64],
+        bits: NDArray[np.uint64],
+    ) -> None:
+        self.walk_ids = walk_ids
+        self.hill_ids = hill_ids
+        self.bits = bits
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[tuple[int, int]]) -> "WalkHillBitsets":
+        """Build the bitsets from (walk_id, hill_id) pairs."""
+        table = np.array(list(pairs), dtype=np.int64).reshape(-1, 2)
+        walk_ids, rows = np.unique(table[:, 0], return_inverse=True)
+        hill_ids, positions = np.unique(table[:, 1], return_inverse=True)
+        words = max(1, -(-hill_ids.size // WORD_BITS))
+        bits = np.zeros((walk_ids.size, words), dtype=np.uint64)
+        np.bitwise_or.at(
+            bits,
+            (rows, positions // WORD_BITS),
+            np.left_shift(np.uint64(1), (positions % WORD_BITS).astype(np.uint64)),
+        )
+        return cls(walk_ids, hill_ids, bits)
+
+    @classmethod
+    def load(cls) -> "WalkHillBitsets":
+        """Build the bitsets from the walk hill decomposition."""
+        bitsets = cls.from_pairs(UserData.get_walk_hill_ids())
+        logger.debug(
+            "Loaded walk hill bitsets",
+            extra={"walks": bitsets.walk_ids.size, "hills": bitsets.hill_ids.size},
+        )
+        return bitsets
+
+    def hill_mask(self, hill_ids: Iterable[int]) -> NDArray[np.uint64]:
+        """The hills as one bitset; hills on no walk are ignored."""
+        hill_ids = np.fromiter(hill_ids, dtype=np.int64)
+        positions = np.searchsorted(self.hill_ids, hill_ids)
+        known = positions < self.hill_ids.size
+        known[known] = self.hill_ids[positions[known]] == hill_ids[known]
+        positions = positions[known]
+        mask = np.zeros(self.bits.shape[1], dtype=np.uint64)
+        np.bitwise_or.at(
+            mask,
+            positions // WORD_BITS,
+            np.left_shift(np.uint64(1), (positions % WORD_BITS).astype(np.uint64)),
+        )
+        return mask
+
+    def walk_bits(self, walk_ids: NDArray[np.int64]) -> NDArray[np.uint64]:
+        """Rows of bits for the walks, empty for walks without hills."""
+        rows = np.searchsorted(self.walk_ids, walk_ids)
+        found = rows < self.walk_ids.size
+        found[found] = self.walk_ids[rows[found]] == walk_ids[found]
+        bits = np.zeros((walk_ids.size, self.bits.shape[1]), dtype=np.uint64)
+        bits[found] = self.bits[rows[found]]
+        return bits
+
+    def count_new_hills(
+        self, walk_ids: NDArray[np.int64], bagged: NDArray[np.uint64]
+    ) -> NDArray[np.int64]:
+        """Number of hills on each walk that are not in the bagged bitset."""
+        return WalkHillBitsets.popcount(self.walk_bits(walk_ids) & ~bagged)
+
+    @staticmethod
+    def popcount(bits: NDArray[np.uint64]) -> NDArray[np.int64]:
+        """
+        Number of hills in each bitset, counting over the last axis, so a
+        single bitset gives a 0-d count and rows of bitsets one per row.
+        """
+        return np.bitwise_count(bits).sum(axis=-1, dtype=np.int64)
@@ -0,0 +1,138 @@
+import logging
+import sqlite3
+from collections.abc import Iterable
+
+from src.database.api import DatabaseAPI
+from src.users.dtos import LatLon
+
+logger = logging.getLogger(__name__)
+
+POSTCODE_INSERT_BATCH_SIZE = 10_000
+
+
+class LocationData:
+    @staticmethod
+    def create_postcodes_table() -> None:
+        """
+        Create the postcodes table in the database if it doesn't exist. It is
+        keyed on the normalised postcode without a rowid, so rows are stored
+        in postcode order and a lookup is a single index search.
+        """
+        db_api = DatabaseAPI()
+        with db_api.db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS postcodes (
+                    postcode TEXT PRIMARY KEY,
+                    lat REAL NOT NULL,
+                    lon REAL NOT NULL
+                ) WITHOUT ROWID
+                """
+            )
+            conn.commit()
+
+    @staticmethod
+    def create_geocode_cache_table() -> None:
+        """Create the geocode_cache table in the database if it doesn't exist."""
+        db_api = DatabaseAPI()
+        with db_api.db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS geocode_cache (
+                    query TEXT PRIMARY KEY,
+                    lat REAL NOT NULL,
+                    lon REAL NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                ) WITHOUT ROWID
+                """
+            )
+            conn.commit()
+
+    @staticmethod
+    def save_postcodes(postcodes: Iterable[tuple[str, float, float]]) -> int:
+        """
+        Save (postcode, lat, lon) rows, replacing existing postcodes, in one
+        transaction. Returns the number of rows saved.
+        """
+        db_api = DatabaseAPI()
+        saved = 0
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                batch: list[tuple[str, float, float]] = []
+                for row in postcodes:
+                    batch.append(row)
+                    if len(batch) >= POSTCODE_INSERT_BATCH_SIZE:
+                        LocationData._insert_postcodes(cursor, batch)
+                        saved += len(batch)
+                        batch = []
+                LocationData._insert_postcodes(cursor, batch)
+                saved += len(batch)
+                conn.commit()
+        except sqlite3.Error:
+            logger.exception(
+                "An error occurred while saving postcodes", extra={"saved": saved}
+            )
+            return 0
+        return saved
+
+    @staticmethod
+    def _insert_postcodes(
+        cursor: sqlite3.Cursor, rows: list[tuple[str, float, float]]
+    ) -> None:
+        """Insert a batch of postcode rows on an open cursor."""
+        cursor.executemany(
+            "INSERT OR REPLACE INTO postcodes (postcode, lat, lon) VALUES (?, ?, ?)",
+            rows,
+        )
+
+    @staticmethod
+    def get_postcode_location(postcode: str) -> LatLon | None:
+        """Get the location of a normalised postcode from the postcodes table."""
+        return LocationData._get_location(
+            "SELECT lat, lon FROM postcodes WHERE postcode = ?", postcode
+        )
+
+    @staticmethod
+    def get_cached_geocode(query: str) -> LatLon | None:
+        """Get the location a geocoder found for a normalised query before."""
+        return LocationData._get_location(
+            "SELECT lat, lon FROM geocode_cache WHERE query = ?", query
+        )
+
+    @staticmethod
+    def save_cached_geocode(query: str, location: LatLon) -> None:
+        """Cache the location a geocoder found for a normalised query."""
+        db_api = DatabaseAPI()
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    INSERT OR REPLACE INTO geocode_cache (query, lat, lon)
+                    VALUES (?, ?, ?)
+                    """,
+                    (query, location.lat, location.lon),
+                )
+                conn.commit()
+        except sqlite3.Error:
+            logger.exception(
+                "An error occurred while caching a geocode", extra={"query": query}
+            )
+
+    @staticmethod
+    def _get_location(sql: str, key: str) -> LatLon | None:
+        """Run a single-row (lat, lon) lookup, treating errors as a miss."""
+        db_api = DatabaseAPI()
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(sql, (key,))
+                result = cursor.fetchone()
+        except sqlite3.Error:
+            # A missing table just means nothing has been imported yet.
+            logger.debug("Location lookup failed", extra={"key": key}, exc_info=True)
+            return None
+        return LatLon(lat=result[0], lon=result[1]) if result else None
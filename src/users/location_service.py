@@ -1,14 +1,62 @@
+import csv
+import logging
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+
 from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut, GeocoderServiceError
 from src.users.dtos import LatLon
+from src.users.location_data import LocationData
+from src.utils.rate_limit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Nominatim's usage policy allows at most one request per second.
+NOMINATIM_MAX_PER_SECOND = 1.0
+
+# Header names used for each column by common postcode directories: the ONS
+# Postcode Directory (pcds, lat, long) and plain postcode,latitude,longitude
+# extracts.
+POSTCODE_COLUMNS = ("postcode", "pcds", "pcd", "pcd7", "pcd8")
+LATITUDE_COLUMNS = ("latitude", "lat")
+LONGITUDE_COLUMNS = ("longitude", "long", "lon", "lng")
+# ONSPD gives postcodes without a grid reference this latitude.
+NO_LOCATION_LATITUDE = 99.999999
+
+_geolocator: Nominatim | None = None
+_geocode_rate_limiter = RateLimiter(NOMINATIM_MAX_PER_SECOND)
+_geolocator_lock = threading.Lock()
+
+
+def normalise_postcode(postcode: str) -> str:
+    """Upper-case a postcode and drop its whitespace, e.g. 'eh1 1aa' -> 'EH11AA'."""
+    return "".join(postcode.split()).upper()
 
 
 def get_lat_lon_from_postcode(postcode: str) -> LatLon:
     """
-    Given a postcode, return the latitude and longitude using geopy's Nominatim geocoder.
+    Given a postcode, return the latitude and longitude. The imported
+    postcode directory is checked first, then the cache of earlier geocoder
+    results, and only then geopy's Nominatim geocoder, whose result is cached.
     """
-    geolocator = Nominatim(user_agent="location_service")
+    key = normalise_postcode(postcode)
+    location = LocationData.get_postcode_location(key)
+    if location is None:
+        location = LocationData.get_cached_geocode(key)
+    if location is not None:
+        logger.debug("Postcode found offline", extra={"postcode": key})
+        return location
+    location = _geocode(postcode)
+    LocationData.save_cached_geocode(key, location)
+    return location
+
+
+def _geocode(postcode: str) -> LatLon:
+    """Look a postcode up with the shared, rate-limited Nominatim geocoder."""
+    geolocator = _get_geolocator()
     search_query = postcode.strip()
+    _geocode_rate_limiter.acquire()
     try:
         location = geolocator.geocode(search_query)
         if location:
@@ -17,3 +65,50 @@ def get_lat_lon_from_postcode(postcode: str) -> LatLon:
             raise ValueError(f"Could not find location for postcode: {postcode}")
     except (GeocoderTimedOut, GeocoderServiceError) as e:
         raise ConnectionError(f"Geocoding service error: {e}")
+
+
+def _get_geolocator() -> Nominatim:
+    """Get the Nominatim geocoder shared by every lookup in this process."""
+    global _geolocator
+    with _geolocator_lock:
+        if _geolocator is None:
+            _geolocator = Nominatim(user_agent="location_service")
+        return _geolocator
+
+
+def read_postcode_directory(path: str | Path) -> Iterator[tuple[str, float, float]]:
+    """
+    Stream (normalised postcode, lat, lon) rows from a postcode directory
+    CSV, working out the columns from its header. Rows without a location
+    are skipped.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as csv_file:
+        reader = csv.DictReader(csv_file)
+        fieldnames = {name.strip().lower(): name for name in reader.fieldnames or []}
+        postcode_column = _find_column(fieldnames, POSTCODE_COLUMNS)
+        latitude_column = _find_column(fieldnames, LATITUDE_COLUMNS)
+        longitude_column = _find_column(fieldnames, LONGITUDE_COLUMNS)
+        skipped = 0
+        for row in reader:
+            try:
+                lat = float(row[latitude_column])
+                lon = float(row[longitude_column])
+            except (TypeError, ValueError):
+                skipped += 1
+                continue
+            postcode = normalise_postcode(row[postcode_column] or "")
+            if not postcode or lat == NO_LOCATION_LATITUDE:
+                skipped += 1
+                continue
+            yield postcode, lat, lon
+        logger.info(
+            "Read postcode directory", extra={"path": str(path), "skipped": skipped}
+        )
+
+
+def _find_column(fieldnames: dict[str, str], candidates: tuple[str, ...]) -> str:
+    """The header, as written, of the first candidate column present."""
+    for candidate in candidates:
+        if candidate in fieldnames:
+            return fieldnames[candidate]
+    raise ValueError(f"Postcode directory has none of the columns {candidates}.")
@@ -0,0 +1,440 @@
+import bisect
+import logging
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, fields, replace
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.users.data import FETCH_CHUNK_SIZE, UserData
+from src.users.dtos import UserWalkTravelRecord, WalkFilters
+from src.users.hill_bitsets import WalkHillBitsets
+from src.users.travel_matrix import TravelMatrix
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class WalkColumns:
+    """
+    A user's walks with directions as columns, one array entry per walk in
+    walk id order, so totals and scores are computed for every walk at once.
+    """
+
+    walk_ids: NDArray[np.int64]
+    walk_duration_seconds: NDArray[np.float64]
+    walk_distance_meters: NDArray[np.float64]
+    walk_ascent_meters: NDArray[np.float64]
+    number_of_hills: NDArray[np.float64]
+    travel_distance_meters: NDArray[np.float64]
+    travel_duration_seconds: NDArray[np.float64]
+    grade: NDArray[np.float64]
+    bog_factor: NDArray[np.float64]
+    user_rating: NDArray[np.float64]
+    # Hills the user has not bagged yet; every hill until bagged hills are
+    # counted in by RankingEngine.load_columns.
+    new_hills: NDArray[np.float64]
+
+    def __len__(self) -> int:
+        return int(self.walk_ids.size)
+
+    @property
+    def total_seconds(self) -> NDArray[np.float64]:
+        """Walk duration plus travel there and back for every walk."""
+        return self.walk_duration_seconds + 2 * self.travel_duration_seconds
+
+    @classmethod
+    def from_rows(
+        cls, rows: list[tuple[int, int, float, int, int, int, int, int, int, float]]
+    ) -> "WalkColumns":
+        """Build the columns from UserData.get_user_walk_columns rows."""
+        table = np.array(rows, dtype=np.float64).reshape(-1, 10)
+        return cls(
+            walk_ids=table[:, 0].astype(np.int64),
+            walk_duration_seconds=table[:, 1],
+            # Truncated to whole meters, as kilometers_to_meters does.
+            walk_distance_meters=np.trunc(table[:, 2] * 1000),
+            walk_ascent_meters=table[:, 3],
+            number_of_hills=table[:, 4],
+            travel_distance_meters=table[:, 5],
+            travel_duration_seconds=table[:, 6],
+            grade=table[:, 7],
+            bog_factor=table[:, 8],
+            user_rating=table[:, 9],
+            new_hills=table[:, 4].copy(),
+        )
+
+    def select(self, mask: NDArray[np.bool_]) -> "WalkColumns":
+        """The columns of only the walks where mask is set."""
+        return WalkColumns(
+            **{field.name: getattr(self, field.name)[mask] for field in fields(self)}
+        )
+
+
+# Scores each walk from the columns; lower is better when ranking ascending.
+ScoreFunction = Callable[[WalkColumns], NDArray[np.float64]]
+
+
+# Objectives a Pareto front can be taken over, each as a key where lower is
+# better; objectives to maximise are negated.
+PARETO_OBJECTIVES: dict[str, ScoreFunction] = {
+    "total_time": lambda c: c.total_seconds,
+    "travel_time": lambda c: c.travel_duration_seconds,
+    "walk_time": lambda c: c.walk_duration_seconds,
+    "hills": lambda c: -c.number_of_hills,
+    "new_hills": lambda c: -c.new_hills,
+    "ascent": lambda c: c.walk_ascent_meters,
+    "distance": lambda c: c.walk_distance_meters,
+    "grade": lambda c: c.grade,
+    "bog": lambda c: c.bog_factor,
+    "rating": lambda c: -c.user_rating,
+}
+DEFAULT_PARETO_OBJECTIVES = ["travel_time", "walk_time", "hills"]
+# Rows filtered against the front at once, and the most key comparisons
+# made at once when the front is large.
+PARETO_BLOCK_SIZE = 512
+PARETO_COMPARISON_LIMIT = 1 << 20
+
+
+class RankingEngine:
+    @staticmethod
+    def load_columns(user_id: int, filters: WalkFilters | None = None) -> WalkColumns:
+        """
+        Load the ranking columns of the user's walks that pass the filters,
+        with the hills the user has bagged taken out of new_hills. See
+        load_group_columns.
+        """
+        return RankingEngine.load_group_columns([user_id], filters)[0]
+
+    @staticmethod
+    def load_group_columns(
+        user_ids: list[int], filters: WalkFilters | None = None
+    ) -> list[WalkColumns]:
+        """
+        Load the ranking columns of each user's walks that pass the filters,
+        in user_ids order, with the hills each user has bagged taken out of
+        new_hills. Once the travel matrix is built the walk columns are read
+        once and each user's travel is sliced from it; until then each
+        user's walks with directions are read from the database.
+        """
+        matrix = TravelMatrix.open()
+        if matrix is None:
+            member_columns = [
+                WalkColumns.from_rows(UserData.get_user_walk_columns(user_id, filters))
+                for user_id in user_ids
+            ]
+        else:
+            walks = WalkColumns.from_rows(UserData.get_walk_columns(filters))
+            seconds, meters = RankingEngine._matrix_travel(
+                matrix, user_ids, walks.walk_ids
+            )
+            member_columns = [
+                replace(
+                    walks,
+                    travel_distance_meters=meters[row],
+                    travel_duration_seconds=seconds[row],
+                ).select(~np.isnan(seconds[row]))
+                for row in range(len(user_ids))
+            ]
+        return [
+            RankingEngine._count_new_hills(user_id, columns, filters)
+            for user_id, columns in zip(user_ids, member_columns)
+        ]
+
+    @staticmethod
+    def _matrix_travel(
+        matrix: TravelMatrix, user_ids: list[int], walk_ids: NDArray[np.int64]
+    ) -> tuple[NDArray[np.float64], NDArray[np.float64]]:
+        """
+        Travel seconds and meters from each user to each walk, as users x
+        walks arrays with NaN for pairs without directions. Rows are sliced
+        from the matrix; directions saved since it was last refreshed are
+        read from the database and laid over them.
+        """
+        seconds = np.full((len(user_ids), walk_ids.size), np.nan)
+        meters = np.full((len(user_ids), walk_ids.size), np.nan)
+        columns = matrix.walk_columns(walk_ids)
+        in_matrix = columns >= 0
+        for row, user_id in enumerate(user_ids):
+            travel = matrix.user_row(user_id)
+            if travel is not None:
+                seconds[row, in_matrix] = travel[0][columns[in_matrix]]
+                meters[row, in_matrix] = travel[1][columns[in_matrix]]
+        rows = {user_id: row for row, user_id in enumerate(user_ids)}
+        walk_columns = {int(walk_id): column for column, walk_id in enumerate(walk_ids)}
+        for chunk in UserData.iter_walk_directions_since(matrix.last_directions_id):
+            for _, user_id, walk_id, distance, duration in chunk:
+                if user_id in rows and walk_id in walk_columns:
+                    seconds[rows[user_id], walk_columns[walk_id]] = duration
+                    meters[rows[user_id], walk_columns[walk_id]] = distance
+        return seconds, meters
+
+    @staticmethod
+    def _count_new_hills(
+        user_id: int, columns: WalkColumns, filters: WalkFilters | None
+    ) -> WalkColumns:
+        """
+        Take the hills the user has bagged out of new_hills, then drop the
+        walks below the filters' min_new_hills.
+        """
+        bagged = UserData.get_bagged_hill_ids(user_id)
+        if bagged and len(columns):
+            bitsets = WalkHillBitsets.load()
+            columns.new_hills = bitsets.count_new_hills(
+                columns.walk_ids, bitsets.hill_mask(bagged)
+            ).astype(np.float64)
+        if filters is not None and filters.min_new_hills > 0:
+            columns = columns.select(columns.new_hills >= filters.min_new_hills)
+        return columns
+
+    @staticmethod
+    def top_indices(
+        scores: NDArray[np.float64], count: int | None, ascending: bool = True
+    ) -> NDArray[np.intp]:
+        """
+        Indices of the count lowest scores, or highest unless ascending, in
+        ranked order; every score when count is None. The best count are
+        picked with argpartition and only they are sorted. Ties go to the
+        lower index and NaN scores rank last.
+        """
+        count = scores.size if count is None else min(count, scores.size)
+        if count <= 0:
+            return np.empty(0, dtype=np.intp)
+        keys = scores if ascending else -scores
+        keys = np.where(np.isnan(keys), np.inf, keys)
+        if count < keys.size:
+            kth = keys[np.argpartition(keys, count - 1)[count - 1]]
+            # Everything tied with the last place, so ties break on index.
+            candidates = np.flatnonzero(keys <= kth)
+        else:
+            candidates = np.arange(keys.size)
+        order = np.argsort(keys[candidates], kind="stable")
+        return candidates[order[:count]]
+
+    @staticmethod
+    def rank(
+        columns: WalkColumns,
+        count: int | None,
+        ascending: bool = True,
+        score: ScoreFunction | None = None,
+    ) -> tuple[NDArray[np.intp], NDArray[np.float64]]:
+        """
+        Rank the walks by score, total time by default. Returns the indices
+        of the top count walks in ranked order and every walk's score.
+        """
+        scores = (
+            columns.total_seconds
+            if score is None
+            else np.asarray(score(columns), dtype=np.float64)
+        )
+        return RankingEngine.top_indices(scores, count, ascending), scores
+
+    @staticmethod
+    def iter_ranked_user_walks(
+        user_id: int,
+        count: int | None = None,
+        ascending: bool = True,
+        filters: WalkFilters | None = None,
+        score: ScoreFunction | None = None,
+    ) -> Iterator[UserWalkTravelRecord]:
+        """
+        Yield the user's top count walks that pass the filters, or all of
+        them, in ranked order with their total time set, and their score
+        when ranked by a score function. Only the numeric
+        columns are read for ranking; full walk details are then read a
+        chunk of ranked walks at a time.
+        """
+        columns = RankingEngine.load_columns(user_id, filters)
+        top, scores = RankingEngine.rank(columns, count, ascending, score)
+        logger.debug(
+            "Ranked user walks",
+            extra={"user_id": user_id, "walks": len(columns), "selected": top.size},
+        )
+        return RankingEngine._iter_records(
+            user_id, columns, top, scores if score is not None else None
+        )
+
+    @staticmethod
+    def pareto_indices(keys: NDArray[np.float64]) -> NDArray[np.intp]:
+        """
+        Indices of the rows of an (n, d) array of keys, lower being better
+        in every column, that no other row dominates: no other row is at
+        least as good in every key and better in one. Rows with a NaN key
+        are left out. The rows are sorted once, lexicographically, so a row
+        can only be dominated by one before it. Two keys are then swept
+        tracking the best second key so far, and three keeping a staircase
+        of the best second and third keys so far, both in O(n log n). More
+        keys are checked against the front found so far (sort-filter
+        skyline), which is usually small next to n. The indices come back
+        in sorted key order.
+        """
+        keys = np.asarray(keys, dtype=np.float64)
+        if keys.ndim != 2 or keys.shape[1] == 0:
+            raise ValueError("Pareto keys must be an (n, d) array with d >= 1")
+        candidates = np.flatnonzero(~np.isnan(keys).any(axis=1))
+        keys = keys[candidates]
+        # lexsort sorts by the last key first, so the keys are reversed.
+        order = np.lexsort(keys.T[::-1])
+        keys = keys[order]
+        if keys.shape[0] == 0:
+            return np.empty(0, dtype=np.intp)
+        if keys.shape[1] == 1:
+            front = np.flatnonzero(keys[:, 0] == keys[0, 0])
+        elif keys.shape[1] == 2:
+            front = RankingEngine._pareto_sweep_2d(keys)
+        elif keys.shape[1] == 3:
+            front = RankingEngine._pareto_sweep_3d(keys)
+        else:
+            front = RankingEngine._pareto_sort_filter(keys)
+        return candidates[order[front]]
+
+    @staticmethod
+    def _pareto_sweep_2d(keys: NDArray[np.float64]) -> NDArray[np.intp]:
+        """
+        Front of two keys sorted lexicographically: a row is dominated
+        exactly when an earlier row has a strictly better second key, or
+        the same second key and a strictly better first key.
+        """
+        first, second = keys[:, 0], keys[:, 1]
+        best_before = np.minimum.accumulate(np.concatenate(([np.inf], second[:-1])))
+        keep = second < best_before
+        # A row tying the best second key so far survives only if it also
+        # ties the first key of the row that set it, i.e. is a duplicate.
+        ties = np.flatnonzero(second == best_before)
+        if ties.size:
+            setter = np.flatnonzero(keep)
+            owner = setter[np.searchsorted(setter, ties) - 1]
+            keep[ties] = first[ties] == first[owner]
+        return np.flatnonzero(keep)
+
+    @staticmethod
+    def _pareto_sweep_3d(keys: NDArray[np.float64]) -> NDArray[np.intp]:
+        """
+        Front of three keys sorted lexicographically. The second and third
+        keys of the front so far are kept as a staircase, second key rising
+        and third falling, so whether an earlier row is at least as good in
+        both is one bisection. Identical rows are next to each other and
+        share their fate; any other earlier row that is at least as good
+        dominates.
+        """
+        seconds: list[float] = []
+        negated_thirds: list[float] = []
+        keep = np.zeros(keys.shape[0], dtype=bool)
+        previous: list[float] | None = None
+        for index, row in enumerate(keys.tolist()):
+            if row == previous:
+                keep[index] = keep[index - 1]
+                continue
+            previous = row
+            _, second, third = row
+            step = bisect.bisect_right(seconds, second) - 1
+            if step >= 0 and -negated_thirds[step] <= third:
+                continue
+            keep[index] = True
+            # Drop the steps the new row is at least as good as.
+            start = bisect.bisect_left(seconds, second)
+            end = bisect.bisect_right(negated_thirds, -third, lo=start)
+            seconds[start:end] = [second]
+            negated_thirds[start:end] = [-third]
+        return np.flatnonzero(keep)
+
+    @staticmethod
+    def _pareto_sort_filter(keys: NDArray[np.float64]) -> NDArray[np.intp]:
+        """
+        Front of three or more keys sorted lexicographically. Rows are
+        taken a block at a time and the block is first checked against the
+        front found so far in one array comparison, which removes most
+        rows; the few left are then checked one by one as the front grows.
+        """
+        front = np.empty_like(keys)
+        front_indices = np.empty(keys.shape[0], dtype=np.intp)
+        size = 0
+        start = 0
+        while start < keys.shape[0]:
+            block_size = max(
+                1,
+                min(
+                    PARETO_BLOCK_SIZE,
+                    PARETO_COMPARISON_LIMIT // max(size * keys.shape[1], 1),
+                ),
+            )
+            block = keys[start : start + block_size]
+            survivors = np.flatnonzero(
+                ~RankingEngine._dominated_by(front[:size], block)
+            )
+            for offset in survivors:
+                row = block[offset]
+                if not RankingEngine._dominated_by(front[:size], row[np.newaxis])[0]:
+                    front[size] = row
+                    front_indices[size] = start + offset
+                    size += 1
+            start += block.shape[0]
+        return front_indices[:size].copy()
+
+    @staticmethod
+    def _dominated_by(
+        front: NDArray[np.float64], rows: NDArray[np.float64]
+    ) -> NDArray[np.bool_]:
+        """Whether each row is dominated by any row of the front."""
+        at_least_as_good = np.all(front[:, np.newaxis] <= rows, axis=2)
+        better = np.any(front[:, np.newaxis] < rows, axis=2)
+        return np.any(at_least_as_good & better, axis=0)
+
+    @staticmethod
+    def iter_pareto_user_walks(
+        user_id: int,
+        objectives: list[str],
+        filters: WalkFilters | None = None,
+    ) -> Iterator[UserWalkTravelRecord]:
+        """
+        Yield the user's walks that pass the filters and are not dominated
+        on the objectives, named in PARETO_OBJECTIVES, ordered by the first
+        objective, with their total time set.
+        """
+        unknown = [name for name in objectives if name not in PARETO_OBJECTIVES]
+        if unknown or not objectives:
+            raise ValueError(
+                f"Unsupported Pareto objectives {unknown}, "
+                f"expected some of: {', '.join(PARETO_OBJECTIVES)}"
+            )
+        columns = RankingEngine.load_columns(user_id, filters)
+        keys = np.column_stack(
+            [PARETO_OBJECTIVES[name](columns) for name in objectives]
+        ).reshape(len(columns), len(objectives))
+        front = RankingEngine.pareto_indices(keys)
+        logger.debug(
+            "Pareto front of user walks",
+            extra={
+                "user_id": user_id,
+                "objectives": objectives,
+                "walks": len(columns),
+                "front": front.size,
+            },
+        )
+        return RankingEngine._iter_records(user_id, columns, front)
+
+    @staticmethod
+    def _iter_records(
+        user_id: int,
+        columns: WalkColumns,
+        indices: NDArray[np.intp],
+        scores: NDArray[np.float64] | None = None,
+    ) -> Iterator[UserWalkTravelRecord]:
+        """
+        Yield the records of the walks at the indices in order, reading
+        full walk details a chunk of walks at a time.
+        """
+        totals = columns.total_seconds
+        for start in range(0, indices.size, FETCH_CHUNK_SIZE):
+            chunk = indices[start : start + FETCH_CHUNK_SIZE]
+            records = UserData.get_user_walks_travel_info_for_walks(
+                user_id, columns.walk_ids[chunk].tolist()
+            )
+            for index in chunk:
+                record = records.get(int(columns.walk_ids[index]))
+                if record is None:
+                    continue
+                record.total_time_seconds = int(totals[index])
+                if scores is not None and not np.isnan(scores[index]):
+                    record.score = float(scores[index])
+                yield record
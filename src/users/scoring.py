@@ -0,0 +1,156 @@
+import ast
+import logging
+import operator
+from collections.abc import Callable
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.users.ranking import ScoreFunction, WalkColumns
+
+logger = logging.getLogger(__name__)
+
+# Values a score expression can use, each computed for every walk at once.
+SCORE_VARIABLES: dict[str, Callable[[WalkColumns], NDArray[np.float64]]] = {
+    "walk_hours": lambda c: c.walk_duration_seconds / 3600,
+    "walk_minutes": lambda c: c.walk_duration_seconds / 60,
+    "walk_km": lambda c: c.walk_distance_meters / 1000,
+    "ascent": lambda c: c.walk_ascent_meters,
+    "hills": lambda c: c.number_of_hills,
+    "new_hills": lambda c: c.new_hills,
+    "grade": lambda c: c.grade,
+    "bog": lambda c: c.bog_factor,
+    "rating": lambda c: c.user_rating,
+    "travel_hours": lambda c: c.travel_duration_seconds / 3600,
+    "travel_minutes": lambda c: c.travel_duration_seconds / 60,
+    "travel_km": lambda c: c.travel_distance_meters / 1000,
+    "total_hours": lambda c: c.total_seconds / 3600,
+    "total_minutes": lambda c: c.total_seconds / 60,
+}
+
+SCORE_FUNCTIONS: dict[str, Callable[..., NDArray[np.float64]]] = {
+    "min": np.minimum,
+    "max": np.maximum,
+    "abs": np.abs,
+    "sqrt": np.sqrt,
+    "log": np.log,
+}
+
+_BINARY_OPERATORS: dict[type[ast.operator], Callable] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Pow: operator.pow,
+}
+
+_UNARY_OPERATORS: dict[type[ast.unaryop], Callable] = {
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+}
+
+# Longest expression accepted, to keep parsing and nesting bounded.
+MAX_SCORE_EXPRESSION_LENGTH = 500
+
+# A compiled node: takes the expression's variables, returns a value per walk.
+_Node = Callable[[dict[str, NDArray[np.float64]]], NDArray[np.float64] | float]
+
+
+class ScoreExpressionError(ValueError):
+    """Raised when a score expression is not valid."""
+
+
+def compile_score(expression: str) -> ScoreFunction:
+    """
+    Compile a score expression such as 'hills / total_hours' into a
+    ScoreFunction. The expression is parsed and checked once; only numbers,
+    the SCORE_VARIABLES, + - * / ** and the SCORE_FUNCTIONS are allowed.
+    The result is evaluated as array operations over every walk at once.
+    Walks whose score is not a finite number, e.g. after dividing by zero,
+    get NaN and rank last.
+    """
+    if len(expression) > MAX_SCORE_EXPRESSION_LENGTH:
+        raise ScoreExpressionError(
+            f"Score expression is longer than {MAX_SCORE_EXPRESSION_LENGTH} characters"
+        )
+    variables: set[str] = set()
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+        node = _compile_node(tree.body, variables)
+    except SyntaxError as e:
+        raise ScoreExpressionError(f"Invalid score expression: {e.msg}") from e
+    except RecursionError as e:
+        raise ScoreExpressionError("Score expression is nested too deeply") from e
+
+    def score(columns: WalkColumns) -> NDArray[np.float64]:
+        values = {name: SCORE_VARIABLES[name](columns) for name in variables}
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            result = np.broadcast_to(
+                np.asarray(node(values), dtype=np.float64), (len(columns),)
+            )
+        return np.where(np.isfinite(result), result, np.nan)
+
+    logger.debug(
+        "Compiled score expression",
+        extra={"expression": expression, "variables": sorted(variables)},
+    )
+    return score
+
+
+def _compile_node(node: ast.AST, variables: set[str]) -> _Node:
+    """Turn one checked expression node into a function over the variables."""
+    match node:
+        case ast.Constant(value=bool()):
+            pass
+        case ast.Constant(value=int() | float() as value):
+            return lambda values: np.float64(value)
+        case ast.Name(id=name) if name in SCORE_VARIABLES:
+            variables.add(name)
+            return lambda values: values[name]
+        case ast.Name(id=name):
+            raise ScoreExpressionError(
+                f"Unknown score variable '{name}', "
+                f"expected one of: {', '.join(SCORE_VARIABLES)}"
+            )
+        case ast.BinOp(left=left, op=op, right=right) if type(op) in _BINARY_OPERATORS:
+            apply = _BINARY_OPERATORS[type(op)]
+            left_node = _compile_node(left, variables)
+            right_node = _compile_node(right, variables)
+            return lambda values: apply(left_node(values), right_node(values))
+        case ast.UnaryOp(op=op, operand=operand) if type(op) in _UNARY_OPERATORS:
+            apply = _UNARY_OPERATORS[type(op)]
+            operand_node = _compile_node(operand, variables)
+            return lambda values: apply(operand_node(values))
+        case ast.Call(func=ast.Name(id=name), args=args, keywords=[]) if (
+            name in SCORE_FUNCTIONS
+        ):
+            function = SCORE_FUNCTIONS[name]
+            arg_nodes = [_compile_node(arg, variables) for arg in args]
+            if name in ("min", "max"):
+                if len(arg_nodes) < 2:
+                    raise ScoreExpressionError(f"{name}() needs at least two values")
+                return lambda values: _reduce(function, arg_nodes, values)
+            if len(arg_nodes) != 1:
+                raise ScoreExpressionError(f"{name}() takes exactly one value")
+            (arg_node,) = arg_nodes
+            return lambda values: function(arg_node(values))
+        case ast.Call(func=ast.Name(id=name)):
+            raise ScoreExpressionError(
+                f"Unknown score function '{name}', "
+                f"expected one of: {', '.join(SCORE_FUNCTIONS)}"
+            )
+    raise ScoreExpressionError(
+        f"Unsupported syntax in score expression: {ast.unparse(node)}"
+    )
+
+
+def _reduce(
+    function: Callable[..., NDArray[np.float64]],
+    nodes: list[_Node],
+    values: dict[str, NDArray[np.float64]],
+) -> NDArray[np.float64]:
+    """Apply a two-argument function across every argument node."""
+    result = nodes[0](values)
+    for node in nodes[1:]:
+        result = function(result, node(values))
+    return result
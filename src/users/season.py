@@ -0,0 +1,198 @@
+import heapq
+import logging
+import time
+from datetime import date
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.users.data import UserData
+from src.users.dtos import SeasonDay, SeasonPlan, WalkFilters
+from src.users.hill_bitsets import WalkHillBitsets
+from src.users.ranking import RankingEngine
+from src.users.service import UsersService
+from src.utils.daylight import day_of_year, daylight_seconds
+
+logger = logging.getLogger(__name__)
+
+UNSCHEDULED = -1
+
+
+class SeasonScheduler:
+    """
+    Schedules one walk per available date over a season so the walks bag as
+    many hills the user has not bagged as possible, where a walk fits a date
+    only if its total time, walk plus return travel, fits the daylight at
+    its start on that date.
+
+    Walks are indexed by row of bits, costs and daylight; dates by column of
+    daylight. A schedule holds the walk on each date, or UNSCHEDULED.
+    """
+
+    @staticmethod
+    def plan_for_user(
+        user_id: int, dates: list[date], filters: WalkFilters | None = None
+    ) -> SeasonPlan:
+        """
+        Schedule the walks the user has directions for and that pass the
+        filters onto the dates. Daylight is computed for every walk start
+        on every date in one array operation.
+        """
+        started = time.perf_counter()
+        dates = sorted(set(dates))
+        columns = RankingEngine.load_columns(user_id, filters)
+        starts = {walk.walk_id: walk for walk in UserData.get_walk_candidates(filters)}
+        latitude = np.full(len(columns), np.nan)
+        known = np.array(
+            [int(walk_id) in starts for walk_id in columns.walk_ids], dtype=bool
+        )
+        if known.any():
+            latitude[known] = UsersService.walk_start_coordinates(
+                [starts[int(walk_id)] for walk_id in columns.walk_ids[known]]
+            )[:, 0]
+        daylight = daylight_seconds(latitude[:, None], day_of_year(dates)[None, :])
+
+        bitsets = WalkHillBitsets.load()
+        bagged = bitsets.hill_mask(UserData.get_bagged_hill_ids(user_id))
+        bits = bitsets.walk_bits(columns.walk_ids) & ~bagged
+        costs = columns.total_seconds
+
+        schedule = SeasonScheduler.schedule(bits, costs, daylight)
+        plan = SeasonScheduler._build_plan(
+            user_id, dates, schedule, columns.walk_ids, bits, costs, daylight
+        )
+        logger.info(
+            "Planned season",
+            extra={
+                "user_id": user_id,
+                "dates": len(dates),
+                "candidate_walks": len(columns),
+                "scheduled_walks": int(np.count_nonzero(schedule != UNSCHEDULED)),
+                "new_hills": plan.new_hills,
+                "elapsed_seconds": round(time.perf_counter() - started, 3),
+            },
+        )
+        return plan
+
+    @staticmethod
+    def schedule(
+        bits: NDArray[np.uint64],
+        costs: NDArray[np.float64],
+        daylight: NDArray[np.float64],
+    ) -> NDArray[np.int64]:
+        """
+        Lazy greedy over walks by hills still to bag, cheaper walks first on
+        ties, keeping a walk only if the walks kept so far can still all be
+        given distinct dates they fit. That is checked by growing a
+        bipartite matching with one augmenting path per walk, so earlier
+        walks move to other dates to make room. A walk that does not fit
+        the matching never will as it grows, so it is dropped for good.
+        """
+        fits = costs[:, None] <= daylight
+        gains = WalkHillBitsets.popcount(bits)
+        heap = [
+            (-int(gains[walk]), float(costs[walk]), int(walk))
+            for walk in np.flatnonzero((gains > 0) & fits.any(axis=1))
+        ]
+        heapq.heapify(heap)
+        schedule = np.full(daylight.shape[1], UNSCHEDULED, dtype=np.int64)
+        covered = np.zeros(bits.shape[1], dtype=np.uint64)
+        while heap and (schedule == UNSCHEDULED).any():
+            stale_gain, cost, walk = heapq.heappop(heap)
+            gain = int(WalkHillBitsets.popcount(bits[walk] & ~covered))
+            if gain == 0:
+                continue
+            if gain < -stale_gain:
+                heapq.heappush(heap, (-gain, cost, walk))
+                continue
+            if SeasonScheduler._augment(walk, fits, daylight, schedule):
+                covered |= bits[walk]
+        return schedule
+
+    @staticmethod
+    def _augment(
+        walk: int,
+        fits: NDArray[np.bool_],
+        daylight: NDArray[np.float64],
+        schedule: NDArray[np.int64],
+    ) -> bool:
+        """
+        Give the walk a date by an augmenting path, moving the scheduled
+        walks along it to other dates they fit. Dates with the least
+        daylight are tried first, to keep the long days for the walks that
+        need them. The depth-first search keeps its own stack, so a path
+        through every date can't hit the recursion limit.
+        """
+        visited = np.zeros(schedule.size, dtype=bool)
+        # A walk on the path, its dates in the order to try, and the next one.
+        stack = [(walk, SeasonScheduler._dates_to_try(walk, fits, daylight), 0)]
+        # path_days[k] is the date the walk in stack[k] would move to.
+        path_days: list[int] = []
+        while stack:
+            current, dates, next_date = stack[-1]
+            if next_date == dates.size:
+                stack.pop()
+                if path_days:
+                    path_days.pop()
+                continue
+            stack[-1] = (current, dates, next_date + 1)
+            day = int(dates[next_date])
+            if visited[day]:
+                continue
+            visited[day] = True
+            if schedule[day] == UNSCHEDULED:
+                for (path_walk, _, _), path_day in zip(stack, [*path_days, day]):
+                    schedule[path_day] = path_walk
+                return True
+            path_days.append(day)
+            occupant = int(schedule[day])
+            stack.append(
+                (occupant, SeasonScheduler._dates_to_try(occupant, fits, daylight), 0)
+            )
+        return False
+
+    @staticmethod
+    def _dates_to_try(
+        walk: int, fits: NDArray[np.bool_], daylight: NDArray[np.float64]
+    ) -> NDArray[np.intp]:
+        """Dates the walk fits, least daylight first."""
+        dates = np.flatnonzero(fits[walk])
+        return dates[np.argsort(daylight[walk, dates], kind="stable")]
+
+    @staticmethod
+    def _build_plan(
+        user_id: int,
+        dates: list[date],
+        schedule: NDArray[np.int64],
+        walk_ids: NDArray[np.int64],
+        bits: NDArray[np.uint64],
+        costs: NDArray[np.float64],
+        daylight: NDArray[np.float64],
+    ) -> SeasonPlan:
+        """Turn the schedule into a SeasonPlan with walk details, by date."""
+        scheduled = [int(walk) for walk in schedule if walk != UNSCHEDULED]
+        records = UserData.get_user_walks_travel_info_for_walks(
+            user_id, [int(walk_ids[walk]) for walk in scheduled]
+        )
+        covered = np.zeros(bits.shape[1], dtype=np.uint64)
+        days = []
+        for column, (day, walk) in enumerate(zip(dates, schedule)):
+            if walk == UNSCHEDULED:
+                days.append(SeasonDay(day=day))
+                continue
+            record = records[int(walk_ids[walk])]
+            record.total_time_seconds = int(costs[walk])
+            days.append(
+                SeasonDay(
+                    day=day,
+                    walk=record,
+                    daylight_seconds=int(daylight[walk, column]),
+                    new_hills=int(WalkHillBitsets.popcount(bits[walk] & ~covered)),
+                )
+            )
+            covered |= bits[walk]
+        return SeasonPlan(
+            days=days,
+            new_hills=int(WalkHillBitsets.popcount(covered)),
+            total_seconds=int(costs[scheduled].sum()) if scheduled else 0,
+        )
@@ -1,13 +1,39 @@
+import csv
+import json
 import logging
+from collections.abc import Iterable, Iterator, Mapping
+from pathlib import Path
+
+import numpy as np
+from numpy.typing import NDArray
 
 # from src.users.dtos import LatLon, UserTotalWalkTravel, UserWalkTimes
 from src.maps.dtos import MapsResponseDTO
+from src.maps.estimator import TravelTimeEstimator
 from src.users.data import UserData
-from src.users.dtos import LatLon, UserWalkTravelInfo
+from src.users.dtos import (
+    CompletionPlan,
+    GroupWalkRecord,
+    LatLon,
+    SeasonPlan,
+    TripPlan,
+    UserImportResult,
+    UserWalkTravelRecord,
+    WalkCandidateRecord,
+    WalkDirectionsPlan,
+    WalkFilters,
+)
+from src.users.ranking import RankingEngine, ScoreFunction
 from src.utils import distance, time
+from src.walkhighlands.api import WalkhighlandsAPI
 
 logger = logging.getLogger(__name__)
 
+GROUP_AGGREGATES = ("max", "sum", "weighted")
+# Share of the slowest member's time in the weighted group score; the rest
+# is the members' mean time.
+DEFAULT_GROUP_MAX_WEIGHT = 0.5
+
 
 class UsersService:
     @staticmethod
@@ -23,6 +49,61 @@ class UsersService:
             logger.debug(f"Invalid location format: {location}")
             return False
 
+    @staticmethod
+    def read_user_import(path: str | Path) -> list[UserImportResult]:
+        """
+        Read the users to import from a CSV with name and postcode columns,
+        or from JSONL with a name and postcode object per line. Rows missing
+        either field are returned as invalid, the rest as pending.
+        """
+        path = Path(path)
+        with open(path, newline="", encoding="utf-8-sig") as import_file:
+            if path.suffix.lower() in (".jsonl", ".ndjson"):
+                rows = UsersService._read_jsonl_rows(import_file)
+            else:
+                rows = (
+                    (line, row)
+                    for line, row in enumerate(csv.DictReader(import_file), start=2)
+                )
+            results = []
+            for line, row in rows:
+                name = str(row.get("name") or "").strip()
+                postcode = str(row.get("postcode") or "").strip()
+                result = UserImportResult(line=line, name=name, postcode=postcode)
+                if not name or not postcode:
+                    result.status = "invalid"
+                    result.message = "A name and postcode are required."
+                results.append(result)
+        return results
+
+    @staticmethod
+    def _read_jsonl_rows(lines: Iterable[str]) -> Iterator[tuple[int, dict]]:
+        """Yield (line number, object) for each non-blank JSONL line."""
+        for line, text in enumerate(lines, start=1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except json.JSONDecodeError:
+                row = None
+            yield line, row if isinstance(row, dict) else {}
+
+    @staticmethod
+    def display_user_import_report(results: Iterable[UserImportResult]) -> None:
+        """Display the outcome of each row of a bulk user import and a summary."""
+        counts: dict[str, int] = {}
+        for result in results:
+            counts[result.status] = counts.get(result.status, 0) + 1
+            message = f" - {result.message}" if result.message else ""
+            print(
+                f"Line {result.line}: {result.name or '?'} ({result.postcode or '?'}) "
+                f"{result.status}{message}"
+            )
+        print("==================================================")
+        print(
+            ", ".join(f"{status}: {count}" for status, count in sorted(counts.items()))
+        )
+
     @staticmethod
     def save_walk_directions_for_user(
         user_id: int, walk_id: int, map_response: MapsResponseDTO
@@ -33,49 +114,267 @@ class UsersService:
         UserData.save_walk_directions(user_id, walk_id, map_response)
 
     @staticmethod
-    def calculate_user_total_times(user_id: int) -> list[UserWalkTravelInfo]:
+    def save_walk_directions_batch_for_user(
+        user_id: int, map_responses: Mapping[int, MapsResponseDTO]
+    ) -> None:
         """
-        Calculate the total time for each walk for a user by summing the
-        walk duration with twice the travel time (their and back).
+        Save the walking directions for a user to many walks at once, keyed
+        by walk id.
         """
-        walk_travel_infos = UserData.get_user_walks_travel_info(user_id)
-        for walk in walk_travel_infos:
-            total_time = (
-                walk.walk_info.walk_duration_seconds
-                + 2 * walk.travel_info.duration_seconds
+        UserData.save_walk_directions_batch(user_id, map_responses)
+
+    @staticmethod
+    def get_optimal_user_walks(
+        user_id: int,
+        number_of_routes: int,
+        ascending: bool = True,
+        filters: WalkFilters | None = None,
+        score: ScoreFunction | None = None,
+    ) -> list[UserWalkTravelRecord]:
+        """
+        Get the walks for a user that pass the filters, ranked by total time,
+        or by the score function when given, and limited to the requested
+        number of routes.
+        """
+        return list(
+            RankingEngine.iter_ranked_user_walks(
+                user_id, number_of_routes, ascending, filters, score
             )
-            walk.total_time_seconds = total_time
-        return walk_travel_infos
+        )
+
+    @staticmethod
+    def get_pareto_user_walks(
+        user_id: int,
+        objectives: list[str],
+        filters: WalkFilters | None = None,
+    ) -> list[UserWalkTravelRecord]:
+        """
+        Get the walks for a user that pass the filters and that no other
+        walk beats on every one of the objectives, ordered by the first.
+        """
+        return list(RankingEngine.iter_pareto_user_walks(user_id, objectives, filters))
+
+    @staticmethod
+    def iter_ranked_user_walks(
+        user_id: int, count: int | None = None, ascending: bool = True
+    ) -> Iterator[UserWalkTravelRecord]:
+        """
+        Stream the user's walks ranked by total time, limited to count when
+        given, without holding every walk's details in memory.
+        """
+        return RankingEngine.iter_ranked_user_walks(
+            user_id, count, ascending, WalkFilters(min_hills=0)
+        )
+
+    @staticmethod
+    def get_optimal_group_walks(
+        members: Mapping[str, int],
+        number_of_routes: int,
+        ascending: bool = True,
+        filters: WalkFilters | None = None,
+        aggregate: str = "max",
+        max_weight: float = DEFAULT_GROUP_MAX_WEIGHT,
+    ) -> list[GroupWalkRecord]:
+        """
+        Rank the walks every member of a group, given as user name to id,
+        has directions for by an aggregate of the members' total times (see
+        aggregate_group_totals), limited to the requested number of routes.
+        The members' ranking columns are read together, sliced from the
+        travel matrix once it is built, and the scoring and ranking are done
+        as array operations over all walks at once.
+        """
+        names = list(members)
+        member_columns = RankingEngine.load_group_columns(
+            [members[name] for name in names], filters
+        )
+        common = member_columns[0].walk_ids if member_columns else np.empty(0)
+        for columns in member_columns[1:]:
+            common = np.intersect1d(common, columns.walk_ids, assume_unique=True)
+        logger.debug(
+            "Walks every group member has directions for",
+            extra={"members": names, "walks": common.size},
+        )
+        if common.size == 0:
+            return []
+
+        totals = np.empty((len(names), common.size), dtype=np.float64)
+        for row, columns in enumerate(member_columns):
+            # Walk ids are sorted, so each common walk is found by bisection.
+            totals[row] = columns.total_seconds[
+                np.searchsorted(columns.walk_ids, common)
+            ]
+        scores = UsersService.aggregate_group_totals(totals, aggregate, max_weight)
+        top = RankingEngine.top_indices(scores, number_of_routes, ascending)
+        details = UserData.get_user_walks_travel_info_for_walks(
+            members[names[0]], common[top].tolist()
+        )
+        group_walks = []
+        for column in top:
+            walk = details[int(common[column])]
+            walk.total_time_seconds = int(totals[0, column])
+            group_walks.append(
+                GroupWalkRecord(
+                    walk=walk,
+                    score_seconds=float(scores[column]),
+                    member_total_seconds={
+                        name: int(totals[row, column]) for row, name in enumerate(names)
+                    },
+                )
+            )
+        return group_walks
+
+    @staticmethod
+    def aggregate_group_totals(
+        totals: NDArray[np.float64],
+        aggregate: str = "max",
+        max_weight: float = DEFAULT_GROUP_MAX_WEIGHT,
+    ) -> NDArray[np.float64]:
+        """
+        Score every walk from a members x walks array of total times: the
+        slowest member's time ('max'), the group's combined time ('sum'), or
+        max_weight times the slowest plus the rest times the mean
+        ('weighted').
+        """
+        match aggregate:
+            case "max":
+                return totals.max(axis=0)
+            case "sum":
+                return totals.sum(axis=0)
+            case "weighted":
+                if not 0 <= max_weight <= 1:
+                    raise ValueError("max_weight must be between 0 and 1.")
+                return max_weight * totals.max(axis=0) + (1 - max_weight) * totals.mean(
+                    axis=0
+                )
+            case _:
+                raise ValueError(f"Unsupported group aggregate: {aggregate}")
+
+    @staticmethod
+    def fit_travel_estimator() -> TravelTimeEstimator:
+        """
+        Fit a travel time estimator from every route already stored for any
+        user, falling back to the default calibration when there are none.
+        """
+        samples = UserData.get_travel_samples()
+        if not samples:
+            return TravelTimeEstimator()
+        origins = np.array(
+            [UsersService._parse_lat_lon(sample.user_location) for sample in samples]
+        )
+        destinations = np.array(
+            [
+                UsersService._parse_lat_lon(
+                    WalkhighlandsAPI.parse_start_location(sample.walk_start_location)
+                )
+                for sample in samples
+            ]
+        )
+        return TravelTimeEstimator.fit(
+            origins[:, 0],
+            origins[:, 1],
+            destinations[:, 0],
+            destinations[:, 1],
+            [sample.distance_meters for sample in samples],
+            [sample.duration_seconds for sample in samples],
+            [sample.region for sample in samples],
+        )
+
+    @staticmethod
+    def walk_start_coordinates(
+        candidates: list[WalkCandidateRecord],
+    ) -> NDArray[np.float64]:
+        """The start of each candidate walk as a row of (lat, lon)."""
+        return np.array(
+            [
+                UsersService._parse_lat_lon(
+                    WalkhighlandsAPI.parse_start_location(walk.walk_start_location)
+                )
+                for walk in candidates
+            ],
+            dtype=np.float64,
+        ).reshape(-1, 2)
+
+    @staticmethod
+    def estimate_walk_total_times(
+        estimator: TravelTimeEstimator,
+        location: LatLon,
+        candidates: list[WalkCandidateRecord],
+    ) -> tuple[NDArray[np.float64], NDArray[np.float64]]:
+        """
+        Estimate the total time (walk plus return travel) for each candidate
+        from the user's location, along with a lower bound on that total.
+        """
+        if not candidates:
+            return np.empty(0), np.empty(0)
+        starts = UsersService.walk_start_coordinates(candidates)
+        regions = [walk.region for walk in candidates]
+        walk_seconds = np.array(
+            [walk.walk_duration_seconds for walk in candidates], dtype=np.float64
+        )
+        estimated = estimator.estimate_seconds(
+            location.lat, location.lon, starts[:, 0], starts[:, 1], regions
+        )
+        lower_bound = estimator.lower_bound_seconds(
+            location.lat, location.lon, starts[:, 0], starts[:, 1]
+        )
+        return walk_seconds + 2 * estimated, walk_seconds + 2 * lower_bound
+
+    @staticmethod
+    def select_walks_to_fetch(
+        estimated_totals: NDArray[np.float64],
+        lower_bound_totals: NDArray[np.float64],
+        known_totals: Iterable[float],
+        top_n: int,
+        limit: int,
+    ) -> NDArray[np.intp]:
+        """
+        Pick the candidates to fetch real directions for next, as indices
+        into the estimate arrays. A candidate can only reach the top N if its
+        lower bound is within the N-th best total already known, so the rest
+        are never fetched. Up to limit of the remaining candidates are
+        returned, best estimate first.
+        """
+        known = np.sort(np.fromiter(known_totals, dtype=np.float64))
+        threshold = known[top_n - 1] if known.size >= top_n else np.inf
+        contenders = np.flatnonzero(lower_bound_totals <= threshold)
+        order = np.argsort(estimated_totals[contenders], kind="stable")
+        return contenders[order[:limit]]
+
+    @staticmethod
+    def _parse_lat_lon(location: str) -> tuple[float, float]:
+        """Parse a "lat,lon" string into a (lat, lon) tuple."""
+        latitude, longitude = map(float, location.split(","))
+        return latitude, longitude
 
     @staticmethod
     def display_user_walk_travel_info(
-        walk_travel_infos: list[UserWalkTravelInfo],
+        walk_travel_infos: Iterable[UserWalkTravelRecord],
     ) -> None:
         """
         Display the user's walk and travel information in a user-friendly format.
         """
         for walk in walk_travel_infos:
             print("==================================================")
-            print(f"Walk Name: {walk.walk_info.walk_name}")
-            print(f"URL: {walk.walk_info.walk_url}")
-            print(f"Start Location: {walk.walk_info.walk_start_location}")
+            print(f"Walk Name: {walk.walk_name}")
+            print(f"URL: {walk.walk_url}")
+            print(f"Start Location: {walk.walk_start_location}")
             print(
-                f"Distance: {distance.meters_to_kilometers(walk.walk_info.walk_distance_meters):.2f} km"
+                f"Distance: {distance.meters_to_kilometers(walk.walk_distance_meters):.2f} km"
             )
-            print(f"Ascent: {walk.walk_info.walk_ascent_meters} m")
+            print(f"Ascent: {walk.walk_ascent_meters} m")
             print(
                 "Duration: "
-                f"{time.user_display_time_hours(time_seconds=walk.walk_info.walk_duration_seconds)}"
+                f"{time.user_display_time_hours(time_seconds=walk.walk_duration_seconds)}"
             )
-            print(f"Number of Hills: {walk.walk_info.number_of_hills}")
-            print(f"Hills: {', '.join(walk.walk_info.hills)}")
+            print(f"Number of Hills: {walk.number_of_hills}")
+            print(f"Hills: {', '.join(walk.hills)}")
             print("--------------------------------------------------")
             print("Travel Information:")
             print(
-                f"  Travel Time: {time.user_display_time_hours(time_seconds=walk.travel_info.duration_seconds)}"
+                f"  Travel Time: {time.user_display_time_hours(time_seconds=walk.travel_duration_seconds)}"
             )
             print(
-                f"  Travel Distance: {distance.meters_to_kilometers(walk.travel_info.distance_meters):.2f} km"
+                f"  Travel Distance: {distance.meters_to_kilometers(walk.travel_distance_meters):.2f} km"
             )
             print("--------------------------------------------------")
             print("Total Trip Information:")
@@ -83,4 +382,138 @@ class UsersService:
                 print(
                     f"  Total Time: {time.user_display_time_hours(time_seconds=walk.total_time_seconds)}"
                 )
+            if walk.score is not None:
+                print(f"  Score: {walk.score:.2f}")
             print("==================================================")
+
+    @staticmethod
+    def display_group_walks(walks: Iterable[GroupWalkRecord]) -> None:
+        """Display the walks ranked for a group with each member's total time."""
+        for group_walk in walks:
+            walk = group_walk.walk
+            print("==================================================")
+            print(f"Walk Name: {walk.walk_name}")
+            print(f"URL: {walk.walk_url}")
+            print(f"Start Location: {walk.walk_start_location}")
+            print(
+                "Duration: "
+                f"{time.user_display_time_hours(time_seconds=walk.walk_duration_seconds)}"
+            )
+            print(f"Hills: {', '.join(walk.hills)}")
+            print("--------------------------------------------------")
+            print(
+                "Group Score: "
+                f"{time.user_display_time_hours(time_seconds=int(group_walk.score_seconds))}"
+            )
+            for name, total_seconds in group_walk.member_total_seconds.items():
+                print(
+                    f"  {name}: {time.user_display_time_hours(time_seconds=total_seconds)}"
+                )
+            print("==================================================")
+
+    @staticmethod
+    def display_completion_plan(plan: CompletionPlan) -> None:
+        """Display the walks planned to bag a user's remaining hills."""
+        print("==================================================")
+        print(f"Remaining Hills: {plan.remaining_hills}")
+        print(f"Walks: {len(plan.walks)}")
+        print(
+            "Total Time: "
+            f"{time.user_display_time_hours(time_seconds=plan.total_seconds)}"
+        )
+        if plan.proved_optimal:
+            print("Proved optimal")
+        if plan.uncovered_hills:
+            print(
+                f"Not reached by any walk with directions: "
+                f"{', '.join(plan.uncovered_hills)}"
+            )
+        for walk in plan.walks:
+            print("--------------------------------------------------")
+            print(f"Walk Name: {walk.walk_name}")
+            print(f"URL: {walk.walk_url}")
+            print(f"Hills: {', '.join(walk.hills)}")
+            if walk.total_time_seconds is not None:
+                print(
+                    "Total Time: "
+                    f"{time.user_display_time_hours(time_seconds=walk.total_time_seconds)}"
+                )
+        print("==================================================")
+
+    @staticmethod
+    def display_season_plan(plan: SeasonPlan) -> None:
+        """Display the walk scheduled on each available date of a season."""
+        print("==================================================")
+        print(f"Dates: {len(plan.days)}")
+        print(f"Walks: {sum(day.walk is not None for day in plan.days)}")
+        print(f"New Hills: {plan.new_hills}")
+        print(
+            "Total Time: "
+            f"{time.user_display_time_hours(time_seconds=plan.total_seconds)}"
+        )
+        for day in plan.days:
+            print("--------------------------------------------------")
+            if day.walk is None:
+                print(f"{day.day.isoformat()}: no walk")
+                continue
+            print(f"{day.day.isoformat()}: {day.walk.walk_name}")
+            print(f"  URL: {day.walk.walk_url}")
+            print(f"  Hills: {', '.join(day.walk.hills)}")
+            print(f"  New Hills: {day.new_hills}")
+            if day.walk.total_time_seconds is not None:
+                print(
+                    "  Total Time: "
+                    f"{time.user_display_time_hours(time_seconds=day.walk.total_time_seconds)}"
+                )
+            if day.daylight_seconds is not None:
+                print(
+                    "  Daylight: "
+                    f"{time.user_display_time_hours(time_seconds=day.daylight_seconds)}"
+                )
+        print("==================================================")
+
+    @staticmethod
+    def display_trip_plan(plan: TripPlan) -> None:
+        """Display the walks planned for each day of a trip from a base."""
+        print("==================================================")
+        print(f"Base: {plan.base.lat:.4f},{plan.base.lon:.4f}")
+        print(f"Days: {len(plan.days)}")
+        print(f"New Hills: {plan.new_hills}")
+        print(
+            "Total Time: "
+            f"{time.user_display_time_hours(time_seconds=plan.total_seconds)}"
+        )
+        for number, day in enumerate(plan.days, start=1):
+            print("--------------------------------------------------")
+            print(
+                f"Day {number}: "
+                f"{time.user_display_time_hours(time_seconds=day.total_seconds)}, "
+                "driving "
+                f"{time.user_display_time_hours(time_seconds=day.drive_seconds)}"
+            )
+            for walk in day.walks:
+                print(f"  Walk Name: {walk.walk_name}")
+                print(f"  URL: {walk.walk_url}")
+                print(f"  Hills: {', '.join(walk.hills)}")
+                print(f"  New Hills: {walk.new_hills}")
+                print(
+                    "  Drive: "
+                    f"{time.user_display_time_hours(time_seconds=walk.drive_seconds)}, "
+                    "Walk: "
+                    f"{time.user_display_time_hours(time_seconds=walk.walk_duration_seconds)}"
+                )
+        print("==================================================")
+
+    @staticmethod
+    def display_walk_directions_plan(plan: WalkDirectionsPlan) -> None:
+        """Display what fetching a user's missing walk directions would cost."""
+        lookup_plan = plan.lookup_plan
+        print("==================================================")
+        print(f"User: {plan.user}")
+        print(f"Walks missing directions: {plan.missing_walks}")
+        print(f"Route lookups (shared trailheads merged): {lookup_plan.lookups}")
+        print(f"  Cached: {lookup_plan.cached}")
+        print(f"  Uncached: {lookup_plan.uncached}")
+        print(f"Maps requests ({lookup_plan.backend}): {lookup_plan.requests}")
+        print(f"Estimated cost: {lookup_plan.estimated_cost:.2f}")
+        print("==================================================")
@@ -1,4 +1,13 @@
-from src.users.dtos import UserWalkTravelInfo, WalkInfo, TravelInfo
+import numpy as np
+from numpy.typing import NDArray
+
+from src.users.dtos import (
+    UserWalkTravelInfo,
+    UserWalkTravelRecord,
+    WalkInfo,
+    TravelInfo,
+)
+from src.users.hill_bitsets import WalkHillBitsets
 
 
 def create_user_walk_travel_info(
@@ -37,3 +46,45 @@ def create_user_walk_travel_info(
         ),
         total_time_seconds=total_time_seconds,
     )
+
+
+def create_user_walk_travel_record(
+    user_id: int = 1,
+    walk_id: int = 1,
+    walk_name: str = "Test Walk",
+    walk_start_location: str = "55.9533,-3.1883",
+    walk_ascent_meters: int = 500,
+    walk_distance_meters: int = 10000,
+    walk_duration_seconds: int = 18000,
+    walk_url: str = "http://test.com",
+    hills: list[str] | None = None,
+    travel_distance_meters: int = 20000,
+    travel_duration_seconds: int = 3600,
+    total_time_seconds: int | None = 21600,
+    score: float | None = None,
+) -> UserWalkTravelRecord:
+    if hills is None:
+        hills = ["Test Hill"]
+    return UserWalkTravelRecord(
+        user_id=user_id,
+        walk_id=walk_id,
+        walk_name=walk_name,
+        walk_start_location=walk_start_location,
+        walk_ascent_meters=walk_ascent_meters,
+        walk_distance_meters=walk_distance_meters,
+        walk_duration_seconds=walk_duration_seconds,
+        walk_url=walk_url,
+        hills=hills,
+        travel_distance_meters=travel_distance_meters,
+        travel_duration_seconds=travel_duration_seconds,
+        total_time_seconds=total_time_seconds,
+        score=score,
+    )
+
+
+def make_walk_bits(walk_hills: list[list[int]]) -> NDArray[np.uint64]:
+    """Hill bitsets of walks 0, 1, ... each on the given hill ids."""
+    bitsets = WalkHillBitsets.from_pairs(
+        [(walk, hill) for walk, hills in enumerate(walk_hills) for hill in hills]
+    )
+    return bitsets.walk_bits(np.arange(len(walk_hills)))
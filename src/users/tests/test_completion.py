@@ -0,0 +1,77 @@
+import numpy as np
+
+from src.users.completion import CompletionPlanner
+from src.users.tests.factories import make_walk_bits
+
+
+def make_instance(walk_hills):
+    bits = make_walk_bits(walk_hills)
+    return bits, np.bitwise_or.reduce(bits, axis=0)
+
+
+def total(costs, chosen):
+    return float(costs[chosen].sum())
+
+
+def test_greedy_covers_every_hill():
+    bits, target = make_instance([[1, 2, 3], [1], [2], [3], [4]])
+    costs = np.array([5.0, 1.0, 1.0, 1.0, 2.0])
+
+    chosen = CompletionPlanner.greedy(bits, costs, target)
+
+    assert sorted(chosen) == [1, 2, 3, 4]
+    assert total(costs, chosen) == 5
+
+
+def test_improve_replaces_a_pair_with_one_walk():
+    # Greedy takes the cheap-per-hill walks 0 and 1, then needs walk 2 for
+    # hill 5; walk 3 alone covers what only walks 1 and 2 add.
+    bits, target = make_instance([[1, 2, 3], [4], [5], [4, 5]])
+    costs = np.array([3.0, 1.0, 4.0, 4.5])
+
+    greedy = CompletionPlanner.greedy(bits, costs, target)
+    improved = CompletionPlanner.improve(bits, costs, greedy, target)
+
+    assert total(costs, greedy) == 8
+    assert sorted(improved) == [0, 3]
+    assert total(costs, improved) == 7.5
+
+
+def test_remove_redundant_drops_dearest_covered_walk():
+    bits, target = make_instance([[1, 2], [1], [2]])
+    costs = np.array([5.0, 1.0, 1.0])
+
+    assert sorted(
+        CompletionPlanner.remove_redundant(bits, costs, [0, 1, 2], target)
+    ) == [
+        1,
+        2,
+    ]
+
+
+def test_branch_and_bound_finds_optimum_greedy_misses():
+    # Greedy starts with the walk covering most hills per hour, which the
+    # optimal plan of two walks does without.
+    bits, target = make_instance([[1, 2, 3, 4], [1, 2, 5], [3, 4, 6], [5], [6]])
+    costs = np.array([4.0, 3.1, 3.1, 3.0, 3.0])
+    heuristic = CompletionPlanner.improve(
+        bits, costs, CompletionPlanner.greedy(bits, costs, target), target
+    )
+
+    chosen, proved = CompletionPlanner.branch_and_bound(bits, costs, target, heuristic)
+
+    assert proved
+    assert sorted(chosen) == [1, 2]
+    assert total(costs, chosen) <= total(costs, heuristic)
+
+
+def test_branch_and_bound_node_limit_keeps_incumbent():
+    bits, target = make_instance([[1, 2], [1], [2]])
+    costs = np.array([5.0, 1.0, 1.0])
+
+    chosen, proved = CompletionPlanner.branch_and_bound(
+        bits, costs, target, [0], node_limit=0
+    )
+
+    assert not proved
+    assert chosen == [0]
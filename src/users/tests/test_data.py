@@ -1,9 +1,20 @@
+from datetime import date
+
 import pytest
 from unittest.mock import patch, MagicMock
 import sqlite3
 from src.users.data import UserData
+from src.users.completion import CompletionPlanner
+from src.users.ranking import RankingEngine
+from src.users.season import SeasonScheduler
+from src.users.travel_matrix import TravelMatrix
+from src.users.trip import TripPlanner
+from src.maps.estimator import TravelTimeEstimator
+from src.walkhighlands.data.hill_data import WalkhighlandsData
+from src.walkhighlands.dtos import WalkStartLocationRecord
 from src.users.dtos import (
     LatLon,
+    WalkFilters,
 )
 
 
@@ -55,6 +66,23 @@ def test_save_and_fetch_user_data(mock_db_api):
     assert fetched_location == location
 
 
+def test_save_users_batch(mock_db_api):
+    UserData.create_user_table()
+    UserData.save_user_data("existing", LatLon(lat=56.0, lon=-4.0))
+
+    inserted = UserData.save_users_batch(
+        [
+            ("existing", LatLon(lat=57.0, lon=-5.0)),
+            ("new_user", LatLon(lat=55.9, lon=-3.2)),
+        ]
+    )
+
+    assert inserted == {"new_user"}
+    assert UserData.get_user_names() == {"existing", "new_user"}
+    _, existing_location = UserData.fetch_user_location("existing")
+    assert existing_location == LatLon(lat=56.0, lon=-4.0)
+
+
 def test_fetch_user_location_not_found(mock_db_api):
     UserData.create_user_table()
     name = "non_existent_user"
@@ -129,37 +157,21 @@ def test_save_walk_directions_duplicate(mock_db_api):
         )
 
 
-def test_get_user_walks_travel_info(mock_db_api):
+@pytest.fixture
+def walk_travel_data(mock_db_api):
     conn = mock_db_api.db_connection.return_value.__enter__.return_value
     cursor = conn.cursor()
 
     # Create tables
     UserData.create_user_table()
     UserData.create_user_walk_directions_table()
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS walks (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT, url TEXT, grade INTEGER,
-            bog_factor INTEGER, user_rating REAL, distance REAL, time REAL,
-            ascent INTEGER, start_grid_ref TEXT, start_location TEXT
-        )
-    """
-    )
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS hills (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT, name TEXT,
-            region TEXT, altitude INTEGER
-        )
-    """
-    )
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS walk_hill_decomposition (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, hill_id INTEGER, walk_id INTEGER
-        )
-    """
-    )
+    with patch(
+        "src.walkhighlands.data.hill_data.DatabaseAPI", return_value=mock_db_api
+    ):
+        WalkhighlandsData.create_walk_data_table()
+        WalkhighlandsData.create_hill_data_table()
+        WalkhighlandsData.create_walk_hill_decomp_table()
+        WalkhighlandsData.create_walk_hill_summary_table()
 
     # Insert test data
     cursor.execute(
@@ -190,35 +202,351 @@ def test_get_user_walks_travel_info(mock_db_api):
         "INSERT INTO user_walk_directions (user_id, walk_id, distance, duration) VALUES (1, 2, 200, 2000)"
     )
     conn.commit()
+    return conn
+
+
+@pytest.fixture
+def ranked_walk_travel_data(walk_travel_data):
+    cursor = walk_travel_data.cursor()
+    cursor.execute(
+        "INSERT INTO walks (id, title, url, grade, bog_factor, user_rating, distance, time, ascent, start_grid_ref, start_location) VALUES (3, 'Test Walk 3', 'http://walk3.com', 4, 2, 4, 12.0, 1.0, 900, 'NN111111', 'http://start.com/3')"
+    )
+    cursor.execute(
+        "INSERT INTO walk_hill_decomposition (walk_id, hill_id) VALUES (3, 101)"
+    )
+    cursor.execute(
+        "INSERT INTO user_walk_directions (user_id, walk_id, distance, duration) VALUES (1, 3, 300, 500)"
+    )
+    walk_travel_data.commit()
+
+    return walk_travel_data
+
+
+def test_ranked_user_walks(ranked_walk_travel_data):
+    result = list(RankingEngine.iter_ranked_user_walks(user_id=1, count=10))
+
+    assert [walk.walk_id for walk in result] == [3, 1]
+    assert result[0].total_time_seconds == 3600 + 2 * 500
+    assert result[1].total_time_seconds == 4500 + 2 * 1000
+    assert set(result[1].hills) == {"Test Hill 1", "Test Hill 2"}
+
+    result = list(
+        RankingEngine.iter_ranked_user_walks(user_id=1, count=1, ascending=False)
+    )
+
+    assert [walk.walk_id for walk in result] == [1]
+
+
+def test_ranked_user_walks_filters(ranked_walk_travel_data):
+    def walk_ids(filters: WalkFilters) -> list[int]:
+        result = RankingEngine.iter_ranked_user_walks(1, 10, True, filters)
+        return [walk.walk_id for walk in result]
+
+    assert walk_ids(WalkFilters(min_hills=0)) == [3, 1, 2]
+    assert walk_ids(WalkFilters(min_hills=2)) == [1]
+    assert walk_ids(WalkFilters(max_grade=3)) == [1]
+    assert walk_ids(WalkFilters(max_bog_factor=1)) == [1]
+    assert walk_ids(WalkFilters(min_rating=2)) == [3]
+    assert walk_ids(WalkFilters(max_distance_km=10)) == [1]
+    assert walk_ids(WalkFilters(max_ascent_meters=500)) == [1]
+
+
+def test_pareto_user_walks(ranked_walk_travel_data):
+    result = RankingEngine.iter_pareto_user_walks(
+        1, ["total_time", "hills"], WalkFilters(min_hills=0)
+    )
+
+    assert [walk.walk_id for walk in result] == [3, 1]
+
+
+def test_bag_and_unbag_hills(walk_travel_data):
+    UserData.create_user_hills_bagged_table()
+
+    assert UserData.bag_hills(1, {101, 102}) == 2
+    assert UserData.bag_hills(1, {101}) == 0
+    assert UserData.get_bagged_hill_ids(1) == {101, 102}
+    assert UserData.unbag_hills(1, {102, 999}) == 1
+    assert UserData.get_bagged_hill_ids(1) == {101}
+    assert UserData.get_bagged_hill_ids(2) == set()
+
+
+def test_get_hill_ids_by_name(walk_travel_data):
+    result = UserData.get_hill_ids_by_name(["test hill 1", " TEST HILL 2 ", "Nope"])
+
+    assert result == {"test hill 1": [101], "test hill 2": [102]}
+    assert UserData.get_hill_ids_by_name([]) == {}
+
+
+def test_load_columns_counts_new_hills(ranked_walk_travel_data):
+    UserData.create_user_hills_bagged_table()
+    UserData.bag_hills(1, {101})
+
+    columns = RankingEngine.load_columns(1, WalkFilters(min_hills=0))
+
+    assert sorted(UserData.get_walk_hill_ids()) == [(1, 101), (1, 102), (3, 101)]
+    assert columns.walk_ids.tolist() == [1, 2, 3]
+    assert columns.new_hills.tolist() == [1, 0, 0]
+    assert columns.number_of_hills.tolist() == [2, 0, 1]
+
+    columns = RankingEngine.load_columns(1, WalkFilters(min_new_hills=1))
+
+    assert columns.walk_ids.tolist() == [1]
+
+
+def test_plan_completion_for_user(ranked_walk_travel_data):
+    UserData.create_user_hills_bagged_table()
+
+    plan = CompletionPlanner.plan_for_user(1, exact=True)
+
+    assert UserData.get_hill_names() == {101: "Test Hill 1", 102: "Test Hill 2"}
+    assert [walk.walk_id for walk in plan.walks] == [1]
+    assert plan.total_seconds == 6500
+    assert plan.remaining_hills == 2
+    assert plan.uncovered_hills == []
+    assert plan.proved_optimal
 
-    result = UserData.get_user_walks_travel_info(user_id=1)
-
-    assert len(result) == 2
-
-    walk_1_info = next((item for item in result if item.walk_info.walk_id == 1), None)
-    assert walk_1_info is not None
-    assert walk_1_info.user_id == 1
-    assert walk_1_info.walk_info.walk_name == "Test Walk 1"
-    assert walk_1_info.walk_info.number_of_hills == 2
-    assert set(walk_1_info.walk_info.hills) == {"Test Hill 1", "Test Hill 2"}
-    assert walk_1_info.walk_info.walk_distance_meters == 1500
-    assert walk_1_info.walk_info.walk_ascent_meters == 100
-    assert walk_1_info.walk_info.walk_duration_seconds == 4500
-    assert walk_1_info.walk_info.walk_url == "http://walk1.com"
-    assert walk_1_info.walk_info.walk_start_location == "http://start.com/1"
-    assert walk_1_info.travel_info.distance_meters == 100
-    assert walk_1_info.travel_info.duration_seconds == 1000
-
-    walk_2_info = next((item for item in result if item.walk_info.walk_id == 2), None)
-    assert walk_2_info is not None
-    assert walk_2_info.user_id == 1
-    assert walk_2_info.walk_info.walk_name == "Test Walk 2"
-    assert walk_2_info.walk_info.number_of_hills == 0
-    assert walk_2_info.walk_info.hills == []
-    assert walk_2_info.walk_info.walk_distance_meters == 2000
-    assert walk_2_info.walk_info.walk_ascent_meters == 200
-    assert walk_2_info.walk_info.walk_duration_seconds == 9000
-    assert walk_2_info.walk_info.walk_url == "http://walk2.com"
-    assert walk_2_info.walk_info.walk_start_location == "http://start.com/2"
-    assert walk_2_info.travel_info.distance_meters == 200
-    assert walk_2_info.travel_info.duration_seconds == 2000
+    UserData.bag_hills(1, {102})
+    plan = CompletionPlanner.plan_for_user(1)
+
+    assert [walk.walk_id for walk in plan.walks] == [3]
+    assert plan.walks[0].total_time_seconds == 4600
+    assert plan.remaining_hills == 1
+
+
+def test_plan_completion_reports_unreachable_hills(ranked_walk_travel_data):
+    UserData.create_user_hills_bagged_table()
+
+    plan = CompletionPlanner.plan_for_user(1, WalkFilters(max_distance_km=10))
+
+    assert [walk.walk_id for walk in plan.walks] == [1]
+    plan = CompletionPlanner.plan_for_user(1, WalkFilters(min_rating=2))
+
+    assert [walk.walk_id for walk in plan.walks] == [3]
+    assert plan.uncovered_hills == ["Test Hill 2"]
+
+
+def test_get_user_walk_columns(ranked_walk_travel_data):
+    columns = RankingEngine.load_columns(1, WalkFilters(min_hills=0))
+
+    assert columns.walk_ids.tolist() == [1, 2, 3]
+    assert columns.walk_distance_meters.tolist() == [1500, 2000, 12000]
+    assert columns.number_of_hills.tolist() == [2, 0, 1]
+    assert columns.total_seconds.tolist() == [6500, 13000, 4600]
+
+
+def test_load_columns_reads_travel_matrix(
+    ranked_walk_travel_data, tmp_path, monkeypatch
+):
+    monkeypatch.setenv("TRAVEL_MATRIX_DIR", str(tmp_path))
+    ranked_walk_travel_data.execute(
+        "DELETE FROM user_walk_directions WHERE walk_id = 3"
+    )
+    with patch(
+        "src.users.travel_matrix.WalkhighlandsAPI.get_walk_start_locations",
+        return_value=[
+            WalkStartLocationRecord(walk_id=walk_id, walk_start_location="56.0,-4.0")
+            for walk_id in (1, 2, 3)
+        ],
+    ):
+        TravelMatrix.refresh()
+    # Saved after the refresh, so read from the database over the matrix.
+    ranked_walk_travel_data.execute(
+        "INSERT INTO user_walk_directions (user_id, walk_id, distance, duration) VALUES (1, 3, 300, 500)"
+    )
+
+    with patch.object(UserData, "get_user_walk_columns") as mock_get_user_walk_columns:
+        columns, other = RankingEngine.load_group_columns(
+            [1, 2], WalkFilters(min_hills=0)
+        )
+
+    mock_get_user_walk_columns.assert_not_called()
+    assert columns.walk_ids.tolist() == [1, 2, 3]
+    assert columns.travel_distance_meters.tolist() == [100, 200, 300]
+    assert columns.total_seconds.tolist() == [6500, 13000, 4600]
+    assert len(other) == 0
+
+
+def test_get_user_walks_travel_info_for_walks(ranked_walk_travel_data):
+    result = UserData.get_user_walks_travel_info_for_walks(1, [3, 2, 99])
+
+    assert set(result) == {2, 3}
+    assert result[3].walk_name == "Test Walk 3"
+    assert result[3].travel_duration_seconds == 500
+
+
+def test_get_user_walks_travel_info_for_walks_hill_names_with_commas(walk_travel_data):
+    cursor = walk_travel_data.cursor()
+    cursor.execute(
+        "INSERT INTO hills (id, name, url, region, altitude) VALUES (103, 'Stob Coire Raineach, Buachaille Etive Beag', 'http://hill3.com', 'Region 1', 925)"
+    )
+    cursor.execute(
+        "INSERT INTO walk_hill_decomposition (walk_id, hill_id) VALUES (2, 103)"
+    )
+    walk_travel_data.commit()
+
+    result = UserData.get_user_walks_travel_info_for_walks(1, [2])
+
+    assert result[2].number_of_hills == 1
+    assert result[2].hills == ["Stob Coire Raineach, Buachaille Etive Beag"]
+
+
+def test_get_walk_ids_missing_directions(walk_travel_data):
+    cursor = walk_travel_data.cursor()
+    cursor.execute(
+        "INSERT INTO walks (id, title, url, grade, bog_factor, user_rating, distance, time, ascent, start_grid_ref, start_location) VALUES (3, 'Test Walk 3', 'http://walk3.com', 1, 1, 1, 1.0, 1.0, 100, 'NN111111', 'http://start.com/3')"
+    )
+    cursor.execute(
+        "INSERT INTO walks (id, title, url, grade, bog_factor, user_rating, distance, time, ascent, start_grid_ref, start_location) VALUES (4, 'Test Walk 4', 'http://walk4.com', 1, 1, 1, 1.0, 1.0, 100, 'NN222222', NULL)"
+    )
+    walk_travel_data.commit()
+
+    assert UserData.get_walk_ids_missing_directions(user_id=1) == {3}
+    assert UserData.get_walk_ids_missing_directions(user_id=2) == {1, 2, 3}
+
+
+def test_save_walk_directions_batch(mock_db_api):
+    UserData.create_user_walk_directions_table()
+    first = MagicMock(distance_meters=1000, duration_seconds=60)
+    second = MagicMock(distance_meters=2000, duration_seconds=120)
+
+    UserData.save_walk_directions_batch(1, {1: first})
+    UserData.save_walk_directions_batch(1, {1: second, 2: second})
+
+    conn = mock_db_api.db_connection.return_value.__enter__.return_value
+    rows = conn.execute(
+        "SELECT walk_id, distance, duration FROM user_walk_directions ORDER BY walk_id"
+    ).fetchall()
+    assert rows == [(1, 1000, 60), (2, 2000, 120)]
+
+
+def test_walk_direction_failures(walk_travel_data):
+    UserData.create_user_walk_direction_failures_table()
+
+    UserData.record_walk_direction_failures(user_id=2, walk_ids={1, 2})
+    UserData.record_walk_direction_failures(user_id=2, walk_ids={2})
+    UserData.record_walk_direction_failures(user_id=1, walk_ids={1})
+
+    assert UserData.get_failed_walk_ids(user_id=2) == {1, 2}
+    # Walk 1 already has directions for user 1.
+    assert UserData.get_failed_walk_ids(user_id=1) == set()
+    attempts = walk_travel_data.execute(
+        "SELECT walk_id, attempts FROM user_walk_direction_failures "
+        "WHERE user_id = 2 ORDER BY walk_id"
+    ).fetchall()
+    assert attempts == [(1, 1), (2, 2)]
+
+    UserData.clear_walk_direction_failures(user_id=2, walk_ids={2})
+
+    assert UserData.get_failed_walk_ids(user_id=2) == {1}
+
+
+def test_get_walk_candidates(ranked_walk_travel_data):
+    result = UserData.get_walk_candidates()
+
+    assert sorted(
+        (walk.walk_id, walk.walk_start_location, walk.region) for walk in result
+    ) == [
+        (1, "http://start.com/1", "Region 1"),
+        (3, "http://start.com/3", "Region 1"),
+    ]
+    assert {walk.walk_id: walk.walk_duration_seconds for walk in result} == {
+        1: 4500,
+        3: 3600,
+    }
+    assert [
+        walk.walk_id for walk in UserData.get_walk_candidates(WalkFilters(max_grade=3))
+    ] == [1]
+    assert {
+        walk.walk_id: walk.region
+        for walk in UserData.get_walk_candidates(WalkFilters(min_hills=0))
+    } == {1: "Region 1", 2: None, 3: "Region 1"}
+
+
+def test_get_travel_samples(ranked_walk_travel_data):
+    result = UserData.get_travel_samples()
+
+    assert sorted(
+        (
+            sample.user_location,
+            sample.walk_start_location,
+            sample.region,
+            sample.distance_meters,
+            sample.duration_seconds,
+        )
+        for sample in result
+    ) == [
+        ("56.0,-4.0", "http://start.com/1", "Region 1", 100, 1000),
+        ("56.0,-4.0", "http://start.com/2", None, 200, 2000),
+        ("56.0,-4.0", "http://start.com/3", "Region 1", 300, 500),
+    ]
+
+
+def test_get_trip_walks(ranked_walk_travel_data):
+    result = UserData.get_trip_walks([1, 3, 99])
+
+    assert set(result) == {1, 3}
+    assert result[1].walk_name == "Test Walk 1"
+    assert result[1].walk_duration_seconds == 4500
+    assert result[1].hills == ["Test Hill 1", "Test Hill 2"]
+    assert result[3].hills == ["Test Hill 1"]
+
+
+@patch(
+    "src.users.trip.UsersService.fit_travel_estimator",
+    return_value=TravelTimeEstimator(),
+)
+def test_plan_trip_for_user(_, ranked_walk_travel_data):
+    cursor = ranked_walk_travel_data.cursor()
+    for walk_id, location in ((1, "56.1,-4.0"), (2, "56.2,-4.0"), (3, "56.1,-4.1")):
+        cursor.execute(
+            "UPDATE walks SET start_location = ? WHERE id = ?",
+            (f"https://www.google.com/maps/search/{location}/", walk_id),
+        )
+    ranked_walk_travel_data.commit()
+    UserData.create_user_hills_bagged_table()
+    base = LatLon(lat=56.0, lon=-4.0)
+
+    plan = TripPlanner.plan_for_user(1, base, days=2, daily_budget_seconds=4 * 3600)
+
+    assert [[walk.walk_id for walk in day.walks] for day in plan.days] == [[1]]
+    assert plan.new_hills == 2
+    assert plan.days[0].walks[0].new_hills == 2
+    assert plan.days[0].drive_seconds == 2 * plan.days[0].walks[0].drive_seconds
+    assert plan.total_seconds == 4500 + plan.days[0].drive_seconds
+
+    UserData.bag_hills(1, {102})
+    plan = TripPlanner.plan_for_user(1, base, days=2, daily_budget_seconds=4 * 3600)
+
+    assert [[walk.walk_id for walk in day.walks] for day in plan.days] == [[3]]
+    assert plan.new_hills == 1
+
+
+def test_plan_season_for_user(ranked_walk_travel_data):
+    cursor = ranked_walk_travel_data.cursor()
+    cursor.execute("UPDATE walks SET time = 9 WHERE id = 1")
+    for walk_id, location in ((1, "56.8,-5.0"), (2, "56.5,-4.5"), (3, "56.4,-4.2")):
+        cursor.execute(
+            "UPDATE walks SET start_location = ? WHERE id = ?",
+            (f"https://www.google.com/maps/search/{location}/", walk_id),
+        )
+    ranked_walk_travel_data.commit()
+    UserData.create_user_hills_bagged_table()
+    dates = [date(2026, 12, 19), date(2026, 6, 20)]
+
+    plan = SeasonScheduler.plan_for_user(1, dates)
+
+    assert [day.day for day in plan.days] == sorted(dates)
+    assert plan.days[0].walk.walk_id == 1
+    assert plan.days[0].walk.total_time_seconds == 9 * 3600 + 2000
+    assert plan.days[0].daylight_seconds > 17 * 3600
+    assert plan.days[0].new_hills == plan.new_hills == 2
+    assert plan.days[1].walk is None
+
+    UserData.bag_hills(1, {102})
+    plan = SeasonScheduler.plan_for_user(1, dates)
+
+    assert plan.days[0].walk is None
+    assert plan.days[1].walk.walk_id == 3
+    assert plan.days[1].daylight_seconds < 8 * 3600
+    assert plan.new_hills == 1
+    assert plan.total_seconds == 4600
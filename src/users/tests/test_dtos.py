@@ -0,0 +1,21 @@
+from src.users.tests.factories import (
+    create_user_walk_travel_info,
+    create_user_walk_travel_record,
+)
+
+
+def test_user_walk_travel_record_to_dto():
+    record = create_user_walk_travel_record(hills=["Hill A", "Hill B"])
+
+    result = record.to_dto()
+
+    assert result == create_user_walk_travel_info(
+        number_of_hills=2, hills=["Hill A", "Hill B"]
+    )
+
+
+def test_user_walk_travel_record_has_no_instance_dict():
+    record = create_user_walk_travel_record()
+
+    assert not hasattr(record, "__dict__")
+    assert record.number_of_hills == 1
@@ -0,0 +1,46 @@
+import numpy as np
+
+from src.users.hill_bitsets import WalkHillBitsets
+
+
+def test_from_pairs():
+    bitsets = WalkHillBitsets.from_pairs([(2, 30), (1, 10), (1, 20), (2, 10)])
+
+    assert bitsets.walk_ids.tolist() == [1, 2]
+    assert bitsets.hill_ids.tolist() == [10, 20, 30]
+    assert bitsets.bits[:, 0].tolist() == [0b011, 0b101]
+
+
+def test_count_new_hills():
+    bitsets = WalkHillBitsets.from_pairs([(1, 10), (1, 20), (2, 10), (2, 30)])
+    bagged = bitsets.hill_mask({10, 99})
+
+    result = bitsets.count_new_hills(np.array([1, 2, 3]), bagged)
+
+    assert result.tolist() == [1, 1, 0]
+
+
+def test_count_new_hills_across_words():
+    pairs = [(1, hill_id) for hill_id in range(150)] + [(2, 149)]
+    bitsets = WalkHillBitsets.from_pairs(pairs)
+
+    assert bitsets.bits.shape == (2, 3)
+    walk_ids = np.array([1, 2])
+    assert bitsets.count_new_hills(walk_ids, bitsets.hill_mask([])).tolist() == [150, 1]
+    bagged = bitsets.hill_mask(range(0, 150, 2))
+    assert bitsets.count_new_hills(walk_ids, bagged).tolist() == [75, 1]
+
+
+def test_popcount():
+    bits = np.array([[0b1011, 0], [0, np.iinfo(np.uint64).max]], dtype=np.uint64)
+
+    assert WalkHillBitsets.popcount(bits).tolist() == [3, 64]
+    assert WalkHillBitsets.popcount(bits[0]) == 3
+
+
+def test_empty_bitsets():
+    bitsets = WalkHillBitsets.from_pairs([])
+
+    result = bitsets.count_new_hills(np.array([1]), bitsets.hill_mask([1]))
+
+    assert result.tolist() == [0]
@@ -0,0 +1,55 @@
+import sqlite3
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.users.dtos import LatLon
+from src.users.location_data import LocationData
+
+
+@pytest.fixture
+def mock_db_api():
+    with patch("src.users.location_data.DatabaseAPI") as MockDatabaseAPI:
+        mock_instance = MockDatabaseAPI.return_value
+        shared_conn = sqlite3.connect(":memory:")
+        mock_context_manager = MagicMock()
+        mock_context_manager.__enter__.return_value = shared_conn
+        mock_context_manager.__exit__.return_value = None
+        mock_instance.db_connection.return_value = mock_context_manager
+        yield mock_instance
+        shared_conn.close()
+
+
+@patch("src.users.location_data.POSTCODE_INSERT_BATCH_SIZE", 2)
+def test_save_and_get_postcodes(mock_db_api):
+    LocationData.create_postcodes_table()
+
+    saved = LocationData.save_postcodes(
+        iter(
+            [
+                ("EH11AA", 55.9533, -3.1883),
+                ("IV11AA", 57.48, -4.22),
+                ("PH11AA", 56.39, -3.43),
+                ("EH11AA", 55.95, -3.19),
+            ]
+        )
+    )
+
+    assert saved == 4
+    assert LocationData.get_postcode_location("EH11AA") == LatLon(lat=55.95, lon=-3.19)
+    assert LocationData.get_postcode_location("PH11AA") == LatLon(lat=56.39, lon=-3.43)
+    assert LocationData.get_postcode_location("AB11AA") is None
+
+
+def test_geocode_cache(mock_db_api):
+    LocationData.create_geocode_cache_table()
+
+    LocationData.save_cached_geocode("EH11AA", LatLon(lat=55.9533, lon=-3.1883))
+
+    assert LocationData.get_cached_geocode("EH11AA") == LatLon(lat=55.9533, lon=-3.1883)
+    assert LocationData.get_cached_geocode("IV11AA") is None
+
+
+def test_lookup_before_tables_exist_is_a_miss(mock_db_api):
+    assert LocationData.get_postcode_location("EH11AA") is None
+    assert LocationData.get_cached_geocode("EH11AA") is None
@@ -1,10 +1,29 @@
 import pytest
 from unittest.mock import patch, MagicMock
-from src.users.location_service import get_lat_lon_from_postcode
+from src.users import location_service
+from src.users.location_service import (
+    get_lat_lon_from_postcode,
+    normalise_postcode,
+    read_postcode_directory,
+)
 from src.users.dtos import LatLon
 from geopy.exc import GeocoderTimedOut, GeocoderServiceError
 
 
+@pytest.fixture(autouse=True)
+def offline_location_data():
+    with patch("src.users.location_service.LocationData") as mock_location_data:
+        mock_location_data.get_postcode_location.return_value = None
+        mock_location_data.get_cached_geocode.return_value = None
+        yield mock_location_data
+
+
+@pytest.fixture(autouse=True)
+def reset_geolocator(monkeypatch):
+    monkeypatch.setattr(location_service, "_geolocator", None)
+    monkeypatch.setattr(location_service, "_geocode_rate_limiter", MagicMock())
+
+
 @patch("src.users.location_service.Nominatim")
 def test_get_lat_lon_from_postcode_success(mock_nominatim):
     mock_geolocator = MagicMock()
@@ -64,3 +83,75 @@ def test_get_lat_lon_from_postcode_timeout_error(mock_nominatim):
     with pytest.raises(ConnectionError, match="Geocoding service error: Timed out"):
         get_lat_lon_from_postcode(postcode)
     mock_geolocator.geocode.assert_called_once_with(postcode.strip())
+
+
+@patch("src.users.location_service.Nominatim")
+def test_get_lat_lon_from_postcode_uses_postcode_directory(
+    mock_nominatim, offline_location_data
+):
+    offline_location_data.get_postcode_location.return_value = LatLon(
+        lat=55.9533, lon=-3.1883
+    )
+
+    result = get_lat_lon_from_postcode(" eh1 1aa ")
+
+    assert result == LatLon(lat=55.9533, lon=-3.1883)
+    offline_location_data.get_postcode_location.assert_called_once_with("EH11AA")
+    mock_nominatim.assert_not_called()
+
+
+@patch("src.users.location_service.Nominatim")
+def test_get_lat_lon_from_postcode_uses_geocode_cache(
+    mock_nominatim, offline_location_data
+):
+    offline_location_data.get_cached_geocode.return_value = LatLon(
+        lat=55.9533, lon=-3.1883
+    )
+
+    result = get_lat_lon_from_postcode("EH1 1AA")
+
+    assert result == LatLon(lat=55.9533, lon=-3.1883)
+    mock_nominatim.assert_not_called()
+
+
+@patch("src.users.location_service.Nominatim")
+def test_get_lat_lon_from_postcode_caches_geocoder_result(
+    mock_nominatim, offline_location_data
+):
+    mock_geolocator = mock_nominatim.return_value
+    mock_geolocator.geocode.return_value = MagicMock(latitude=57.0, longitude=-4.0)
+
+    get_lat_lon_from_postcode("PH1 1AA")
+    get_lat_lon_from_postcode("PH2 2AA")
+
+    mock_nominatim.assert_called_once()
+    offline_location_data.save_cached_geocode.assert_any_call(
+        "PH11AA", LatLon(lat=57.0, lon=-4.0)
+    )
+
+
+def test_normalise_postcode():
+    assert normalise_postcode(" eh1  1aa ") == "EH11AA"
+
+
+def test_read_postcode_directory_onspd_columns(tmp_path):
+    directory = tmp_path / "onspd.csv"
+    directory.write_text(
+        "pcd,pcds,lat,long\n"
+        "EH1 1AA,EH1 1AA,55.9533,-3.1883\n"
+        "EH991AA,EH99 1AA,99.999999,0.000000\n"
+        "PH1  1AA,PH1 1AA,,\n"
+        "IV1 1AA,IV1 1AA,57.48,-4.22\n"
+    )
+
+    rows = list(read_postcode_directory(directory))
+
+    assert rows == [("EH11AA", 55.9533, -3.1883), ("IV11AA", 57.48, -4.22)]
+
+
+def test_read_postcode_directory_missing_columns(tmp_path):
+    directory = tmp_path / "postcodes.csv"
+    directory.write_text("id,postcode\n1,EH1 1AA\n")
+
+    with pytest.raises(ValueError, match="none of the columns"):
+        list(read_postcode_directory(directory))
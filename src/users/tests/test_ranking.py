@@ -0,0 +1,158 @@
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from src.users.ranking import RankingEngine, WalkColumns
+from src.users.scoring import compile_score
+from src.users.tests.factories import create_user_walk_travel_record
+
+
+def test_top_indices():
+    scores = np.array([5.0, 1.0, 4.0, 2.0, 3.0])
+
+    assert RankingEngine.top_indices(scores, 3).tolist() == [1, 3, 4]
+    assert RankingEngine.top_indices(scores, 2, ascending=False).tolist() == [0, 2]
+    assert RankingEngine.top_indices(scores, 10).tolist() == [1, 3, 4, 2, 0]
+    assert RankingEngine.top_indices(scores, None).tolist() == [1, 3, 4, 2, 0]
+    assert RankingEngine.top_indices(scores, 0).tolist() == []
+
+
+def test_top_indices_ties_break_on_index_and_nan_last():
+    scores = np.array([np.nan, 2.0, 1.0, 2.0, 2.0, 1.0])
+
+    assert RankingEngine.top_indices(scores, 3).tolist() == [2, 5, 1]
+    assert RankingEngine.top_indices(scores, 3, ascending=False).tolist() == [1, 3, 4]
+    assert RankingEngine.top_indices(scores, None)[-1] == 0
+
+
+def test_walk_columns_from_rows():
+    columns = WalkColumns.from_rows(
+        [
+            (1, 4500, 1.5, 100, 2, 100, 1000, 3, 2, 4.5),
+            (2, 9000, 2.0, 200, 0, 200, 2000, 4, 3, 3.0),
+        ]
+    )
+
+    assert columns.walk_ids.dtype == np.int64
+    assert len(columns) == 2
+    assert columns.walk_distance_meters.tolist() == [1500, 2000]
+    assert columns.total_seconds.tolist() == [6500, 13000]
+    assert len(WalkColumns.from_rows([])) == 0
+
+
+def test_rank_with_custom_score():
+    columns = WalkColumns.from_rows(
+        [
+            (1, 4500, 1.5, 100, 2, 100, 1000, 3, 2, 4.5),
+            (2, 9000, 2.0, 200, 0, 200, 2000, 4, 3, 3.0),
+        ]
+    )
+
+    top, scores = RankingEngine.rank(
+        columns, 1, score=lambda walk: -walk.walk_ascent_meters
+    )
+
+    assert top.tolist() == [1]
+    assert scores.tolist() == [-100, -200]
+
+
+@patch("src.users.ranking.UserData")
+def test_iter_ranked_user_walks_with_score(mock_user_data):
+    mock_user_data.get_user_walk_columns.return_value = [
+        (1, 4500, 1.5, 100, 2, 100, 1000, 3, 2, 4.5),
+        (2, 9000, 2.0, 200, 0, 200, 2000, 4, 3, 3.0),
+        (3, 3600, 2.0, 200, 1, 200, 0, 4, 3, 3.0),
+    ]
+    mock_user_data.get_bagged_hill_ids.return_value = set()
+    mock_user_data.get_user_walks_travel_info_for_walks.side_effect = (
+        lambda user_id, walk_ids: {
+            walk_id: create_user_walk_travel_record(walk_id=walk_id)
+            for walk_id in walk_ids
+        }
+    )
+
+    result = list(
+        RankingEngine.iter_ranked_user_walks(
+            1, 2, ascending=False, score=compile_score("hills / travel_hours")
+        )
+    )
+
+    assert [walk.walk_id for walk in result] == [1, 2]
+    assert result[0].score == pytest.approx(7.2)
+    assert result[0].total_time_seconds == 6500
+    assert result[1].score == 0
+
+
+def brute_force_pareto(keys):
+    return [
+        i
+        for i, row in enumerate(keys)
+        if not np.isnan(row).any()
+        and not any(
+            np.all(other <= row) and np.any(other < row)
+            for other in keys
+            if not np.isnan(other).any()
+        )
+    ]
+
+
+@pytest.mark.parametrize("dimensions", [1, 2, 3, 4])
+def test_pareto_indices_matches_brute_force(dimensions):
+    rng = np.random.default_rng(dimensions)
+    keys = rng.integers(0, 5, (300, dimensions)).astype(np.float64)
+    keys[7, 0] = np.nan
+
+    result = RankingEngine.pareto_indices(keys)
+
+    assert sorted(result.tolist()) == brute_force_pareto(keys)
+
+
+def test_pareto_indices_trade_offs_and_duplicates():
+    keys = np.array(
+        [
+            [3600, 3600, -1],
+            [5400, 3600, -3],
+            [3600, 7200, -1],
+            [3600, 3600, -1],
+            [1800, 9000, 0],
+        ]
+    )
+
+    result = RankingEngine.pareto_indices(keys)
+
+    assert result.tolist() == [4, 0, 3, 1]
+    assert RankingEngine.pareto_indices(np.empty((0, 3))).tolist() == []
+
+
+def test_pareto_indices_rejects_missing_keys():
+    with pytest.raises(ValueError, match="Pareto keys"):
+        RankingEngine.pareto_indices(np.ones(3))
+
+
+@patch("src.users.ranking.UserData")
+def test_iter_pareto_user_walks(mock_user_data):
+    mock_user_data.get_user_walk_columns.return_value = [
+        (1, 3600, 1.5, 100, 1, 100, 1000, 3, 2, 4.5),
+        (2, 5400, 2.0, 200, 3, 200, 1000, 4, 3, 3.0),
+        (3, 3600, 2.0, 200, 1, 200, 2000, 4, 3, 3.0),
+    ]
+    mock_user_data.get_bagged_hill_ids.return_value = set()
+    mock_user_data.get_user_walks_travel_info_for_walks.side_effect = (
+        lambda user_id, walk_ids: {
+            walk_id: create_user_walk_travel_record(walk_id=walk_id)
+            for walk_id in walk_ids
+        }
+    )
+
+    result = list(
+        RankingEngine.iter_pareto_user_walks(1, ["travel_time", "walk_time", "hills"])
+    )
+
+    assert [walk.walk_id for walk in result] == [1, 2]
+    assert result[1].total_time_seconds == 7400
+
+
+def test_iter_pareto_user_walks_unknown_objective():
+    with pytest.raises(ValueError, match="Unsupported Pareto objectives"):
+        list(RankingEngine.iter_pareto_user_walks(1, ["speed"]))
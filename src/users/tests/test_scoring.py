@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from src.users.ranking import WalkColumns
+from src.users.scoring import ScoreExpressionError, compile_score
+
+
+@pytest.fixture
+def columns():
+    return WalkColumns.from_rows(
+        [
+            (1, 3600, 10.0, 800, 2, 20000, 1800, 3, 2, 4.0),
+            (2, 7200, 15.0, 1200, 1, 50000, 3600, 5, 4, 3.0),
+            (3, 1800, 5.0, 300, 0, 0, 0, 1, 1, 2.5),
+        ]
+    )
+
+
+def test_compile_score_hills_per_hour(columns):
+    score = compile_score("hills / total_hours")
+
+    np.testing.assert_allclose(score(columns), [1.0, 1 / 4, 0.0])
+
+
+def test_compile_score_weighted_penalties(columns):
+    score = compile_score("total_hours + 0.5 * grade + bog - max(rating, 3) ** 2")
+
+    np.testing.assert_allclose(score(columns), [-10.5, 1.5, -7.0])
+
+
+def test_compile_score_non_finite_scores_are_nan(columns):
+    score = compile_score("ascent / travel_minutes")
+
+    result = score(columns)
+
+    np.testing.assert_allclose(result[:2], [800 / 30, 1200 / 60])
+    assert np.isnan(result[2])
+
+
+def test_compile_score_constant_is_broadcast(columns):
+    assert compile_score("-2")(columns).tolist() == [-2, -2, -2]
+
+
+@pytest.mark.parametrize(
+    "expression, message",
+    [
+        ("hills +", "Invalid score expression"),
+        ("speed * 2", "Unknown score variable 'speed'"),
+        ("__import__('os')", "Unknown score function '__import__'"),
+        ("__import__('os').system('true')", "Unsupported syntax"),
+        ("hills.real", "Unsupported syntax"),
+        ("hills if grade else bog", "Unsupported syntax"),
+        ("hills < 2", "Unsupported syntax"),
+        ("'hills'", "Unsupported syntax"),
+        ("True", "Unsupported syntax"),
+        ("max(hills)", "at least two values"),
+        ("sqrt(hills, grade)", "exactly one value"),
+        ("log(x=hills)", "Unknown score function 'log'"),
+        ("hills" + " + hills" * 100, "longer than"),
+    ],
+)
+def test_compile_score_rejects_invalid_expressions(expression, message):
+    with pytest.raises(ScoreExpressionError, match=message):
+        compile_score(expression)
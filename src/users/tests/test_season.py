@@ -0,0 +1,76 @@
+import numpy as np
+
+from src.users.season import UNSCHEDULED, SeasonScheduler
+from src.users.tests.factories import make_walk_bits
+
+HOUR = 3600.0
+
+
+def test_schedule_takes_most_new_hills_first():
+    bits = make_walk_bits([[1, 2, 3], [1], [4], [1, 2]])
+    costs = np.full(4, 5 * HOUR)
+    daylight = np.full((4, 2), 12 * HOUR)
+
+    schedule = SeasonScheduler.schedule(bits, costs, daylight)
+
+    assert sorted(schedule.tolist()) == [0, 2]
+
+
+def test_schedule_only_uses_dates_with_enough_daylight():
+    bits = make_walk_bits([[1, 2, 3], [4]])
+    costs = np.array([14 * HOUR, 6 * HOUR])
+    daylight = np.array([[8 * HOUR, 17 * HOUR], [8 * HOUR, 17 * HOUR]])
+
+    schedule = SeasonScheduler.schedule(bits, costs, daylight)
+
+    assert schedule.tolist() == [1, 0]
+
+
+def test_schedule_moves_walks_to_make_room():
+    # Walk 0 first takes date 1, where it has less daylight, but that is the
+    # only date long enough for walk 1, so walk 0 moves to date 0.
+    bits = make_walk_bits([[1, 2], [3]])
+    costs = np.array([7 * HOUR, 15 * HOUR])
+    daylight = np.array([[12 * HOUR, 11 * HOUR], [9 * HOUR, 16 * HOUR]])
+
+    schedule = SeasonScheduler.schedule(bits, costs, daylight)
+
+    assert schedule.tolist() == [0, 1]
+
+
+def test_schedule_leaves_dates_free_without_walks_that_fit():
+    bits = make_walk_bits([[1], [2]])
+    costs = np.array([10 * HOUR, 12 * HOUR])
+    daylight = np.full((2, 3), [7 * HOUR, 11 * HOUR, 7 * HOUR])
+
+    schedule = SeasonScheduler.schedule(bits, costs, daylight)
+
+    assert schedule.tolist() == [UNSCHEDULED, 0, UNSCHEDULED]
+
+
+def test_schedule_skips_walks_with_no_start_location():
+    bits = make_walk_bits([[1], [2]])
+    costs = np.full(2, 5 * HOUR)
+    daylight = np.array([[np.nan, np.nan], [12 * HOUR, 12 * HOUR]])
+
+    schedule = SeasonScheduler.schedule(bits, costs, daylight)
+
+    assert sorted(schedule.tolist()) == [UNSCHEDULED, 1]
+
+
+def test_schedule_moves_walks_along_paths_longer_than_the_recursion_limit():
+    # Walk i fits dates i and i + 1 and takes date i, until the last walk,
+    # which only fits date 0, moves every other walk along one date.
+    walks = 2_000
+    bits = make_walk_bits([[walk] for walk in range(walks + 1)])
+    costs = 5 * HOUR + np.arange(walks + 1, dtype=np.float64)
+    daylight = np.zeros((walks + 1, walks + 1))
+    days = np.arange(walks + 1, dtype=np.float64)
+    for walk in range(walks):
+        daylight[walk, [walk, walk + 1]] = 10 * HOUR + days[[walk, walk + 1]]
+    daylight[walks, 0] = 10 * HOUR
+
+    schedule = SeasonScheduler.schedule(bits, costs, daylight)
+
+    assert schedule[0] == walks
+    assert schedule[1:].tolist() == list(range(walks))
@@ -0,0 +1,139 @@
+import sqlite3
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from src.users.data import UserData
+from src.users.dtos import LatLon
+from src.users.travel_matrix import TravelMatrix
+from src.walkhighlands.dtos import WalkStartLocationRecord
+
+
+@pytest.fixture
+def mock_db_api():
+    with patch("src.users.data.DatabaseAPI") as MockDatabaseAPI:
+        mock_instance = MockDatabaseAPI.return_value
+        shared_conn = sqlite3.connect(":memory:")
+        mock_context_manager = MagicMock()
+        mock_context_manager.__enter__.return_value = shared_conn
+        mock_context_manager.__exit__.return_value = None
+        mock_instance.db_connection.return_value = mock_context_manager
+        UserData.create_user_table()
+        UserData.create_user_walk_directions_table()
+        UserData.save_user_data("alice", LatLon(lat=56.0, lon=-4.0))
+        UserData.save_user_data("bob", LatLon(lat=57.0, lon=-5.0))
+        yield shared_conn
+        shared_conn.close()
+
+
+@pytest.fixture
+def walks():
+    walk_ids = [10, 20, 30]
+    with patch(
+        "src.users.travel_matrix.WalkhighlandsAPI.get_walk_start_locations",
+        side_effect=lambda: [
+            WalkStartLocationRecord(walk_id=walk_id, walk_start_location="56.0,-4.0")
+            for walk_id in walk_ids
+        ],
+    ):
+        yield walk_ids
+
+
+def save_directions(user_id, walk_id, distance, duration):
+    UserData.save_walk_directions_batch(
+        user_id,
+        {walk_id: MagicMock(distance_meters=distance, duration_seconds=duration)},
+    )
+
+
+def test_open_without_matrix(tmp_path):
+    assert TravelMatrix.open(tmp_path) is None
+
+
+def test_refresh_builds_matrix(mock_db_api, walks, tmp_path):
+    save_directions(1, 10, 1000, 60)
+    save_directions(2, 30, 3000, 180)
+
+    TravelMatrix.refresh(tmp_path)
+    matrix = TravelMatrix.open(tmp_path)
+
+    assert matrix.user_ids.tolist() == [1, 2]
+    assert matrix.walk_ids.tolist() == [10, 20, 30]
+    np.testing.assert_array_equal(
+        matrix.seconds, [[60, np.nan, np.nan], [np.nan, np.nan, 180]]
+    )
+    seconds, meters = matrix.user_row(2)
+    assert isinstance(seconds, np.memmap)
+    np.testing.assert_array_equal(meters, [np.nan, np.nan, 3000])
+    assert matrix.user_row(99) is None
+    assert matrix.walk_columns([30, 99]).tolist() == [2, -1]
+
+
+@patch("src.users.travel_matrix.MIN_CAPACITY", 2)
+def test_refresh_adds_new_directions_users_and_walks(mock_db_api, walks, tmp_path):
+    save_directions(1, 10, 1000, 60)
+    TravelMatrix.refresh(tmp_path)
+
+    walks.extend([40, 50, 60])
+    UserData.save_user_data("carol", LatLon(lat=55.0, lon=-3.0))
+    save_directions(1, 20, 2000, 120)
+    save_directions(3, 60, 6000, 360)
+    with patch.object(
+        UserData,
+        "iter_walk_directions_since",
+        wraps=UserData.iter_walk_directions_since,
+    ) as mock_iter:
+        matrix = TravelMatrix.refresh(tmp_path)
+
+    mock_iter.assert_called_once_with(1)
+    assert matrix.user_ids.tolist() == [1, 2, 3]
+    assert matrix.walk_ids.tolist() == [10, 20, 30, 40, 50, 60]
+    assert matrix.seconds[0, :2].tolist() == [60, 120]
+    assert matrix.seconds[2, 5] == 360
+    assert np.isnan(matrix.seconds[1]).all()
+    assert TravelMatrix.open(tmp_path).last_directions_id == 3
+
+
+def test_refresh_rebuilds_when_directions_removed(mock_db_api, walks, tmp_path):
+    save_directions(1, 10, 1000, 60)
+    save_directions(1, 20, 2000, 120)
+    TravelMatrix.refresh(tmp_path)
+
+    mock_db_api.execute("DELETE FROM user_walk_directions WHERE walk_id = 20")
+    mock_db_api.commit()
+    matrix = TravelMatrix.refresh(tmp_path)
+
+    assert matrix.seconds[0, 0] == 60
+    assert np.isnan(matrix.seconds[0, 1])
+
+
+def test_refresh_rebuilds_when_older_directions_removed(mock_db_api, walks, tmp_path):
+    save_directions(1, 10, 1000, 60)
+    save_directions(1, 20, 2000, 120)
+    TravelMatrix.refresh(tmp_path)
+
+    mock_db_api.execute("DELETE FROM user_walk_directions WHERE walk_id = 10")
+    mock_db_api.commit()
+    save_directions(2, 30, 3000, 180)
+    matrix = TravelMatrix.refresh(tmp_path)
+
+    assert np.isnan(matrix.seconds[0, 0])
+    assert matrix.seconds[0, 1] == 120
+    assert matrix.seconds[1, 2] == 180
+    assert matrix.directions_count == 2
+
+
+def test_refresh_keeps_matrix_when_database_read_fails(mock_db_api, walks, tmp_path):
+    save_directions(1, 10, 1000, 60)
+    TravelMatrix.refresh(tmp_path)
+
+    with (
+        patch.object(
+            UserData, "count_walk_directions", side_effect=sqlite3.OperationalError
+        ),
+        pytest.raises(sqlite3.OperationalError),
+    ):
+        TravelMatrix.refresh(tmp_path)
+
+    assert TravelMatrix.open(tmp_path).seconds[0, 0] == 60
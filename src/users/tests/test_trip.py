@@ -0,0 +1,88 @@
+import numpy as np
+
+from src.users.tests.factories import make_walk_bits
+from src.users.trip import TripPlanner
+
+HOUR = 3600.0
+
+
+def make_travel(points):
+    """Travel matrix of an hour per unit of distance, with the base at (0, 0)."""
+    nodes = np.array([(0.0, 0.0), *points])
+    return np.linalg.norm(nodes[:, None] - nodes[None, :], axis=-1) * HOUR
+
+
+def test_solve_keeps_each_day_within_budget():
+    travel = np.zeros((4, 4))
+    walk_seconds = np.full(3, 6 * HOUR)
+    bits = make_walk_bits([[1], [2], [3]])
+
+    routes = TripPlanner.solve(travel, walk_seconds, bits, 2, 10 * HOUR)
+
+    assert sorted(len(route) for route in routes) == [1, 1]
+    assert all(
+        TripPlanner.day_seconds(route, travel, walk_seconds) <= 10 * HOUR
+        for route in routes
+    )
+
+
+def test_insert_skips_walks_without_new_hills():
+    travel = np.zeros((4, 4))
+    walk_seconds = np.array([3 * HOUR, HOUR, HOUR])
+    bits = make_walk_bits([[1, 2], [1], [2]])
+    routes = [[]]
+
+    added = TripPlanner.insert(routes, travel, walk_seconds, bits, 10 * HOUR)
+
+    assert added
+    assert sorted(routes[0]) == [1, 2]
+
+
+def test_swap_replaces_walk_with_one_bagging_more_hills():
+    # Greedy takes the quick walk 0 for its hill per hour, leaving no room
+    # for walk 1 and its three hills.
+    travel = np.zeros((3, 3))
+    walk_seconds = np.array([2 * HOUR, 9 * HOUR])
+    bits = make_walk_bits([[1], [2, 3, 4]])
+    routes = [[]]
+
+    TripPlanner.insert(routes, travel, walk_seconds, bits, 10 * HOUR)
+
+    assert routes == [[0]]
+    assert TripPlanner.swap(routes, travel, walk_seconds, bits, 10 * HOUR)
+    assert routes == [[1]]
+    assert TripPlanner.solve(travel, walk_seconds, bits, 1, 10 * HOUR) == [[1]]
+
+
+def test_two_opt_removes_crossing():
+    travel = make_travel([(1, 0), (1, 1), (0, 1)])
+    walk_seconds = np.zeros(3)
+    route = [0, 2, 1]
+
+    changed = TripPlanner.two_opt(route, travel, walk_seconds)
+
+    assert changed
+    assert TripPlanner.day_seconds(route, travel, walk_seconds) == 4 * HOUR
+
+
+def test_relocate_joins_walks_sharing_a_drive():
+    travel = make_travel([(3, 0), (3, 0.5)])
+    walk_seconds = np.full(2, HOUR)
+    routes = [[0], [1]]
+
+    moved = TripPlanner.relocate(routes, travel, walk_seconds, 10 * HOUR)
+
+    assert moved
+    assert sorted(sorted(route) for route in routes) == [[], [0, 1]]
+
+
+def test_cheapest_insertion_positions():
+    travel = make_travel([(1, 0), (3, 0), (2, 0)])
+    walk_seconds = np.array([HOUR, HOUR, 2 * HOUR])
+
+    cost, position = TripPlanner._cheapest_insertion(
+        [0, 1], np.array([2]), travel, walk_seconds
+    )
+
+    assert position.tolist() == [1]
+    assert cost[0] == 2 * HOUR
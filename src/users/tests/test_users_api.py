@@ -1,17 +1,164 @@
+from datetime import date
+
+import googlemaps
 import pytest
-from src.users.tests.factories import create_user_walk_travel_info
+from src.users.tests.factories import create_user_walk_travel_record
 from unittest.mock import patch
+from src.maps.estimator import TravelTimeEstimator
 from src.users.api import UsersAPI
-from src.users.dtos import LatLon
-from src.walkhighlands.dtos import WalkStartLocationDTO
-from src.maps.dtos import MapsResponseDTO
+from src.users.dtos import LatLon, WalkCandidateRecord, WalkFilters
+from src.users.service import UsersService
+from src.walkhighlands.api import WalkhighlandsAPI
+from src.walkhighlands.dtos import WalkStartLocationRecord, WalkTrailheadRecord
+from src.maps.dtos import MapsLookupPlanDTO, MapsResponseDTO
+from src.maps.quota import MapsBudgetExceededError
+from src.maps.resilience import MapsUnavailableError
 
 
+@patch("src.users.api.LocationData")
 @patch("src.users.api.UserData")
-def test_initialize_users(mock_user_data):
+def test_initialize_users(mock_user_data, mock_location_data):
     UsersAPI.initialize_users()
 
     mock_user_data.create_user_table.assert_called_once()
+    mock_user_data.create_user_walk_direction_failures_table.assert_called_once()
+    mock_user_data.create_user_hills_bagged_table.assert_called_once()
+    mock_location_data.create_postcodes_table.assert_called_once()
+    mock_location_data.create_geocode_cache_table.assert_called_once()
+
+
+@patch("src.users.api.UserData")
+def test_bag_hills(mock_user_data):
+    mock_user_data.get_user_id_for_name.return_value = 1
+    mock_user_data.get_hill_ids_by_name.return_value = {"ben nevis": [101]}
+    mock_user_data.bag_hills.return_value = 2
+
+    bagged = UsersAPI.bag_hills("test_user", ["Ben Nevis", "102"])
+
+    assert bagged == 2
+    mock_user_data.get_hill_ids_by_name.assert_called_once_with(["Ben Nevis"])
+    mock_user_data.bag_hills.assert_called_once_with(1, {101, 102})
+
+
+@patch("src.users.api.UserData")
+def test_unbag_hills(mock_user_data):
+    mock_user_data.get_user_id_for_name.return_value = 1
+    mock_user_data.get_hill_ids_by_name.return_value = {"ben nevis": [101]}
+    mock_user_data.unbag_hills.return_value = 1
+
+    assert UsersAPI.unbag_hills("test_user", ["ben nevis"]) == 1
+    mock_user_data.unbag_hills.assert_called_once_with(1, {101})
+
+
+@patch("src.users.api.UserData")
+def test_bag_hills_unknown_or_ambiguous_hill(mock_user_data):
+    mock_user_data.get_user_id_for_name.return_value = 1
+    mock_user_data.get_hill_ids_by_name.return_value = {"sgurr mor": [5, 9]}
+
+    with pytest.raises(ValueError, match="Hills not found: Ben Nevis"):
+        UsersAPI.bag_hills("test_user", ["Ben Nevis", "Sgurr Mor"])
+    with pytest.raises(ValueError, match="give one of the ids: 5, 9"):
+        UsersAPI.bag_hills("test_user", ["Sgurr Mor"])
+    mock_user_data.bag_hills.assert_not_called()
+
+
+@patch("src.users.api.UsersService")
+@patch("src.users.api.CompletionPlanner")
+@patch("src.users.api.UserData")
+def test_plan_completion(mock_user_data, mock_planner, mock_users_service):
+    mock_user_data.get_user_id_for_name.return_value = 1
+    filters = WalkFilters(max_grade=4)
+
+    plan = UsersAPI.plan_completion("test_user", filters, exact=True)
+
+    mock_planner.plan_for_user.assert_called_once_with(1, filters, True)
+    assert plan is mock_planner.plan_for_user.return_value
+    mock_users_service.display_completion_plan.assert_called_once_with(plan)
+
+
+@patch("src.users.api.UsersService")
+@patch("src.users.api.SeasonScheduler")
+@patch("src.users.api.UserData")
+def test_plan_season(mock_user_data, mock_scheduler, mock_users_service):
+    mock_user_data.get_user_id_for_name.return_value = 1
+    dates = [date(2026, 5, 2), date(2026, 5, 3)]
+
+    plan = UsersAPI.plan_season("test_user", dates)
+
+    mock_scheduler.plan_for_user.assert_called_once_with(1, dates, None)
+    assert plan is mock_scheduler.plan_for_user.return_value
+    mock_users_service.display_season_plan.assert_called_once_with(plan)
+
+
+@patch("src.users.api.UsersService")
+@patch("src.users.api.TripPlanner")
+@patch("src.users.api.UserData")
+def test_plan_trip_from_lat_lon_base(mock_user_data, mock_planner, mock_users_service):
+    mock_user_data.get_user_id_for_name.return_value = 1
+    mock_users_service.check_location.return_value = True
+    filters = WalkFilters(max_grade=4)
+
+    plan = UsersAPI.plan_trip("test_user", 3, 9.5, "57.1,-5.2", filters)
+
+    mock_planner.plan_for_user.assert_called_once_with(
+        1, LatLon(lat=57.1, lon=-5.2), 3, 34200, filters
+    )
+    assert plan is mock_planner.plan_for_user.return_value
+    mock_users_service.display_trip_plan.assert_called_once_with(plan)
+
+
+@patch("src.users.api.UsersService")
+@patch("src.users.api.TripPlanner")
+@patch("src.users.api.get_lat_lon_from_postcode")
+@patch("src.users.api.UserData")
+def test_plan_trip_base_defaults_to_home(
+    mock_user_data, mock_get_lat_lon, mock_planner, mock_users_service
+):
+    home = LatLon(lat=56.0, lon=-4.0)
+    mock_user_data.get_user_id_for_name.return_value = 1
+    mock_user_data.fetch_user_location.return_value = (1, home)
+    mock_users_service.check_location.return_value = True
+
+    UsersAPI.plan_trip("test_user", 2, 8)
+
+    mock_get_lat_lon.assert_not_called()
+    mock_planner.plan_for_user.assert_called_once_with(1, home, 2, 28800, None)
+
+
+@patch("src.users.api.TripPlanner")
+@patch("src.users.api.get_lat_lon_from_postcode")
+@patch("src.users.api.UserData")
+def test_plan_trip_from_postcode_base(mock_user_data, mock_get_lat_lon, mock_planner):
+    mock_user_data.get_user_id_for_name.return_value = 1
+    mock_get_lat_lon.return_value = LatLon(lat=91.0, lon=-4.0)
+
+    with pytest.raises(ValueError, match="Invalid trip base"):
+        UsersAPI.plan_trip("test_user", 2, 8, "PH33 6SY")
+
+    mock_get_lat_lon.assert_called_once_with("PH33 6SY")
+    mock_planner.plan_for_user.assert_not_called()
+
+
+@patch("src.users.api.UserData")
+def test_bag_hills_user_not_found(mock_user_data):
+    mock_user_data.get_user_id_for_name.return_value = None
+
+    with pytest.raises(ValueError, match="User not found"):
+        UsersAPI.bag_hills("missing", ["Ben Nevis"])
+
+
+@patch("src.users.api.read_postcode_directory")
+@patch("src.users.api.LocationData")
+def test_import_postcodes(mock_location_data, mock_read_postcode_directory):
+    mock_location_data.save_postcodes.return_value = 2
+
+    imported = UsersAPI.import_postcodes("onspd.csv")
+
+    assert imported == 2
+    mock_read_postcode_directory.assert_called_once_with("onspd.csv")
+    mock_location_data.save_postcodes.assert_called_once_with(
+        mock_read_postcode_directory.return_value
+    )
 
 
 @patch("src.users.api.UsersService")
@@ -69,6 +216,75 @@ def test_add_user_check_location_failure(
     mock_user_data.save_user_data.assert_not_called()
 
 
+@patch("src.users.api.get_lat_lon_from_postcode")
+@patch("src.users.api.UserData")
+def test_import_users(mock_user_data, mock_get_lat_lon_from_postcode, tmp_path):
+    import_file = tmp_path / "club.csv"
+    import_file.write_text(
+        "name,postcode\n"
+        "Alice,EH1 1AA\n"
+        "Bob,eh1 1aa\n"
+        "Alice,IV1 1AA\n"
+        "Carol,XX1 1XX\n"
+        "Dave,PH1 1AA\n"
+        "Erin,AB1 1AA\n"
+        "Frank,\n"
+    )
+    locations = {
+        "EH1 1AA": LatLon(lat=55.95, lon=-3.19),
+        "PH1 1AA": LatLon(lat=56.39, lon=-3.43),
+        "AB1 1AA": LatLon(lat=157.0, lon=-2.1),
+    }
+
+    def geocode(postcode):
+        if postcode not in locations:
+            raise ValueError(f"Could not find location for postcode: {postcode}")
+        return locations[postcode]
+
+    mock_get_lat_lon_from_postcode.side_effect = geocode
+    mock_user_data.get_user_names.return_value = {"Dave"}
+    mock_user_data.save_users_batch.side_effect = lambda users: {
+        name for name, _ in users
+    }
+
+    results = UsersAPI.import_users(str(import_file), max_workers=2)
+
+    assert [(result.name, result.status) for result in results] == [
+        ("Alice", "added"),
+        ("Bob", "added"),
+        ("Alice", "invalid"),
+        ("Carol", "failed"),
+        ("Dave", "exists"),
+        ("Erin", "invalid"),
+        ("Frank", "invalid"),
+    ]
+    assert "XX1 1XX" in results[3].message
+    assert mock_get_lat_lon_from_postcode.call_count == 3
+    mock_user_data.save_users_batch.assert_called_once_with(
+        [
+            ("Alice", LatLon(lat=55.95, lon=-3.19)),
+            ("Bob", LatLon(lat=55.95, lon=-3.19)),
+        ]
+    )
+    mock_user_data.save_user_data.assert_not_called()
+
+
+@patch("src.users.api.get_lat_lon_from_postcode")
+@patch("src.users.api.UserData")
+def test_import_users_raises_programming_errors(
+    mock_user_data, mock_get_lat_lon_from_postcode, tmp_path
+):
+    import_file = tmp_path / "club.csv"
+    import_file.write_text("name,postcode\nAlice,EH1 1AA\n")
+    mock_get_lat_lon_from_postcode.side_effect = TypeError("bug")
+    mock_user_data.get_user_names.return_value = set()
+
+    with pytest.raises(TypeError):
+        UsersAPI.import_users(str(import_file), max_workers=1)
+
+    mock_user_data.save_users_batch.assert_not_called()
+
+
 @patch("src.users.api.UserData")
 def test_get_user_location_success(mock_user_data):
     name = "test_user"
@@ -91,7 +307,6 @@ def test_get_user_location_not_found(mock_user_data):
     mock_user_data.fetch_user_location.assert_called_once_with(name)
 
 
-@patch("src.users.api.UsersAPI._directions_already_saved", return_value=False)
 @patch("src.users.api.UsersService")
 @patch("src.users.api.MapsApi")
 @patch("src.users.api.WalkhighlandsAPI")
@@ -101,17 +316,18 @@ def test_get_walk_directions_for_user(
     mock_walkhighlands_api,
     mock_maps_api,
     mock_users_service,
-    mock_directions_already_saved,
 ):
     user = "test_user"
     user_id = 1
     user_location = LatLon(lat=55.84901, lon=-3.14373)
     mock_user_data.fetch_user_location.return_value = (user_id, user_location)
 
-    walk_location = WalkStartLocationDTO(
+    walk_location = WalkStartLocationRecord(
         walk_id=1, walk_start_location="56.90890,-4.23660"
     )
     mock_walkhighlands_api.get_walk_start_locations.return_value = [walk_location]
+    mock_walkhighlands_api.get_walk_trailheads.return_value = {}
+    mock_user_data.get_walk_ids_missing_directions.return_value = {1}
 
     map_response = MapsResponseDTO(
         origin="55.84901,-3.14373",
@@ -119,21 +335,22 @@ def test_get_walk_directions_for_user(
         distance_meters=179939,
         duration_seconds=7461,
     )
-    mock_maps_api.get_driving_distance_and_time.return_value = map_response
+    mock_maps_api.iter_driving_distances_from.return_value = iter(
+        [{("walk", 1): map_response}]
+    )
 
     UsersAPI.get_walk_directions_for_user(user)
 
     mock_user_data.fetch_user_location.assert_called_once_with(user)
     mock_walkhighlands_api.get_walk_start_locations.assert_called_once()
-    mock_maps_api.get_driving_distance_and_time.assert_called_once_with(
-        origin="55.84901,-3.14373", destination="56.90890,-4.23660"
+    mock_maps_api.iter_driving_distances_from.assert_called_once_with(
+        origin="55.84901,-3.14373", destinations={("walk", 1): "56.90890,-4.23660"}
     )
-    mock_users_service.save_walk_directions_for_user.assert_called_once_with(
-        user_id, walk_location.walk_id, map_response
+    mock_users_service.save_walk_directions_batch_for_user.assert_called_once_with(
+        user_id, {walk_location.walk_id: map_response}
     )
 
 
-@patch("src.users.api.UsersAPI._directions_already_saved", return_value=True)
 @patch("src.users.api.UsersService")
 @patch("src.users.api.MapsApi")
 @patch("src.users.api.WalkhighlandsAPI")
@@ -143,32 +360,25 @@ def test_get_walk_directions_for_user_skips_existing(
     mock_walkhighlands_api,
     mock_maps_api,
     mock_users_service,
-    mock_directions_already_saved,
 ):
     user = "test_user"
     user_id = 1
     user_location = LatLon(lat=55.84901, lon=-3.14373)
     mock_user_data.fetch_user_location.return_value = (user_id, user_location)
 
-    walk_location = WalkStartLocationDTO(
+    walk_location = WalkStartLocationRecord(
         walk_id=1, walk_start_location="56.90890,-4.23660"
     )
     mock_walkhighlands_api.get_walk_start_locations.return_value = [walk_location]
+    mock_user_data.get_walk_ids_missing_directions.return_value = set()
 
     UsersAPI.get_walk_directions_for_user(user)
 
     mock_user_data.fetch_user_location.assert_called_once_with(user)
     mock_walkhighlands_api.get_walk_start_locations.assert_called_once()
-    mock_maps_api.get_driving_distance_and_time.assert_not_called()
-    mock_users_service.save_walk_directions_for_user.assert_not_called()
-
-
-@patch("src.users.api.UserData")
-def test_directions_already_saved_true(mock_user_data):
-    mock_user_data.check_walk_directions_exist.return_value = True
-    result = UsersAPI._directions_already_saved(1, 1)
-    assert result is True
-    mock_user_data.check_walk_directions_exist.assert_called_once_with(1, 1)
+    mock_user_data.get_walk_ids_missing_directions.assert_called_once_with(user_id)
+    mock_maps_api.iter_driving_distances_from.assert_not_called()
+    mock_users_service.save_walk_directions_batch_for_user.assert_not_called()
 
 
 @patch("src.users.api.UsersService")
@@ -177,32 +387,461 @@ def test_get_optimal_user_routes(mock_user_data, mock_users_service):
     user = "test_user"
     user_id = 1
     mock_user_data.get_user_id_for_name.return_value = user_id
-
     walk_infos = [
-        create_user_walk_travel_info(
-            walk_id=1, number_of_hills=1, total_time_seconds=1000
-        ),
-        create_user_walk_travel_info(
-            walk_id=2, number_of_hills=0, total_time_seconds=500
-        ),
-        create_user_walk_travel_info(
-            walk_id=3, number_of_hills=2, total_time_seconds=2000
-        ),
+        create_user_walk_travel_record(walk_id=1, total_time_seconds=1000),
+        create_user_walk_travel_record(walk_id=3, total_time_seconds=2000),
+    ]
+    mock_users_service.get_optimal_user_walks.return_value = walk_infos
+    filters = WalkFilters(min_hills=2, max_grade=3)
+
+    UsersAPI.get_optimal_user_routes(user, 5, ascending=False, filters=filters)
+
+    mock_users_service.get_optimal_user_walks.assert_called_once_with(
+        user_id, 5, False, filters, None
+    )
+    mock_users_service.display_user_walk_travel_info.assert_called_once_with(walk_infos)
+
+
+@patch("src.users.api.UsersService")
+@patch("src.users.api.UserData")
+def test_get_pareto_user_routes(mock_user_data, mock_users_service):
+    mock_user_data.get_user_id_for_name.return_value = 1
+    walk_infos = [create_user_walk_travel_record(walk_id=2)]
+    mock_users_service.get_pareto_user_walks.return_value = walk_infos
+    filters = WalkFilters(max_grade=3)
+
+    UsersAPI.get_pareto_user_routes("test_user", ["total_time", "hills"], filters)
+
+    mock_users_service.get_pareto_user_walks.assert_called_once_with(
+        1, ["total_time", "hills"], filters
+    )
+    mock_users_service.display_user_walk_travel_info.assert_called_once_with(walk_infos)
+
+
+@patch("src.users.api.UserData")
+def test_get_optimal_user_routes_user_not_found(mock_user_data):
+    mock_user_data.get_user_id_for_name.return_value = None
+
+    with pytest.raises(ValueError, match="User not found"):
+        UsersAPI.get_optimal_user_routes("missing", 10)
+
+
+@patch("src.users.api.DIRECTIONS_WRITE_BATCH_SIZE", 2)
+@patch("src.users.api.UsersService")
+@patch("src.users.api.MapsApi")
+@patch("src.users.api.WalkhighlandsAPI")
+@patch("src.users.api.UserData")
+def test_get_walk_directions_for_user_writes_in_batches(
+    mock_user_data,
+    mock_walkhighlands_api,
+    mock_maps_api,
+    mock_users_service,
+):
+    mock_user_data.fetch_user_location.return_value = (
+        1,
+        LatLon(lat=55.84901, lon=-3.14373),
+    )
+    mock_walkhighlands_api.get_walk_start_locations.return_value = [
+        WalkStartLocationRecord(walk_id=walk_id, walk_start_location="56.9,-4.2")
+        for walk_id in (1, 2, 3)
+    ]
+    mock_walkhighlands_api.get_walk_trailheads.return_value = {}
+    mock_user_data.get_walk_ids_missing_directions.return_value = {1, 2, 3}
+    responses = {
+        walk_id: MapsResponseDTO(
+            origin="55.84901,-3.14373",
+            destination="56.9,-4.2",
+            distance_meters=walk_id,
+            duration_seconds=walk_id,
+        )
+        for walk_id in (1, 2, 3)
+    }
+    mock_maps_api.iter_driving_distances_from.return_value = iter(
+        [
+            {("walk", 1): responses[1]},
+            {("walk", 2): responses[2]},
+            {("walk", 3): responses[3]},
+        ]
+    )
+
+    UsersAPI.get_walk_directions_for_user("test_user")
+
+    saved = [
+        call.args[1]
+        for call in mock_users_service.save_walk_directions_batch_for_user.call_args_list
+    ]
+    assert saved == [{1: responses[1], 2: responses[2]}, {3: responses[3]}]
+
+
+@patch("src.users.api.DIRECTIONS_PREFILTER_BATCH_SIZE", 1)
+@patch.object(UsersService, "save_walk_directions_batch_for_user")
+@patch.object(UsersService, "get_optimal_user_walks")
+@patch.object(UsersService, "fit_travel_estimator")
+@patch.object(WalkhighlandsAPI, "get_walk_trailheads", return_value={})
+@patch("src.users.api.MapsApi")
+@patch("src.users.api.UserData")
+def test_get_walk_directions_for_user_top_n_skips_walks_that_cannot_rank(
+    mock_user_data,
+    mock_maps_api,
+    mock_get_walk_trailheads,
+    mock_fit_travel_estimator,
+    mock_get_optimal_user_walks,
+    mock_save_batch,
+):
+    mock_user_data.fetch_user_location.return_value = (1, LatLon(lat=56.0, lon=-4.0))
+    mock_user_data.get_walk_ids_missing_directions.return_value = {1, 2, 3}
+    mock_user_data.get_walk_candidates.return_value = [
+        WalkCandidateRecord(
+            walk_id, f"https://www.google.com/maps/search/{lat},-4.0/", None, 3600
+        )
+        for walk_id, lat in ((1, 58.5), (2, 56.1), (3, 56.5))
+    ]
+    mock_fit_travel_estimator.return_value = TravelTimeEstimator()
+    near = MapsResponseDTO(
+        origin="56.0,-4.0",
+        destination="56.1,-4.0",
+        distance_meters=15000,
+        duration_seconds=900,
+    )
+    mock_maps_api.iter_driving_distances_from.return_value = iter([{("walk", 2): near}])
+    mock_get_optimal_user_walks.side_effect = [
+        [],
+        [create_user_walk_travel_record(walk_id=2, total_time_seconds=5400)],
+    ]
+
+    UsersAPI.get_walk_directions_for_user("test_user", top_n=1)
+
+    mock_maps_api.iter_driving_distances_from.assert_called_once_with(
+        origin="56.0,-4.0", destinations={("walk", 2): "56.1,-4.0"}
+    )
+    mock_save_batch.assert_called_once_with(1, {2: near})
+    mock_user_data.get_walk_candidates.assert_called_once_with(None)
+
+
+@patch("src.users.api.UsersService")
+@patch("src.users.api.MapsApi")
+@patch("src.users.api.WalkhighlandsAPI")
+@patch("src.users.api.UserData")
+def test_get_walk_directions_for_user_shares_trailhead_lookups(
+    mock_user_data,
+    mock_walkhighlands_api,
+    mock_maps_api,
+    mock_users_service,
+):
+    mock_user_data.fetch_user_location.return_value = (1, LatLon(lat=56.0, lon=-4.0))
+    mock_walkhighlands_api.get_walk_start_locations.return_value = [
+        WalkStartLocationRecord(walk_id=1, walk_start_location="56.9089,-4.2366"),
+        WalkStartLocationRecord(walk_id=2, walk_start_location="56.9091,-4.2364"),
+        WalkStartLocationRecord(walk_id=3, walk_start_location="57.1,-5.0"),
+    ]
+    mock_walkhighlands_api.get_walk_trailheads.return_value = {
+        1: WalkTrailheadRecord(1, 10, "56.9089,-4.2366"),
+        2: WalkTrailheadRecord(2, 10, "56.9089,-4.2366"),
+    }
+    mock_user_data.get_walk_ids_missing_directions.return_value = {1, 2, 3}
+    trailhead_route = MapsResponseDTO(
+        origin="56.0,-4.0",
+        destination="56.9089,-4.2366",
+        distance_meters=120000,
+        duration_seconds=5400,
+    )
+    walk_route = MapsResponseDTO(
+        origin="56.0,-4.0",
+        destination="57.1,-5.0",
+        distance_meters=180000,
+        duration_seconds=9000,
+    )
+    mock_maps_api.iter_driving_distances_from.return_value = iter(
+        [{("trailhead", 10): trailhead_route, ("walk", 3): walk_route}]
+    )
+
+    UsersAPI.get_walk_directions_for_user("test_user")
+
+    mock_maps_api.iter_driving_distances_from.assert_called_once_with(
+        origin="56.0,-4.0",
+        destinations={("trailhead", 10): "56.9089,-4.2366", ("walk", 3): "57.1,-5.0"},
+    )
+    mock_users_service.save_walk_directions_batch_for_user.assert_called_once_with(
+        1, {1: trailhead_route, 2: trailhead_route, 3: walk_route}
+    )
+
+
+@patch("src.users.api.UsersService")
+@patch("src.users.api.MapsApi")
+@patch("src.users.api.WalkhighlandsAPI")
+@patch("src.users.api.UserData")
+def test_get_walk_directions_for_user_pauses_at_budget(
+    mock_user_data,
+    mock_walkhighlands_api,
+    mock_maps_api,
+    mock_users_service,
+):
+    mock_user_data.fetch_user_location.return_value = (1, LatLon(lat=56.0, lon=-4.0))
+    mock_walkhighlands_api.get_walk_start_locations.return_value = [
+        WalkStartLocationRecord(
+            walk_id=walk_id, walk_start_location=f"56.{walk_id},-4.0"
+        )
+        for walk_id in (1, 2)
+    ]
+    mock_walkhighlands_api.get_walk_trailheads.return_value = {}
+    mock_user_data.get_walk_ids_missing_directions.return_value = {1, 2}
+    response = MapsResponseDTO(
+        origin="56.0,-4.0",
+        destination="56.1,-4.0",
+        distance_meters=1000,
+        duration_seconds=60,
+    )
+
+    def fetched_until_budget(origin, destinations):
+        yield {("walk", 1): response}
+        raise MapsBudgetExceededError("budget")
+
+    mock_maps_api.iter_driving_distances_from.side_effect = fetched_until_budget
+
+    UsersAPI.get_walk_directions_for_user("test_user")
+
+    mock_users_service.save_walk_directions_batch_for_user.assert_called_once_with(
+        1, {1: response}
+    )
+
+
+@patch("src.users.api.MapsApi")
+@patch("src.users.api.WalkhighlandsAPI")
+@patch("src.users.api.UserData")
+def test_plan_walk_directions_for_user(
+    mock_user_data, mock_walkhighlands_api, mock_maps_api
+):
+    mock_user_data.fetch_user_location.return_value = (1, LatLon(lat=56.0, lon=-4.0))
+    mock_walkhighlands_api.get_walk_start_locations.return_value = [
+        WalkStartLocationRecord(walk_id=walk_id, walk_start_location="56.9,-4.2")
+        for walk_id in (1, 2, 3)
+    ]
+    mock_walkhighlands_api.get_walk_trailheads.return_value = {
+        1: WalkTrailheadRecord(1, 10, "56.9,-4.2"),
+        2: WalkTrailheadRecord(2, 10, "56.9,-4.2"),
+    }
+    mock_user_data.get_walk_ids_missing_directions.return_value = {1, 2, 3}
+    lookup_plan = MapsLookupPlanDTO(
+        backend="google",
+        lookups=2,
+        cached=1,
+        uncached=1,
+        requests=1,
+        estimated_cost=0.005,
+    )
+    mock_maps_api.plan_driving_distances_from.return_value = lookup_plan
+
+    plan = UsersAPI.plan_walk_directions_for_user("test_user")
+
+    assert plan.missing_walks == 3
+    assert plan.lookup_plan == lookup_plan
+    mock_maps_api.plan_driving_distances_from.assert_called_once_with(
+        "56.0,-4.0", {("trailhead", 10): "56.9,-4.2", ("walk", 3): "56.9,-4.2"}
+    )
+    mock_maps_api.iter_driving_distances_from.assert_not_called()
+
+
+@patch.object(UsersService, "get_optimal_user_walks", return_value=[])
+@patch.object(UsersService, "fit_travel_estimator")
+@patch.object(WalkhighlandsAPI, "get_walk_trailheads", return_value={})
+@patch("src.users.api.MapsApi")
+@patch("src.users.api.UserData")
+def test_plan_walk_directions_for_user_top_n_applies_prefilter(
+    mock_user_data,
+    mock_maps_api,
+    mock_get_walk_trailheads,
+    mock_fit_travel_estimator,
+    mock_get_optimal_user_walks,
+):
+    mock_user_data.fetch_user_location.return_value = (1, LatLon(lat=56.0, lon=-4.0))
+    mock_user_data.get_walk_ids_missing_directions.return_value = {1, 2, 3}
+    mock_user_data.get_walk_candidates.return_value = [
+        WalkCandidateRecord(
+            walk_id, f"https://www.google.com/maps/search/{lat},-4.0/", None, 3600
+        )
+        for walk_id, lat in ((1, 58.5), (2, 56.1), (3, 56.5))
+    ]
+    mock_fit_travel_estimator.return_value = TravelTimeEstimator()
+    mock_maps_api.plan_driving_distances_from.return_value = MapsLookupPlanDTO(
+        backend="google",
+        lookups=1,
+        cached=0,
+        uncached=1,
+        requests=1,
+        estimated_cost=0.005,
+    )
+
+    plan = UsersAPI.plan_walk_directions_for_user("test_user", top_n=1)
+
+    assert plan.missing_walks == 1
+    mock_maps_api.plan_driving_distances_from.assert_called_once_with(
+        "56.0,-4.0", {("walk", 2): "56.1,-4.0"}
+    )
+    mock_maps_api.iter_driving_distances_from.assert_not_called()
+
+
+@patch("src.users.api.UsersService")
+@patch("src.users.api.MapsApi")
+@patch("src.users.api.WalkhighlandsAPI")
+@patch("src.users.api.UserData")
+def test_get_walk_directions_for_user_records_failures(
+    mock_user_data,
+    mock_walkhighlands_api,
+    mock_maps_api,
+    mock_users_service,
+):
+    mock_user_data.fetch_user_location.return_value = (1, LatLon(lat=56.0, lon=-4.0))
+    mock_walkhighlands_api.get_walk_start_locations.return_value = [
+        WalkStartLocationRecord(
+            walk_id=walk_id, walk_start_location=f"56.{walk_id},-4.0"
+        )
+        for walk_id in (1, 2)
     ]
-    mock_users_service.calculate_user_total_times.return_value = walk_infos
+    mock_walkhighlands_api.get_walk_trailheads.return_value = {}
+    mock_user_data.get_walk_ids_missing_directions.return_value = {1, 2}
+    response = MapsResponseDTO(
+        origin="56.0,-4.0",
+        destination="56.1,-4.0",
+        distance_meters=1000,
+        duration_seconds=60,
+    )
+    mock_maps_api.iter_driving_distances_from.return_value = iter(
+        [{("walk", 1): response}]
+    )
+
+    UsersAPI.get_walk_directions_for_user("test_user")
 
-    UsersAPI.get_optimal_user_routes(user, 10, ascending=True)
+    mock_user_data.clear_walk_direction_failures.assert_called_once_with(1, {1})
+    mock_user_data.record_walk_direction_failures.assert_called_once_with(1, {2})
 
-    mock_users_service.display_user_walk_travel_info.assert_called_once()
-    args, _ = mock_users_service.display_user_walk_travel_info.call_args
-    displayed_walks = args[0]
 
-    assert len(displayed_walks) == 2
-    assert displayed_walks[0].walk_info.walk_id == 1
-    assert displayed_walks[1].walk_info.walk_id == 3
+@patch("src.users.api.UsersService")
+@patch("src.users.api.MapsApi")
+@patch("src.users.api.WalkhighlandsAPI")
+@patch("src.users.api.UserData")
+def test_get_walk_directions_for_user_retry_failed(
+    mock_user_data,
+    mock_walkhighlands_api,
+    mock_maps_api,
+    mock_users_service,
+):
+    mock_user_data.fetch_user_location.return_value = (1, LatLon(lat=56.0, lon=-4.0))
+    mock_walkhighlands_api.get_walk_start_locations.return_value = [
+        WalkStartLocationRecord(
+            walk_id=walk_id, walk_start_location=f"56.{walk_id},-4.0"
+        )
+        for walk_id in (1, 2, 3)
+    ]
+    mock_walkhighlands_api.get_walk_trailheads.return_value = {}
+    mock_user_data.get_failed_walk_ids.return_value = {2}
+    mock_maps_api.iter_driving_distances_from.return_value = iter([])
+
+    UsersAPI.get_walk_directions_for_user("test_user", retry_failed=True)
+
+    mock_user_data.get_walk_ids_missing_directions.assert_not_called()
+    mock_maps_api.iter_driving_distances_from.assert_called_once_with(
+        origin="56.0,-4.0", destinations={("walk", 2): "56.2,-4.0"}
+    )
+    mock_user_data.record_walk_direction_failures.assert_called_once_with(1, {2})
+
+
+@patch("src.users.api.UsersService")
+@patch("src.users.api.MapsApi")
+@patch("src.users.api.WalkhighlandsAPI")
+@patch("src.users.api.UserData")
+def test_get_walk_directions_for_user_pauses_when_maps_unavailable(
+    mock_user_data,
+    mock_walkhighlands_api,
+    mock_maps_api,
+    mock_users_service,
+):
+    mock_user_data.fetch_user_location.return_value = (1, LatLon(lat=56.0, lon=-4.0))
+    mock_walkhighlands_api.get_walk_start_locations.return_value = [
+        WalkStartLocationRecord(walk_id=1, walk_start_location="56.1,-4.0")
+    ]
+    mock_walkhighlands_api.get_walk_trailheads.return_value = {}
+    mock_user_data.get_walk_ids_missing_directions.return_value = {1}
+    mock_maps_api.iter_driving_distances_from.side_effect = MapsUnavailableError("open")
+
+    UsersAPI.get_walk_directions_for_user("test_user")
+
+    mock_user_data.record_walk_direction_failures.assert_not_called()
+    mock_users_service.save_walk_directions_batch_for_user.assert_not_called()
+
+
+@patch("src.users.api.UsersService")
+@patch("src.users.api.MapsApi")
+@patch("src.users.api.WalkhighlandsAPI")
+@patch("src.users.api.UserData")
+def test_get_walk_directions_for_user_records_failures_on_maps_client_error(
+    mock_user_data,
+    mock_walkhighlands_api,
+    mock_maps_api,
+    mock_users_service,
+):
+    mock_user_data.fetch_user_location.return_value = (1, LatLon(lat=56.0, lon=-4.0))
+    mock_walkhighlands_api.get_walk_start_locations.return_value = [
+        WalkStartLocationRecord(walk_id=1, walk_start_location="56.1,-4.0")
+    ]
+    mock_walkhighlands_api.get_walk_trailheads.return_value = {}
+    mock_user_data.get_walk_ids_missing_directions.return_value = {1}
+    mock_maps_api.iter_driving_distances_from.side_effect = (
+        googlemaps.exceptions.Timeout()
+    )
+
+    UsersAPI.get_walk_directions_for_user("test_user")
+
+    mock_user_data.record_walk_direction_failures.assert_called_once_with(1, {1})
+
+
+@patch("src.users.api.UsersService")
+@patch("src.users.api.MapsApi")
+@patch("src.users.api.WalkhighlandsAPI")
+@patch("src.users.api.UserData")
+def test_get_walk_directions_for_user_raises_programming_errors(
+    mock_user_data,
+    mock_walkhighlands_api,
+    mock_maps_api,
+    mock_users_service,
+):
+    mock_user_data.fetch_user_location.return_value = (1, LatLon(lat=56.0, lon=-4.0))
+    mock_walkhighlands_api.get_walk_start_locations.return_value = [
+        WalkStartLocationRecord(walk_id=1, walk_start_location="56.1,-4.0")
+    ]
+    mock_walkhighlands_api.get_walk_trailheads.return_value = {}
+    mock_user_data.get_walk_ids_missing_directions.return_value = {1}
+    mock_maps_api.iter_driving_distances_from.side_effect = TypeError("bug")
+
+    with pytest.raises(TypeError):
+        UsersAPI.get_walk_directions_for_user("test_user")
+
+    mock_user_data.record_walk_direction_failures.assert_not_called()
+
+
+@patch("src.users.api.UsersService")
+@patch("src.users.api.UserData")
+def test_get_optimal_group_routes(mock_user_data, mock_users_service):
+    mock_user_data.get_user_id_for_name.side_effect = {"alice": 1, "bob": 2}.get
+    filters = WalkFilters(min_hills=2)
+
+    UsersAPI.get_optimal_group_routes(
+        ["alice", "bob"], 5, True, filters, "weighted", 0.75
+    )
+
+    mock_users_service.get_optimal_group_walks.assert_called_once_with(
+        {"alice": 1, "bob": 2}, 5, True, filters, "weighted", 0.75
+    )
+    mock_users_service.display_group_walks.assert_called_once_with(
+        mock_users_service.get_optimal_group_walks.return_value
+    )
+
+
+@patch("src.users.api.UsersService")
+@patch("src.users.api.UserData")
+def test_get_optimal_group_routes_user_not_found(mock_user_data, mock_users_service):
+    mock_user_data.get_user_id_for_name.side_effect = {"alice": 1}.get
+
+    with pytest.raises(ValueError, match="User not found"):
+        UsersAPI.get_optimal_group_routes(["alice", "carol"], 5)
 
-    UsersAPI.get_optimal_user_routes(user, 10, ascending=False)
-    args, _ = mock_users_service.display_user_walk_travel_info.call_args
-    displayed_walks = args[0]
-    assert displayed_walks[0].walk_info.walk_id == 3
-    assert displayed_walks[1].walk_info.walk_id == 1
+    mock_users_service.get_optimal_group_walks.assert_not_called()
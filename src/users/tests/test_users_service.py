@@ -1,6 +1,22 @@
+from datetime import date
+
+import numpy as np
+import pytest
+from src.maps.estimator import DEFAULT_CALIBRATION, TravelTimeEstimator
 from src.users.service import UsersService
-from src.users.tests.factories import create_user_walk_travel_info
-from src.users.dtos import LatLon
+from src.users.tests.factories import create_user_walk_travel_record
+from src.users.dtos import (
+    CompletionPlan,
+    LatLon,
+    SeasonDay,
+    SeasonPlan,
+    TripDay,
+    TripPlan,
+    TripWalkRecord,
+    WalkCandidateRecord,
+    WalkFilters,
+)
+from src.users.ranking import WalkColumns
 from unittest.mock import patch
 
 
@@ -46,7 +62,7 @@ def test_check_location_invalid_longitude_low():
 
 @patch("builtins.print")
 def test_display_user_walk_travel_info(mock_print):
-    walk_travel_info = create_user_walk_travel_info()
+    walk_travel_info = create_user_walk_travel_record()
 
     UsersService.display_user_walk_travel_info([walk_travel_info])
 
@@ -71,3 +87,221 @@ def test_display_user_walk_travel_info(mock_print):
     ]
     for call in expected_calls:
         mock_print.assert_any_call(call)
+
+
+def test_select_walks_to_fetch_without_known_totals():
+    estimated = np.array([300.0, 100.0, 200.0])
+    lower_bound = np.array([250.0, 50.0, 150.0])
+
+    selected = UsersService.select_walks_to_fetch(
+        estimated, lower_bound, [], top_n=2, limit=2
+    )
+
+    assert selected.tolist() == [1, 2]
+
+
+def test_select_walks_to_fetch_prunes_by_lower_bound():
+    estimated = np.array([300.0, 100.0, 200.0, 400.0])
+    lower_bound = np.array([250.0, 50.0, 150.0, 90.0])
+
+    selected = UsersService.select_walks_to_fetch(
+        estimated, lower_bound, [120.0, 160.0, 500.0], top_n=2, limit=10
+    )
+
+    assert selected.tolist() == [1, 2, 3]
+
+
+@patch("src.users.service.UserData")
+def test_fit_travel_estimator_without_samples(mock_user_data):
+    mock_user_data.get_travel_samples.return_value = []
+
+    estimator = UsersService.fit_travel_estimator()
+
+    assert estimator.default == DEFAULT_CALIBRATION
+
+
+def test_estimate_walk_total_times():
+    candidates = [
+        WalkCandidateRecord(
+            1, "https://www.google.com/maps/search/56.0,-4.0/", None, 3600
+        ),
+        WalkCandidateRecord(
+            2, "https://www.google.com/maps/search/57.0,-4.0/", None, 3600
+        ),
+    ]
+
+    estimated, lower_bound = UsersService.estimate_walk_total_times(
+        TravelTimeEstimator(), LatLon(lat=56.0, lon=-4.0), candidates
+    )
+
+    assert estimated[0] == lower_bound[0] == 3600
+    assert 3600 < lower_bound[1] < estimated[1]
+
+
+def test_read_user_import_csv(tmp_path):
+    import_file = tmp_path / "club.csv"
+    import_file.write_text("name,postcode\nAlice,EH1 1AA\nBob,\n")
+
+    results = UsersService.read_user_import(import_file)
+
+    assert [(r.line, r.name, r.postcode, r.status) for r in results] == [
+        (2, "Alice", "EH1 1AA", "pending"),
+        (3, "Bob", "", "invalid"),
+    ]
+
+
+def test_read_user_import_jsonl(tmp_path):
+    import_file = tmp_path / "club.jsonl"
+    import_file.write_text(
+        '{"name": "Alice", "postcode": "EH1 1AA"}\n'
+        "\n"
+        "not json\n"
+        '{"name": "Carol", "postcode": "IV1 1AA"}\n'
+    )
+
+    results = UsersService.read_user_import(import_file)
+
+    assert [(r.line, r.name, r.status) for r in results] == [
+        (1, "Alice", "pending"),
+        (3, "", "invalid"),
+        (4, "Carol", "pending"),
+    ]
+
+
+def test_aggregate_group_totals():
+    totals = np.array([[100.0, 300.0], [200.0, 100.0]])
+
+    assert UsersService.aggregate_group_totals(totals, "max").tolist() == [200, 300]
+    assert UsersService.aggregate_group_totals(totals, "sum").tolist() == [300, 400]
+    assert UsersService.aggregate_group_totals(
+        totals, "weighted", max_weight=0.5
+    ).tolist() == [175, 250]
+
+
+def test_aggregate_group_totals_unsupported():
+    with pytest.raises(ValueError, match="Unsupported group aggregate"):
+        UsersService.aggregate_group_totals(np.ones((2, 2)), "median")
+
+
+def make_columns(walk_ids, totals):
+    walk_ids = np.array(walk_ids, dtype=np.int64)
+    return WalkColumns(
+        walk_ids=walk_ids,
+        walk_duration_seconds=np.array(totals, dtype=np.float64),
+        walk_distance_meters=np.zeros(walk_ids.size),
+        walk_ascent_meters=np.zeros(walk_ids.size),
+        number_of_hills=np.ones(walk_ids.size),
+        travel_distance_meters=np.zeros(walk_ids.size),
+        travel_duration_seconds=np.zeros(walk_ids.size),
+        grade=np.ones(walk_ids.size),
+        bog_factor=np.ones(walk_ids.size),
+        user_rating=np.ones(walk_ids.size),
+        new_hills=np.ones(walk_ids.size),
+    )
+
+
+@patch("src.users.service.UserData")
+@patch("src.users.service.RankingEngine.load_group_columns")
+def test_get_optimal_group_walks(mock_load_group_columns, mock_user_data):
+    member_columns = {
+        1: make_columns([1, 2, 3, 4], [100, 500, 200, 50]),
+        2: make_columns([1, 2, 3], [900, 100, 250]),
+    }
+    mock_load_group_columns.side_effect = lambda user_ids, filters: [
+        member_columns[user_id] for user_id in user_ids
+    ]
+    mock_user_data.get_user_walks_travel_info_for_walks.side_effect = (
+        lambda user_id, walk_ids: {
+            walk_id: create_user_walk_travel_record(user_id=user_id, walk_id=walk_id)
+            for walk_id in walk_ids
+        }
+    )
+    filters = WalkFilters(min_hills=2)
+
+    result = UsersService.get_optimal_group_walks(
+        {"alice": 1, "bob": 2}, number_of_routes=2, filters=filters, aggregate="max"
+    )
+
+    mock_load_group_columns.assert_called_once_with([1, 2], filters)
+    assert [group_walk.walk.walk_id for group_walk in result] == [3, 2]
+    assert result[0].score_seconds == 250
+    assert result[0].member_total_seconds == {"alice": 200, "bob": 250}
+    assert result[0].walk.total_time_seconds == 200
+    assert result[1].member_total_seconds == {"alice": 500, "bob": 100}
+    mock_user_data.get_user_walks_travel_info_for_walks.assert_called_once_with(
+        1, [3, 2]
+    )
+
+
+@patch("builtins.print")
+def test_display_user_walk_travel_info_with_score(mock_print):
+    walk_travel_info = create_user_walk_travel_record(score=1.5)
+
+    UsersService.display_user_walk_travel_info([walk_travel_info])
+
+    mock_print.assert_any_call("  Score: 1.50")
+
+
+@patch("builtins.print")
+def test_display_completion_plan(mock_print):
+    plan = CompletionPlan(
+        walks=[create_user_walk_travel_record(total_time_seconds=21600)],
+        total_seconds=21600,
+        remaining_hills=3,
+        uncovered_hills=["Ben Nevis"],
+        proved_optimal=True,
+    )
+
+    UsersService.display_completion_plan(plan)
+
+    mock_print.assert_any_call("Remaining Hills: 3")
+    mock_print.assert_any_call("Total Time: 6h 0m")
+    mock_print.assert_any_call("Proved optimal")
+    mock_print.assert_any_call("Not reached by any walk with directions: Ben Nevis")
+    mock_print.assert_any_call("Hills: Test Hill")
+
+
+@patch("builtins.print")
+def test_display_trip_plan(mock_print):
+    walk = TripWalkRecord(
+        1, "Test Walk", "http://test.com", 18000, ["Test Hill"], 3600, 1
+    )
+    plan = TripPlan(
+        base=LatLon(lat=57.0, lon=-5.0),
+        days=[TripDay(walks=[walk], drive_seconds=7200, total_seconds=25200)],
+        new_hills=1,
+        total_seconds=25200,
+    )
+
+    UsersService.display_trip_plan(plan)
+
+    mock_print.assert_any_call("Base: 57.0000,-5.0000")
+    mock_print.assert_any_call("New Hills: 1")
+    mock_print.assert_any_call("Day 1: 7h 0m, driving 2h 0m")
+    mock_print.assert_any_call("  Walk Name: Test Walk")
+    mock_print.assert_any_call("  Drive: 1h 0m, Walk: 5h 0m")
+
+
+@patch("builtins.print")
+def test_display_season_plan(mock_print):
+    plan = SeasonPlan(
+        days=[
+            SeasonDay(day=date(2026, 5, 2)),
+            SeasonDay(
+                day=date(2026, 5, 3),
+                walk=create_user_walk_travel_record(total_time_seconds=21600),
+                daylight_seconds=57600,
+                new_hills=1,
+            ),
+        ],
+        new_hills=1,
+        total_seconds=21600,
+    )
+
+    UsersService.display_season_plan(plan)
+
+    mock_print.assert_any_call("Walks: 1")
+    mock_print.assert_any_call("2026-05-02: no walk")
+    mock_print.assert_any_call("2026-05-03: Test Walk")
+    mock_print.assert_any_call("  Total Time: 6h 0m")
+    mock_print.assert_any_call("  Daylight: 16h 0m")
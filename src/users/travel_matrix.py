@@ -0,0 +1,292 @@
+import logging
+import math
+import os
+from pathlib import Path
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.users.data import UserData
+from src.walkhighlands.api import WalkhighlandsAPI
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRAVEL_MATRIX_DIR = "travel_matrix"
+SECONDS_FILE = "travel_seconds.npy"
+METERS_FILE = "travel_meters.npy"
+INDEX_FILE = "index.npz"
+# Spare rows and columns allocated when the matrix grows, so adding a user
+# or walk does not rewrite the files every time.
+GROWTH_FACTOR = 1.5
+MIN_CAPACITY = 16
+
+
+class TravelMatrix:
+    """
+    Travel time in seconds and distance in meters from every user to every
+    walk start, in users x walks float32 arrays stored as .npy files and
+    opened as memory maps. Row i is user_ids[i] and column j walk_ids[j];
+    pairs without directions are NaN. The arrays may have spare capacity
+    beyond the ids, so slice with user_row or the seconds and meters
+    properties rather than the raw files. last_directions_id is the newest
+    user_walk_directions row applied, so refresh only reads newer rows, and
+    directions_count the number of rows applied, so refresh can tell when
+    any of them has been deleted.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        user_ids: NDArray[np.int64],
+        walk_ids: NDArray[np.int64],
+        seconds: NDArray[np.float32],
+        meters: NDArray[np.float32],
+        last_directions_id: int,
+        directions_count: int,
+    ) -> None:
+        self.directory = directory
+        self.user_ids = user_ids
+        self.walk_ids = walk_ids
+        self._seconds = seconds
+        self._meters = meters
+        self.last_directions_id = last_directions_id
+        self.directions_count = directions_count
+        self.user_index = {int(user_id): row for row, user_id in enumerate(user_ids)}
+        self.walk_index = {int(walk_id): col for col, walk_id in enumerate(walk_ids)}
+
+    @property
+    def seconds(self) -> NDArray[np.float32]:
+        """Travel seconds for every user and walk, a view on the memory map."""
+        return self._seconds[: self.user_ids.size, : self.walk_ids.size]
+
+    @property
+    def meters(self) -> NDArray[np.float32]:
+        """Travel meters for every user and walk, a view on the memory map."""
+        return self._meters[: self.user_ids.size, : self.walk_ids.size]
+
+    def user_row(
+        self, user_id: int
+    ) -> tuple[NDArray[np.float32], NDArray[np.float32]] | None:
+        """
+        Travel seconds and meters from the user to every walk, in walk_ids
+        order, as views on the memory map. None for an unknown user.
+        """
+        row = self.user_index.get(user_id)
+        if row is None:
+            return None
+        return self.seconds[row], self.meters[row]
+
+    def walk_columns(self, walk_ids: NDArray[np.int64] | list[int]) -> NDArray[np.intp]:
+        """Column of each walk id, or -1 for walks not in the matrix."""
+        return np.fromiter(
+            (self.walk_index.get(int(walk_id), -1) for walk_id in walk_ids),
+            dtype=np.intp,
+            count=len(walk_ids),
+        )
+
+    @staticmethod
+    def default_directory() -> Path:
+        """Directory of the matrix files, from TRAVEL_MATRIX_DIR."""
+        return Path(os.getenv("TRAVEL_MATRIX_DIR", DEFAULT_TRAVEL_MATRIX_DIR))
+
+    @staticmethod
+    def exists(directory: Path | None = None) -> bool:
+        """Whether a matrix has been built in the directory."""
+        directory = directory or TravelMatrix.default_directory()
+        return (directory / INDEX_FILE).exists()
+
+    @classmethod
+    def open(
+        cls, directory: Path | None = None, writable: bool = False
+    ) -> "TravelMatrix | None":
+        """
+        Open a built matrix without reading the arrays into memory, or None
+        if there is none. Read-only unless writable.
+        """
+        directory = directory or cls.default_directory()
+        if not cls.exists(directory):
+            return None
+        mmap_mode = "r+" if writable else "r"
+        with np.load(directory / INDEX_FILE) as index:
+            user_ids = index["user_ids"]
+            walk_ids = index["walk_ids"]
+            last_directions_id = int(index["last_directions_id"])
+            # Indexes written before the count was kept are rebuilt.
+            directions_count = (
+                int(index["directions_count"]) if "directions_count" in index else -1
+            )
+        return cls(
+            directory,
+            user_ids,
+            walk_ids,
+            np.load(directory / SECONDS_FILE, mmap_mode=mmap_mode),
+            np.load(directory / METERS_FILE, mmap_mode=mmap_mode),
+            last_directions_id,
+            directions_count,
+        )
+
+    @classmethod
+    def refresh(
+        cls, directory: Path | None = None, rebuild: bool = False
+    ) -> "TravelMatrix":
+        """
+        Bring the matrix up to date with the database, building it if it
+        does not exist. Only directions saved since the last refresh are
+        read; new users and walks are appended, growing the files when
+        their spare capacity runs out. The matrix is rebuilt from scratch
+        when asked to, or when directions it holds have been deleted.
+        """
+        directory = directory or cls.default_directory()
+        matrix = None if rebuild else cls.open(directory, writable=True)
+        if (
+            matrix is not None
+            and UserData.count_walk_directions(matrix.last_directions_id)
+            != matrix.directions_count
+        ):
+            logger.info(
+                "Walk directions were removed, rebuilding the travel matrix",
+                extra={"directory": str(directory)},
+            )
+            matrix = None
+
+        directions = cls._read_directions_since(
+            matrix.last_directions_id if matrix is not None else 0
+        )
+        user_ids = matrix.user_ids if matrix is not None else np.empty(0, np.int64)
+        walk_ids = matrix.walk_ids if matrix is not None else np.empty(0, np.int64)
+        new_user_ids = cls._new_ids(
+            user_ids, [UserData.get_user_ids(), directions[:, 1]]
+        )
+        new_walk_ids = cls._new_ids(
+            walk_ids,
+            [
+                [walk.walk_id for walk in WalkhighlandsAPI.get_walk_start_locations()],
+                directions[:, 2],
+            ],
+        )
+        if matrix is None or new_user_ids.size or new_walk_ids.size:
+            directory.mkdir(parents=True, exist_ok=True)
+            matrix = cls._allocate(
+                directory,
+                np.concatenate([user_ids, new_user_ids]),
+                np.concatenate([walk_ids, new_walk_ids]),
+                matrix,
+            )
+
+        if directions.size:
+            rows = np.fromiter(
+                (matrix.user_index[int(user_id)] for user_id in directions[:, 1]),
+                dtype=np.intp,
+                count=len(directions),
+            )
+            cols = matrix.walk_columns(directions[:, 2])
+            matrix._meters[rows, cols] = directions[:, 3]
+            matrix._seconds[rows, cols] = directions[:, 4]
+            matrix.last_directions_id = int(directions[-1, 0])
+            matrix.directions_count += len(directions)
+        matrix._flush()
+        logger.info(
+            "Refreshed travel matrix",
+            extra={
+                "directory": str(directory),
+                "users": matrix.user_ids.size,
+                "walks": matrix.walk_ids.size,
+                "new_directions": len(directions),
+            },
+        )
+        return matrix
+
+    @staticmethod
+    def _read_directions_since(last_id: int) -> NDArray[np.int64]:
+        """New directions as an (n, 5) array of id, user, walk, meters, seconds."""
+        chunks = [
+            np.array(rows, dtype=np.int64)
+            for rows in UserData.iter_walk_directions_since(last_id)
+        ]
+        if not chunks:
+            return np.empty((0, 5), dtype=np.int64)
+        return np.concatenate(chunks)
+
+    @staticmethod
+    def _new_ids(
+        known_ids: NDArray[np.int64], id_sources: list[list[int] | NDArray[np.int64]]
+    ) -> NDArray[np.int64]:
+        """Ids from any of the sources that are not known yet, sorted."""
+        ids = np.unique(
+            np.concatenate([np.asarray(ids, dtype=np.int64) for ids in id_sources])
+        )
+        return ids[~np.isin(ids, known_ids)]
+
+    @classmethod
+    def _allocate(
+        cls,
+        directory: Path,
+        user_ids: NDArray[np.int64],
+        walk_ids: NDArray[np.int64],
+        current: "TravelMatrix | None",
+    ) -> "TravelMatrix":
+        """
+        Make room for the ids, reusing the current files while they have
+        capacity and otherwise copying them into larger ones.
+        """
+        needed = (user_ids.size, walk_ids.size)
+        if current is not None and all(
+            size <= capacity for size, capacity in zip(needed, current._seconds.shape)
+        ):
+            return cls(
+                directory,
+                user_ids,
+                walk_ids,
+                current._seconds,
+                current._meters,
+                current.last_directions_id,
+                current.directions_count,
+            )
+        shape = tuple(
+            max(MIN_CAPACITY, math.ceil(size * GROWTH_FACTOR)) for size in needed
+        )
+        arrays = []
+        for name in (SECONDS_FILE, METERS_FILE):
+            temporary = directory / (name + ".tmp")
+            array = np.lib.format.open_memmap(
+                temporary, mode="w+", dtype=np.float32, shape=shape
+            )
+            array[:] = np.nan
+            if current is not None:
+                old = current._seconds if name == SECONDS_FILE else current._meters
+                array[: old.shape[0], : old.shape[1]] = old
+            array.flush()
+            del array
+            arrays.append(temporary)
+        if current is not None:
+            del current._seconds, current._meters
+        for temporary, name in zip(arrays, (SECONDS_FILE, METERS_FILE)):
+            os.replace(temporary, directory / name)
+        logger.debug(
+            "Allocated travel matrix",
+            extra={"directory": str(directory), "shape": shape},
+        )
+        return cls(
+            directory,
+            user_ids,
+            walk_ids,
+            np.load(directory / SECONDS_FILE, mmap_mode="r+"),
+            np.load(directory / METERS_FILE, mmap_mode="r+"),
+            current.last_directions_id if current is not None else 0,
+            current.directions_count if current is not None else 0,
+        )
+
+    def _flush(self) -> None:
+        """Write the arrays, then the index, so the index never runs ahead."""
+        for array in (self._seconds, self._meters):
+            if isinstance(array, np.memmap):
+                array.flush()
+        temporary = self.directory / (INDEX_FILE + ".tmp.npz")
+        np.savez(
+            temporary,
+            user_ids=self.user_ids,
+            walk_ids=self.walk_ids,
+            last_directions_id=np.int64(self.last_directions_id),
+            directions_count=np.int64(self.directions_count),
+        )
+        os.replace(temporary, self.directory / INDEX_FILE)
@@ -0,0 +1,382 @@
+import logging
+import time
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.users.data import UserData
+from src.users.dtos import LatLon, TripDay, TripPlan, WalkFilters
+from src.users.hill_bitsets import WalkHillBitsets
+from src.users.service import UsersService
+
+logger = logging.getLogger(__name__)
+
+# Rounds of local search and re-insertion before settling for the plan.
+MAX_IMPROVEMENT_ROUNDS = 50
+# Savings smaller than this are rounding, not an improvement.
+TIME_TOLERANCE = 1e-6
+
+
+class TripPlanner:
+    """
+    Plans a multi-day trip from one base: each day drives from the base to
+    one or more walks in turn and back, within a daily time budget, and the
+    days together bag as many hills the user has not bagged as possible.
+
+    Walks are indexed by row of bits and walk_seconds. travel is the driving
+    time matrix over the base, node 0, and the walk starts, node i + 1 for
+    walk i. A day is the list of its walks in order.
+    """
+
+    @staticmethod
+    def plan_for_user(
+        user_id: int,
+        base: LatLon,
+        days: int,
+        daily_budget_seconds: float,
+        filters: WalkFilters | None = None,
+    ) -> TripPlan:
+        """
+        Plan a trip of up to days days from base, each within
+        daily_budget_seconds of driving and walking, using the walks that
+        pass the filters and bag a hill the user has not. Driving times are
+        estimated offline from the calibrated travel time estimator.
+        """
+        if days < 1:
+            raise ValueError("A trip needs at least one day")
+        if daily_budget_seconds <= 0:
+            raise ValueError("The daily time budget must be positive")
+        started = time.perf_counter()
+        candidates = UserData.get_walk_candidates(filters)
+        estimator = UsersService.fit_travel_estimator()
+        starts = UsersService.walk_start_coordinates(candidates)
+        regions = np.array([walk.region for walk in candidates], dtype=object)
+        walk_ids = np.array([walk.walk_id for walk in candidates], dtype=np.int64)
+        walk_seconds = np.array(
+            [walk.walk_duration_seconds for walk in candidates], dtype=np.float64
+        )
+        bitsets = WalkHillBitsets.load()
+        bagged = bitsets.hill_mask(UserData.get_bagged_hill_ids(user_id))
+        bits = bitsets.walk_bits(walk_ids) & ~bagged
+
+        # Only walks that fit a day on their own and bag something are useful.
+        base_seconds = estimator.estimate_seconds(
+            base.lat, base.lon, starts[:, 0], starts[:, 1], regions
+        )
+        useful = (walk_seconds + 2 * base_seconds <= daily_budget_seconds) & (
+            WalkHillBitsets.popcount(bits) > 0
+        )
+        travel = estimator.estimate_matrix_seconds(
+            np.concatenate([[base.lat], starts[useful, 0]]),
+            np.concatenate([[base.lon], starts[useful, 1]]),
+            np.concatenate([[None], regions[useful]]),
+        )
+        walk_ids = walk_ids[useful]
+        walk_seconds = walk_seconds[useful]
+        bits = bits[useful]
+
+        routes = TripPlanner.solve(
+            travel, walk_seconds, bits, days, daily_budget_seconds
+        )
+        plan = TripPlanner._build_plan(base, routes, travel, walk_ids, bits)
+        logger.info(
+            "Planned trip",
+            extra={
+                "user_id": user_id,
+                "days": days,
+                "daily_budget_seconds": daily_budget_seconds,
+                "candidate_walks": int(walk_ids.size),
+                "walks": sum(len(day.walks) for day in plan.days),
+                "new_hills": plan.new_hills,
+                "total_seconds": plan.total_seconds,
+                "elapsed_seconds": round(time.perf_counter() - started, 3),
+            },
+        )
+        return plan
+
+    @staticmethod
+    def solve(
+        travel: NDArray[np.float64],
+        walk_seconds: NDArray[np.float64],
+        bits: NDArray[np.uint64],
+        days: int,
+        budget: float,
+    ) -> list[list[int]]:
+        """
+        Choose and order walks for each day to bag the most hills. Greedy
+        insertion builds the days, then local search alternates 2-opt within
+        each day, Or-opt moves of a walk to its cheapest slot on any day and
+        swaps of a walk for one bagging more hills, re-inserting walks into
+        the time freed, until no move helps.
+        """
+        routes: list[list[int]] = [[] for _ in range(days)]
+        TripPlanner.insert(routes, travel, walk_seconds, bits, budget)
+        for _ in range(MAX_IMPROVEMENT_ROUNDS):
+            for route in routes:
+                TripPlanner.two_opt(route, travel, walk_seconds)
+            relocated = TripPlanner.relocate(routes, travel, walk_seconds, budget)
+            inserted = TripPlanner.insert(routes, travel, walk_seconds, bits, budget)
+            swapped = TripPlanner.swap(routes, travel, walk_seconds, bits, budget)
+            if not (relocated or inserted or swapped):
+                break
+        return routes
+
+    @staticmethod
+    def insert(
+        routes: list[list[int]],
+        travel: NDArray[np.float64],
+        walk_seconds: NDArray[np.float64],
+        bits: NDArray[np.uint64],
+        budget: float,
+    ) -> bool:
+        """
+        Greedy insertion: keep adding the walk with the most new hills per
+        second of added day time, at its cheapest slot on a day it fits,
+        until no walk both fits and bags a new hill. Returns whether any
+        walk was added.
+        """
+        selected = TripPlanner._selected(routes, walk_seconds.size)
+        covered = TripPlanner._covered(routes, bits)
+        day_seconds = [TripPlanner.day_seconds(r, travel, walk_seconds) for r in routes]
+        added = False
+        while True:
+            gains = WalkHillBitsets.popcount(bits & ~covered)
+            candidates = np.flatnonzero(~selected & (gains > 0))
+            if candidates.size == 0:
+                break
+            best = None
+            for day, route in enumerate(routes):
+                cost, position = TripPlanner._cheapest_insertion(
+                    route, candidates, travel, walk_seconds
+                )
+                fits = day_seconds[day] + cost <= budget
+                if not fits.any():
+                    continue
+                ratio = np.where(
+                    fits, gains[candidates] / np.maximum(cost, 1.0), -np.inf
+                )
+                k = int(np.argmax(ratio))
+                if best is None or ratio[k] > best[0]:
+                    best = (ratio[k], day, int(candidates[k]), int(position[k]))
+            if best is None:
+                break
+            _, day, walk, position = best
+            routes[day].insert(position, walk)
+            day_seconds[day] = TripPlanner.day_seconds(
+                routes[day], travel, walk_seconds
+            )
+            selected[walk] = True
+            covered |= bits[walk]
+            added = True
+        return added
+
+    @staticmethod
+    def two_opt(
+        route: list[int], travel: NDArray[np.float64], walk_seconds: NDArray[np.float64]
+    ) -> bool:
+        """
+        Reverse stretches of a day's walks while that shortens the day's
+        driving. Returns whether the order changed.
+        """
+        best = TripPlanner.day_seconds(route, travel, walk_seconds)
+        changed = False
+        improved = True
+        while improved:
+            improved = False
+            for i in range(len(route) - 1):
+                for j in range(i + 1, len(route)):
+                    trial = route[:i] + route[i : j + 1][::-1] + route[j + 1 :]
+                    seconds = TripPlanner.day_seconds(trial, travel, walk_seconds)
+                    if seconds < best - TIME_TOLERANCE:
+                        route[:] = trial
+                        best = seconds
+                        changed = improved = True
+        return changed
+
+    @staticmethod
+    def relocate(
+        routes: list[list[int]],
+        travel: NDArray[np.float64],
+        walk_seconds: NDArray[np.float64],
+        budget: float,
+    ) -> bool:
+        """
+        Or-opt: move single walks to the cheapest slot on any day, the same
+        day included, where that cuts the trip's total time and the day
+        still fits the budget. Returns whether any walk moved.
+        """
+        moved = False
+        improved = True
+        while improved:
+            improved = False
+            day_seconds = [
+                TripPlanner.day_seconds(r, travel, walk_seconds) for r in routes
+            ]
+            for day, route in enumerate(routes):
+                for index, walk in enumerate(route):
+                    rest = route[:index] + route[index + 1 :]
+                    saving = day_seconds[day] - TripPlanner.day_seconds(
+                        rest, travel, walk_seconds
+                    )
+                    walk_array = np.array([walk])
+                    for target, other in enumerate(routes):
+                        target_route = rest if target == day else other
+                        cost, position = TripPlanner._cheapest_insertion(
+                            target_route, walk_array, travel, walk_seconds
+                        )
+                        target_seconds = (
+                            day_seconds[day] - saving
+                            if target == day
+                            else day_seconds[target]
+                        )
+                        if (
+                            cost[0] < saving - TIME_TOLERANCE
+                            and target_seconds + cost[0] <= budget
+                        ):
+                            route[:] = rest
+                            other.insert(int(position[0]), walk)
+                            moved = improved = True
+                            break
+                    if improved:
+                        break
+                if improved:
+                    break
+        return moved
+
+    @staticmethod
+    def swap(
+        routes: list[list[int]],
+        travel: NDArray[np.float64],
+        walk_seconds: NDArray[np.float64],
+        bits: NDArray[np.uint64],
+        budget: float,
+    ) -> bool:
+        """
+        Replace a planned walk with an unplanned one that bags more hills
+        the rest of the trip does not, at its cheapest slot on the same day
+        if it fits, preferring the biggest gain. Returns whether any walk
+        was replaced.
+        """
+        swapped = False
+        improved = True
+        while improved:
+            improved = False
+            selected = TripPlanner._selected(routes, walk_seconds.size)
+            for day, route in enumerate(routes):
+                for index, walk in enumerate(route):
+                    rest = route[:index] + route[index + 1 :]
+                    others = [r if d != day else rest for d, r in enumerate(routes)]
+                    covered = TripPlanner._covered(others, bits)
+                    gains = WalkHillBitsets.popcount(bits & ~covered)
+                    candidates = np.flatnonzero(~selected & (gains > gains[walk]))
+                    if candidates.size == 0:
+                        continue
+                    cost, position = TripPlanner._cheapest_insertion(
+                        rest, candidates, travel, walk_seconds
+                    )
+                    rest_seconds = TripPlanner.day_seconds(rest, travel, walk_seconds)
+                    fits = rest_seconds + cost <= budget
+                    if not fits.any():
+                        continue
+                    order = np.lexsort((cost, -gains[candidates]))
+                    k = int(order[np.argmax(fits[order])])
+                    rest.insert(int(position[k]), int(candidates[k]))
+                    route[:] = rest
+                    swapped = improved = True
+                    break
+                if improved:
+                    break
+        return swapped
+
+    @staticmethod
+    def day_seconds(
+        route: list[int], travel: NDArray[np.float64], walk_seconds: NDArray[np.float64]
+    ) -> float:
+        """Driving and walking time of a day that visits route from the base."""
+        if not route:
+            return 0.0
+        nodes = np.array([0, *(walk + 1 for walk in route), 0])
+        return float(travel[nodes[:-1], nodes[1:]].sum() + walk_seconds[route].sum())
+
+    @staticmethod
+    def _cheapest_insertion(
+        route: list[int],
+        candidates: NDArray[np.int64],
+        travel: NDArray[np.float64],
+        walk_seconds: NDArray[np.float64],
+    ) -> tuple[NDArray[np.float64], NDArray[np.int64]]:
+        """
+        The least time each candidate adds to a day, and the position in
+        the route where it adds it, for every candidate at once.
+        """
+        nodes = np.array([0, *(walk + 1 for walk in route), 0])
+        previous, following = nodes[:-1], nodes[1:]
+        added = (
+            travel[np.ix_(previous, candidates + 1)]
+            + walk_seconds[candidates][None, :]
+            + travel[np.ix_(candidates + 1, following)].T
+            - travel[previous, following][:, None]
+        )
+        position = np.argmin(added, axis=0)
+        return added[position, np.arange(candidates.size)], position
+
+    @staticmethod
+    def _build_plan(
+        base: LatLon,
+        routes: list[list[int]],
+        travel: NDArray[np.float64],
+        walk_ids: NDArray[np.int64],
+        bits: NDArray[np.uint64],
+    ) -> TripPlan:
+        """Turn the planned days into a TripPlan with walk details."""
+        records = UserData.get_trip_walks(
+            [int(walk_ids[walk]) for route in routes for walk in route]
+        )
+        covered = np.zeros(bits.shape[1], dtype=np.uint64)
+        trip_days = []
+        for route in routes:
+            if not route:
+                continue
+            nodes = np.array([0, *(walk + 1 for walk in route), 0])
+            legs = np.rint(travel[nodes[:-1], nodes[1:]]).astype(int)
+            walks = []
+            for walk, leg in zip(route, legs):
+                record = records[int(walk_ids[walk])]
+                record.drive_seconds = int(leg)
+                record.new_hills = int(WalkHillBitsets.popcount(bits[walk] & ~covered))
+                covered |= bits[walk]
+                walks.append(record)
+            drive_seconds = int(legs.sum())
+            trip_days.append(
+                TripDay(
+                    walks=walks,
+                    drive_seconds=drive_seconds,
+                    total_seconds=drive_seconds
+                    + sum(walk.walk_duration_seconds for walk in walks),
+                )
+            )
+        return TripPlan(
+            base=base,
+            days=trip_days,
+            new_hills=int(WalkHillBitsets.popcount(covered)),
+            total_seconds=sum(day.total_seconds for day in trip_days),
+        )
+
+    @staticmethod
+    def _selected(routes: list[list[int]], size: int) -> NDArray[np.bool_]:
+        """Mask of the walks on any day."""
+        selected = np.zeros(size, dtype=bool)
+        selected[[walk for route in routes for walk in route]] = True
+        return selected
+
+    @staticmethod
+    def _covered(
+        routes: list[list[int]], bits: NDArray[np.uint64]
+    ) -> NDArray[np.uint64]:
+        """Bitset of the hills bagged by the walks on any day."""
+        walks = [walk for route in routes for walk in route]
+        return (
+            np.bitwise_or.reduce(bits[walks], axis=0)
+            if walks
+            else (np.zeros(bits.shape[1], dtype=np.uint64))
+        )
@@ -0,0 +1,48 @@
+from collections.abc import Iterable
+from datetime import date
+
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+
+# Altitude of the sun's centre at sunrise and sunset: the sun's radius plus
+# atmospheric refraction put the top of its disc on the horizon.
+SUNRISE_ALTITUDE_DEGREES = -0.833
+SECONDS_PER_DAY = 86_400
+
+
+def day_of_year(dates: Iterable[date]) -> NDArray[np.int64]:
+    """Day of the year of each date, 1 for the 1st of January."""
+    return np.array([day.timetuple().tm_yday for day in dates], dtype=np.int64)
+
+
+def solar_declination(day: ArrayLike) -> NDArray[np.float64]:
+    """
+    Declination of the sun in radians on each day of the year, from the
+    Fourier series used by NOAA's solar calculator.
+    """
+    gamma = 2 * np.pi / 365 * (np.asarray(day, dtype=np.float64) - 1)
+    return (
+        0.006918
+        - 0.399912 * np.cos(gamma)
+        + 0.070257 * np.sin(gamma)
+        - 0.006758 * np.cos(2 * gamma)
+        + 0.000907 * np.sin(2 * gamma)
+        - 0.002697 * np.cos(3 * gamma)
+        + 0.00148 * np.sin(3 * gamma)
+    )
+
+
+def daylight_seconds(latitude: ArrayLike, day: ArrayLike) -> NDArray[np.float64]:
+    """
+    Seconds from sunrise to sunset at latitudes in degrees on days of the
+    year. Inputs broadcast, so a column of latitudes against a row of days
+    gives every latitude on every day at once. Polar day and night give a
+    full day and zero.
+    """
+    phi = np.radians(latitude)
+    declination = solar_declination(day)
+    cos_hour_angle = (
+        np.sin(np.radians(SUNRISE_ALTITUDE_DEGREES)) - np.sin(phi) * np.sin(declination)
+    ) / (np.cos(phi) * np.cos(declination))
+    hour_angle = np.arccos(np.clip(cos_hour_angle, -1.0, 1.0))
+    return hour_angle / np.pi * SECONDS_PER_DAY
@@ -1,3 +1,9 @@
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+
+EARTH_RADIUS_METERS = 6_371_000.0
+
+
 def kilometers_to_meters(kilometers: float) -> int:
     """Convert kilometers to meters."""
     return int(kilometers * 1000)
@@ -26,3 +32,25 @@ def user_display_distance(
         return f"{kilometers} km {meters} m"
     else:
         return f"{meters} m"
+
+
+def great_circle_meters(
+    origin_lat: ArrayLike,
+    origin_lon: ArrayLike,
+    destination_lat: ArrayLike,
+    destination_lon: ArrayLike,
+) -> NDArray[np.float64]:
+    """
+    Haversine distance in meters between origins and destinations given in
+    degrees. Inputs broadcast, so one origin can be passed against arrays of
+    destinations.
+    """
+    lat1 = np.radians(origin_lat)
+    lat2 = np.radians(destination_lat)
+    delta_lat = lat2 - lat1
+    delta_lon = np.radians(destination_lon) - np.radians(origin_lon)
+    a = (
+        np.sin(delta_lat / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin(delta_lon / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
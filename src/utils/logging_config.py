@@ -38,7 +38,7 @@ class CustomFormatter(logging.Formatter):
                 extra_data[key] = value
 
         if extra_data:
-            message += f" (extra: {json.dumps(extra_data)})\n"
+            message += f" (extra: {json.dumps(extra_data, default=str)})\n"
         return message
 
 
@@ -0,0 +1,27 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter that spaces calls to at most max_per_second.
+    Each caller reserves the next free slot and sleeps until it arrives, so
+    concurrent workers share one overall rate.
+    """
+
+    def __init__(self, max_per_second: float) -> None:
+        if max_per_second <= 0:
+            raise ValueError("max_per_second must be positive.")
+        self.interval = 1.0 / max_per_second
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until the caller may make its next call."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
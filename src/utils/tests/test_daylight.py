@@ -0,0 +1,43 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from src.utils.daylight import SECONDS_PER_DAY, day_of_year, daylight_seconds
+
+
+def test_day_of_year():
+    days = day_of_year([date(2026, 1, 1), date(2026, 6, 21), date(2024, 12, 31)])
+
+    assert days.tolist() == [1, 172, 366]
+
+
+def test_daylight_in_edinburgh_at_the_solstices():
+    summer, winter = daylight_seconds(
+        55.95, day_of_year([date(2026, 6, 21), date(2026, 12, 21)])
+    )
+
+    # Sunrise to sunset is about 17h 35m in June and 6h 57m in December.
+    assert summer == pytest.approx(17.58 * 3600, abs=180)
+    assert winter == pytest.approx(6.95 * 3600, abs=180)
+
+
+def test_daylight_broadcasts_latitudes_against_days():
+    latitudes = np.array([55.0, 58.5])
+    days = day_of_year([date(2026, 3, 20), date(2026, 6, 21), date(2026, 12, 21)])
+
+    daylight = daylight_seconds(latitudes[:, None], days[None, :])
+
+    assert daylight.shape == (2, 3)
+    assert daylight[0, 0] == pytest.approx(daylight[1, 0], abs=120)
+    assert daylight[1, 1] > daylight[0, 1]
+    assert daylight[1, 2] < daylight[0, 2]
+
+
+def test_daylight_polar_day_and_night():
+    summer, winter = daylight_seconds(
+        80.0, day_of_year([date(2026, 6, 21), date(2026, 12, 21)])
+    )
+
+    assert summer == SECONDS_PER_DAY
+    assert winter == 0
@@ -0,0 +1,18 @@
+import pytest
+
+from src.utils.distance import great_circle_meters
+
+
+def test_great_circle_meters():
+    # Edinburgh to Glasgow is roughly 67 km in a straight line.
+    distance = great_circle_meters(55.9533, -3.1883, 55.8642, -4.2518)
+
+    assert distance == pytest.approx(67_000, rel=0.02)
+
+
+def test_great_circle_meters_broadcasts_destinations():
+    distances = great_circle_meters(56.0, -4.0, [56.0, 57.0], [-4.0, -4.0])
+
+    assert distances.shape == (2,)
+    assert distances[0] == 0
+    assert distances[1] == pytest.approx(111_195, rel=0.01)
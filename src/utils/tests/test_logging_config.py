@@ -1,6 +1,7 @@
 import logging
+from datetime import date
 from unittest.mock import patch
-from src.utils.logging_config import init_logging
+from src.utils.logging_config import CustomFormatter, init_logging
 import json
 
 
@@ -59,3 +60,14 @@ def test_init_logging_with_extra(mock_stream_handler):
 
     # Clean up
     temp_logger.removeHandler(capture_handler)
+
+
+def test_custom_formatter_logs_values_json_cannot_encode_as_strings():
+    formatter = CustomFormatter("%(levelname)s:%(name)s:%(message)s")
+    record = logging.makeLogRecord(
+        {"msg": "Planning season", "cli_args": {"dates": [date(2026, 6, 6)]}}
+    )
+
+    formatted_message = formatter.format(record)
+
+    assert '(extra: {"cli_args": {"dates": ["2026-06-06"]}})' in formatted_message
@@ -0,0 +1,43 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from src.utils.rate_limit import RateLimiter
+
+
+def test_acquire_spaces_calls():
+    limiter = RateLimiter(max_per_second=10)
+
+    with (
+        patch("src.utils.rate_limit.time.monotonic", return_value=100.0),
+        patch("src.utils.rate_limit.time.sleep") as mock_sleep,
+    ):
+        for _ in range(3):
+            limiter.acquire()
+
+    delays = [call.args[0] for call in mock_sleep.call_args_list]
+    assert delays == pytest.approx([0.1, 0.2])
+
+
+def test_acquire_shared_between_threads():
+    limiter = RateLimiter(max_per_second=50)
+
+    def acquire(_):
+        limiter.acquire()
+        return time.monotonic()
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        times = sorted(executor.map(acquire, range(12)))
+
+    # One shared schedule gives the k-th call a slot k intervals after the
+    # first, whichever thread makes it; threads waking late only add to it.
+    for k, acquired in enumerate(times):
+        assert acquired - start >= k * limiter.interval
+
+
+def test_invalid_rate():
+    with pytest.raises(ValueError, match="must be positive"):
+        RateLimiter(max_per_second=0)
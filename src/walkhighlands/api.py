@@ -1,5 +1,11 @@
 from src.scraper.api import ScraperAPI
-from src.walkhighlands.dtos import HillPageData, Walk, WalkData, WalkStartLocationDTO
+from src.walkhighlands.dtos import (
+    HillPageData,
+    Walk,
+    WalkData,
+    WalkStartLocationRecord,
+    WalkTrailheadRecord,
+)
 from src.walkhighlands.service import WalkhighlandsService
 from src.walkhighlands.data.hill_data import WalkhighlandsData
 import logging
@@ -65,6 +71,9 @@ class WalkhighlandsAPI:
         WalkhighlandsData.create_hill_data_table()
         WalkhighlandsData.create_walk_data_table()
         WalkhighlandsData.create_walk_hill_decomp_table()
+        WalkhighlandsData.create_walk_hill_summary_table()
+        WalkhighlandsData.create_trailhead_tables()
+        WalkhighlandsData.assign_missing_trailheads()
 
     @staticmethod
     def reset_database(tables: list[str] | None = None) -> None:
@@ -72,6 +81,18 @@ class WalkhighlandsAPI:
         WalkhighlandsData.reset_database(tables)
 
     @staticmethod
-    def get_walk_start_locations() -> list[WalkStartLocationDTO]:
+    def get_walk_start_locations() -> list[WalkStartLocationRecord]:
         """Fetch all walk starting locations from the database."""
         return WalkhighlandsData.get_walk_starting_locations()
+
+    @staticmethod
+    def get_walk_trailheads() -> dict[int, WalkTrailheadRecord]:
+        """Fetch the trailhead of every walk that has one, keyed by walk id."""
+        return WalkhighlandsData.get_walk_trailheads()
+
+    @staticmethod
+    def parse_start_location(start_location_url: str) -> str:
+        """Convert a stored walk start location URL into a "lat,lon" string."""
+        return WalkhighlandsData._parse_start_location_url_to_lat_lon_string(
+            start_location_url
+        )
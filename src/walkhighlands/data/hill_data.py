@@ -1,10 +1,21 @@
 from src.database.api import DatabaseAPI
-from src.walkhighlands.dtos import HillPageData, WalkData, WalkStartLocationDTO
+from src.utils.distance import great_circle_meters
+from src.walkhighlands.dtos import (
+    HillPageData,
+    WalkData,
+    WalkStartLocationRecord,
+    WalkTrailheadRecord,
+)
 import logging
+import math
+import os
 import sqlite3
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_TRAILHEAD_RADIUS_METERS = 100.0
+METERS_PER_DEGREE_LATITUDE = 111_320.0
+
 
 class WalkhighlandsData:
     @staticmethod
@@ -100,6 +111,16 @@ class WalkhighlandsData:
                             "Duplicate entry for walk_hill_decomposition.",
                             extra={"hill_id": hill_id, "walk_id": walk_id},
                         )
+                if walk_data.start_location:
+                    try:
+                        WalkhighlandsData._assign_trailhead(
+                            cursor, walk_id, walk_data.start_location
+                        )
+                    except sqlite3.OperationalError:
+                        logger.warning(
+                            "Trailhead tables missing, walk left unassigned.",
+                            extra={"walk_id": walk_id},
+                        )
                 conn.commit()
             logger.debug(
                 "Inserted walk data into the database.",
@@ -160,7 +181,288 @@ class WalkhighlandsData:
                 )
                 """
             )
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_walk_hill_decomposition_walk_id
+                ON walk_hill_decomposition (walk_id)
+                """
+            )
+            conn.commit()
+
+    @staticmethod
+    def create_walk_hill_summary_table() -> None:
+        """
+        Create the per-walk hill summary table and the triggers that keep it
+        in step with walk_hill_decomposition and hills. Each row holds the
+        hill count and JSON arrays of hill ids and names ordered by hill id,
+        so reads don't need to aggregate the decomposition. Existing
+        decomposition rows are summarised when the table is created.
+        """
+        logger.info(
+            "Creating walk hill summary table in the database if it doesn't exist."
+        )
+        refresh = """
+            DELETE FROM walk_hill_summary WHERE walk_id {walks};
+            INSERT INTO walk_hill_summary
+                (walk_id, number_of_hills, hill_ids, hill_names)
+            SELECT
+                walk_id, COUNT(*), json_group_array(hill_id), json_group_array(name)
+            FROM (
+                SELECT whd.walk_id, whd.hill_id, h.name
+                FROM walk_hill_decomposition whd
+                JOIN hills h ON whd.hill_id = h.id
+                WHERE whd.walk_id {walks}
+                ORDER BY whd.walk_id, whd.hill_id
+            )
+            GROUP BY walk_id;
+        """
+        # Walks on a hill, for the triggers on hills.
+        walks_on_hill = """
+            IN (SELECT walk_id FROM walk_hill_decomposition WHERE hill_id = {hill_id})
+        """
+        db_api = DatabaseAPI()
+        with db_api.db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS walk_hill_summary (
+                    walk_id INTEGER PRIMARY KEY,
+                    number_of_hills INTEGER NOT NULL,
+                    hill_ids TEXT NOT NULL,
+                    hill_names TEXT NOT NULL,
+                    FOREIGN KEY (walk_id) REFERENCES walks(id)
+                )
+                """
+            )
+            cursor.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS walk_hill_summary_after_insert
+                AFTER INSERT ON walk_hill_decomposition
+                BEGIN
+                    {refresh.format(walks="= NEW.walk_id")}
+                END
+                """
+            )
+            cursor.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS walk_hill_summary_after_delete
+                AFTER DELETE ON walk_hill_decomposition
+                BEGIN
+                    {refresh.format(walks="= OLD.walk_id")}
+                END
+                """
+            )
+            cursor.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS walk_hill_summary_after_update
+                AFTER UPDATE ON walk_hill_decomposition
+                BEGIN
+                    {refresh.format(walks="= OLD.walk_id")}
+                    {refresh.format(walks="= NEW.walk_id")}
+                END
+                """
+            )
+            cursor.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS walk_hill_summary_after_hill_insert
+                AFTER INSERT ON hills
+                BEGIN
+                    {refresh.format(walks=walks_on_hill.format(hill_id="NEW.id"))}
+                END
+                """
+            )
+            cursor.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS walk_hill_summary_after_hill_delete
+                AFTER DELETE ON hills
+                BEGIN
+                    {refresh.format(walks=walks_on_hill.format(hill_id="OLD.id"))}
+                END
+                """
+            )
+            cursor.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS walk_hill_summary_after_hill_update
+                AFTER UPDATE OF id, name ON hills
+                BEGIN
+                    {refresh.format(walks=walks_on_hill.format(hill_id="OLD.id"))}
+                    {refresh.format(walks=walks_on_hill.format(hill_id="NEW.id"))}
+                END
+                """
+            )
+            cursor.execute(
+                """
+                INSERT OR REPLACE INTO walk_hill_summary
+                    (walk_id, number_of_hills, hill_ids, hill_names)
+                SELECT
+                    walk_id, COUNT(*), json_group_array(hill_id), json_group_array(name)
+                FROM (
+                    SELECT whd.walk_id, whd.hill_id, h.name
+                    FROM walk_hill_decomposition whd
+                    JOIN hills h ON whd.hill_id = h.id
+                    ORDER BY whd.walk_id, whd.hill_id
+                )
+                GROUP BY walk_id
+                """
+            )
+            conn.commit()
+
+    @staticmethod
+    def create_trailhead_tables() -> None:
+        """
+        Create the trailheads table and the walk_trailheads link table if
+        they don't exist. A trailhead is a walk start point shared by every
+        walk starting within TRAILHEAD_RADIUS_METERS of it.
+        """
+        logger.info("Creating trailhead tables in the database if they don't exist.")
+        db_api = DatabaseAPI()
+        with db_api.db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS trailheads (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    lat REAL NOT NULL,
+                    lon REAL NOT NULL
+                )
+                """
+            )
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_trailheads_lat_lon
+                ON trailheads (lat, lon)
+                """
+            )
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS walk_trailheads (
+                    walk_id INTEGER PRIMARY KEY,
+                    trailhead_id INTEGER NOT NULL,
+                    FOREIGN KEY (walk_id) REFERENCES walks(id),
+                    FOREIGN KEY (trailhead_id) REFERENCES trailheads(id)
+                )
+                """
+            )
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_walk_trailheads_trailhead_id
+                ON walk_trailheads (trailhead_id)
+                """
+            )
+            conn.commit()
+
+    @staticmethod
+    def assign_missing_trailheads() -> int:
+        """
+        Link every walk with a start location but no trailhead to one,
+        e.g. walks saved before trailheads existed. Returns the number of
+        walks assigned.
+        """
+        db_api = DatabaseAPI()
+        with db_api.db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT w.id, w.start_location FROM walks w
+                WHERE w.start_location IS NOT NULL
+                AND NOT EXISTS (
+                    SELECT 1 FROM walk_trailheads wt WHERE wt.walk_id = w.id
+                )
+                ORDER BY w.id
+                """
+            )
+            walks = cursor.fetchall()
+            for walk_id, start_location in walks:
+                WalkhighlandsData._assign_trailhead(cursor, walk_id, start_location)
             conn.commit()
+        if walks:
+            logger.info("Assigned walks to trailheads.", extra={"walks": len(walks)})
+        return len(walks)
+
+    @staticmethod
+    def get_walk_trailheads() -> dict[int, WalkTrailheadRecord]:
+        """Get the trailhead of every walk that has one, keyed by walk id."""
+        db_api = DatabaseAPI()
+        try:
+            with db_api.db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    SELECT wt.walk_id, t.id, t.lat, t.lon
+                    FROM walk_trailheads wt
+                    JOIN trailheads t ON wt.trailhead_id = t.id
+                    """
+                )
+                return {
+                    walk_id: WalkTrailheadRecord(walk_id, trailhead_id, f"{lat},{lon}")
+                    for walk_id, trailhead_id, lat, lon in cursor.fetchall()
+                }
+        except sqlite3.Error:
+            logger.exception("An error occurred while fetching walk trailheads")
+            return {}
+
+    @staticmethod
+    def _assign_trailhead(
+        cursor: sqlite3.Cursor, walk_id: int, start_location_url: str
+    ) -> int | None:
+        """
+        Link a walk to the nearest trailhead within TRAILHEAD_RADIUS_METERS
+        of its start, creating a trailhead at the start if there is none.
+        Returns the trailhead id, or None if the start location can't be
+        parsed.
+        """
+        try:
+            lat, lon = map(
+                float,
+                WalkhighlandsData._parse_start_location_url_to_lat_lon_string(
+                    start_location_url
+                ).split(","),
+            )
+        except (IndexError, ValueError):
+            logger.debug(
+                "Walk start location is not a map URL, no trailhead assigned.",
+                extra={"walk_id": walk_id, "start_location": start_location_url},
+            )
+            return None
+        radius = WalkhighlandsData._trailhead_radius_meters()
+        delta_lat = radius / METERS_PER_DEGREE_LATITUDE
+        delta_lon = delta_lat / max(math.cos(math.radians(lat)), 1e-6)
+        cursor.execute(
+            """
+            SELECT id, lat, lon FROM trailheads
+            WHERE lat BETWEEN ? AND ? AND lon BETWEEN ? AND ?
+            """,
+            (lat - delta_lat, lat + delta_lat, lon - delta_lon, lon + delta_lon),
+        )
+        nearby = cursor.fetchall()
+        trailhead_id = None
+        if nearby:
+            distances = great_circle_meters(
+                lat, lon, [row[1] for row in nearby], [row[2] for row in nearby]
+            )
+            closest = int(distances.argmin())
+            if distances[closest] <= radius:
+                trailhead_id = nearby[closest][0]
+        if trailhead_id is None:
+            cursor.execute(
+                "INSERT INTO trailheads (lat, lon) VALUES (?, ?)", (lat, lon)
+            )
+            trailhead_id = cursor.lastrowid
+        cursor.execute(
+            """
+            INSERT OR REPLACE INTO walk_trailheads (walk_id, trailhead_id)
+            VALUES (?, ?)
+            """,
+            (walk_id, trailhead_id),
+        )
+        return trailhead_id
+
+    @staticmethod
+    def _trailhead_radius_meters() -> float:
+        """Distance within which walk starts share a trailhead."""
+        return float(
+            os.getenv("TRAILHEAD_RADIUS_METERS", str(DEFAULT_TRAILHEAD_RADIUS_METERS))
+        )
 
     @staticmethod
     def get_hill_id_by_url(url: str) -> int | None:
@@ -231,10 +533,15 @@ class WalkhighlandsData:
 
     @staticmethod
     def reset_database(tables: list[str] | None = None) -> None:
-        """Reset the database."""
+        """
+        Reset the database. The walk hill summary is derived from the other
+        tables, and dropping hills drops its triggers, so it is always
+        dropped and rebuilt once the other tables have been recreated.
+        """
         db_api = DatabaseAPI()
         with db_api.db_connection() as conn:
             cursor = conn.cursor()
+            cursor.execute("DROP TABLE IF EXISTS walk_hill_summary")
             if not tables or "walk_hill_decomposition" in tables:
                 logger.info("Dropping and recreating walk_hill_decomposition table.")
                 cursor.execute("DROP TABLE IF EXISTS walk_hill_decomposition")
@@ -242,18 +549,23 @@ class WalkhighlandsData:
             if not tables or "walks" in tables:
                 logger.info("Dropping and recreating walks table.")
                 cursor.execute("DROP TABLE IF EXISTS walks")
+                cursor.execute("DROP TABLE IF EXISTS walk_trailheads")
+                cursor.execute("DROP TABLE IF EXISTS trailheads")
                 WalkhighlandsData.create_walk_data_table()
+                WalkhighlandsData.create_trailhead_tables()
             if not tables or "hills" in tables:
                 logger.info("Dropping and recreating hills table.")
                 cursor.execute("DROP TABLE IF EXISTS hills")
                 WalkhighlandsData.create_hill_data_table()
+            logger.info("Recreating walk_hill_summary table.")
+            WalkhighlandsData.create_walk_hill_summary_table()
             conn.commit()
 
     @staticmethod
-    def get_walk_starting_locations() -> list[WalkStartLocationDTO]:
+    def get_walk_starting_locations() -> list[WalkStartLocationRecord]:
         """Get walk starting locations from the database."""
         db_api = DatabaseAPI()
-        walk_start_locations: list[WalkStartLocationDTO] = []
+        walk_start_locations: list[WalkStartLocationRecord] = []
         with db_api.db_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
@@ -271,9 +583,7 @@ class WalkhighlandsData:
                     )
                 )
                 walk_start_locations.append(
-                    WalkStartLocationDTO(
-                        walk_id=walk_id, walk_start_location=lat_lon_string
-                    )
+                    WalkStartLocationRecord(walk_id, lat_lon_string)
                 )
         return walk_start_locations
 
@@ -1,3 +1,5 @@
+from dataclasses import dataclass
+
 from pydantic import BaseModel
 
 
@@ -30,3 +32,26 @@ class Walk(BaseModel):
 class WalkStartLocationDTO(BaseModel):
     walk_id: int
     walk_start_location: str
+
+
+@dataclass(slots=True)
+class WalkStartLocationRecord:
+    """Lightweight walk start location used on internal read paths."""
+
+    walk_id: int
+    walk_start_location: str
+
+    def to_dto(self) -> WalkStartLocationDTO:
+        """Convert the record into the validated WalkStartLocationDTO model."""
+        return WalkStartLocationDTO(
+            walk_id=self.walk_id, walk_start_location=self.walk_start_location
+        )
+
+
+@dataclass(slots=True)
+class WalkTrailheadRecord:
+    """The trailhead a walk starts from, with its location as "lat,lon"."""
+
+    walk_id: int
+    trailhead_id: int
+    trailhead_location: str
@@ -174,8 +174,14 @@ class TestWalkhighlandsAPI:
     @patch("walkhighlands.api.WalkhighlandsData.create_hill_data_table")
     @patch("walkhighlands.api.WalkhighlandsData.create_walk_data_table")
     @patch("walkhighlands.api.WalkhighlandsData.create_walk_hill_decomp_table")
+    @patch("walkhighlands.api.WalkhighlandsData.create_walk_hill_summary_table")
+    @patch("walkhighlands.api.WalkhighlandsData.create_trailhead_tables")
+    @patch("walkhighlands.api.WalkhighlandsData.assign_missing_trailheads")
     def test_initialize_app_success(
         self,
+        mock_assign_missing_trailheads,
+        mock_create_trailhead_tables,
+        mock_create_walk_hill_summary_table,
         mock_create_walk_hill_decomp_table,
         mock_create_walk_data_table,
         mock_create_hill_data_table,
@@ -185,6 +191,9 @@ class TestWalkhighlandsAPI:
         mock_create_hill_data_table.assert_called_once()
         mock_create_walk_data_table.assert_called_once()
         mock_create_walk_hill_decomp_table.assert_called_once()
+        mock_create_walk_hill_summary_table.assert_called_once()
+        mock_create_trailhead_tables.assert_called_once()
+        mock_assign_missing_trailheads.assert_called_once()
 
     @patch("walkhighlands.api.WalkhighlandsData.reset_database")
     def test_reset_database_no_tables(self, mock_reset_database):
@@ -43,3 +43,178 @@ def test_insert_walk_duplicate_hill_decomposition(mock_db_api):
             "Duplicate entry for walk_hill_decomposition.",
             extra={"hill_id": 1, "walk_id": 1},
         )
+
+
+def _insert_hills(conn: sqlite3.Connection) -> None:
+    conn.executemany(
+        "INSERT INTO hills (id, url, name, region, altitude) VALUES (?, ?, ?, ?, ?)",
+        [
+            (1, "http://hill1.com", "Hill, One", "Region 1", 1000),
+            (2, "http://hill2.com", "Hill Two", "Region 1", 1100),
+        ],
+    )
+    conn.commit()
+
+
+def test_walk_hill_summary_maintained_on_decomposition_changes(mock_db_api):
+    WalkhighlandsData.create_walk_data_table()
+    WalkhighlandsData.create_hill_data_table()
+    WalkhighlandsData.create_walk_hill_decomp_table()
+    WalkhighlandsData.create_walk_hill_summary_table()
+    conn = mock_db_api.db_connection.return_value.__enter__.return_value
+    _insert_hills(conn)
+
+    WalkhighlandsData.insert_walk(
+        WalkData(
+            title="Test Walk",
+            url="http://test.com",
+            grade=1,
+            bog_factor=1,
+            user_rating=1,
+            distance_km=1,
+            duration_hr=1,
+            ascent_m=1,
+            start_grid_ref="NN123456",
+            start_location="somewhere",
+            hill_ids=[2, 1],
+        )
+    )
+
+    summary = conn.execute(
+        "SELECT number_of_hills, hill_ids, hill_names FROM walk_hill_summary"
+    ).fetchall()
+    assert summary == [(2, "[1,2]", '["Hill, One","Hill Two"]')]
+
+    conn.execute("DELETE FROM walk_hill_decomposition WHERE hill_id = 1")
+    summary = conn.execute(
+        "SELECT number_of_hills, hill_ids, hill_names FROM walk_hill_summary"
+    ).fetchall()
+    assert summary == [(1, "[2]", '["Hill Two"]')]
+
+    conn.execute("DELETE FROM walk_hill_decomposition")
+    assert conn.execute("SELECT * FROM walk_hill_summary").fetchall() == []
+
+
+def test_walk_hill_summary_maintained_on_hill_changes(mock_db_api):
+    WalkhighlandsData.create_hill_data_table()
+    WalkhighlandsData.create_walk_hill_decomp_table()
+    WalkhighlandsData.create_walk_hill_summary_table()
+    conn = mock_db_api.db_connection.return_value.__enter__.return_value
+    _insert_hills(conn)
+    conn.executemany(
+        "INSERT INTO walk_hill_decomposition (walk_id, hill_id) VALUES (?, ?)",
+        [(5, 2), (5, 1), (6, 2)],
+    )
+
+    def summary():
+        return conn.execute(
+            "SELECT walk_id, hill_ids, hill_names FROM walk_hill_summary "
+            "ORDER BY walk_id"
+        ).fetchall()
+
+    conn.execute("UPDATE hills SET name = 'Hill Deux' WHERE id = 2")
+    assert summary() == [
+        (5, "[1,2]", '["Hill, One","Hill Deux"]'),
+        (6, "[2]", '["Hill Deux"]'),
+    ]
+
+    conn.execute("DELETE FROM hills WHERE id = 2")
+    assert summary() == [(5, "[1]", '["Hill, One"]')]
+
+    conn.execute(
+        "INSERT INTO hills (id, url, name, region, altitude) "
+        "VALUES (2, 'http://hill2.com', 'Hill Two', 'Region 1', 1100)"
+    )
+    assert summary() == [
+        (5, "[1,2]", '["Hill, One","Hill Two"]'),
+        (6, "[2]", '["Hill Two"]'),
+    ]
+
+
+@pytest.mark.parametrize("tables", [None, ["hills"]])
+def test_reset_database_keeps_walk_hill_summary_in_step_with_hills(mock_db_api, tables):
+    WalkhighlandsData.create_walk_data_table()
+    WalkhighlandsData.create_hill_data_table()
+    WalkhighlandsData.create_walk_hill_decomp_table()
+    WalkhighlandsData.create_walk_hill_summary_table()
+    conn = mock_db_api.db_connection.return_value.__enter__.return_value
+
+    WalkhighlandsData.reset_database(tables)
+    _insert_hills(conn)
+    conn.execute("INSERT INTO walk_hill_decomposition (walk_id, hill_id) VALUES (5, 2)")
+    conn.execute("UPDATE hills SET name = 'Hill Deux' WHERE id = 2")
+
+    assert conn.execute(
+        "SELECT walk_id, hill_ids, hill_names FROM walk_hill_summary"
+    ).fetchall() == [(5, "[2]", '["Hill Deux"]')]
+
+
+def test_create_walk_hill_summary_table_backfills_existing_rows(mock_db_api):
+    WalkhighlandsData.create_hill_data_table()
+    WalkhighlandsData.create_walk_hill_decomp_table()
+    conn = mock_db_api.db_connection.return_value.__enter__.return_value
+    _insert_hills(conn)
+    conn.executemany(
+        "INSERT INTO walk_hill_decomposition (walk_id, hill_id) VALUES (?, ?)",
+        [(5, 2), (5, 1), (6, 2)],
+    )
+
+    WalkhighlandsData.create_walk_hill_summary_table()
+
+    summary = conn.execute(
+        "SELECT walk_id, number_of_hills, hill_ids FROM walk_hill_summary "
+        "ORDER BY walk_id"
+    ).fetchall()
+    assert summary == [(5, 2, "[1,2]"), (6, 1, "[2]")]
+
+
+def _walk(url: str, start_location: str) -> WalkData:
+    return WalkData(
+        title=url,
+        url=url,
+        grade=1,
+        bog_factor=1,
+        user_rating=1,
+        distance_km=1,
+        duration_hr=1,
+        ascent_m=1,
+        start_grid_ref="NN123456",
+        start_location=f"https://www.google.com/maps/search/{start_location}/",
+        hill_ids=[],
+    )
+
+
+def test_insert_walk_clusters_trailheads(mock_db_api):
+    WalkhighlandsData.create_walk_data_table()
+    WalkhighlandsData.create_walk_hill_decomp_table()
+    WalkhighlandsData.create_trailhead_tables()
+
+    # The second walk starts about 30 m from the first, the third about 1 km away.
+    WalkhighlandsData.insert_walk(_walk("https://walk1.com", "56.90890,-4.23660"))
+    WalkhighlandsData.insert_walk(_walk("https://walk2.com", "56.90910,-4.23640"))
+    WalkhighlandsData.insert_walk(_walk("https://walk3.com", "56.91790,-4.23660"))
+
+    trailheads = WalkhighlandsData.get_walk_trailheads()
+
+    assert trailheads[1].trailhead_id == trailheads[2].trailhead_id
+    assert trailheads[3].trailhead_id != trailheads[1].trailhead_id
+    assert trailheads[2].trailhead_location == "56.9089,-4.2366"
+
+
+def test_get_walk_trailheads_without_tables(mock_db_api):
+    assert WalkhighlandsData.get_walk_trailheads() == {}
+
+
+def test_assign_missing_trailheads(mock_db_api, monkeypatch):
+    WalkhighlandsData.create_walk_data_table()
+    WalkhighlandsData.create_walk_hill_decomp_table()
+    WalkhighlandsData.insert_walk(_walk("https://walk1.com", "56.90890,-4.23660"))
+    WalkhighlandsData.insert_walk(_walk("https://walk2.com", "56.91790,-4.23660"))
+    WalkhighlandsData.create_trailhead_tables()
+    monkeypatch.setenv("TRAILHEAD_RADIUS_METERS", "2000")
+
+    assert WalkhighlandsData.assign_missing_trailheads() == 2
+    assert WalkhighlandsData.assign_missing_trailheads() == 0
+
+    trailheads = WalkhighlandsData.get_walk_trailheads()
+    assert trailheads[1].trailhead_id == trailheads[2].trailhead_id
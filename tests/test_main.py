@@ -0,0 +1,44 @@
+from unittest.mock import patch
+
+import main
+from src.users.ranking import DEFAULT_PARETO_OBJECTIVES
+
+
+def run_main(argv):
+    with patch("sys.argv", ["main.py", *argv]):
+        main.main()
+
+
+@patch("main.UsersAPI")
+def test_optimal_routes_pareto_shows_the_skyline(mock_users_api):
+    run_main(["optimal-routes", "--users", "alice", "--pareto", "hills"])
+
+    mock_users_api.get_pareto_user_routes.assert_called_once()
+    user, objectives, _ = mock_users_api.get_pareto_user_routes.call_args.args
+    assert (user, objectives) == ("alice", ["hills"])
+    mock_users_api.get_optimal_user_routes.assert_not_called()
+
+
+@patch("main.UsersAPI")
+def test_optimal_routes_pareto_defaults_objectives_and_fetches_every_walk(
+    mock_users_api,
+):
+    run_main(
+        ["optimal-routes", "--users", "alice", "--pareto", "--ascending"]
+        + ["--fetch_missing"]
+    )
+
+    _, objectives, _ = mock_users_api.get_pareto_user_routes.call_args.args
+    assert objectives == DEFAULT_PARETO_OBJECTIVES
+    fetch = mock_users_api.get_walk_directions_for_user.call_args
+    assert fetch.kwargs["top_n"] is None
+
+
+@patch("main.UsersAPI")
+def test_optimal_routes_without_pareto_ranks_top_n(mock_users_api):
+    run_main(["optimal-routes", "--users", "alice", "--ascending", "--fetch_missing"])
+
+    mock_users_api.get_pareto_user_routes.assert_not_called()
+    mock_users_api.get_optimal_user_routes.assert_called_once()
+    fetch = mock_users_api.get_walk_directions_for_user.call_args
+    assert fetch.kwargs["top_n"] == 10